@@ -7,6 +7,7 @@
 #include <aotriton/_internal/triton_kernel.h>
 #include <aotriton/config.h>
 #include <memory>
+#include <mutex>
 #include <shared_mutex>
 #include <stdint.h>
 #include <string_view>
@@ -17,7 +18,11 @@
 namespace AOTRITON_NS {
 
 using PackedKernelPtr = std::shared_ptr<PackedKernel>;
+struct AKS2_Header;
 struct AKS2_Metadata;
+struct AKS3_Header;
+struct AKS3_Block;
+struct AKS3_Entry;
 
 class PackedKernel {
 public:
@@ -33,6 +38,12 @@ public:
 private:
   static std::shared_mutex registry_mutex_;
   static std::unordered_map<pstring_view, PackedKernelPtr> registry_;
+  hipError_t open_aks2(int fd, const AKS2_Header& header);
+  hipError_t open_aks3(int fd, const AKS3_Header& header);
+  TritonKernel::Essentials filter_aks2(std::string_view stem_name) const;
+  TritonKernel::Essentials filter_aks3(std::string_view stem_name) const;
+  const uint8_t* decompress_block(uint32_t index) const;
+  uint32_t format_ = 0;
   // Note: do NOT drop the decompressed directory, its content is used by
   //       the unordered_map directory_
   std::vector<uint8_t> decompressed_content_;
@@ -41,6 +52,19 @@ private:
   const uint8_t* kernel_start_;
   // Note: again, AKS2_Metadata points to directory at decompressed_content_
   std::unordered_map<std::string_view, const AKS2_Metadata*> directory_;
+
+  // AKS3: the archive is kept compressed, blocks are decompressed on demand.
+  //       Pointers below point to archive_content_
+  std::vector<uint8_t> archive_content_;
+  uint32_t number_of_kernels_ = 0;
+  uint32_t number_of_blocks_ = 0;
+  const AKS3_Block* blocks_ = nullptr;
+  const AKS3_Entry* entries_ = nullptr;
+  const char* names_ = nullptr;
+  const uint8_t* block_start_ = nullptr;
+  // PackedKernel is shared by TritonKernel objects of the same Functional
+  mutable std::mutex block_mutex_;
+  mutable std::vector<std::unique_ptr<std::vector<uint8_t>>> decompressed_blocks_;
 };
 
 };
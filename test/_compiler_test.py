@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Shared by the CPU tests of v3python/compile.py and v3python.compiler, which
+# run with the fake backend.
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SOURCE_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOURCE_PATH))
+from v3python.compiler import CompileJob
+
+COMPILER = SOURCE_PATH / 'v3python' / 'compile.py'
+# Environment variables of compile.py that change where and how it compiles
+COMPILER_ENVIRONMENT = ['AOTRITON_COMPILE_SERVER',
+                        'AOTRITON_HSACO_CACHE',
+                        'AOTRITON_COMPILE_LEDGER',
+                        'AOTRITON_COMPILE_MEMORY_BUDGET']
+
+'''
+Job of directory/fake_kernel.py, written to directory/kernel_<index>.hsaco
+unless path or out_path is given
+'''
+def make_job(directory : Path, kernel_name='ok', index=0, **kwargs):
+    d = dict(path=str(directory / 'fake_kernel.py'),
+             kernel_name=kernel_name,
+             out_path=str(directory / f'kernel_{index}.hsaco'),
+             signature='*fp16:16, i32, 64',
+             target='gfx942',
+             num_warps=4)
+    d.update(kwargs)
+    return CompileJob(**d)
+
+'''
+Environment of compile.py with the fake backend, and only the given
+variables among COMPILER_ENVIRONMENT
+'''
+def compiler_env(**variables):
+    env = dict(os.environ, AOTRITON_COMPILE_BACKEND='fake')
+    for key in COMPILER_ENVIRONMENT:
+        env.pop(key, None)
+    env.update({ k : str(v) for k, v in variables.items() })
+    return env
+
+def compiler_command(job, *extra):
+    return [sys.executable, str(COMPILER), job.path,
+            '--kernel_name', job.kernel_name,
+            '-o', job.out_path,
+            '-g', job.grid,
+            '--num_warps', str(job.num_warps),
+            '--num_stages', str(job.num_stages),
+            '--waves_per_eu', str(job.waves_per_eu),
+            '--target', job.target,
+            '--signature', job.signature,
+            '--timeout', str(job.timeout),
+            *extra]
+
+def run_compiler(job, env, *extra):
+    return subprocess.run(compiler_command(job, *extra), env=env, capture_output=True, text=True)
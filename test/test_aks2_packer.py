@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. The streaming/parallel AKS2 packer must produce the same bytes as
+# compressing the whole archive in one LZMA call.
+
+import json
+import lzma
+import os
+import random
+import sys
+import threading
+import time
+from argparse import Namespace
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from v3python import aks2 as aks2_module
+from v3python.aks2 import (
+    AKS2,
+    AKS2_MAGIC,
+    JobServerClient,
+    directory_entry_blob,
+    pack_cluster,
+    parse_cluster,
+    scan_hsaco,
+    u32,
+)
+
+def write_dummy_hsacos(directory : Path, n, seed):
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(n):
+        hsaco = directory / f'kernel_{seed}_{i}.hsaco'
+        if i % 7 == 3:
+            blob = b''
+            j = { 'compile_status' : 'Timeout' }
+        else:
+            size = rng.choice([16, 3000, 70000])
+            blob = b'\x7fELF' + bytes(rng.getrandbits(8) for _ in range(size // 2)) + bytes(size // 2)
+            j = { 'shared' : rng.choice([0, 32768]), 'num_warps' : rng.choice([1, 4, 8]), 'warp_size' : 64 }
+        hsaco.write_bytes(blob)
+        hsaco.with_suffix('.json').write_text(json.dumps(j))
+        files.append(str(hsaco))
+    return files
+
+'''
+The AKS2 format in its simplest form: header + one LZMA stream over the
+directory and all images, loaded into memory.
+'''
+def reference_aks2(files, ignore_json):
+    entries = []
+    blobs = []
+    offset = 0
+    for fn in files:
+        entry = scan_hsaco(Path(fn), offset, ignore_json)
+        blob = Path(fn).read_bytes()
+        offset += len(blob)
+        entries.append(entry)
+        blobs.append(blob)
+    directory = b''.join([directory_entry_blob(e) for e in entries])
+    content = directory + b''.join(blobs)
+    header = AKS2_MAGIC + u32(len(content)) + u32(len(entries)) + u32(len(directory))
+    return header + lzma.compress(content)
+
+@pytest.mark.parametrize('ignore_json', [False, True])
+def test_streaming_identical(tmp_path, monkeypatch, ignore_json):
+    # Images larger than the chunk size are split into several compress() calls
+    monkeypatch.setattr(aks2_module, 'STREAM_CHUNK_SIZE', 4096)
+    files = write_dummy_hsacos(tmp_path / 'hsaco', 24, seed=0)
+    aks2 = AKS2()
+    aks2.load(Namespace(hsaco_files=files, ignore_json=ignore_json))
+    aks2.write_file(tmp_path / 'out.aks2')
+    assert (tmp_path / 'out.aks2').read_bytes() == reference_aks2(files, ignore_json)
+    assert not list(tmp_path.glob('*.tmp'))
+
+def write_cluster_file(tmp_path, narchives):
+    lines = []
+    for i in range(narchives):
+        files = write_dummy_hsacos(tmp_path / 'hsaco' / str(i), 5 + i, seed=i)
+        lines.append(';'.join(['amd-gfx942', 'flash', f'kernel{i % 2}', f'FONLY__{i}___gfx942'] + files))
+    cluster = tmp_path / 'Bare.cluster'
+    cluster.write_text('\n'.join(lines) + '\n')
+    return cluster
+
+def check_archives(rules, output_dir):
+    for archive, files in rules:
+        assert (output_dir / archive).read_bytes() == reference_aks2(files, False)
+
+def test_pack_cluster_identical(tmp_path):
+    cluster = write_cluster_file(tmp_path, 8)
+    rules = parse_cluster(cluster)
+    assert len(rules) == 8
+    assert rules[0][0] == Path('amd-gfx942/flash/kernel0/FONLY__0___gfx942.aks2')
+    pack_cluster(rules, tmp_path / 'images', ignore_json=False, jobs=3)
+    check_archives(rules, tmp_path / 'images')
+
+def test_memory_budget(tmp_path, monkeypatch):
+    cluster = write_cluster_file(tmp_path, 6)
+    rules = parse_cluster(cluster)
+    running = []
+    peak = []
+    lock = threading.Lock()
+    original = aks2_module.pack_one
+    def tracking_pack_one(*args):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        original(*args)
+        with lock:
+            running.pop()
+    monkeypatch.setattr(aks2_module, 'pack_one', tracking_pack_one)
+    # Budget for two concurrent archives
+    pack_cluster(rules, tmp_path / 'images', ignore_json=False, jobs=4,
+                 memory_budget=2 * AKS2.estimated_memory())
+    assert max(peak) <= 2
+    check_archives(rules, tmp_path / 'images')
+
+def test_jobserver(tmp_path, monkeypatch):
+    cluster = write_cluster_file(tmp_path, 5)
+    rules = parse_cluster(cluster)
+    rfd, wfd = os.pipe()
+    os.write(wfd, b'++')
+    monkeypatch.setenv('MAKEFLAGS', f' -j3 --jobserver-auth={rfd},{wfd}')
+    jobserver = JobServerClient.from_environ()
+    assert jobserver is not None
+    pack_cluster(rules, tmp_path / 'images', ignore_json=False, jobs=4, jobserver=jobserver)
+    check_archives(rules, tmp_path / 'images')
+    # All tokens are returned
+    os.set_blocking(rfd, False)
+    assert os.read(rfd, 16) == b'++'
+    os.close(rfd)
+    os.close(wfd)
+
+def test_slots_taken_by_workers(tmp_path, monkeypatch):
+    cluster = write_cluster_file(tmp_path, 6)
+    rules = parse_cluster(cluster)
+    rfd, wfd = os.pipe()
+    os.write(wfd, b'+')
+    monkeypatch.setenv('MAKEFLAGS', f' -j2 --jobserver-auth={rfd},{wfd}')
+    jobserver = JobServerClient.from_environ()
+    threads = []
+    original = jobserver.acquire
+    def tracking_acquire():
+        threads.append(threading.get_ident())
+        return original()
+    monkeypatch.setattr(jobserver, 'acquire', tracking_acquire)
+    original_pack_one = aks2_module.pack_one
+    def failing_pack_one(archive, *args):
+        if archive.name.startswith('FONLY__2_'):
+            raise RuntimeError('broken archive')
+        original_pack_one(archive, *args)
+    monkeypatch.setattr(aks2_module, 'pack_one', failing_pack_one)
+    with pytest.raises(RuntimeError, match='broken archive'):
+        pack_cluster(rules, tmp_path / 'images', ignore_json=False, jobs=3, jobserver=jobserver)
+    assert len(threads) == len(rules)
+    assert threading.get_ident() not in threads
+    # Tokens are returned, also by the failed archive
+    os.set_blocking(rfd, False)
+    assert os.read(rfd, 16) == b'+'
+    os.close(rfd)
+    os.close(wfd)
+
+def test_no_jobserver(monkeypatch):
+    monkeypatch.setenv('MAKEFLAGS', '-j4')
+    assert JobServerClient.from_environ() is None
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Deduplication and shared-dictionary study over synthetic ELF-like
+# kernel images.
+
+import random
+import sys
+import zlib
+from argparse import Namespace
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from v3python.aks2 import AKS2, AKS2Reader, parse_cluster
+from v3python.aks2_study import (
+    create_codecs,
+    find_duplicates,
+    format_report,
+    minhash,
+    scan_blobs,
+    similarity,
+    study,
+    train_dictionary,
+)
+
+ELF_HEADER = b'\x7fELF\x02\x01\x01\x40' + bytes(8) + b'\x03\x00\xe0\x00' + bytes(44)
+NOTE = b'amdhsa.kernels\x00.group_segment_fixed_size\x00.kernarg_segment_size\x00.wavefront_size\x00' * 4
+
+def elf_like(rng, code):
+    return ELF_HEADER + NOTE + code + bytes(rng.getrandbits(8) for _ in range(64))
+
+'''
+For each kernel, a base code section and variants with small edits (as if
+BLOCK_DMODEL changed), plus exact copies of some variants.
+'''
+def write_images(directory : Path, arch='gfx942', nkernels=4, nvariants=3, seed=0):
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for k in range(nkernels):
+        code = bytearray(rng.getrandbits(8) for _ in range(4096))
+        for v in range(nvariants):
+            variant = bytearray(code)
+            for _ in range(8):
+                variant[rng.randrange(len(variant))] = rng.getrandbits(8)
+            fn = directory / f'kernel{k}-Sig-F__{v}--Arch_{arch}.hsaco'
+            fn.write_bytes(elf_like(rng, bytes(variant)))
+            files.append(fn)
+        copy = directory / f'kernel{k}-Sig-F__copy--Arch_{arch}.hsaco'
+        copy.write_bytes(files[-1].read_bytes())
+        files.append(copy)
+    return files
+
+def study_args(**kwargs):
+    args = dict(dict_size=32 * 1024, similarity=0.5, max_blobs=None)
+    args.update(kwargs)
+    return Namespace(**args)
+
+def test_duplicates(tmp_path):
+    files = write_images(tmp_path)
+    blobs = scan_blobs(files)
+    dups = find_duplicates(blobs)
+    assert len(dups) == 4
+    for group in dups.values():
+        assert len(group) == 2
+        assert any('copy' in b.path.name for b in group)
+
+def test_similarity(tmp_path):
+    files = write_images(tmp_path, nkernels=3)
+    datas = [ fn.read_bytes() for fn in files if 'copy' not in fn.name ]
+    signatures = [ minhash(d) for d in datas ]
+    nearest, pairs = similarity(signatures, 0.5)
+    # Variants of the same kernel are similar, different kernels are not
+    for i, j, s in pairs:
+        assert i // 3 == j // 3
+    assert len(pairs) == 3 * 3
+    assert min(nearest) > 0.5
+
+def test_shared_dictionary(tmp_path):
+    files = write_images(tmp_path, nkernels=6, nvariants=2)
+    datas = [ fn.read_bytes() for fn in files ]
+    zdict = train_dictionary(datas, 32 * 1024)
+    assert 0 < len(zdict) <= 32 * 1024
+    assert NOTE[:64] in zdict
+    codecs = { c.name : c for c in create_codecs(datas, 32 * 1024) }
+    plain = sum([len(codecs['zlib'].compress(d)) for d in datas])
+    shared = sum([len(codecs['zlib+dict'].compress(d)) for d in datas])
+    assert shared < plain
+    for d in datas:
+        assert codecs['zlib+dict'].decompress(codecs['zlib+dict'].compress(d)) == d
+
+def test_dedup_archive(tmp_path):
+    files = write_images(tmp_path / 'images')
+    args = Namespace(hsaco_files=[str(fn) for fn in files], ignore_json=True)
+    full = AKS2()
+    full.load(args)
+    full.write_file(tmp_path / 'full.aks2')
+    dedup = AKS2(dedup=True)
+    dedup.load(args)
+    dedup.write_file(tmp_path / 'dedup.aks2')
+    assert len(dedup.images) == len(files) - 4
+    assert dedup.total_uncompressed_size < full.total_uncompressed_size
+    reader = AKS2Reader(tmp_path / 'dedup.aks2')
+    for fn in files:
+        assert reader.read(fn.stem)[0] == fn.read_bytes()
+
+def test_study_report(tmp_path):
+    files = write_images(tmp_path / 'gfx942', arch='gfx942')
+    files += write_images(tmp_path / 'gfx1100', arch='gfx1100', seed=1)
+    # Two archives sharing one image
+    cluster = tmp_path / 'Bare.cluster'
+    gfx942 = [ str(fn) for fn in files if 'gfx942' in fn.name ]
+    cluster.write_text(';'.join(['amd-gfx942', 'flash', 'kernel', 'FONLY__a___gfx942'] + gfx942[:3]) + '\n' +
+                       ';'.join(['amd-gfx942', 'flash', 'kernel', 'FONLY__b___gfx942'] + gfx942[2:6]) + '\n')
+    rules = parse_cluster(cluster)
+    report = study(files, study_args(), rules)
+    assert [r['arch'] for r in report['arches']] == ['gfx1100', 'gfx942']
+    for r in report['arches']:
+        assert r['images'] == 16
+        assert r['unique_images'] == 12
+        strategies = r['strategies']
+        assert strategies['solid lzma, dedup']['size'] <= strategies['solid lzma (AKS2)']['size']
+        assert strategies['per-image zlib+dict, dedup']['size'] < strategies['per-image zlib, dedup']['size']
+    assert report['cluster']['images_in_multiple_archives'] == 1
+    assert 'gfx942' in format_report(report)
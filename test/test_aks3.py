@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Round-trip of AKS2/AKS3 kernel archives over synthetic HSACO blobs.
+
+import json
+import random
+import struct
+import sys
+from argparse import Namespace
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from v3python import aks3 as aks3_module
+from v3python.aks2 import AKS2
+from v3python.aks3 import AKS3, AKS3Reader, NO_BLOCK, open_archive
+
+def synthetic_kernels(n=40, seed=0):
+    rng = random.Random(seed)
+    kernels = []
+    for i in range(n):
+        if i % 13 == 5:
+            blob = b''  # Failed compilation
+            shared, threads = 0, 0
+        else:
+            # Compressible header + random payload, similar to HSACO files
+            size = rng.randint(1, 8192)
+            blob = b'\x7fELF' + bytes(60) + bytes(rng.getrandbits(8) for _ in range(size))
+            shared, threads = rng.choice([0, 16384, 65536]), rng.choice([64, 256, 512])
+        kernels.append((f'attn_fwd-Sig-F__{i}__P__{rng.getrandbits(32):08x}', blob, shared, threads))
+    return kernels
+
+def write_hsaco_files(directory : Path, kernels):
+    files = []
+    for name, blob, shared, threads in kernels:
+        hsaco = directory / f'{name}.hsaco'
+        hsaco.write_bytes(blob)
+        j = { 'shared' : shared, 'num_warps' : threads // 64, 'warp_size' : 64 }
+        if not blob:
+            j['compile_status'] = 'Timeout'
+        hsaco.with_suffix('.json').write_text(json.dumps(j))
+        files.append(str(hsaco))
+    return files
+
+@pytest.mark.parametrize('block_size', [0, 4096, 1 << 20])
+def test_aks3_roundtrip(tmp_path, block_size):
+    kernels = synthetic_kernels()
+    aks3 = AKS3(block_size=block_size)
+    for name, blob, shared, threads in kernels:
+        aks3.add(name, blob, shared, threads)
+    fn = tmp_path / 'test.aks2'
+    with open(fn, 'wb') as f:
+        aks3.write(f)
+    reader = open_archive(fn)
+    assert isinstance(reader, AKS3Reader)
+    assert sorted(reader.kernels) == sorted([k[0] for k in kernels])
+    nonempty = [k for k in kernels if k[1]]
+    if block_size == 0:
+        assert len(reader.blocks) == len(nonempty)
+    elif block_size == 1 << 20:
+        assert len(reader.blocks) == 1
+    for name, blob, shared, threads in kernels:
+        assert reader.read(name) == (blob, shared, threads)
+        if not blob:
+            assert reader.lookup(name).block == NO_BLOCK
+    assert reader.lookup('attn_fwd-Sig-F__missing') is None
+    assert reader.read('attn_fwd-Sig-F__missing') is None
+
+def test_aks3_decompresses_one_block(tmp_path, monkeypatch):
+    kernels = synthetic_kernels()
+    aks3 = AKS3()
+    for k in kernels:
+        aks3.add(*k)
+    fn = tmp_path / 'test.aks2'
+    with open(fn, 'wb') as f:
+        aks3.write(f)
+    reader = AKS3Reader(fn)
+    decompressed = []
+    original = aks3_module.lzma.decompress
+    def counting_decompress(data, *args, **kwargs):
+        raw = original(data, *args, **kwargs)
+        decompressed.append(len(raw))
+        return raw
+    monkeypatch.setattr(aks3_module.lzma, 'decompress', counting_decompress)
+    name, blob, _, _ = kernels[1]
+    assert reader.read(name)[0] == blob
+    assert len(decompressed) <= 1
+    assert sum(decompressed) <= len(blob)
+
+def test_aks3_name_beyond_name_table(tmp_path):
+    aks3 = AKS3()
+    for k in synthetic_kernels(4):
+        aks3.add(*k)
+    fn = tmp_path / 'test.aks2'
+    with open(fn, 'wb') as f:
+        aks3.write(f)
+    data = bytearray(fn.read_bytes())
+    _, _, nblocks, names_size = aks3_module._HEADER.unpack_from(data)
+    # name_length of the first entry
+    pos = aks3_module._HEADER.size + nblocks * aks3_module._BLOCK.size + 12
+    struct.pack_into('=I', data, pos, names_size + 1)
+    fn.write_bytes(data)
+    with pytest.raises(AssertionError, match='name table'):
+        AKS3Reader(fn)
+
+def test_aks2_compatibility(tmp_path):
+    kernels = synthetic_kernels(seed=1)
+    files = write_hsaco_files(tmp_path, kernels)
+    args = Namespace(hsaco_files=files, ignore_json=False, block_size=256)
+    aks2 = AKS2()
+    aks2.load(args)
+    fn2 = tmp_path / 'v2.aks2'
+    with open(fn2, 'wb') as f:
+        aks2.write(f)
+    aks3 = AKS3(block_size=args.block_size)
+    aks3.load(args)
+    fn3 = tmp_path / 'v3.aks2'
+    with open(fn3, 'wb') as f:
+        aks3.write(f)
+    v2 = open_archive(fn2)
+    v3 = open_archive(fn3)
+    assert sorted(v2.kernels) == sorted(v3.kernels)
+    for name, blob, shared, threads in kernels:
+        assert v2.read(name) == v3.read(name) == (blob, shared, threads)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Resource usage and occupancy from the AMDGPU metadata of code
+# objects, built around the metadata that LLVM emits.
+
+import copy
+import struct
+from types import SimpleNamespace
+import pytest
+
+from _compiler_test import make_job
+from v3python.compiler import CompileResult, STATUS_COMPLETE
+from v3python.compiler.amdgpu_meta import (
+    KernelResources,
+    read_kernel_resources,
+    resource_fields,
+    occupancy,
+    unpackb,
+)
+from v3python.compiler.ledger import make_record, summarize
+from v3python.codegen.autotune import hsaco_worth_tuning
+
+# AMDGPU metadata note of a gfx90a kernel that uses v[0:100] and a[0:63],
+# compiled by llc -mtriple=amdgcn-amd-amdhsa -mcpu=gfx90a (LLVM 14, which has
+# no gfx942). The accum_offset of its kernel descriptor is 104, and
+# .vgpr_count is 104 + 64. Later LLVM also emits .agpr_count.
+GFX90A_NOTE = bytes.fromhex(
+    '83ae616d646873612e6b65726e656c73918da52e617267739185ae2e616464726573735f7370616365a6676c6f62616c'
+    'a52e6e616d65a36f7574a72e6f666673657400a52e73697a6508ab2e76616c75655f6b696e64ad676c6f62616c5f6275'
+    '66666572b92e67726f75705f7365676d656e745f66697865645f73697a6500b62e6b65726e6172675f7365676d656e74'
+    '5f616c69676e08b52e6b65726e6172675f7365676d656e745f73697a6508b82e6d61785f666c61745f776f726b67726f'
+    '75705f73697a65cd0100a52e6e616d65a86174746e5f667764bb2e707269766174655f7365676d656e745f6669786564'
+    '5f73697a6500ab2e736770725f636f756e7406b12e736770725f7370696c6c5f636f756e7400a72e73796d626f6cab61'
+    '74746e5f6677642e6b64ab2e766770725f636f756e74cca8b12e766770725f7370696c6c5f636f756e7400af2e776176'
+    '6566726f6e745f73697a6540ad616d646873612e746172676574b9616d6467636e2d616d642d616d646873612d2d6766'
+    '78393061ae616d646873612e76657273696f6e920101')
+
+'''
+Just enough MessagePack to write AMDGPU metadata
+'''
+def packb(v):
+    if isinstance(v, bool):
+        return b'\xc3' if v else b'\xc2'
+    if isinstance(v, int):
+        if 0 <= v < 128:
+            return struct.pack('B', v)
+        return b'\xce' + struct.pack('>I', v)
+    if isinstance(v, str):
+        s = v.encode()
+        return b'\xd9' + struct.pack('B', len(s)) + s
+    if isinstance(v, list):
+        return b'\xdc' + struct.pack('>H', len(v)) + b''.join([ packb(e) for e in v ])
+    if isinstance(v, dict):
+        return b'\xde' + struct.pack('>H', len(v)) + b''.join([ packb(k) + packb(e) for k, e in v.items() ])
+    assert False, f'Unsupported type {type(v)}'
+
+def pad4(b):
+    return b + b'\0' * (-len(b) % 4)
+
+'''
+ELF64 file with a NULL section and one SHT_NOTE section
+'''
+def make_elf(notes, e_machine=224):
+    note_section = b''
+    for name, note_type, desc in notes:
+        name = name + b'\0'
+        note_section += struct.pack('<III', len(name), len(desc), note_type) + pad4(name) + pad4(desc)
+    ehsize = 64
+    shoff = ehsize + len(note_section)
+    ident = struct.pack('<4sBBBBBxxxxxxx', b'\x7fELF', 2, 1, 1, 64, 3)
+    header = struct.pack('<HHIQQQIHHHHHH', 3, e_machine, 1, 0, 0, shoff, 0, ehsize, 0, 0, 64, 2, 0)
+    null_section = b'\0' * 64
+    sections = struct.pack('<IIQQQQIIQQ', 0, 7, 0, 0, ehsize, len(note_section), 0, 0, 4, 0)
+    return ident + header + note_section + null_section + sections
+
+'''
+Metadata of the GFX90A_NOTE kernel, with the given fields replaced
+'''
+def make_kernel(name='attn_fwd', **kwargs):
+    [k] = copy.deepcopy(unpackb(GFX90A_NOTE)['amdhsa.kernels'])
+    k.update({ '.name' : name, '.symbol' : name + '.kd' })
+    k.update({ '.' + key : value for key, value in kwargs.items() })
+    return k
+
+def make_hsaco(kernels, target='amdgcn-amd-amdhsa--gfx942:sramecc+:xnack-'):
+    meta = unpackb(GFX90A_NOTE)
+    meta['amdhsa.kernels'] = kernels
+    meta['amdhsa.target'] = target
+    # Code objects usually carry other notes before the metadata
+    return make_elf([(b'AMD', 1, b'\0' * 6), (b'AMDGPU', 32, packb(meta))])
+
+def test_unpackb_matches_msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    value = {
+        'small' : 5,
+        'negative' : -3,
+        'large' : 1 << 40,
+        'very negative' : -(1 << 33),
+        'float' : 0.5,
+        'none' : None,
+        'flags' : [True, False],
+        'bytes' : b'\x00\x01',
+        'long string' : 'x' * 300,
+        'nested' : { 'array' : list(range(20)) },
+    }
+    assert unpackb(msgpack.packb(value, use_bin_type=True)) == value
+    assert unpackb(packb({ 'a' : [1, 300] })) == { 'a' : [1, 300] }
+
+def test_read_llvm_metadata():
+    [res] = read_kernel_resources(make_elf([(b'AMDGPU', 32, GFX90A_NOTE)]))
+    assert res == KernelResources(name='attn_fwd', arch='gfx90a',
+                                  vgpr_count=168, agpr_count=0, sgpr_count=6,
+                                  lds_size=0, scratch_size=0,
+                                  vgpr_spill_count=0, sgpr_spill_count=0,
+                                  wavefront_size=64, workgroup_size=256)
+    # 168 of the 512 unified VGPRs, AccVGPRs included
+    assert occupancy(res) == (3, 'vgpr')
+    assert occupancy(res, 'gfx942') == (3, 'vgpr')
+
+def test_read_kernel_resources():
+    data = make_hsaco([make_kernel(agpr_count=64, sgpr_count=40,
+                                   group_segment_fixed_size=16384,
+                                   private_segment_fixed_size=48,
+                                   vgpr_spill_count=12)])
+    [res] = read_kernel_resources(data)
+    assert res == KernelResources(name='attn_fwd', arch='gfx942',
+                                  vgpr_count=168, agpr_count=64, sgpr_count=40,
+                                  lds_size=16384, scratch_size=48,
+                                  vgpr_spill_count=12, sgpr_spill_count=0,
+                                  wavefront_size=64, workgroup_size=256)
+    assert occupancy(res) == (3, 'vgpr')
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'not an elf file' * 10,
+    make_elf([(b'AMDGPU', 32, b'\x80')], e_machine=62),
+    make_elf([(b'AMD', 1, b'\0' * 4)]),
+])
+def test_invalid_code_objects(data):
+    with pytest.raises(ValueError):
+        read_kernel_resources(data)
+    assert resource_fields(data) == {}
+
+def resources(arch='gfx942', **kwargs):
+    d = dict(name='k', arch=arch, vgpr_count=16, sgpr_count=16, workgroup_size=256)
+    d.update(kwargs)
+    return KernelResources(**d)
+
+@pytest.mark.parametrize('res, expected', [
+    (resources(), (8, 'waves')),
+    (resources(vgpr_count=128), (4, 'vgpr')),
+    # vgpr_count already counts the AccVGPRs of the unified register file
+    (resources(vgpr_count=168, agpr_count=64), (3, 'vgpr')),
+    (resources(vgpr_count=256, agpr_count=128), (2, 'vgpr')),
+    (resources(vgpr_count=264, agpr_count=128), (1, 'vgpr')),
+    (resources(sgpr_count=112), (7, 'sgpr')),
+    # 2 workgroups of 4 waves per CU
+    (resources(lds_size=32768), (2, 'lds')),
+    (resources(arch='gfx950', lds_size=32768), (5, 'lds')),
+    # wave32, 1536 VGPRs in granules of 24
+    (resources(arch='gfx1100', vgpr_count=128, wavefront_size=32), (10, 'vgpr')),
+    (resources(arch='gfx1100', vgpr_count=32, sgpr_count=106, wavefront_size=32), (16, 'waves')),
+    (resources(arch='gfx1102', vgpr_count=128, wavefront_size=32), (8, 'vgpr')),
+    (resources(arch='gfx000'), (None, None)),
+])
+def test_occupancy(res, expected):
+    assert occupancy(res) == expected
+
+def test_occupancy_of_other_arch():
+    res = resources(arch=None, vgpr_count=128)
+    assert occupancy(res) == (None, None)
+    assert occupancy(res, 'gfx942') == (4, 'vgpr')
+
+def test_resource_fields_reports_worst_kernel():
+    data = make_hsaco([make_kernel('light', vgpr_count=32),
+                       make_kernel('heavy', vgpr_count=256, sgpr_spill_count=2)])
+    fields = resource_fields(data)
+    assert fields['vgpr_count'] == 256
+    assert fields['sgpr_spill_count'] == 2
+    assert fields['occupancy'] == 2
+    assert fields['occupancy_limiter'] == 'vgpr'
+    assert resource_fields(data, 'gfx1100')['occupancy'] == 5
+
+def test_ledger_records_are_tagged(tmp_path):
+    spilled = make_job(tmp_path, 'attn_fwd', 0)
+    spilled.hsaco_path.write_bytes(make_hsaco([make_kernel(vgpr_count=512, vgpr_spill_count=30)]))
+    fake = make_job(tmp_path, 'attn_fwd', 1)
+    fake.hsaco_path.write_bytes(b'fake image')
+    missing = make_job(tmp_path, 'attn_fwd', 2)
+    result = CompileResult(status=STATUS_COMPLETE, duration=1.0)
+    records = [ make_record(job, result) for job in [spilled, fake, missing] ]
+    assert records[0]['vgpr_spill_count'] == 30
+    assert records[0]['occupancy'] == 1
+    assert records[0]['occupancy_limiter'] == 'vgpr'
+    assert 'occupancy' not in records[1]
+    assert 'occupancy' not in records[2]
+    [summary] = summarize(records)
+    assert summary['spilled'] == 1
+
+def tuning_args(max_spills=-1, min_occupancy=0):
+    return SimpleNamespace(build_for_tuning_max_spills=max_spills,
+                           build_for_tuning_min_occupancy=min_occupancy)
+
+def test_hsaco_worth_tuning(tmp_path):
+    hsaco = tmp_path / 'kernel.hsaco'
+    hsaco.write_bytes(make_hsaco([make_kernel(vgpr_count=256, vgpr_spill_count=4)]))
+    assert hsaco_worth_tuning(tuning_args(), hsaco, {})
+    assert hsaco_worth_tuning(tuning_args(max_spills=4), hsaco, {})
+    assert not hsaco_worth_tuning(tuning_args(max_spills=0), hsaco, {})
+    assert hsaco_worth_tuning(tuning_args(min_occupancy=2), hsaco, {})
+    assert not hsaco_worth_tuning(tuning_args(min_occupancy=3), hsaco, {})
+    # Ledger records are trusted over the file
+    record = { 'vgpr_spill_count' : 0, 'sgpr_spill_count' : 0, 'occupancy' : 8 }
+    assert hsaco_worth_tuning(tuning_args(max_spills=0, min_occupancy=3), hsaco, record)
+    # Unknown resource usage never skips a kernel
+    hsaco.write_bytes(b'fake image')
+    assert hsaco_worth_tuning(tuning_args(max_spills=0, min_occupancy=3), hsaco, {})
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Graph of kernels.ninja, and depfiles of compile.py with the fake
+# backend. Queries with ninja itself are skipped if ninja is not installed.
+
+import shutil
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+
+from _compiler_test import SOURCE_PATH, make_job, compiler_env, run_compiler
+from v3python.codegen.ninja import BuildNinjaGenerator, NINJA_FILE, escape_path
+from v3python.compiler.depfile import source_dependencies
+
+NINJA = shutil.which('ninja') or shutil.which('ninja-build')
+
+def ninja_args(build_dir, **kwargs):
+    d = dict(build_dir=build_dir,
+             root_dir=SOURCE_PATH,
+             ninja_compile_jobs=3,
+             ninja_timeout=8.0,
+             ninja_triton_cache_dir=None,
+             ninja_git_sha1='0123abc',
+             ninja_aks3=False,
+             ninja_aks3_block_size=0)
+    d.update(kwargs)
+    return SimpleNamespace(**d)
+
+def write_sources(src_dir):
+    src_dir.mkdir(parents=True, exist_ok=True)
+    (src_dir / 'fwd_kernel.py').write_text('import triton\nfrom fwd_inner import attn_fwd_inner\n')
+    (src_dir / 'fwd_inner.py').write_text('import dropout\nfrom masked_load_store import load_fn\n')
+    (src_dir / 'dropout.py').write_text('import triton.language as tl\n')
+    (src_dir / 'masked_load_store.py').write_text('from dropout import *\n')
+    (src_dir / 'unused.py').write_text('import os\n')
+    return src_dir / 'fwd_kernel.py'
+
+'''
+Small fixture of Bare.compile, Bare.cluster and Affine.cluster
+'''
+def make_lists(tmp_path):
+    build_dir = tmp_path / 'build dir'
+    src = write_sources(tmp_path / 'tritonsrc')
+    image_dir = build_dir / 'flash' / 'gpu_kernel_image.attn_fwd'
+    image_dir.mkdir(parents=True)
+    compile_lines = []
+    cluster_lines = []
+    for arch in ['gfx942', 'gfx950']:
+        hsacos = []
+        for i in range(3):
+            hsaco = image_dir / f'attn_fwd-Sig-F__＊fp16@16_{i}__CO__warp4_stg1--Arch_{arch}.hsaco'
+            hsacos.append(str(hsaco))
+            compile_lines.append(';'.join([str(hsaco), str(src), 'attn_fwd', '4', '1', '2', arch,
+                                           '*fp16:16, *fp16:16, i32, 64, True']) + '\n')
+        cluster_lines.append(';'.join([f'amd-{arch}', 'flash', 'attn_fwd', f'FONLY__{arch}'] + hsacos) + '\n')
+    co = tmp_path / 'third_party' / 'bwd_hd64.co'
+    co.parent.mkdir(parents=True)
+    co.write_bytes(b'')
+    affine_lines = [ ';'.join(['amd-gfx942', 'flash', 'bwd_dq_dk_dv_v3', 'affine_kernels', str(co)]) + '\n' ]
+    return build_dir, compile_lines, cluster_lines, affine_lines
+
+def write_ninja(tmp_path, **kwargs):
+    build_dir, compile_lines, cluster_lines, affine_lines = make_lists(tmp_path)
+    path = build_dir / NINJA_FILE
+    with open(path, 'w') as fout:
+        BuildNinjaGenerator(ninja_args(build_dir, **kwargs)).write(fout, compile_lines, cluster_lines, affine_lines)
+    return path, compile_lines, cluster_lines
+
+def split_paths(s):
+    paths = []
+    current = ''
+    i = 0
+    while i < len(s):
+        if s[i] == '$' and i + 1 < len(s):
+            current += s[i + 1]
+            i += 2
+            continue
+        if s[i] == ' ':
+            if current:
+                paths.append(current)
+            current = ''
+        else:
+            current += s[i]
+        i += 1
+    if current:
+        paths.append(current)
+    return paths
+
+'''
+Build statements of a ninja file without line continuations:
+{output: {rule, inputs, implicit, order_only, implicit_outputs, variables}}
+'''
+def parse_builds(path):
+    builds = {}
+    pools = {}
+    last = None
+    for line in path.read_text().splitlines():
+        if line.startswith('build '):
+            outs, rest = line[len('build '):].split(': ', 1)
+            outs, _, implicit_outputs = outs.partition(' | ')
+            rest, _, order_only = rest.partition(' || ')
+            rest, _, implicit = rest.partition(' | ')
+            rule, _, inputs = rest.partition(' ')
+            last = dict(rule=rule,
+                        inputs=split_paths(inputs),
+                        implicit=split_paths(implicit),
+                        order_only=split_paths(order_only),
+                        implicit_outputs=split_paths(implicit_outputs),
+                        variables={})
+            for o in split_paths(outs) + last['implicit_outputs']:
+                assert o not in builds, f'{o} has multiple build statements'
+                builds[o] = last
+        elif line.startswith('pool '):
+            last = pools.setdefault(line.split()[1], { 'variables' : {} })
+        elif line.startswith('  ') and last is not None:
+            key, _, value = line.strip().partition(' = ')
+            last['variables'][key] = value
+        else:
+            last = None
+    return builds, pools
+
+def test_escape_path():
+    assert escape_path('/a b/c:d$e') == '/a$ b/c$:d$$e'
+    assert split_paths(escape_path('/a b/c:d$e') + ' x') == ['/a b/c:d$e', 'x']
+
+def test_graph(tmp_path):
+    path, compile_lines, cluster_lines = write_ninja(tmp_path)
+    builds, pools = parse_builds(path)
+    assert pools['compile']['variables']['depth'] == '3'
+    text = path.read_text()
+    assert 'restat = 1' in text
+    assert 'deps = gcc' in text
+    hsacos = [ line.split(';')[0] for line in compile_lines ]
+    for hsaco, line in zip(hsacos, compile_lines):
+        b = builds[hsaco]
+        assert b['rule'] == 'compile'
+        assert b['inputs'] == [line.split(';')[1]]
+        assert b['implicit_outputs'] == [str(Path(hsaco).with_suffix('.json'))]
+        assert b['variables']['signature'] == "'*fp16:16, *fp16:16, i32, 64, True'"
+    assert builds['compile']['inputs'] == hsacos
+    image_dir = tmp_path / 'build dir' / 'aotriton.images'
+    for line in cluster_lines:
+        parts = line.strip().split(';')
+        aks2 = image_dir / parts[0] / 'flash' / 'attn_fwd' / f'{parts[3]}.aks2'
+        b = builds[str(aks2)]
+        assert b['rule'] == 'pack'
+        assert b['inputs'] == parts[4:]
+        assert b['implicit'] == [ str(Path(h).with_suffix('.json')) for h in parts[4:] ]
+    affine = builds[str(image_dir / 'amd-gfx942' / 'flash' / 'bwd_dq_dk_dv_v3' / 'affine_kernels.aks2')]
+    assert affine['variables']['pack_options'] == '--ignore_json'
+    assert affine['implicit'] == []
+    signature = builds[str(image_dir / 'amd-gfx942' / '__signature__')]
+    assert signature['inputs'] == [str(tmp_path / 'build dir' / '__signature__.json')]
+    assert len(signature['order_only']) == 2
+    assert sorted(builds['images']['inputs']) == sorted([ o for o, b in builds.items() if b['rule'] in ['pack', 'copy'] ])
+    # Every input is built, or is a source file
+    for o, b in builds.items():
+        for i in b['inputs'] + b['implicit'] + b['order_only']:
+            assert i in builds or Path(i).is_file(), f'{i} of {o} is neither built nor a source'
+
+def test_aks3(tmp_path):
+    path, _, _ = write_ninja(tmp_path, ninja_aks3=True, ninja_aks3_block_size=4096)
+    text = path.read_text()
+    assert 'aks_module = v3python.aks3' in text
+    assert 'aks_options = --block_size 4096' in text
+
+@pytest.mark.skipif(NINJA is None, reason='ninja is not installed')
+def test_ninja_query(tmp_path):
+    path, compile_lines, cluster_lines = write_ninja(tmp_path)
+    hsaco = compile_lines[0].split(';')[0]
+    out = subprocess.run([NINJA, '-f', str(path), '-t', 'query', hsaco],
+                         check=True, capture_output=True, text=True).stdout
+    assert 'outputs:' in out
+    assert 'FONLY__gfx942.aks2' in out
+    dry = subprocess.run([NINJA, '-f', str(path), '-n'],
+                         cwd=path.parent, check=True, capture_output=True, text=True).stdout
+    assert dry.count('Compiling') == len(compile_lines)
+    assert dry.count('Packing') == len(cluster_lines) + 1
+
+def test_source_dependencies(tmp_path):
+    src = write_sources(tmp_path)
+    assert source_dependencies(src) == [ tmp_path / name for name in ['fwd_kernel.py', 'dropout.py',
+                                                                      'fwd_inner.py', 'masked_load_store.py'] ]
+
+def test_compiler_depfile(tmp_path):
+    src = write_sources(tmp_path / 'src dir')
+    out = tmp_path / 'kernel.hsaco'
+    depfile = tmp_path / 'kernel.hsaco.d'
+    job = make_job(tmp_path, path=str(src), out_path=str(out), signature='*fp16:16, i32')
+    assert run_compiler(job, compiler_env(), '--depfile', str(depfile)).returncode == 0
+    assert out.is_file()
+    target, deps = depfile.read_text().strip().split(': ')
+    assert target == str(out)
+    assert deps.startswith(str(src).replace(' ', '\\ ') + ' ')
+    assert len(deps.split('.py')) == 5
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Compile ledger written by compile.py, and read by the AKS2
+# packer, the planner and the report.
+
+import subprocess
+import sys
+import threading
+from argparse import Namespace
+import pytest
+
+from _compiler_test import SOURCE_PATH, make_job as make_compile_job, compiler_env, run_compiler
+from v3python.compiler import (
+    CompileResult,
+    STATUS_COMPLETE,
+    STATUS_EXCEPTION,
+    STATUS_TIMEOUT,
+    STATUS_EXIT_WITH_ERROR,
+)
+from v3python.compiler import ledger as ledger_module
+from v3python.compiler.ledger import (
+    CompileLedger,
+    DEFAULT_LEDGER,
+    make_record,
+    open_ledger,
+    summarize,
+    compact,
+)
+from v3python.aks2 import AKS2
+from v3python.codegen.plan import CompileDurationModel
+
+'''
+Job of an attn_fwd HSACO, laid out as in the build directory, where the
+ledger is found
+'''
+def make_job(build_dir, kernel_name, index, timeout=0.02):
+    image_dir = build_dir / 'flash' / 'gpu_kernel_image.attn_fwd'
+    image_dir.mkdir(parents=True, exist_ok=True)
+    return make_compile_job(build_dir, kernel_name, index,
+                            path=str(SOURCE_PATH / 'tritonsrc' / 'flash.py'),
+                            out_path=str(image_dir / f'attn_fwd-Sig-F__{index}--Arch_gfx942.hsaco'),
+                            timeout=timeout)
+
+@pytest.fixture
+def env():
+    return compiler_env()
+
+@pytest.fixture
+def compiled(tmp_path, env):
+    build_dir = tmp_path / 'build'
+    jobs = [ make_job(build_dir, name, i) for i, name in enumerate(['ok', 'sleep=0.3', 'hang', 'crash', 'ok']) ]
+    for job in jobs:
+        assert run_compiler(job, env).returncode == 0
+    return build_dir, jobs
+
+def test_compile_appends_records(compiled):
+    build_dir, jobs = compiled
+    records = list(CompileLedger(build_dir / DEFAULT_LEDGER).records())
+    assert [ r['status'] for r in records ] == [STATUS_COMPLETE, STATUS_COMPLETE, STATUS_TIMEOUT, STATUS_EXIT_WITH_ERROR, STATUS_COMPLETE]
+    for job, r in zip(jobs, records):
+        assert r['hsaco'] == job.hsaco_path.name
+        assert r['path'] == str(job.hsaco_path)
+        assert r['kernel'] == 'attn_fwd'
+        assert r['arch'] == 'gfx942'
+        assert r['hsaco_size'] == job.hsaco_path.stat().st_size
+        assert r['cached'] == False
+    assert records[1]['duration'] >= 0.3
+    assert records[0]['peak_rss'] > 0
+    assert records[0]['shared'] == 0 and records[0]['block_threads'] == 4 * 64
+    assert 'shared' not in records[2]
+
+def test_compile_without_timeout(tmp_path, env):
+    build_dir = tmp_path / 'build'
+    ok = make_job(build_dir, 'ok', 0, timeout=0)
+    failed = make_job(build_dir, 'raise', 1, timeout=0)
+    assert run_compiler(ok, env).returncode == 0
+    assert run_compiler(failed, env).returncode != 0
+    assert run_compiler(make_job(build_dir, 'ok', 2, timeout=0), env, '--no_ledger').returncode == 0
+    records = list(CompileLedger(build_dir / DEFAULT_LEDGER).records())
+    assert [ (r['hsaco'], r['status']) for r in records ] == [(ok.hsaco_path.name, STATUS_COMPLETE),
+                                                             (failed.hsaco_path.name, STATUS_EXCEPTION)]
+
+def test_cache_hits_are_recorded(tmp_path, env):
+    build_dir = tmp_path / 'build'
+    env['AOTRITON_HSACO_CACHE'] = str(tmp_path / 'cache')
+    job = make_job(build_dir, 'sleep=0.2', 0)
+    for _ in range(2):
+        assert run_compiler(job, env).returncode == 0
+    records = list(CompileLedger(build_dir / DEFAULT_LEDGER).records())
+    assert [ r['cached'] for r in records ] == [False, True]
+    assert records[1]['duration'] is None
+    # The planner keeps the measured duration
+    model = CompileDurationModel.load(build_dir / DEFAULT_LEDGER)
+    assert model.estimate('attn_fwd', 'gfx942', job.hsaco_path.name) >= 0.2
+    [latest] = summarize(records)
+    assert latest['slowest'][0]['duration'] >= 0.2
+
+def test_index(tmp_path):
+    ledger = CompileLedger(tmp_path / DEFAULT_LEDGER)
+    jobs = [ make_job(tmp_path, 'ok', i) for i in range(3) ]
+    for job in jobs:
+        ledger.append(make_record(job, CompileResult(status=STATUS_TIMEOUT, duration=1.0)))
+    ledger.update_index()
+    assert ledger.lookup(jobs[1].hsaco_path)['status'] == STATUS_TIMEOUT
+    assert ledger.lookup(tmp_path / 'missing.hsaco') is None
+    # Incremental update, later records win
+    ledger.append(make_record(jobs[1], CompileResult(status=STATUS_COMPLETE, duration=2.0)))
+    with open(ledger.path, 'a') as f:
+        f.write('{"path": "incomplete')
+    other = CompileLedger(ledger.path)
+    other.update_index()
+    assert other.lookup(jobs[1].hsaco_path)['status'] == STATUS_COMPLETE
+    assert other.lookup(jobs[2].hsaco_path)['status'] == STATUS_TIMEOUT
+    # Complete the line
+    with open(ledger.path, 'a') as f:
+        f.write('"}\n')
+    ledger.append(make_record(jobs[2], CompileResult(status=STATUS_COMPLETE)))
+    ledger.update_index()
+    assert ledger.lookup(jobs[2].hsaco_path)['status'] == STATUS_COMPLETE
+    # Compaction replaces the file, and the index is rebuilt
+    assert compact(ledger) == 3
+    ledger.update_index()
+    assert ledger.lookup(jobs[0].hsaco_path)['status'] == STATUS_TIMEOUT
+    assert ledger.lookup(jobs[1].hsaco_path)['duration'] == 2.0
+
+def test_append_during_compaction(tmp_path, monkeypatch):
+    ledger = CompileLedger(tmp_path / DEFAULT_LEDGER)
+    jobs = [ make_job(tmp_path, 'ok', i) for i in range(3) ]
+    for job in jobs[:2]:
+        ledger.append(make_record(job, CompileResult(status=STATUS_TIMEOUT)))
+        ledger.append(make_record(job, CompileResult(status=STATUS_COMPLETE)))
+    reading = threading.Event()
+    resume = threading.Event()
+    latest_records = ledger_module.latest_records
+    def paused(records):
+        reading.set()
+        resume.wait()
+        return latest_records(records)
+    monkeypatch.setattr(ledger_module, 'latest_records', paused)
+    compaction = threading.Thread(target=compact, args=(ledger,), daemon=True)
+    compaction.start()
+    writer = CompileLedger(ledger.path)
+    append = threading.Thread(target=writer.append,
+                              args=(make_record(jobs[2], CompileResult(status=STATUS_COMPLETE)),),
+                              daemon=True)
+    try:
+        assert reading.wait(5)
+        append.start()
+        # Waits for the compaction, then appends to the replaced ledger
+        append.join(0.2)
+        assert append.is_alive()
+    finally:
+        resume.set()
+    compaction.join()
+    append.join()
+    records = list(CompileLedger(ledger.path).records())
+    assert [ (r['hsaco'], r['status']) for r in records ] == [ (job.hsaco_path.name, STATUS_COMPLETE) for job in jobs ]
+
+def test_generator_imports_without_unix_modules():
+    # As on Windows, where AOTRITON_NOIMAGE_MODE builds still run the generator
+    script = ('import sys\n'
+              'sys.modules["fcntl"] = sys.modules["resource"] = None\n'
+              'import v3python.generate\n')
+    subprocess.run([sys.executable, '-c', script], cwd=SOURCE_PATH, check=True)
+
+def test_summarize():
+    def record(kernel, arch, i, status, duration):
+        return { 'hsaco' : f'{kernel}-{i}.hsaco', 'path' : f'/b/{kernel}-{i}.hsaco',
+                 'kernel' : kernel, 'arch' : arch, 'status' : status, 'duration' : duration, 'peak_rss' : i << 20 }
+    records = [ record('attn_fwd', 'gfx942', i, STATUS_COMPLETE, float(i)) for i in range(8) ]
+    records += [ record('attn_fwd', 'gfx942', 8, STATUS_TIMEOUT, 600.0),
+                 record('attn_fwd', 'gfx942', 9, STATUS_EXCEPTION, 1.5),
+                 record('bwd', 'gfx950', 0, STATUS_COMPLETE, 3.0),
+                 # Superseded
+                 record('attn_fwd', 'gfx942', 9, STATUS_COMPLETE, 2.5) ]
+    fwd, bwd = summarize(records, top=3)
+    assert (fwd['kernel'], fwd['arch'], fwd['hsaco']) == ('attn_fwd', 'gfx942', 10)
+    assert fwd['timeouts'] == 1
+    assert fwd['failure_rate'] == 0.1
+    assert [ r['duration'] for r in fwd['slowest'] ] == [600.0, 7.0, 6.0]
+    assert fwd['max_peak_rss'] == 9 << 20
+    assert bwd['failure_rate'] == 0.0
+
+def test_packer_uses_ledger(compiled):
+    build_dir, jobs = compiled
+    hsaco_files = [ str(job.hsaco_path) for job in jobs ]
+    def pack(**kwargs):
+        aks2 = AKS2()
+        aks2.load(Namespace(hsaco_files=hsaco_files, ignore_json=False, **kwargs))
+        return aks2
+    reference = pack(ledger=None, no_ledger=True)
+    assert [ e.image_size == 0 for e in reference.directory ] == [False, False, True, True, False]
+    ledger = open_ledger(build_dir / DEFAULT_LEDGER)
+    assert ledger is not None
+    for job in jobs:
+        job.json_path.unlink()
+    with_ledger = pack(ledger=None, no_ledger=False)
+    assert with_ledger.directory == reference.directory
+    with pytest.raises(FileNotFoundError):
+        pack(ledger=None, no_ledger=True)
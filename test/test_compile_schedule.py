@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Makespan simulator, compile duration model and LPT order of
+# Bare.compile, with synthetic durations.
+
+import json
+import math
+import random
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from v3python.codegen.schedule import (
+    CompileCostModel,
+    CompileRule,
+    CompileScheduler,
+    heuristic_seconds,
+    lpt_order,
+    makespan_lower_bound,
+    simulate_makespan,
+)
+
+ARGUMENTS = {
+    'attn_fwd' : ['Q', 'BLOCK_DMODEL', 'ENABLE_DROPOUT', 'BLOCK_M', 'BLOCK_N'],
+    'bwd_kernel_dk_dv' : ['Q', 'BLOCK_M', 'BLOCK_DMODEL', 'BLOCK_N', 'ENABLE_DROPOUT'],
+}
+
+def make_line(kernel, index, block_m, block_n, hdim, stages=1, dropout=False):
+    hsaco = f'/build/flash/gpu_kernel_image.{kernel}/{kernel}-Sig-F__{index}--Arch_gfx942.hsaco'
+    if kernel == 'attn_fwd':
+        sig = f'*fp16:16, {hdim}, {dropout}, {block_m}, {block_n}'
+    else:
+        sig = f'*fp16:16, {block_m}, {hdim}, {block_n}, {dropout}'
+    return f'{hsaco};/src/flash.py;{kernel};4;{stages};2;gfx942;{sig}\n'
+
+def synthetic_lines(n, seed):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n):
+        kernel = rng.choice(list(ARGUMENTS.keys()))
+        lines.append(make_line(kernel, i,
+                               rng.choice([16, 32, 64, 128]),
+                               rng.choice([16, 32, 64, 128]),
+                               rng.choice([16, 64, 128, 256]),
+                               rng.choice([1, 2]),
+                               rng.choice([False, True])))
+    return lines
+
+def synthetic_seconds(rule):
+    base = 20.0 if rule.kernel == 'attn_fwd' else 50.0
+    return base * (rule.integer('BLOCK_M', 1) * rule.integer('BLOCK_N', 1)) ** 0.6 / 40 \
+                * (rule.integer('BLOCK_DMODEL', 1) / 64) ** 0.4 * (1.8 ** (rule.num_stages - 1))
+
+def test_simulate_makespan():
+    assert simulate_makespan([], 4) == 0.0
+    assert simulate_makespan([5.0], 4) == 5.0
+    assert simulate_makespan([3, 3, 2, 2, 2], 2) == 7
+    assert simulate_makespan([1, 1, 1, 1, 4], 2) == 6
+    assert simulate_makespan([4, 1, 1, 1, 1], 2) == 4
+    assert simulate_makespan([2, 2, 2, 2], 1) == 8
+    assert simulate_makespan([2, 2, 2, 2], 8) == 2
+    assert makespan_lower_bound([3, 3, 2, 2, 2], 2) == 6
+    assert makespan_lower_bound([10, 1, 1], 4) == 10
+
+def test_lpt_bound():
+    rng = random.Random(0)
+    for cores in [2, 7, 32]:
+        durations = [ rng.expovariate(1 / 60) for _ in range(500) ] + [ 3600.0 ] * 3
+        lpt = [ durations[i] for i in lpt_order(durations) ]
+        bound = makespan_lower_bound(durations, cores)
+        assert simulate_makespan(lpt, cores) <= (4 / 3 - 1 / (3 * cores)) * bound + 1e-6
+        # Long jobs last in the original order
+        tail_heavy = sorted(durations)
+        assert simulate_makespan(lpt, cores) <= simulate_makespan(tail_heavy, cores)
+
+def test_lpt_order_is_stable():
+    assert lpt_order([1, 3, 2, 3, 1]) == [1, 3, 2, 0, 4]
+
+def test_parse_rule():
+    rule = CompileRule.parse(make_line('bwd_kernel_dk_dv', 3, 64, 32, 128, 2, True), ARGUMENTS)
+    assert (rule.kernel, rule.arch, rule.num_warps, rule.num_stages, rule.waves_per_eu) == ('bwd_kernel_dk_dv', 'gfx942', 4, 2, 2)
+    assert rule.arguments == {'BLOCK_M' : '64', 'BLOCK_DMODEL' : '128', 'BLOCK_N' : '32', 'ENABLE_DROPOUT' : 'True'}
+    assert rule.hsaco == 'bwd_kernel_dk_dv-Sig-F__3--Arch_gfx942.hsaco'
+    # Unknown kernels only use the compiler options
+    unknown = CompileRule.parse(make_line('bwd_kernel_dk_dv', 3, 64, 32, 128), {})
+    assert unknown.arguments == {}
+    assert heuristic_seconds(unknown) > 0
+
+def test_heuristic():
+    small = CompileRule.parse(make_line('bwd_kernel_dk_dv', 0, 16, 16, 64), ARGUMENTS)
+    large = CompileRule.parse(make_line('bwd_kernel_dk_dv', 1, 128, 128, 256), ARGUMENTS)
+    staged = CompileRule.parse(make_line('bwd_kernel_dk_dv', 2, 128, 128, 256, stages=2), ARGUMENTS)
+    fwd = CompileRule.parse(make_line('attn_fwd', 3, 128, 128, 256), ARGUMENTS)
+    assert heuristic_seconds(small) < heuristic_seconds(large) < heuristic_seconds(staged)
+    assert heuristic_seconds(fwd) < heuristic_seconds(large)
+
+def test_model_from_ledger(tmp_path):
+    lines = synthetic_lines(400, seed=1)
+    rules = [ CompileRule.parse(line, ARGUMENTS) for line in lines ]
+    truth = [ synthetic_seconds(r) for r in rules ]
+    # Half of the rules were compiled before
+    ledger = tmp_path / 'compile_ledger.jsonl'
+    with open(ledger, 'w') as f:
+        for r, s in list(zip(rules, truth))[::2]:
+            print(json.dumps({'hsaco' : r.hsaco, 'kernel' : r.kernel, 'arch' : r.arch, 'duration' : s, 'status' : 'Complete'}), file=f)
+        # Cache hits do not override the measured duration
+        print(json.dumps({'hsaco' : rules[0].hsaco, 'kernel' : rules[0].kernel, 'arch' : 'gfx942', 'duration' : None}), file=f)
+    model = CompileCostModel.from_ledger(ledger).fit(rules)
+    assert model.trained
+    predictions = model.predict(rules)
+    assert [ source for _, source in predictions ] == ['ledger', 'model'] * 200
+    assert predictions[0][0] == truth[0]
+    # The model ranks unseen rules close to the truth
+    unseen = list(range(1, 400, 2))
+    errors = [ abs(math.log(predictions[i][0] / truth[i])) for i in unseen ]
+    assert sum(errors) / len(errors) < 0.25
+    lpt = [ truth[i] for i in lpt_order([ s for s, _ in predictions ]) ]
+    optimal = [ truth[i] for i in lpt_order(truth) ]
+    for cores in [8, 64]:
+        assert simulate_makespan(lpt, cores) <= 1.05 * simulate_makespan(optimal, cores)
+
+def test_heuristic_fallback():
+    lines = synthetic_lines(50, seed=2)
+    model = CompileCostModel({}).fit([ CompileRule.parse(line, ARGUMENTS) for line in lines ])
+    assert not model.trained
+    sources = set([ source for _, source in model.predict([ CompileRule.parse(line, ARGUMENTS) for line in lines ]) ])
+    assert sources == {'heuristic'}
+
+def test_scheduler(tmp_path):
+    lines = synthetic_lines(300, seed=3)
+    scheduler = CompileScheduler(CompileCostModel({}), ARGUMENTS)
+    ordered = scheduler.order(lines)
+    assert sorted(ordered) == sorted(lines)
+    rules = [ CompileRule.parse(line, ARGUMENTS) for line in ordered ]
+    predicted = [ heuristic_seconds(r) for r in rules ]
+    assert predicted == sorted(predicted, reverse=True)
+    report = scheduler.report(lines, [1, 16])
+    assert report['rules'] == 300
+    assert report['sources'] == {'heuristic' : 300}
+    one, sixteen = report['makespan']
+    assert one['original_order_hours'] == one['lpt_order_hours'] == pytest.approx(report['predicted_cpu_hours'], abs=0.002)
+    assert sixteen['lower_bound_hours'] <= sixteen['lpt_order_hours'] <= sixteen['original_order_hours']
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Scheduling, timeouts and crash recovery of the compile worker
+# pool and server, with the fake backend.
+
+import json
+import subprocess
+import sys
+import time
+import pytest
+
+from _compiler_test import SOURCE_PATH, make_job, compiler_env, run_compiler
+from v3python.compiler import (
+    STATUS_COMPLETE,
+    STATUS_EXCEPTION,
+    STATUS_TIMEOUT,
+    STATUS_EXIT_WITH_ERROR,
+    STATUS_MEMORY_LIMIT,
+)
+from v3python.compiler import client
+from v3python.compiler.pool import WorkerPool
+from v3python.compiler.backend import FakeBackend, import_source
+
+def check_outputs(job, status):
+    with open(job.json_path) as f:
+        j = json.load(f)
+    assert j['compile_status'] == status
+    image = job.hsaco_path.read_bytes()
+    if status == STATUS_COMPLETE:
+        assert image == FakeBackend.image(job)
+    else:
+        assert image == b''
+
+def test_parallel_scheduling(tmp_path):
+    jobs = [ make_job(tmp_path, 'sleep=0.5', i) for i in range(4) ]
+    with WorkerPool(backend='fake', workers=2) as pool:
+        # Warm up, so that process creation is not measured
+        pool.run(make_job(tmp_path, 'ok', 100))
+        pool.run(make_job(tmp_path, 'ok', 101))
+        tic = time.monotonic()
+        results = [ f.result() for f in [ pool.submit(job) for job in jobs ] ]
+        elapsed = time.monotonic() - tic
+    assert [ r.status for r in results ] == [STATUS_COMPLETE] * 4
+    assert 1.0 <= elapsed < 1.9
+    for job in jobs:
+        check_outputs(job, STATUS_COMPLETE)
+    assert pool.stats['respawned'] == 0
+
+def test_worker_is_persistent(tmp_path):
+    with WorkerPool(backend='fake', workers=1) as pool:
+        pool.run(make_job(tmp_path, 'ok', 0))
+        results = [ pool.run(make_job(tmp_path, 'ok', i)) for i in range(1, 20) ]
+    assert all([ r.status == STATUS_COMPLETE for r in results ])
+    assert pool.stats == { 'submitted' : 20, 'completed' : 20, 'respawned' : 0 }
+
+def test_timeout_and_recovery(tmp_path):
+    with WorkerPool(backend='fake', workers=1) as pool:
+        hang = make_job(tmp_path, 'hang', 0, timeout=0.01)
+        after = make_job(tmp_path, 'ok', 1, timeout=0.01)
+        tic = time.monotonic()
+        r = pool.run(hang)
+        assert time.monotonic() - tic < 5.0
+        assert r.status == STATUS_TIMEOUT
+        check_outputs(hang, STATUS_TIMEOUT)
+        assert pool.run(after).status == STATUS_COMPLETE
+        check_outputs(after, STATUS_COMPLETE)
+    assert pool.stats['respawned'] == 1
+
+def test_crash_and_exception(tmp_path):
+    with WorkerPool(backend='fake', workers=2) as pool:
+        jobs = [ make_job(tmp_path, name, i) for i, name in enumerate(['crash', 'raise', 'ok', 'crash', 'ok']) ]
+        results = [ f.result() for f in [ pool.submit(job) for job in jobs ] ]
+    expected = [STATUS_EXIT_WITH_ERROR, STATUS_EXCEPTION, STATUS_COMPLETE, STATUS_EXIT_WITH_ERROR, STATUS_COMPLETE]
+    assert [ r.status for r in results ] == expected
+    assert results[0].exitcode == 3
+    for job, status in zip(jobs, expected):
+        check_outputs(job, status)
+    assert pool.stats['respawned'] == 2
+
+def test_memory_limit(tmp_path):
+    with WorkerPool(backend='fake', workers=1, memory_limit=512 << 20) as pool:
+        hog = make_job(tmp_path, 'hog=1024', 0)
+        small = make_job(tmp_path, 'hog=16', 1)
+        assert pool.run(hog).status == STATUS_MEMORY_LIMIT
+        check_outputs(hog, STATUS_MEMORY_LIMIT)
+        r = pool.run(small)
+    assert r.status == STATUS_COMPLETE
+    assert r.peak_rss >= 16 << 20
+    assert r.hsaco_size == len(FakeBackend.image(small))
+
+def test_import_source_by_path(tmp_path):
+    sources = []
+    for name in ['fwd', 'bwd']:
+        d = tmp_path / name
+        d.mkdir()
+        (d / f'{name}_helper.py').write_text(f'NAME = {name!r}\n')
+        (d / 'kernel.py').write_text(f'from {name}_helper import NAME\ndef kernel():\n    return NAME\n')
+        sources.append(d / 'kernel.py')
+    # Same file name in different directories
+    assert [ import_source(src).kernel() for src in sources ] == ['fwd', 'bwd']
+    assert import_source(tmp_path / 'fwd' / '..' / 'fwd' / 'kernel.py') is import_source(sources[0])
+
+@pytest.fixture
+def server(tmp_path):
+    sock = tmp_path / 'compile.sock'
+    proc = subprocess.Popen([sys.executable, '-m', 'v3python.compiler.server',
+                             '--socket', str(sock),
+                             '--workers', '2',
+                             '--backend', 'fake',
+                             '--idle_timeout', '60'],
+                            cwd=SOURCE_PATH)
+    for _ in range(200):
+        if sock.is_socket():
+            break
+        time.sleep(0.05)
+    yield sock
+    client.shutdown(sock)
+    proc.wait(timeout=30)
+    assert not sock.exists()
+
+def test_server_round_trip(tmp_path, server):
+    env = compiler_env(AOTRITON_COMPILE_SERVER=server)
+    jobs = [ make_job(tmp_path, name, i, timeout=0.02) for i, name in enumerate(['ok', 'hang', 'crash', 'ok']) ]
+    procs = [ run_compiler(job, env) for job in jobs ]
+    assert [ p.returncode for p in procs ] == [0] * 4
+    assert 'timed out' in procs[1].stderr
+    for job, status in zip(jobs, [STATUS_COMPLETE, STATUS_TIMEOUT, STATUS_EXIT_WITH_ERROR, STATUS_COMPLETE]):
+        check_outputs(job, status)
+    stats = client.status(server)
+    assert stats['completed'] == 4
+    assert stats['respawned'] == 2
+
+def test_local_fallback(tmp_path):
+    env = compiler_env(AOTRITON_COMPILE_SERVER=tmp_path / 'no_server.sock')
+    ok = make_job(tmp_path, 'ok', 0, timeout=0.02)
+    hang = make_job(tmp_path, 'hang', 1, timeout=0.01)
+    assert run_compiler(ok, env).returncode == 0
+    p = run_compiler(hang, env)
+    assert p.returncode == 0
+    assert 'timed out' in p.stderr
+    check_outputs(ok, STATUS_COMPLETE)
+    check_outputs(hang, STATUS_TIMEOUT)
+    # Without timeout, errors fail the build
+    assert run_compiler(make_job(tmp_path, 'raise', 2), env).returncode != 0
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Generates the code for one target with the shipped tuning
+# databases under two PYTHONHASHSEED values, or with --jobs 1 and --jobs 4,
+# and compares the trees.
+
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+SOURCE_PATH = Path(__file__).resolve().parent.parent
+
+@pytest.mark.parametrize('extra_args', [[], ['--reproducible']])
+def test_generator_reproducible(tmp_path, extra_args):
+    cmd = [sys.executable, '-m', 'v3python.check_reproducible',
+           '--target_gpus', 'gfx942_mod0',
+           '--seeds', '0', '1',
+           '--work_dir', str(tmp_path),
+           '--', *extra_args]
+    proc = subprocess.run(cmd, cwd=SOURCE_PATH, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+def test_generator_jobs_identical(tmp_path):
+    cmd = [sys.executable, '-m', 'v3python.check_reproducible',
+           '--target_gpus', 'gfx942_mod0',
+           '--seeds', '0',
+           '--jobs', '1', '4',
+           '--work_dir', str(tmp_path)]
+    proc = subprocess.run(cmd, cwd=SOURCE_PATH, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert 'PYTHONHASHSEED=0 --jobs 4: identical to PYTHONHASHSEED=0 --jobs 1' in proc.stdout
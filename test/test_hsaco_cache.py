@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. HSACO cache with the fake compiler backend.
+
+import json
+import time
+import pytest
+
+from _compiler_test import make_job, compiler_env, run_compiler
+from v3python.compiler import (
+    CompileResult,
+    STATUS_COMPLETE,
+    STATUS_EXCEPTION,
+    STATUS_TIMEOUT,
+    create_backend,
+)
+from v3python.compiler.backend import FakeBackend
+from v3python.compiler.cache import HsacoCache, cache_key, _source_digests
+
+@pytest.fixture
+def src_dir(tmp_path):
+    d = tmp_path / 'src'
+    d.mkdir()
+    (d / 'fake_kernel.py').write_text('def kernel(): pass\n')
+    (d / 'fake_inner.py').write_text('def inner(): pass\n')
+    _source_digests.clear()
+    return d
+
+'''
+Same source, compiled into different build trees
+'''
+def make_build_job(src_dir, out_dir, kernel_name='ok', **kwargs):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return make_job(src_dir, kernel_name, out_path=str(out_dir / f'{kernel_name}.hsaco'), **kwargs)
+
+def compile_with_cache(cache, job):
+    result = cache.get(job)
+    if result is not None:
+        return result, True
+    create_backend('fake').compile(job)
+    result = CompileResult(status=STATUS_COMPLETE)
+    cache.put(job, result)
+    return result, False
+
+def test_hit_across_build_trees(tmp_path, src_dir):
+    with HsacoCache(tmp_path / 'cache', 'fake') as cache:
+        job_a = make_build_job(src_dir, tmp_path / 'build_a')
+        job_b = make_build_job(src_dir, tmp_path / 'build_b')
+        assert compile_with_cache(cache, job_a)[1] == False
+        result, hit = compile_with_cache(cache, job_b)
+        assert hit
+        assert result.hsaco_size == len(FakeBackend.image(job_a))
+        assert job_a.hsaco_path.read_bytes() == job_b.hsaco_path.read_bytes()
+        assert job_a.json_path.read_text() == job_b.json_path.read_text()
+        stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries']) == (1, 1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+def test_key(tmp_path, src_dir):
+    job = make_build_job(src_dir, tmp_path / 'build')
+    key = cache_key(job, 'fake')
+    assert key == cache_key(make_build_job(src_dir, tmp_path / 'other', timeout=5.0, verbose=True), 'fake')
+    for kwargs in [dict(num_warps=8), dict(num_stages=2), dict(waves_per_eu=1),
+                   dict(target='gfx950'), dict(signature='*fp16:16, i32, 128')]:
+        assert key != cache_key(make_build_job(src_dir, tmp_path / 'build', **kwargs), 'fake'), kwargs
+    assert key != cache_key(job, 'fake 2')
+    # Imported siblings are part of the source
+    (src_dir / 'fake_inner.py').write_text('def inner(): return 1\n')
+    _source_digests.clear()
+    assert key != cache_key(job, 'fake')
+
+def test_lru_eviction(tmp_path, src_dir):
+    jobs = [ make_build_job(src_dir, tmp_path / f'build_{i}', num_warps=i + 1) for i in range(6) ]
+    with HsacoCache(tmp_path / 'cache', 'fake', max_size=1 << 30) as cache:
+        for job in jobs[:4]:
+            compile_with_cache(cache, job)
+        entry_size = cache.total_size() // 4
+        cache.max_size = entry_size * 4 + entry_size // 2
+        # jobs[0] becomes the most recently used
+        time.sleep(0.01)
+        assert compile_with_cache(cache, jobs[0])[1]
+        compile_with_cache(cache, jobs[4])
+        assert cache.total_size() <= cache.max_size * 0.9
+        assert compile_with_cache(cache, jobs[0])[1]
+        assert not compile_with_cache(cache, jobs[1])[1]
+        stats = cache.stats()
+    assert stats['evictions'] >= 1
+    assert stats['size'] <= entry_size * 4 + entry_size // 2
+
+def test_negative_entries(tmp_path, src_dir):
+    with HsacoCache(tmp_path / 'cache', 'fake', negative_ttl=3600.0) as cache:
+        job = make_build_job(src_dir, tmp_path / 'build_a', 'hang', timeout=1.0)
+        assert cache.get(job) is None
+        cache.put(job, CompileResult(status=STATUS_TIMEOUT))
+        again = make_build_job(src_dir, tmp_path / 'build_b', 'hang', timeout=1.0)
+        assert cache.get(again).status == STATUS_TIMEOUT
+        assert json.loads(again.json_path.read_text()) == {'compile_status': STATUS_TIMEOUT}
+        assert again.hsaco_path.read_bytes() == b''
+        # A longer timeout deserves another try
+        assert cache.get(make_build_job(src_dir, tmp_path / 'build_c', 'hang', timeout=2.0)) is None
+        failed = make_build_job(src_dir, tmp_path / 'build_a', 'raise')
+        cache.put(failed, CompileResult(status=STATUS_EXCEPTION))
+        assert cache.get(failed).status == STATUS_EXCEPTION
+        stats = cache.stats()
+        assert stats['negative_hits'] == 2
+        assert stats['negative_entries'] == 2
+        assert stats['size'] == 0
+        cache.negative_ttl = 0.0
+        time.sleep(0.01)
+        assert cache.get(failed) is None
+        assert cache.evict(1 << 30) == 1
+        assert cache.stats()['entries'] == 0
+
+def test_compile_py(tmp_path, src_dir):
+    cache_dir = tmp_path / 'cache'
+    env = compiler_env(AOTRITON_HSACO_CACHE=cache_dir)
+    jobs = [ make_build_job(src_dir, tmp_path / f'build_{i}', kernel_name) for i in range(2) for kernel_name in ['ok', 'hang'] ]
+    for job in jobs:
+        job.timeout = 0.01
+    tic = time.monotonic()
+    for job in jobs[:2]:
+        assert run_compiler(job, env).returncode == 0
+    first = time.monotonic() - tic
+    tic = time.monotonic()
+    procs = [ run_compiler(job, env) for job in jobs[2:] ]
+    second = time.monotonic() - tic
+    assert [ p.returncode for p in procs ] == [0, 0]
+    assert 'timed out' in procs[1].stderr
+    assert second < first
+    assert jobs[0].hsaco_path.read_bytes() == jobs[2].hsaco_path.read_bytes() == FakeBackend.image(jobs[0])
+    assert jobs[3].hsaco_path.read_bytes() == b''
+    with HsacoCache(cache_dir, 'fake') as cache:
+        stats = cache.stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 2)
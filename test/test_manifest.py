@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Cache hits and invalidations of the incremental generation
+# manifest (v3python.codegen.manifest), with a fake v3python tree.
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+
+SOURCE_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOURCE_PATH))
+from v3python.codegen import manifest as manifest_module
+from v3python.codegen.manifest import Manifest, MANIFEST_DIR
+
+RULES_SOURCE = '''
+class FakeInterface(object):
+    FAMILY = 'flash'
+    NAME = 'attn_fwd'
+'''
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    v3python = tmp_path / 'v3python'
+    (v3python / 'codegen' / 'template').mkdir(parents=True)
+    (v3python / 'rules').mkdir()
+    (v3python / 'codegen' / 'root.py').write_text('# generator\n')
+    (v3python / 'codegen' / 'template' / 'autotune_table_entry.cc').write_text('// template\n')
+    (v3python / 'rules' / 'fake_rules.py').write_text(RULES_SOURCE)
+    (v3python / 'rules' / 'attn_fwd.yaml').write_text('rules: []\n')
+    monkeypatch.setattr(manifest_module, '_V3PYTHON_DIR', v3python)
+    monkeypatch.setattr(manifest_module, '_RULES_DIR', v3python / 'rules')
+    monkeypatch.setattr(manifest_module, '_TEMPLATE_DIR', v3python / 'codegen' / 'template')
+    spec = importlib.util.spec_from_file_location('fake_rules', v3python / 'rules' / 'fake_rules.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setitem(sys.modules, 'fake_rules', module)
+    iface = module.FakeInterface()
+    iface.pruning_rules_path = v3python / 'rules' / 'attn_fwd.yaml'
+    return SimpleNamespace(v3python=v3python,
+                           args=SimpleNamespace(build_dir=tmp_path / 'build', target_gpus=['gfx942_mod0'], verbose=False),
+                           functional=SimpleNamespace(meta_object=iface, tunecc_signature='FONLY__fp16'),
+                           rows=[(1, 'fp16', 64)])
+
+'''
+One generation with the manifest. Returns the replayed result, None if the
+Functional had to be generated.
+'''
+def generate(tree, result='generated', verbose=False):
+    tree.args.verbose = verbose
+    m = Manifest(tree.args)
+    results = SimpleNamespace(col_names=['id', 'dtype', 'hdim'], rows=list(tree.rows))
+    digest = m.digest(tree.functional, (results, 'SELECT * FROM "FLASH$attn_fwd"'))
+    replayed = m.load(tree.functional, digest)
+    if replayed is None:
+        m.store(digest, result)
+    m.save()
+    return replayed
+
+def test_hit(tree, capsys):
+    assert generate(tree) is None
+    assert generate(tree) == 'generated'
+    assert capsys.readouterr().out == ''
+    assert generate(tree, verbose=True) == 'generated'
+    assert capsys.readouterr().out == 'Incremental generation: 1 Functionals reused, 0 regenerated\n'
+
+@pytest.mark.parametrize('path', ['codegen/template/autotune_table_entry.cc',
+                                  'codegen/root.py',
+                                  'rules/fake_rules.py',
+                                  'rules/attn_fwd.yaml'])
+def test_source_change(tree, path):
+    assert generate(tree) is None
+    fn = tree.v3python / path
+    fn.write_text(fn.read_text() + '\n')
+    assert generate(tree, 'regenerated') is None
+    assert generate(tree) == 'regenerated'
+
+def test_database_change(tree):
+    assert generate(tree) is None
+    tree.rows[0] = (1, 'fp16', 128)
+    assert generate(tree, 'regenerated') is None
+    assert generate(tree) == 'regenerated'
+
+def test_stale_objects_removed(tree):
+    generate(tree)
+    tree.rows.append((2, 'bf16', 64))
+    generate(tree)
+    objects = list((tree.args.build_dir / MANIFEST_DIR / 'objects').glob('*/*'))
+    assert len(objects) == 1
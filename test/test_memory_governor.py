@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Memory budget of concurrent compilations, and classification of
+# out-of-memory workers, with the fake backend.
+
+import json
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from _compiler_test import SOURCE_PATH, make_job, compiler_env, compiler_command
+from v3python.compiler import (
+    CompileResult,
+    STATUS_COMPLETE,
+    STATUS_MEMORY_LIMIT,
+)
+from v3python.compiler.pool import WorkerPool
+from v3python.compiler.governor import MemoryGovernor, PeakRssModel
+from v3python.compiler.ledger import CompileLedger, make_record
+
+MiB = 1 << 20
+
+def check_status(job, status):
+    with open(job.json_path) as f:
+        assert json.load(f)['compile_status'] == status
+
+def test_blocking_and_release(tmp_path):
+    governor = MemoryGovernor(tmp_path, 100)
+    first = governor.acquire(60)
+    acquired = threading.Event()
+    def second():
+        with governor.reserve(60):
+            acquired.set()
+    t = threading.Thread(target=second)
+    t.start()
+    assert not acquired.wait(0.3)
+    governor.release(first)
+    assert acquired.wait(5.0)
+    t.join()
+    assert governor.usage() == (0, {})
+
+def test_oversized_request_is_clamped(tmp_path):
+    governor = MemoryGovernor(tmp_path, 100)
+    with governor.reserve(1000) as token:
+        assert governor.usage() == (100, { token : 100 })
+    assert governor.usage()[0] == 0
+
+def test_fifo_order(tmp_path):
+    governor = MemoryGovernor(tmp_path, 100)
+    holder = governor.acquire(60)
+    order = []
+    def job(name, nbytes):
+        with governor.reserve(nbytes):
+            order.append(name)
+    large = threading.Thread(target=job, args=('large', 50))
+    large.start()
+    time.sleep(0.2)
+    small = threading.Thread(target=job, args=('small', 10))
+    small.start()
+    time.sleep(0.3)
+    # small fits the budget, but must not overtake large
+    assert order == []
+    governor.release(holder)
+    large.join(5.0)
+    small.join(5.0)
+    assert order == ['large', 'small']
+
+def test_dead_process_is_reclaimed(tmp_path):
+    script = ('import sys, time\n'
+              f'sys.path.insert(0, {str(SOURCE_PATH)!r})\n'
+              'from v3python.compiler.governor import MemoryGovernor\n'
+              f'MemoryGovernor({str(tmp_path)!r}, 100).acquire(100)\n'
+              'print("ready", flush=True)\n'
+              'time.sleep(60)\n')
+    proc = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, text=True)
+    assert proc.stdout.readline().strip() == 'ready'
+    governor = MemoryGovernor(tmp_path, 100)
+    assert governor.usage()[0] == 100
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+    tic = time.monotonic()
+    with governor.reserve(100):
+        assert time.monotonic() - tic < 5.0
+
+def test_peak_rss_model(tmp_path):
+    ledger = CompileLedger(tmp_path / 'compile_ledger.jsonl')
+    measured = make_job(tmp_path, 'ok', 0)
+    ledger.append(make_record(measured, CompileResult(status=STATUS_COMPLETE, duration=1.0, peak_rss=400 * MiB)))
+    ledger.update_index()
+    model = PeakRssModel(ledger, default=1000 * MiB, margin=1.25)
+    assert model.predict(measured) == 500 * MiB
+    # Same kernel, another HSACO
+    assert model.predict(make_job(tmp_path, 'ok', 1)) == 500 * MiB
+    assert model.predict(make_job(tmp_path, 'unknown', 2)) == 1000 * MiB
+    assert PeakRssModel(None, default=1000 * MiB).predict(measured) == 1000 * MiB
+
+def test_rlimit_as_per_job(tmp_path):
+    with WorkerPool(backend='fake', workers=1) as pool:
+        hog = make_job(tmp_path, 'hog=1024', 0, rlimit_as=512 * MiB)
+        r = pool.run(hog)
+        assert r.status == STATUS_MEMORY_LIMIT
+        check_status(hog, STATUS_MEMORY_LIMIT)
+        # The limit only applies to the job that requests it
+        unlimited = make_job(tmp_path, 'hog=1024', 1)
+        assert pool.run(unlimited).status == STATUS_COMPLETE
+    assert pool.stats['respawned'] == 0
+
+def test_native_allocation_failure(tmp_path):
+    with WorkerPool(backend='fake', workers=1) as pool:
+        oom = make_job(tmp_path, 'oom', 0, rlimit_as=512 * MiB)
+        after = make_job(tmp_path, 'ok', 1)
+        r = pool.run(oom)
+        assert r.status == STATUS_MEMORY_LIMIT
+        assert r.exitcode == -signal.SIGABRT
+        check_status(oom, STATUS_MEMORY_LIMIT)
+        assert pool.run(after).status == STATUS_COMPLETE
+    assert pool.stats['respawned'] == 1
+
+def start_compiler(job, env):
+    return subprocess.Popen(compiler_command(job), env=env, stderr=subprocess.PIPE, text=True)
+
+def budget_env(tmp_path, budget):
+    return compiler_env(AOTRITON_COMPILE_LEDGER=tmp_path / 'compile_ledger.jsonl',
+                        AOTRITON_COMPILE_MEMORY_BUDGET=budget)
+
+def test_compiler_under_budget(tmp_path):
+    jobs = [ make_job(tmp_path, 'sleep=1,hog=64', i) for i in range(4) ]
+    ledger = CompileLedger(tmp_path / 'compile_ledger.jsonl')
+    for job in jobs:
+        ledger.append(make_record(job, CompileResult(status=STATUS_COMPLETE, duration=1.0, peak_rss=400 * MiB)))
+    # Each job is predicted to use 500 MiB, hence two jobs at a time
+    env = budget_env(tmp_path, 1024)
+    governor = MemoryGovernor(tmp_path, 1024 * MiB)
+    tic = time.monotonic()
+    procs = [ start_compiler(job, env) for job in jobs ]
+    max_usage = 0
+    max_jobs = 0
+    while any([ p.poll() is None for p in procs ]):
+        usage, reservations = governor.usage()
+        max_usage = max(max_usage, usage)
+        max_jobs = max(max_jobs, len(reservations))
+        time.sleep(0.05)
+    elapsed = time.monotonic() - tic
+    assert [ p.returncode for p in procs ] == [0] * 4
+    assert 0 < max_usage <= 1024 * MiB
+    assert 1 <= max_jobs <= 2
+    assert elapsed >= 2.0
+    for job in jobs:
+        check_status(job, STATUS_COMPLETE)
+    assert governor.usage() == (0, {})
+
+def test_compiler_memory_limit_is_not_fatal(tmp_path):
+    env = budget_env(tmp_path, 512)
+    hog = make_job(tmp_path, 'hog=1024', 0)
+    p = start_compiler(hog, env)
+    _, stderr = p.communicate()
+    assert p.returncode == 0
+    assert 'exceeded the memory limit of 512 MiB' in stderr
+    check_status(hog, STATUS_MEMORY_LIMIT)
+    records = list(CompileLedger(tmp_path / 'compile_ledger.jsonl').records())
+    assert [ r['status'] for r in records ] == [STATUS_MEMORY_LIMIT]
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Pruning rules of autotune configs, and rules learned from
+# synthetic compile ledgers.
+
+import itertools
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from v3python.autotune import Config
+from v3python.autotune.pruning import (
+    PRUNING_VERSION,
+    PruningRule,
+    PruningRuleSet,
+    REASON_SPILL,
+    REASON_TIMEOUT,
+    learn_rules,
+    record_variables,
+)
+from v3python.compiler.ledger import CompileLedger, latest_records
+
+ARGUMENTS = {
+    'toy_fwd' : ['Q', 'BLOCK_DMODEL', 'BLOCK_M', 'BLOCK_N'],
+}
+
+class Choice(object):
+    def __init__(self, value):
+        self.triton_compile_signature = value
+
+def make_functional(arch, dtype='*fp16:16', hdim=128):
+    return SimpleNamespace(arch=arch, compact_choices={ 'Q' : Choice(dtype), 'BLOCK_DMODEL' : Choice(hdim) })
+
+def make_configs():
+    for M, N, warps, stages in itertools.product([16, 32, 64, 128], [16, 32, 64], [1, 2, 4], [1, 2]):
+        yield Config({'BLOCK_M': M, 'BLOCK_N': N, 'waves_per_eu': 2}, num_warps=warps, num_stages=stages)
+
+def test_rule_conditions():
+    rule = PruningRule({ 'BLOCK_M*BLOCK_N' : { 'ge' : 1024 }, 'num_warps' : { 'lt' : 4 }, 'Q' : '*fp16:16' })
+    assert rule.matches({ 'BLOCK_M' : 32, 'BLOCK_N' : 32, 'num_warps' : 2, 'Q' : '*fp16:16' })
+    assert not rule.matches({ 'BLOCK_M' : 32, 'BLOCK_N' : 16, 'num_warps' : 2, 'Q' : '*fp16:16' })
+    assert not rule.matches({ 'BLOCK_M' : 32, 'BLOCK_N' : 32, 'num_warps' : 4, 'Q' : '*fp16:16' })
+    assert not rule.matches({ 'BLOCK_M' : 32, 'BLOCK_N' : 32, 'num_warps' : 2, 'Q' : '*bf16:16' })
+    # Missing variables never match
+    assert not rule.matches({ 'BLOCK_M' : 32, 'num_warps' : 2, 'Q' : '*fp16:16' })
+    assert PruningRule({ 'BLOCK_M' : { 'in' : [16, 32] }, 'BLOCK_N' : { 'ne' : 16 } }).matches({ 'BLOCK_M' : 16, 'BLOCK_N' : 32 })
+    with pytest.raises(AssertionError):
+        PruningRule({ 'BLOCK_M' : { 'between' : [16, 32] } })
+
+def test_rule_arch_selection():
+    rdna = PruningRule({ 'num_warps' : 1 }, production_line=['RDNA'])
+    assert rdna.applies_to('gfx1100')
+    assert not rdna.applies_to('gfx942')
+    # gfx1250 belongs to CDNA, despite its name
+    assert not rdna.applies_to('gfx1250')
+    pattern = PruningRule({ 'num_warps' : 1 }, arch=['gfx94*', 'gfx950'])
+    assert pattern.applies_to('gfx942')
+    assert pattern.applies_to('gfx950')
+    assert not pattern.applies_to('gfx90a')
+    assert PruningRule({ 'num_warps' : 1 }).applies_to('gfx90a')
+
+def test_filter_configs():
+    ruleset = PruningRuleSet('toy_fwd', [
+        PruningRule({ 'BLOCK_M*BLOCK_N' : { 'ge' : 4096 }, 'num_warps' : 1 }, reason=REASON_TIMEOUT),
+        PruningRule({ 'BLOCK_DMODEL' : { 'ge' : 256 }, 'num_stages' : 2 }, reason=REASON_TIMEOUT, production_line=['RDNA']),
+    ])
+    def kept(f):
+        return [ (c.kwargs['BLOCK_M'], c.kwargs['BLOCK_N'], c.num_warps, c.num_stages) for c in ruleset.filter(f, make_configs()) ]
+    all_configs = [ (c.kwargs['BLOCK_M'], c.kwargs['BLOCK_N'], c.num_warps, c.num_stages) for c in make_configs() ]
+    cdna = kept(make_functional('gfx942', hdim=256))
+    assert cdna == [ c for c in all_configs if not (c[0] * c[1] >= 4096 and c[2] == 1) ]
+    rdna = kept(make_functional('gfx1100', hdim=256))
+    assert rdna == [ c for c in cdna if c[3] != 2 ]
+    assert kept(make_functional('gfx1100', hdim=128)) == cdna
+    assert kept(make_functional('gfx942')) == kept(make_functional('gfx942', hdim=64))
+
+def test_rule_file_round_trip(tmp_path):
+    ruleset = PruningRuleSet('toy_fwd', [
+        PruningRule({ 'BLOCK_M' : 128, 'num_warps' : { 'lt' : 4 } }, reason=REASON_TIMEOUT, arch=['gfx942'], support=5),
+        PruningRule({ 'BLOCK_DMODEL' : { 'gt' : 256 } }, reason='Faulty', production_line=['RDNA']),
+    ])
+    path = tmp_path / 'toy_fwd.pruning.json'
+    ruleset.save(path)
+    loaded = PruningRuleSet.load(path)
+    assert loaded.asdict() == ruleset.asdict()
+    assert json.loads(path.read_text())['version'] == PRUNING_VERSION
+    # Missing files have no rules
+    assert PruningRuleSet.load(tmp_path / 'missing.json', 'toy_fwd').rules == []
+    path.write_text(json.dumps({ 'version' : PRUNING_VERSION + 1, 'kernel' : 'toy_fwd', 'rules' : [] }))
+    with pytest.raises(AssertionError):
+        PruningRuleSet.load(path)
+
+def test_shipped_rule_files():
+    from v3python.rules import kernels
+    tunable = [ k for k in kernels if k.is_tunable ]
+    assert tunable
+    for k in tunable:
+        assert k.pruning_rules_path.is_file(), f'{k.NAME} has no pruning rule file'
+        ruleset = PruningRuleSet.load(k.pruning_rules_path)
+        assert ruleset.kernel == k.NAME
+        known = set(k.ARGUMENTS) | set(['num_warps', 'num_stages', 'waves_per_eu'])
+        for rule in ruleset.rules:
+            for key in rule.when:
+                for name in key.split('*'):
+                    assert name in known, f'{k.NAME}: unknown variable {name} in pruning rule {rule.when}'
+
+def make_record(index, M, N, warps, hdim=128, stages=1, status='Complete', arch='gfx942', **kwargs):
+    record = {
+        'hsaco' : f'toy_fwd-{index}--Arch_{arch}.hsaco',
+        'path' : f'/build/flash/gpu_kernel_image.toy_fwd/toy_fwd-{index}--Arch_{arch}.hsaco',
+        'kernel' : 'toy_fwd',
+        'arch' : arch,
+        'status' : status,
+        'duration' : 10.0,
+        'signature' : f'*fp16:16, {hdim}, {M}, {N}',
+        'num_warps' : warps,
+        'num_stages' : stages,
+        'waves_per_eu' : 2,
+    }
+    record.update(kwargs)
+    return record
+
+def synthetic_ledger(is_timeout, spills=None, arch='gfx942'):
+    records = []
+    for i, (M, N, warps, hdim) in enumerate(itertools.product([16, 32, 64, 128], [16, 32, 64], [1, 2, 4], [64, 128, 256])):
+        status = 'Timeout' if is_timeout(M, N, warps, hdim) else 'Complete'
+        extra = {}
+        if spills is not None and status == 'Complete':
+            extra['vgpr_spill_count'] = spills(M, N, warps, hdim)
+        records.append(make_record(i, M, N, warps, hdim, status=status, arch=arch, **extra))
+    return records
+
+def check_proposal(rules, records, reason):
+    bad = [ r for r in records if (r['status'] == 'Timeout') == (reason == REASON_TIMEOUT) and (reason != REASON_SPILL or r.get('vgpr_spill_count', 0) > 0) ]
+    good = [ r for r in records if r['status'] == 'Complete' and r.get('vgpr_spill_count', 0) == 0 ]
+    variables = lambda r : record_variables(r, ARGUMENTS['toy_fwd'])
+    assert all([ rule.reason == reason for rule in rules ])
+    for r in bad:
+        assert any([ rule.matches(variables(r)) for rule in rules ]), f'Not covered: {r}'
+    for r in good:
+        assert not any([ rule.matches(variables(r)) for rule in rules ]), f'Viable config pruned: {r}'
+
+def test_record_variables():
+    r = make_record(0, 64, 32, 4, hdim=256, stages=2)
+    assert record_variables(r, ARGUMENTS['toy_fwd']) == {
+        'Q' : '*fp16:16', 'BLOCK_DMODEL' : 256, 'BLOCK_M' : 64, 'BLOCK_N' : 32,
+        'num_warps' : 4, 'num_stages' : 2, 'waves_per_eu' : 2,
+    }
+    # Records without signature only have compiler options
+    del r['signature']
+    assert record_variables(r, ARGUMENTS['toy_fwd']) == { 'num_warps' : 4, 'num_stages' : 2, 'waves_per_eu' : 2 }
+
+def test_learn_timeouts():
+    records = synthetic_ledger(lambda M, N, warps, hdim : M * N >= 64 * 32 and warps == 1)
+    proposals = learn_rules(records, ARGUMENTS)
+    rules = proposals['toy_fwd']
+    assert len(rules) == 1
+    assert rules[0].when == { 'BLOCK_M*BLOCK_N' : { 'ge' : 2048 }, 'num_warps' : 1 }
+    assert rules[0].arch == ['gfx942']
+    assert rules[0].support == len([ r for r in records if r['status'] == 'Timeout' ])
+    check_proposal(rules, records, REASON_TIMEOUT)
+
+def test_learn_disjoint_timeouts():
+    def is_timeout(M, N, warps, hdim):
+        return (hdim == 256 and M == 128 and warps < 4) or (warps == 1 and N == 64)
+    records = synthetic_ledger(is_timeout)
+    # The first cause needs three conditions
+    rules = learn_rules(records, ARGUMENTS)['toy_fwd']
+    assert [ r.when for r in rules ] == [{ 'BLOCK_N' : 64, 'num_warps' : 1 }]
+    rules = learn_rules(records, ARGUMENTS, max_conditions=3)['toy_fwd']
+    assert len(rules) == 2
+    check_proposal(rules, records, REASON_TIMEOUT)
+
+def test_learn_spills():
+    records = synthetic_ledger(lambda *_ : False, spills=lambda M, N, warps, hdim : 12 if hdim == 256 and M >= 64 else 0)
+    rules = learn_rules(records, ARGUMENTS)['toy_fwd']
+    assert [ r.when for r in rules ] == [{ 'BLOCK_DMODEL' : 256, 'BLOCK_M' : { 'ge' : 64 } }]
+    check_proposal(rules, records, REASON_SPILL)
+    # Spill threshold
+    assert learn_rules(records, ARGUMENTS, vgpr_spill_threshold=16) == {}
+    assert learn_rules(records, ARGUMENTS, vgpr_spill_threshold=-1) == {}
+
+def test_learn_per_arch():
+    records = synthetic_ledger(lambda M, N, warps, hdim : M == 128 and warps == 1, arch='gfx1100')
+    records += synthetic_ledger(lambda *_ : False, arch='gfx942')
+    rules = learn_rules(records, ARGUMENTS)['toy_fwd']
+    assert [ r.arch for r in rules ] == [['gfx1100']]
+
+def test_learn_skips_pruned_and_rare_failures():
+    is_timeout = lambda M, N, warps, hdim : M * N >= 64 * 32 and warps == 1
+    records = synthetic_ledger(is_timeout)
+    existing = { 'toy_fwd' : PruningRuleSet('toy_fwd', [ PruningRule({ 'BLOCK_M*BLOCK_N' : { 'ge' : 2048 }, 'num_warps' : 1 }) ]) }
+    assert learn_rules(records, ARGUMENTS, existing=existing) == {}
+    # Two failures are below the default support
+    records = synthetic_ledger(lambda M, N, warps, hdim : M == 128 and N == 64 and warps == 1 and hdim >= 128)
+    assert learn_rules(records, ARGUMENTS) == {}
+    assert learn_rules(records, ARGUMENTS, min_support=2, max_conditions=3)['toy_fwd'][0].support == 2
+    # Crashes say nothing about the config
+    records = [ dict(r, status='ExitWithError') for r in synthetic_ledger(is_timeout) ]
+    assert learn_rules(records, ARGUMENTS) == {}
+
+def test_learn_from_ledger_file(tmp_path):
+    ledger = CompileLedger(tmp_path / 'compile_ledger.jsonl')
+    is_timeout = lambda M, N, warps, hdim : M * N >= 64 * 32 and warps == 1
+    records = synthetic_ledger(is_timeout)
+    # Earlier attempts of the same HSACO files are superseded
+    for r in records:
+        ledger.append(dict(r, status='Timeout', time=0))
+    for r in records:
+        ledger.append(r)
+    rules = learn_rules(latest_records(ledger.records()), ARGUMENTS)['toy_fwd']
+    check_proposal(rules, records, REASON_TIMEOUT)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Streaming aggregation of raw tuning logs by v2python.table_tool
+# selects the same kernels as keeping all records in memory.
+
+import io
+import json
+import math
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+import numpy as np
+import pytest
+
+SOURCE_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOURCE_PATH))
+pytest.importorskip('tqdm')
+from v2python.table_tool import TuningDatabase, PkrStore, do_main
+from v3python.bench.table_tool_ingest import synthetic_log, table_tool_args, dump
+
+'''
+Tasks interleaved as with parallel tuners, with ties of time, and records
+that are not sensible
+'''
+def messy_log(nlines, configs, seed):
+    rng = np.random.default_rng(seed)
+    records = [ json.loads(line) for line in synthetic_log(nlines, configs, seed).splitlines() ]
+    for j in records:
+        u = rng.uniform()
+        # Few distinct values, to have ties
+        j['time'] = [ float(rng.integers(1, 4)), float(rng.integers(1, 3)) ]
+        j['adiffs'] = [ float(rng.choice([1e-3, 2e-3, 4e-3, 6e-3, 3e-2])) ]
+        if u < 0.05:
+            j['adiffs'] = [ math.nan ]
+        elif u < 0.10:
+            j['time'] = math.inf
+        elif u < 0.15:
+            j['result'] = 'compile error'
+        elif u < 0.20:
+            j['target_fudge_factors'] = None
+    # Only insensible records for a few tasks
+    for j in records:
+        if j['_debug_task_id'] % 7 == 3:
+            j['adiffs'] = [ math.nan ]
+    order = rng.permutation(len(records))
+    return ''.join([ json.dumps(records[i]) + '\n' for i in order ])
+
+def aggregate(tmp_path, name, log, action='rawjson', **kwargs):
+    db_file = tmp_path / f'{name}.sqlite3'
+    args = table_tool_args(db_file, action, 1000, 1.0, 'wal')
+    args.sc_report = str(tmp_path / f'{name}.json')
+    args.scratch_dir = tmp_path
+    for k, v in kwargs.items():
+        setattr(args, k, v)
+    db = TuningDatabase(args)
+    with redirect_stdout(io.StringIO()) as out:
+        do_main(args, db, io.StringIO(log))
+    return db_file, args, out.getvalue()
+
+@pytest.mark.parametrize('budget', [100000, 3])
+def test_same_selection_as_in_memory(tmp_path, budget):
+    log = messy_log(2000, 16, seed=11)
+    legacy, _, legacy_out = aggregate(tmp_path, 'legacy', log, aggregate_in_memory=True)
+    streaming, _, streaming_out = aggregate(tmp_path, 'streaming', log, aggregation_budget=budget)
+    assert dump(legacy) == dump(streaming)
+    # Same tasks to re-run, reported in the same order
+    assert 'TUNE_FLASH' in legacy_out
+    assert legacy_out == streaming_out
+    # Scratch database is removed
+    assert sorted([ p.name for p in tmp_path.iterdir() ]) == ['legacy.sqlite3', 'streaming.sqlite3']
+
+def test_same_sancheck(tmp_path):
+    log = messy_log(1000, 8, seed=12)
+    _, legacy, _ = aggregate(tmp_path, 'legacy', log, action='rawsc', aggregate_in_memory=True)
+    _, streaming, _ = aggregate(tmp_path, 'streaming', log, action='rawsc', aggregation_budget=4)
+    legacy_rerun = json.loads(Path(legacy.sc_report).read_text())['need_rerun']
+    streaming_rerun = json.loads(Path(streaming.sc_report).read_text())['need_rerun']
+    assert legacy_rerun
+    assert sorted(legacy_rerun) == sorted(streaming_rerun)
+
+def test_spill_and_reload(tmp_path):
+    records = [ json.loads(line) for line in synthetic_log(60, 4, seed=13).splitlines() ]
+    legacy = PkrStore(streaming=False)
+    store = PkrStore(budget=4, scratch_dir=tmp_path)
+    # Round robin over the 15 tasks
+    for j in sorted(records, key=lambda j : records.index(j) % 4):
+        key = (j['arch'], j['_debug_task_id'], j['kernel_name'])
+        legacy.collect(key, j)
+        store.collect(key, j)
+    assert store.spilled > 0
+    assert len(store) == len(legacy) == 15
+    for pkr in legacy.values():
+        pkr.conclude()
+    optimals = [ pkr.get_optimal_kernel(5.0, 100.0) for pkr in legacy.values() ]
+    assert [ pkr.get_optimal_kernel(5.0, 100.0) for pkr in store.values() ] == optimals
+    assert [ pkr.tid for pkr in store.values() ] == list(range(15))
+    store.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_candidates_are_bounded():
+    store = PkrStore()
+    key = ('gfx942', 0, 'attn_fwd')
+    for j in [ json.loads(line) for line in synthetic_log(500, 500, seed=14).splitlines() ]:
+        store.collect(key, j)
+    [pkr] = list(store.values())
+    # Pareto front of (time, adiffs), not every acceptable record
+    assert len(pkr.get_state()['candidates']) < 50
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# CPU only. Batched ingestion of tuning logs by v2python.table_tool.
+
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing, redirect_stdout
+from pathlib import Path
+import pytest
+
+SOURCE_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOURCE_PATH))
+pytest.importorskip('tqdm')
+from v2python.table_tool import TuningDatabase, do_main
+from v3python.bench.table_tool_ingest import synthetic_log, table_tool_args, dump
+
+TABLE = 'FLASH$attn_fwd'
+
+def ingest(db_file, log, action='pipejson', batch_size=1000, flush_interval=1.0, journal_mode='wal'):
+    args = table_tool_args(db_file, action, batch_size, flush_interval, journal_mode)
+    db = TuningDatabase(args)
+    with redirect_stdout(io.StringIO()):
+        do_main(args, db, io.StringIO(log))
+    return db
+
+def count_rows(db_file):
+    with closing(sqlite3.connect(db_file)) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM "{TABLE}"').fetchone()[0]
+
+@pytest.mark.parametrize('action', ['pipejson', 'rawjson'])
+def test_same_content_as_per_row_commits(tmp_path, action):
+    log = synthetic_log(500, 10, seed=1)
+    legacy = tmp_path / 'legacy.sqlite3'
+    batched = tmp_path / 'batched.sqlite3'
+    ingest(legacy, log, action, batch_size=1, flush_interval=0.0, journal_mode='delete')
+    db = ingest(batched, log, action, batch_size=64)
+    assert db.committed == (500 if action == 'pipejson' else 50)
+    assert dump(legacy) == dump(batched)
+    assert count_rows(batched) == 50
+
+def test_journal_mode_is_restored(tmp_path):
+    db_file = tmp_path / 'tuning.sqlite3'
+    ingest(db_file, synthetic_log(100, 10, seed=2))
+    assert not Path(f'{db_file}-wal').exists()
+    with closing(sqlite3.connect(db_file)) as conn:
+        assert conn.execute('PRAGMA journal_mode;').fetchone()[0] == 'delete'
+
+def test_replay_is_idempotent(tmp_path):
+    log = synthetic_log(300, 10, seed=3)
+    once = tmp_path / 'once.sqlite3'
+    twice = tmp_path / 'twice.sqlite3'
+    ingest(once, log)
+    # A crash after some batches, then the whole log is ingested again
+    ingest(twice, ''.join(log.splitlines(keepends=True)[:130]), batch_size=50)
+    ingest(twice, log, batch_size=50)
+    assert dump(once) == dump(twice)
+
+def test_failed_batch_is_rolled_back(tmp_path):
+    db_file = tmp_path / 'tuning.sqlite3'
+    lines = synthetic_log(40, 10, seed=4).splitlines(keepends=True)
+    # Unknown column in the second batch
+    bad = lines[25].replace('"PRE_LOAD_V"', '"UNKNOWN_COLUMN"')
+    args = table_tool_args(db_file, 'pipejson', 20, 0.0, 'wal')
+    db = TuningDatabase(args)
+    for line in lines[:25] + [bad]:
+        db.upsert(line, create_table_only=False)
+    with pytest.raises(sqlite3.OperationalError):
+        db.flush()
+    assert db.committed == 20
+    assert count_rows(db_file) == 2
+
+def test_idle_pipe_is_flushed(tmp_path):
+    db_file = tmp_path / 'tuning.sqlite3'
+    lines = synthetic_log(30, 10, seed=5).splitlines(keepends=True)
+    args = table_tool_args(db_file, 'pipejson', 1000, 0.2, 'wal')
+    rfd, wfd = os.pipe()
+    fin = os.fdopen(rfd, 'r')
+    fout = os.fdopen(wfd, 'w')
+    committed = []
+    # The sqlite connection belongs to the thread that creates it
+    def table_tool():
+        db = TuningDatabase(args)
+        do_main(args, db, fin)
+        committed.append(db.committed)
+    t = threading.Thread(target=table_tool)
+    t.start()
+    fout.writelines(lines[:20])
+    fout.flush()
+    # Far from a full batch, but committed once the input is idle
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        try:
+            if count_rows(db_file) == 2:
+                break
+        except sqlite3.OperationalError:
+            pass
+        time.sleep(0.05)
+    assert count_rows(db_file) == 2
+    fout.writelines(lines[20:])
+    fout.close()
+    t.join(5.0)
+    assert not t.is_alive()
+    assert count_rows(db_file) == 3
+    assert committed == [30]
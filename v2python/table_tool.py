@@ -9,8 +9,13 @@ import argparse
 import sys
 import os
 import math
+import time
+import queue
+import threading
 import numpy as np
 import csv
+import tempfile
+from collections import OrderedDict
 from tqdm import tqdm
 from pathlib import Path
 
@@ -54,6 +59,17 @@ def parse():
                    ''')
     p.add_argument('--max_fudge_factor', type=float, default=100.0)
     p.add_argument('--sc_report', type=str, default=None, help='Write san check results to this JSON file. Required for --action rawsc')
+    p.add_argument('--batch_size', type=int, default=1000, help='Number of upserted rows per transaction. 1 commits every row')
+    p.add_argument('--flush_interval', type=float, default=1.0,
+                   help='Commit pending rows once the oldest is this many seconds old, also when the piped input is idle. 0 to only commit full batches')
+    p.add_argument('--journal_mode', type=str, default='wal', choices=['wal', 'delete'],
+                   help='SQLite journal mode during the ingestion. The database is switched back to the rollback journal (delete) on exit')
+    p.add_argument('--aggregate_in_memory', action='store_true',
+                   help='For rawjson/rawsc/opjson. Keep all raw records in memory until the end, instead of the running best of each task. Both select the same kernels')
+    p.add_argument('--aggregation_budget', type=int, default=100000,
+                   help='For rawjson/rawsc/opjson. Maximal number of tasks whose running best is kept in memory. Least recently updated tasks are moved to a scratch sqlite database')
+    p.add_argument('--scratch_dir', type=Path, default=None,
+                   help='Directory of the scratch database of the aggregation. Defaults to the system temporary directory')
     args = p.parse_args()
     if args.action == 'rawsc':
         assert args.sc_report is not None, '--sc_report is required for --action rawsc'
@@ -62,6 +78,16 @@ def parse():
         assert args.kernel_family, f'--kernel_family is needed for --action {args.action}'
     return args
 
+def gettime(j):
+    if not isinstance(j['time'], list):
+        return j['time']
+    return tuple(j['time'])
+
+def scale_adiffs(adiffs, factor):
+    if isinstance(adiffs, list):
+        return [ factor * e for e in adiffs ]
+    return factor * adiffs
+
 # TODO: Refactor this piece
 #       Use --kernel_family to lookup info
 
@@ -73,6 +99,10 @@ class PerKernelResult(object):
     def __init__(self, task_id):
         self._tid = task_id
         self._jarray = []
+        # Streaming mode, see reduce()
+        self._streaming = False
+        self._best_adiffs = None
+        self._candidates = []
 
     @property
     def tid(self):
@@ -81,6 +111,59 @@ class PerKernelResult(object):
     def collect(self, j):
         self._jarray.append(j)
 
+    '''
+    Streaming counterpart of collect(), for get_optimal_kernel() with the
+    same tolerance_factor.
+
+    Only the first record (for conclude() and entry_from_json()), the
+    running best adiffs, and the candidates are kept. Candidates are the
+    records that are still acceptable, and not beaten by an earlier
+    candidate with no larger adiffs and no longer time. Records dropped
+    this way can never be the optimal kernel, because the acceptable adiffs
+    only decrease as better records arrive.
+    '''
+    def reduce(self, j, tolerance_factor):
+        if not self._jarray:
+            self._streaming = True
+            self._jarray.append(j)
+            self.conclude()
+        if not self.is_sensible(j):
+            return
+        adiffs = j['adiffs']
+        if self._best_adiffs is None or self._best_adiffs > adiffs:
+            self._best_adiffs = adiffs
+        acceptable_adiffs = scale_adiffs(self._best_adiffs, tolerance_factor)
+        candidates = [ k for k in self._candidates if k['adiffs'] < acceptable_adiffs ]
+        if not adiffs < acceptable_adiffs:
+            self._candidates = candidates
+            return
+        t = gettime(j)
+        # On ties of time, the earlier record wins in get_optimal_kernel()
+        if any([ gettime(k) <= t and k['adiffs'] <= adiffs for k in candidates ]):
+            self._candidates = candidates
+            return
+        candidates = [ k for k in candidates if not (t < gettime(k) and adiffs <= k['adiffs']) ]
+        candidates.append(j)
+        self._candidates = candidates
+
+    '''
+    State of reduce(), restored by PkrStore with pkr_factory() and
+    set_state()
+    '''
+    def get_state(self):
+        return {
+            'head' : self._jarray[0],
+            'best_adiffs' : self._best_adiffs,
+            'candidates' : self._candidates,
+        }
+
+    def set_state(self, state):
+        self._streaming = True
+        self._jarray = [state['head']]
+        self.conclude()
+        self._best_adiffs = state['best_adiffs']
+        self._candidates = state['candidates']
+
     def conclude(self):
         self.valid_out_tensors = self.KERNEL_OUT_TENSORS
 
@@ -153,39 +236,44 @@ class PerKernelResult(object):
         optimal = self.remove_unused(optimal)
         return optimal
 
+    def is_sensible(self, j):
+        if j['result'] != 'tuned':
+            return False
+        if 'target_fudge_factors' not in j:
+            return False
+        if j['target_fudge_factors'] is None:
+            return False
+        if not isinstance(j['time'], list):
+            t = j['time']
+            if not isinstance(t, float):
+                return False
+            if math.isnan(t) or math.isinf(t):
+                return False
+        adiffs = j['adiffs']
+        if adiffs is None or self.any_nan(adiffs):
+            return False
+        return True
+
     def sensible_gen(self):
         for j in self._jarray:
-            if j['result'] != 'tuned':
-                continue
-            if 'target_fudge_factors' not in j:
-                continue
-            if j['target_fudge_factors'] is None:
-                continue
-            if not isinstance(j['time'], list):
-                t = j['time']
-                if not isinstance(t, float):
-                    continue
-                if math.isnan(t) or math.isinf(t):
-                    continue
-            adiffs = j['adiffs']
-            if adiffs is None or self.any_nan(adiffs):
-                continue
-            yield j
+            if self.is_sensible(j):
+                yield j
 
     def get_accurate_kernels(self, tolerance_factor):
-        best_adiffs = None
-        sensibles = list(self.sensible_gen())
-        for j in sensibles:
-            if best_adiffs is None:
-                best_adiffs = j['adiffs']
-            elif best_adiffs > j['adiffs']:
-                best_adiffs = j['adiffs']
+        if self._streaming:
+            best_adiffs = self._best_adiffs
+            sensibles = self._candidates
+        else:
+            best_adiffs = None
+            sensibles = list(self.sensible_gen())
+            for j in sensibles:
+                if best_adiffs is None:
+                    best_adiffs = j['adiffs']
+                elif best_adiffs > j['adiffs']:
+                    best_adiffs = j['adiffs']
         if best_adiffs is None:
             return None, None
-        if isinstance(best_adiffs, list):
-            acceptable_adiffs = [ tolerance_factor * e for e in best_adiffs ]
-        else:
-            acceptable_adiffs = tolerance_factor * best_adiffs
+        acceptable_adiffs = scale_adiffs(best_adiffs, tolerance_factor)
         return best_adiffs, [ j for j in sensibles if j['adiffs'] < acceptable_adiffs ]
 
     def get_optimal_kernel(self, fudge_factor_tolerance, max_fudge_factor, allow_no_acceptable=False):
@@ -198,10 +286,6 @@ class PerKernelResult(object):
             print(f'NEED RERUN TID: {self.tid}')
             return None
 
-        def gettime(j):
-            if not isinstance(j['time'], list):
-                return j['time']
-            return tuple(j['time'])
         if not acceptables:
             if allow_no_acceptable:
                 return None
@@ -318,6 +402,107 @@ def pkr_factory(key):
     factory = KERNEL_NAME_TO_FACTORY[kn]
     return factory(tid)
 
+'''
+PerKernelResult objects of the aggregation, by key (gpu, task_id,
+kernel_name), iterated in the order the keys are first seen.
+
+With streaming=True, records are reduced to the running best of each key
+(PerKernelResult.reduce), and at most budget keys are kept in memory. The
+least recently updated keys are moved to a scratch sqlite database under
+scratch_dir, and moved back when their task shows up again.
+'''
+class PkrStore(object):
+    def __init__(self, streaming=True, tolerance_factor=5.0, budget=100000, scratch_dir=None):
+        self._streaming = streaming
+        self._tolerance_factor = tolerance_factor
+        self._budget = max(1, budget)
+        self._scratch_dir = scratch_dir
+        self._memory = OrderedDict()  # key -> (seq, pkr), least recently updated first
+        self._next_seq = 0
+        self._scratch = None
+        self._scratch_path = None
+        self._nspilled = 0
+
+    def __len__(self):
+        return len(self._memory) + self._nspilled
+
+    @property
+    def spilled(self):
+        return self._nspilled
+
+    def collect(self, key, j):
+        seq, pkr = self._get(key)
+        if self._streaming:
+            pkr.reduce(j, self._tolerance_factor)
+        else:
+            pkr.collect(j)
+        if self._streaming and len(self._memory) > self._budget:
+            self._spill(len(self._memory) - self._budget // 2)
+
+    def _get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        item = self._load(key)
+        if item is None:
+            item = (self._next_seq, pkr_factory(key))
+            self._next_seq += 1
+        self._memory[key] = item
+        return item
+
+    def _open_scratch(self):
+        fd, path = tempfile.mkstemp(prefix='table_tool_', suffix='.sqlite3', dir=self._scratch_dir)
+        os.close(fd)
+        self._scratch_path = Path(path)
+        self._scratch = sqlite3.connect(path)
+        # Disposable, no need to survive crashes
+        self._scratch.execute('PRAGMA journal_mode=OFF;')
+        self._scratch.execute('PRAGMA synchronous=OFF;')
+        self._scratch.execute('CREATE TABLE pkr (key TEXT PRIMARY KEY, seq INTEGER, state TEXT);')
+
+    def _spill(self, n):
+        if self._scratch is None:
+            self._open_scratch()
+        rows = []
+        for _ in range(n):
+            key, (seq, pkr) = self._memory.popitem(last=False)
+            rows.append((json.dumps(key), seq, json.dumps(pkr.get_state())))
+        with self._scratch:
+            self._scratch.executemany('INSERT INTO pkr VALUES(?, ?, ?);', rows)
+        self._nspilled += len(rows)
+
+    def _load(self, key):
+        if not self._nspilled:
+            return None
+        skey = json.dumps(key)
+        row = self._scratch.execute('SELECT seq, state FROM pkr WHERE key = ?;', (skey,)).fetchone()
+        if row is None:
+            return None
+        with self._scratch:
+            self._scratch.execute('DELETE FROM pkr WHERE key = ?;', (skey,))
+        self._nspilled -= 1
+        seq, state = row
+        pkr = pkr_factory(key)
+        pkr.set_state(json.loads(state))
+        return (seq, pkr)
+
+    def values(self):
+        if self._scratch is None:
+            for seq, pkr in sorted(self._memory.values(), key=lambda item : item[0]):
+                yield pkr
+            return
+        self._spill(len(self._memory))
+        for key, state in self._scratch.execute('SELECT key, state FROM pkr ORDER BY seq;'):
+            pkr = pkr_factory(tuple(json.loads(key)))
+            pkr.set_state(json.loads(state))
+            yield pkr
+
+    def close(self):
+        if self._scratch is not None:
+            self._scratch.close()
+            self._scratch_path.unlink(missing_ok=True)
+            self._scratch = None
+
 class TuningDatabase(object):
     OPTABLE = False
     PYTYPE_TO_SQLTYPE = {
@@ -330,13 +515,24 @@ class TuningDatabase(object):
         self._args = args
         if args.file is not None:
             self._conn = sqlite3.connect(args.file)  # TODO: use autocommit for python 3.12+
-            self._conn.isolation_level = None  # TODO: add --batch mode,
+            # Transactions are managed by flush()
+            self._conn.isolation_level = None
             if args.opfile is not None:
                 self._conn.execute(f"ATTACH DATABASE '{args.opfile.as_posix()}' AS op;")
+            if args.journal_mode == 'wal':
+                # Without schema, applies to all attached databases
+                self._conn.execute('PRAGMA journal_mode=WAL;')
+                # Committed rows may be lost on power failure, but the
+                # database stays consistent, and upserts can be replayed
+                self._conn.execute('PRAGMA synchronous=NORMAL;')
             self._cur = self._conn.cursor()
         else:
             self._conn = None
         self._table_existance_checked = set()
+        self._pending = []  # [(stmt, values)]
+        self._pending_since = None
+        self._committed = 0
+        self.pkr_database = None
 
     @property
     def verbose(self):
@@ -439,11 +635,61 @@ class TuningDatabase(object):
             print("values 2: ", values)
         if self.verbose:
             print("Executing", stmt, "with", values)
-        self._cur.execute(stmt, values)
-        self._conn.commit()
+        self.queue(stmt, values)
+
+    '''
+    Upserts are batched into transactions of up to --batch_size rows, or
+    --flush_interval seconds.
+    A crash loses the uncommitted rows only. All statements are idempotent
+    upserts, so the input can be ingested again.
+    '''
+    def queue(self, stmt, values):
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append((stmt, values))
+        if len(self._pending) >= self._args.batch_size or self.flush_due():
+            self.flush()
+
+    def flush_due(self):
+        if not self._pending or self._args.flush_interval <= 0:
+            return False
+        return time.monotonic() - self._pending_since >= self._args.flush_interval
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._cur.execute('BEGIN')
+        try:
+            # Consecutive rows only, the order of upserts matters
+            for stmt, rows in itertools.groupby(self._pending, key=lambda p : p[0]):
+                self._cur.executemany(stmt, [values for _, values in rows])
+        except BaseException:
+            self._cur.execute('ROLLBACK')
+            raise
+        self._cur.execute('COMMIT')
+        self._committed += len(self._pending)
+        if self.verbose:
+            print(f'[table_tool] Committed {len(self._pending)} rows, {self._committed} in total', file=sys.stderr)
+        self._pending = []
+        self._pending_since = None
+
+    @property
+    def committed(self):
+        return self._committed
 
     def close(self):
+        if self.pkr_database is not None:
+            self.pkr_database.close()
         if self._args.file is not None:
+            self.flush()
+            if self._args.journal_mode == 'wal':
+                # Leave a single database file, which is archived as-is
+                try:
+                    self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE);')
+                    self._conn.execute('PRAGMA journal_mode=DELETE;')
+                except sqlite3.OperationalError as e:
+                    # All rows are committed. The WAL is merged by the next writer
+                    print(f'[table_tool] Database stays in WAL mode: {e}', file=sys.stderr)
             self._cur.close()
             self._conn.close()
 
@@ -494,11 +740,16 @@ class TuningDatabase(object):
                     row = row[1:]
                 for i in cindices:
                     row.append(row[i])
-                self._cur.execute(stmt, row)
-            self._conn.commit()
+                self.queue(stmt, row)
+            self.flush()
 
     def init_aggregation(self):
-        self.pkr_database = {}  # dict: (gpu, task_id, kernel_name) -> (best, json)
+        args = self._args
+        # (gpu, task_id, kernel_name) -> PerKernelResult
+        self.pkr_database = PkrStore(streaming=not args.aggregate_in_memory,
+                                     tolerance_factor=args.fudge_factor_tolerance,
+                                     budget=args.aggregation_budget,
+                                     scratch_dir=args.scratch_dir)
 
     def aggregate(self, line_text):
         round_inputs = self._args.round_inputs
@@ -604,9 +855,7 @@ class TuningDatabase(object):
             key = (raw_info['arch'], raw_info['_debug_task_id'] // divisor, 'op_attn_bwd')
         else:
             key = (raw_info['arch'], raw_info['_debug_task_id'], raw_info['kernel_name'])
-        if key not in self.pkr_database:
-            self.pkr_database[key] = pkr_factory(key)
-        self.pkr_database[key].collect(raw_info)
+        self.pkr_database.collect(key, raw_info)
 
     def aggregation_results(self):
         warned = False
@@ -634,6 +883,31 @@ class TuningDatabase(object):
         }
         json.dump(sc_report, fout, indent=2)
 
+'''
+Lines of fin. For pipes, also yields None when no line arrives within
+interval seconds, so that the caller can commit pending rows while the
+tuner is busy.
+'''
+def timed_lines(fin, interval):
+    if interval <= 0 or fin.seekable():
+        yield from fin
+        return
+    lines = queue.Queue()
+    def reader():
+        for line in fin:
+            lines.put(line)
+        lines.put(None)
+    threading.Thread(target=reader, daemon=True).start()
+    while True:
+        try:
+            line = lines.get(timeout=interval)
+        except queue.Empty:
+            yield None
+            continue
+        if line is None:
+            return
+        yield line
+
 def do_main(args, db, fin):
     if fin.seekable():
         fin.seek(0, os.SEEK_END)
@@ -648,8 +922,12 @@ def do_main(args, db, fin):
             create_table_only = True
         else:
             create_table_only = False
-        for line in fin:
+        for line in timed_lines(fin, args.flush_interval):
+            if line is None:
+                db.flush()
+                continue
             db.upsert(line, create_table_only=create_table_only)
+        db.flush()
         print("[table_tool] Input closed, exiting", file=sys.stderr)
     elif args.action in ['rawjson', 'rawjson_fudge_check', 'opjson']:
         db.init_aggregation()
@@ -662,25 +940,25 @@ def do_main(args, db, fin):
                 pass
         else:
             pbar = tqdm(total=len(db.pkr_database), desc='Processed kernels')
-            with db._conn:  # Transaction
-                for rawjson in db.aggregation_results():
-                    if rawjson is None:
-                        continue
-                    db.upsert_json(rawjson, create_table_only=False)
-                    # Dispatcher v3 should nullified such cases
-                    # if 'CAUSAL' in rawjson['inputs']:
-                    #     causal = rawjson['inputs']['CAUSAL']
-                    # elif 'CAUSAL_TYPE' in rawjson['inputs']:
-                    #     causal = rawjson['inputs']['CAUSAL_TYPE']
-                    # else:
-                    #     causal = False
-                    ## Handles CAUSAL=True and BIAS_TYPE=1 case
-                    ## No real use cases, just let the build system compile things
-                    #if causal == True and rawjson['inputs']['BIAS_TYPE'] == 0:
-                    #    rj2 = deepcopy(rawjson)
-                    #    rj2['inputs']['BIAS_TYPE'] = 1
-                    #    db.upsert_json(rj2, create_table_only=False)
-                    pbar.update(1)
+            for rawjson in db.aggregation_results():
+                if rawjson is None:
+                    continue
+                db.upsert_json(rawjson, create_table_only=False)
+                # Dispatcher v3 should nullified such cases
+                # if 'CAUSAL' in rawjson['inputs']:
+                #     causal = rawjson['inputs']['CAUSAL']
+                # elif 'CAUSAL_TYPE' in rawjson['inputs']:
+                #     causal = rawjson['inputs']['CAUSAL_TYPE']
+                # else:
+                #     causal = False
+                ## Handles CAUSAL=True and BIAS_TYPE=1 case
+                ## No real use cases, just let the build system compile things
+                #if causal == True and rawjson['inputs']['BIAS_TYPE'] == 0:
+                #    rj2 = deepcopy(rawjson)
+                #    rj2['inputs']['BIAS_TYPE'] = 1
+                #    db.upsert_json(rj2, create_table_only=False)
+                pbar.update(1)
+            db.flush()
         for klass in KERNEL_NAME_TO_FACTORY.values():
             print(f'{klass.KERNEL_NAME=} {klass.KERNEL_MAX_FUDGE_FACTORS=}')
     elif args.action == 'rawsc':
@@ -71,24 +71,13 @@ class AffineKernelDescription(Interface):
     def perf_cfields(self):
         return self._perf_cfields
 
-    # Overrides Interface.gen_functionals because Affine kernels may not
-    # support all arch select to build
-    def gen_functionals(self, build_for_target_arch):
-        log(lambda : f'{self.__class__=} gen_functionals')
-        target_arch = {}
-        # Filter out unsupported arch
-        for arch, gpus in build_for_target_arch.items():
-            if arch in self.SUPPORTED_ARCH:
-                target_arch[arch] = gpus
-        all_func_params = self._func_params + self._residual_func_params
-        def create_binds_from_nths(nths):
-            return [ tp.create_nth(nth) for tp, nth in zip(all_func_params, nths) ]
-        log(lambda : f'{self.__class__=} gen_functionals')
-        for arch_number, arch in enumerate(target_arch.keys()):
-            gpus = target_arch[arch]
-            for nths in itertools.product(*all_func_params):
-                binds = create_binds_from_nths(nths)
-                yield Functional(self, arch, arch_number, binds, optimized_for=gpus)
+    # Affine kernels also enumerate residual choices
+    def _enumerated_func_params(self):
+        return self._func_params + self._residual_func_params
+
+    # Affine kernels may not support all arch select to build
+    def _supported_target_arch(self, build_for_target_arch):
+        return { arch : gpus for arch, gpus in build_for_target_arch.items() if arch in self.SUPPORTED_ARCH }
 
     def translate_dataframe(self, f : Functional, df : 'pandas.DataFrame'):
         raise RuntimeError(f'translate_dataframe should not be calle over any AffineDescription {self.NAME=}')
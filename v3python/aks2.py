@@ -2,12 +2,17 @@
 # Copyright © 2024-2025 Advanced Micro Devices, Inc.
 # SPDX-License-Identifier: MIT
 
+import hashlib
 import json
+import os
 import sys
-from argparse import ArgumentParser
+import threading
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import lzma
 from dataclasses import dataclass, fields
+from .compiler.ledger import default_ledger, open_ledger
 
 desc = """
 AOTriton Kernel Storage V2 (AKS2) utility
@@ -17,6 +22,21 @@ def parse():
     parser = ArgumentParser(description=desc)
     parser.add_argument("-o", help="Output AKS2 file")
     parser.add_argument("--ignore_json", help="Ignore JSON files", action='store_true')
+    parser.add_argument("--cluster", type=Path, default=None,
+                        help="Pack all archives listed in a cluster file (Bare.cluster/Affine.cluster) in one invocation. Archives are written under --output_dir. The CMake build uses this mode when AOTRITON_PACK_JOBS > 1")
+    parser.add_argument("--output_dir", type=Path, default=None,
+                        help="Root directory of archives for --cluster, i.e. aotriton.images")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(),
+                        help="Maximal number of archives compressed concurrently with --cluster")
+    parser.add_argument("--jobserver", action='store_true',
+                        help="With --cluster, take a token from the GNU make jobserver in MAKEFLAGS for each archive compressed concurrently, beyond the first. Ignored when there is no jobserver")
+    parser.add_argument("--memory_budget", type=int, default=1024,
+                        help="Memory budget in MiB for --cluster. Limits the number of archives compressed concurrently")
+    parser.add_argument("--dedup", action='store_true',
+                        help="Store identical images once. The archive remains readable by AKS2 readers")
+    parser.add_argument("--ledger", type=Path, default=None,
+                        help="Compile ledger that records the metadata of HSACO files, which replaces reading their JSON files. Defaults to compile_ledger.jsonl of the build directory of the first HSACO file, if present")
+    parser.add_argument("--no_ledger", action='store_true', help="Always read the JSON files")
     parser.add_argument("hsaco_files", nargs='*', help="Input HSACO Files")
     args = parser.parse_args()
     return args
@@ -37,30 +57,67 @@ _AKS2_DirectoryEntry_BaseSize = (len(fields(AKS2_DirectoryEntry)) - 1) * 4
 def directory_entry_size(entry):
     return entry.filename_length + _AKS2_DirectoryEntry_BaseSize
 
-def load_hsaco(hsaco : Path, offset, ignore_json):
+'''
+Metadata of a HSACO from the compile ledger, as (shared_memory_size, block_threads).
+Returns None if the ledger does not record the current HSACO file.
+'''
+def ledger_metadata(ledger, hsaco : Path, image_size):
+    record = ledger.lookup(hsaco)
+    if record is None or record.get('hsaco_size') != image_size:
+        return None
+    if image_size == 0:
+        # Empty images of failed compilation, no need to read the JSON
+        return None if record['status'] == 'Complete' else (0, 0)
+    if record['status'] != 'Complete' or 'shared' not in record:
+        return None
+    return record['shared'], record['block_threads']
+
+'''
+Opens the ledger for the HSACO files, according to --ledger and --no_ledger
+'''
+def open_hsaco_ledger(args, hsaco_files):
+    # Namespaces constructed by other tools may not have these options
+    if getattr(args, 'no_ledger', True) or args.ignore_json or not hsaco_files:
+        return None
+    path = args.ledger if args.ledger is not None else default_ledger(hsaco_files[0])
+    return None if path is None else open_ledger(path)
+
+'''
+Directory entry of a HSACO file, without reading the image
+'''
+def scan_hsaco(hsaco : Path, offset, ignore_json, ledger=None):
+    image_size = os.stat(hsaco).st_size
+    metadata = None if ignore_json or ledger is None else ledger_metadata(ledger, hsaco, image_size)
+    if ignore_json:
+        shared_memory_size = 0
+        block_threads = 0
+    elif metadata is not None:
+        shared_memory_size, block_threads = metadata
+    else:
+        with open(hsaco.with_suffix('.json')) as jf:
+            j = json.load(jf)
+            if image_size > 0:
+                shared_memory_size = j['shared']
+                block_threads = j['num_warps'] * j['warp_size']
+            else:
+                shared_memory_size = 0
+                block_threads = 0
+                assert j['compile_status'] != 'Complete'
+    filename = str(hsaco.stem).encode('utf-8')
+    entry = AKS2_DirectoryEntry(shared_memory_size=shared_memory_size,
+                                block_threads=block_threads,
+                                offset=offset,
+                                image_size=image_size,
+                                filename_length=len(filename)+1,
+                                filename=filename)
+    return entry
+
+def load_hsaco(hsaco : Path, offset, ignore_json, ledger=None):
+    entry = scan_hsaco(hsaco, offset, ignore_json, ledger)
     with open(hsaco, 'rb') as f:
         blob = f.read()
-        if ignore_json:
-            shared_memory_size = 0
-            block_threads = 0
-        else:
-            with open(hsaco.with_suffix('.json')) as jf:
-                j = json.load(jf)
-                if len(blob) > 0:
-                    shared_memory_size = j['shared']
-                    block_threads = j['num_warps'] * j['warp_size']
-                else:
-                    shared_memory_size = 0
-                    block_threads = 0
-                    assert j['compile_status'] != 'Complete'
-        filename = str(hsaco.stem).encode('utf-8')
-        entry = AKS2_DirectoryEntry(shared_memory_size=shared_memory_size,
-                                    block_threads=block_threads,
-                                    offset=offset,
-                                    image_size=len(blob),
-                                    filename_length=len(filename)+1,
-                                    filename=filename)
-        return entry, blob
+    assert len(blob) == entry.image_size, f'{hsaco} changed during packing'
+    return entry, blob
 
 def u32(val):
     return val.to_bytes(4, byteorder=sys.byteorder, signed=False)
@@ -79,52 +136,295 @@ def directory_entry_blob(entry):
     assert len(blob) == directory_entry_size(entry), f'blob size {len(blob)} != directory entry size {directory_entry_size(entry)}'
     return blob
 
+# HSACO files are streamed into the compressor in chunks of this size
+STREAM_CHUNK_SIZE = 1 << 20
+# Memory used by LZMACompressor with the default preset (6), see xz(1)
+LZMA_ENCODER_MEMORY = 94 << 20
+
+def hash_file(path : Path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+'''
+AKS2 archive. load() only reads the directory information, and the images
+are streamed from the HSACO files by write(), hence the memory usage does not
+depend on the size of the archive.
+
+With dedup=True, identical images are stored once and their directory
+entries share the offset. Readers of AKS2 only use offset and image_size,
+hence such archives are compatible with them.
+'''
 class AKS2(object):
-    def __init__(self):
+    def __init__(self, dedup=False):
         self.total_uncompressed_size : int = 0
         self.number_of_kernels : int = 0
         self.directory_size : int = 0
         self.directory = []
-        self.hsaco_blobs = []
+        self.images = []
         self.current_offset = 0
+        self.dedup = dedup
+        self._offsets = {}
 
     def load(self, args):
         self.number_of_kernels = len(args.hsaco_files)
+        ledger = open_hsaco_ledger(args, args.hsaco_files)
         for hsaco in args.hsaco_files:
-            entry, blob = load_hsaco(Path(hsaco), self.current_offset, args.ignore_json)
-            self.current_offset += len(blob)
+            hsaco = Path(hsaco)
+            entry = scan_hsaco(hsaco, self.current_offset, args.ignore_json, ledger)
             self.directory.append(entry)
-            self.hsaco_blobs.append(blob)
+            if self.dedup and entry.image_size > 0:
+                digest = hash_file(hsaco)
+                if digest in self._offsets:
+                    entry.offset = self._offsets[digest]
+                    continue
+                self._offsets[digest] = entry.offset
+            self.current_offset += entry.image_size
+            self.images.append((hsaco, entry.image_size))
         self.directory_size = sum([directory_entry_size(e) for e in self.directory])
-        self.total_uncompressed_size = self.directory_size + sum([len(blob) for blob in self.hsaco_blobs])
+        self.total_uncompressed_size = self.directory_size + self.current_offset
 
     def write(self, f):
         f.write(AKS2_MAGIC)
         write_u32(self.total_uncompressed_size, f)
         write_u32(self.number_of_kernels, f)
         write_u32(self.directory_size, f)
+        # The compressed stream only depends on the input bytes, not on how
+        # they are split into compress() calls
         lzc = lzma.LZMACompressor()
         for entry in self.directory:
             entry_blob = directory_entry_blob(entry)
             f.write(lzc.compress(entry_blob))
-        for blob in self.hsaco_blobs:
-            f.write(lzc.compress(blob))
+        for hsaco, image_size in self.images:
+            nbytes = 0
+            with open(hsaco, 'rb') as hf:
+                while chunk := hf.read(STREAM_CHUNK_SIZE):
+                    nbytes += len(chunk)
+                    f.write(lzc.compress(chunk))
+            assert nbytes == image_size, f'{hsaco} changed during packing'
         f.write(lzc.flush())
 
+    '''
+    Write to a temporary file and rename, so that an interrupted build does
+    not leave a truncated archive
+    '''
+    def write_file(self, path : Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                self.write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+
+    @staticmethod
+    def estimated_memory():
+        return LZMA_ENCODER_MEMORY + STREAM_CHUNK_SIZE
+
+'''
+Reads AKS2 files. The whole archive is a single LZMA stream, hence it is
+decompressed at once.
+'''
+class AKS2Reader(object):
+    def __init__(self, path : Path):
+        with open(path, 'rb') as f:
+            header = f.read(16)
+            assert header[:4] == AKS2_MAGIC, f'{path} is not an AKS2 file'
+            self.total_uncompressed_size = int.from_bytes(header[4:8], byteorder=sys.byteorder)
+            self.number_of_kernels = int.from_bytes(header[8:12], byteorder=sys.byteorder)
+            self.directory_size = int.from_bytes(header[12:16], byteorder=sys.byteorder)
+            content = lzma.decompress(f.read())
+        assert len(content) == self.total_uncompressed_size, f'{path}: decompressed size {len(content)} != {self.total_uncompressed_size}'
+        self.directory = {}
+        ptr = 0
+        for _ in range(self.number_of_kernels):
+            values = [ int.from_bytes(content[ptr+i*4:ptr+i*4+4], byteorder=sys.byteorder) for i in range(5) ]
+            ptr += _AKS2_DirectoryEntry_BaseSize
+            entry = AKS2_DirectoryEntry(*values, filename=content[ptr:ptr+values[4]-1])
+            ptr += entry.filename_length
+            self.directory[entry.filename.decode('utf-8')] = entry
+        assert ptr == self.directory_size, f'{path}: directory size {ptr} != {self.directory_size}'
+        self._images = content[ptr:]
+
+    @property
+    def kernels(self):
+        return list(self.directory.keys())
+
+    '''
+    Returns (image, shared_memory_size, block_threads), or None if not found
+    '''
+    def read(self, name : str):
+        entry = self.directory.get(name)
+        if entry is None:
+            return None
+        image = self._images[entry.offset:entry.offset+entry.image_size]
+        return image, entry.shared_memory_size, entry.block_threads
+
+'''
+Caps the sum of the estimated memory of concurrent tasks.
+A task larger than the budget runs alone.
+'''
+class MemoryBudget(object):
+    def __init__(self, limit):
+        self._limit = limit
+        self._used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes):
+        with self._cond:
+            while self._used > 0 and self._used + nbytes > self._limit:
+                self._cond.wait()
+            self._used += nbytes
+
+    def release(self, nbytes):
+        with self._cond:
+            self._used -= nbytes
+            self._cond.notify_all()
+
+'''
+Client of the GNU make jobserver.
+Each process owns an implicit job slot. Additional slots are tokens (one
+byte each) read from the jobserver, and must be written back once the job
+finishes.
+'''
+class JobServerClient(object):
+    def __init__(self, rfd, wfd, fifo=None):
+        self._rfd = rfd
+        self._wfd = wfd
+        self._fifo = fifo
+        self._implicit_free = True
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_environ():
+        makeflags = os.environ.get('MAKEFLAGS', '')
+        auth = None
+        for flag in makeflags.split():
+            for prefix in ['--jobserver-auth=', '--jobserver-fds=']:
+                if flag.startswith(prefix):
+                    auth = flag[len(prefix):]
+        if auth is None:
+            return None
+        if auth.startswith('fifo:'):
+            fifo = auth[len('fifo:'):]
+            fd = os.open(fifo, os.O_RDWR)
+            return JobServerClient(fd, fd, fifo=fifo)
+        try:
+            rfd, wfd = [ int(fd) for fd in auth.split(',') ]
+            os.fstat(rfd)
+            os.fstat(wfd)
+        except (ValueError, OSError):
+            # Not started by make with '+', or fds are not inherited
+            return None
+        return JobServerClient(rfd, wfd)
+
+    '''
+    Returns a slot: None for the implicit slot, otherwise the token
+    '''
+    def acquire(self):
+        with self._lock:
+            if self._implicit_free:
+                self._implicit_free = False
+                return None
+        return os.read(self._rfd, 1)
+
+    def release(self, slot):
+        if slot is None:
+            with self._lock:
+                self._implicit_free = True
+            return
+        os.write(self._wfd, slot)
+
+    def close(self):
+        if self._fifo is not None:
+            os.close(self._rfd)
+
+'''
+Parse a cluster file. Each line is
+    arch_dir;family;kernel;FONLY;hsaco;hsaco;...
+Returns [(archive path relative to the output dir, [hsaco files])]
+'''
+def parse_cluster(cluster_file : Path):
+    rules = []
+    with open(cluster_file, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            parts = line.split(';')
+            archive = Path(*parts[:3]) / f'{parts[3]}.aks2'
+            rules.append((archive, parts[4:]))
+    return rules
+
+def pack_one(archive : Path, hsaco_files, ignore_json, dedup=False, ledger=None, no_ledger=False):
+    aks2 = AKS2(dedup=dedup)
+    aks2.load(Namespace(hsaco_files=hsaco_files, ignore_json=ignore_json, ledger=ledger, no_ledger=no_ledger))
+    aks2.write_file(archive)
+
+'''
+Pack the archives of a cluster file concurrently. Each archive is compressed
+by one thread (lzma releases the GIL), and the number of concurrent archives
+is limited by jobs, the memory budget and the jobserver, if any.
+The memory and the jobserver token are taken by the worker thread, hence a
+worker waiting for them does not hold back the others.
+'''
+def pack_cluster(rules, output_dir : Path, ignore_json, jobs=1, memory_budget=None, jobserver=None, dedup=False, ledger=None, no_ledger=False):
+    budget = MemoryBudget(memory_budget if memory_budget is not None else jobs * AKS2.estimated_memory())
+    nbytes = AKS2.estimated_memory()
+    def pack(archive, hsaco_files):
+        budget.acquire(nbytes)
+        try:
+            slot = jobserver.acquire() if jobserver is not None else None
+            try:
+                pack_one(output_dir / archive, hsaco_files, ignore_json, dedup, ledger, no_ledger)
+            finally:
+                if jobserver is not None:
+                    jobserver.release(slot)
+        finally:
+            budget.release(nbytes)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [ executor.submit(pack, archive, hsaco_files) for archive, hsaco_files in rules ]
+    # Re-raise the first exception
+    for fut in futures:
+        fut.result()
+
 def do_create(args):
     if not args.hsaco_files:
         print("No input file, exit")
         return
-    aks2 = AKS2()
+    aks2 = AKS2(dedup=args.dedup)
     aks2.load(args)
-    with open(Path(args.o).with_suffix('.aks2'), "wb") as f:
-        aks2.write(f)
+    aks2.write_file(Path(args.o).with_suffix('.aks2'))
+
+def do_pack_cluster(args):
+    assert args.output_dir is not None, '--cluster requires --output_dir'
+    rules = parse_cluster(args.cluster)
+    jobserver = JobServerClient.from_environ() if args.jobserver else None
+    try:
+        pack_cluster(rules, args.output_dir, args.ignore_json,
+                     jobs=args.jobs,
+                     memory_budget=args.memory_budget << 20,
+                     jobserver=jobserver,
+                     dedup=args.dedup,
+                     ledger=args.ledger,
+                     no_ledger=args.no_ledger)
+    finally:
+        if jobserver is not None:
+            jobserver.close()
 
 def main():
     args = parse()
     # Leave do_xxx() for other operation modes like
     #   aks2 -l xx: list content from xx
-    do_create(args)
+    if args.cluster is not None:
+        do_pack_cluster(args)
+    else:
+        do_create(args)
 
 if __name__ == "__main__":
     main()
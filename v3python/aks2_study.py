@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import json
+import lzma
+import re
+import time
+import zlib
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+from .aks2 import hash_file, parse_cluster, pack_cluster
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+desc = """
+Deduplication and shared-dictionary compression study of kernel images.
+Reports, per arch:
+  * exact duplicates (blake2b)
+  * similarity of each image to its nearest neighbor (MinHash)
+  * size and decode time of:
+    - solid LZMA over all images, as AKS2 does per archive
+    - solid LZMA over unique images
+    - per-image LZMA/zlib, and zlib with a shared dictionary trained on the
+      arch (zstd as well if the zstandard module is installed)
+With --cluster, duplicates across archives are counted, and --emit_dir
+writes the archives with duplicates stored once.
+"""
+
+def parse():
+    p = ArgumentParser(description=desc)
+    p.add_argument("dirs", type=Path, nargs='*', help="Directories of kernel images, searched recursively")
+    p.add_argument("--pattern", default='*.hsaco', help="File name pattern of kernel images")
+    p.add_argument("--cluster", type=Path, default=None, help="Bare.cluster, to study duplicates across archives. Images listed in it are added to the study")
+    p.add_argument("--emit_dir", type=Path, default=None, help="With --cluster, write deduplicated AKS2 archives under this directory")
+    p.add_argument("--ignore_json", action='store_true', help="With --emit_dir, ignore JSON files")
+    p.add_argument("--dict_size", type=int, default=32 * 1024, help="Size of the shared dictionary. zlib uses at most 32KiB")
+    p.add_argument("--similarity", type=float, default=0.5, help="Pairs with estimated Jaccard similarity above this are reported as similar")
+    p.add_argument("--max_blobs", type=int, default=None, help="Study every k-th image so that at most this many images are used per arch")
+    p.add_argument("--json", type=Path, default=None, help="Also write the report as JSON")
+    return p.parse_args()
+
+ARCH_PATTERN = re.compile(r'--Arch_(gfx[0-9a-z]+)$')
+
+def arch_of(path : Path):
+    m = ARCH_PATTERN.search(path.stem)
+    return m.group(1) if m else 'unknown'
+
+@dataclass
+class Blob:
+    path : Path
+    arch : str
+    size : int
+    digest : str
+
+    def read(self):
+        return self.path.read_bytes()
+
+def scan_blobs(files):
+    blobs = []
+    for fn in sorted(set([Path(fn) for fn in files])):
+        size = fn.stat().st_size
+        if size == 0:
+            continue
+        blobs.append(Blob(path=fn, arch=arch_of(fn), size=size, digest=hash_file(fn)))
+    return blobs
+
+'''
+Returns { digest : [Blob] } of images with more than one copy
+'''
+def find_duplicates(blobs):
+    by_digest = defaultdict(list)
+    for b in blobs:
+        by_digest[b.digest].append(b)
+    return { d : l for d, l in by_digest.items() if len(l) > 1 }
+
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+SHINGLE_SIZE = 8
+_MINHASH_RNG = np.random.default_rng(0x41545249)
+_MINHASH_A = _MINHASH_RNG.integers(1, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_MINHASH_B = _MINHASH_RNG.integers(0, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+'''
+MinHash signature over the 8-byte shingles of data
+'''
+def minhash(data : bytes):
+    arr = np.frombuffer(data, dtype=np.uint8)
+    n = len(arr) - SHINGLE_SIZE + 1
+    if n <= 0:
+        arr = np.pad(arr, (0, SHINGLE_SIZE - len(arr)))
+        n = 1
+    shingles = np.zeros(n, dtype=np.uint64)
+    for k in range(SHINGLE_SIZE):
+        shingles |= arr[k:k+n].astype(np.uint64) << np.uint64(8 * k)
+    shingles = np.unique(shingles)
+    # Universal hashing mod 2^64, overflow is intended
+    with np.errstate(over='ignore'):
+        return np.array([ (shingles * a + b).min() for a, b in zip(_MINHASH_A, _MINHASH_B) ], dtype=np.uint64)
+
+'''
+Returns nearest-neighbor similarity of each image, and similar pairs
+[(i, j, similarity)] with similarity >= threshold.
+Candidates are found by LSH banding, hence pairs with low similarity may be
+missed, and their nearest-neighbor similarity is reported as 0.
+'''
+def similarity(signatures, threshold):
+    n = len(signatures)
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    candidates = set()
+    for band in range(MINHASH_BANDS):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(signatures):
+            buckets[sig[band*rows:(band+1)*rows].tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    candidates.add((members[x], members[y]))
+    nearest = np.zeros(n)
+    pairs = []
+    for i, j in sorted(candidates):
+        s = float(np.mean(signatures[i] == signatures[j]))
+        nearest[i] = max(nearest[i], s)
+        nearest[j] = max(nearest[j], s)
+        if s >= threshold:
+            pairs.append((i, j, s))
+    return nearest, pairs
+
+'''
+Shared dictionary for zlib: segments that occur in most images, the most
+frequent ones at the end (zlib prefers short distances).
+'''
+def train_dictionary(samples, dict_size, segment_size=64):
+    document_frequency = Counter()
+    for data in samples:
+        segments = set([ data[i:i+segment_size] for i in range(0, len(data) - segment_size + 1, segment_size // 2) ])
+        document_frequency.update(segments)
+    selected = []
+    total = 0
+    for segment, df in document_frequency.most_common():
+        if df < 2 or total + len(segment) > dict_size:
+            break
+        selected.append(segment)
+        total += len(segment)
+    return b''.join(reversed(selected))
+
+class Codec(object):
+    def __init__(self, name, compress, decompress, overhead=0):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+        self.overhead = overhead
+
+def create_codecs(samples, dict_size):
+    zdict = train_dictionary(samples, min(dict_size, 32 * 1024))
+    def zlib_dict_compress(data):
+        c = zlib.compressobj(level=9, zdict=zdict)
+        return c.compress(data) + c.flush()
+    def zlib_dict_decompress(data):
+        d = zlib.decompressobj(zdict=zdict)
+        return d.decompress(data) + d.flush()
+    codecs = [
+        Codec('lzma', lzma.compress, lzma.decompress),
+        Codec('zlib', lambda data : zlib.compress(data, 9), zlib.decompress),
+        Codec('zlib+dict', zlib_dict_compress, zlib_dict_decompress, overhead=len(zdict)),
+    ]
+    if zstandard is not None:
+        codecs.append(Codec('zstd', zstandard.ZstdCompressor(level=19).compress,
+                            zstandard.ZstdDecompressor().decompress))
+        try:
+            zd = zstandard.train_dictionary(dict_size, samples)
+        except zstandard.ZstdError:
+            zd = None
+        if zd is not None:
+            codecs.append(Codec('zstd+dict', zstandard.ZstdCompressor(level=19, dict_data=zd).compress,
+                                zstandard.ZstdDecompressor(dict_data=zd).decompress,
+                                overhead=len(zd.as_bytes())))
+    return codecs
+
+'''
+Returns (compressed size, seconds to decode everything, seconds to decode one image)
+'''
+def measure_solid(datas):
+    compressed = lzma.compress(b''.join(datas))
+    tic = time.perf_counter()
+    lzma.decompress(compressed)
+    seconds = time.perf_counter() - tic
+    # Loading any image requires decoding the whole stream
+    return len(compressed), seconds, seconds
+
+def measure_codec(codec, datas):
+    compressed = [ codec.compress(data) for data in datas ]
+    tic = time.perf_counter()
+    for data, c in zip(datas, compressed):
+        assert codec.decompress(c) == data, f'{codec.name} round-trip failed'
+    seconds = time.perf_counter() - tic
+    return sum([len(c) for c in compressed]) + codec.overhead, seconds, seconds / max(1, len(datas))
+
+def study_arch(arch, blobs, args):
+    if args.max_blobs is not None and len(blobs) > args.max_blobs:
+        step = -(-len(blobs) // args.max_blobs)
+        blobs = blobs[::step]
+    datas = [ b.read() for b in blobs ]
+    raw = sum([len(d) for d in datas])
+    duplicates = find_duplicates(blobs)
+    unique = {}
+    unique_names = {}
+    for b, d in zip(blobs, datas):
+        unique.setdefault(b.digest, d)
+        unique_names.setdefault(b.digest, b.path.name)
+    unique_names = list(unique_names.values())
+    signatures = [ minhash(d) for d in unique.values() ]
+    nearest, pairs = similarity(signatures, args.similarity)
+    strategies = {}
+    def record(name, result):
+        size, decode_all, decode_one = result
+        strategies[name] = {
+            'size' : size,
+            'ratio' : round(raw / size, 3) if size else None,
+            'decode_all_ms' : round(decode_all * 1e3, 3),
+            'decode_one_ms' : round(decode_one * 1e3, 3),
+        }
+    record('solid lzma (AKS2)', measure_solid(datas))
+    record('solid lzma, dedup', measure_solid(list(unique.values())))
+    for codec in create_codecs(list(unique.values()), args.dict_size):
+        record(f'per-image {codec.name}, dedup', measure_codec(codec, list(unique.values())))
+    return {
+        'arch' : arch,
+        'images' : len(blobs),
+        'raw_bytes' : raw,
+        'unique_images' : len(unique),
+        'unique_bytes' : sum([len(d) for d in unique.values()]),
+        'duplicate_groups' : [ sorted([b.path.name for b in l]) for l in duplicates.values() ],
+        'nearest_similarity' : {
+            'mean' : round(float(nearest.mean()), 3) if len(nearest) else 0.0,
+            'above_threshold' : int((nearest >= args.similarity).sum()),
+        },
+        'similar_pairs' : [ (unique_names[i], unique_names[j], round(s, 3)) for i, j, s in sorted(pairs, key=lambda p : -p[2])[:20] ],
+        'strategies' : strategies,
+    }
+
+'''
+Images shared by more than one archive of the cluster file
+'''
+def study_cluster(rules):
+    archives_of = defaultdict(set)
+    size_of = {}
+    for archive, files in rules:
+        for fn in files:
+            fn = Path(fn)
+            if not fn.is_file() or fn.stat().st_size == 0:
+                continue
+            digest = hash_file(fn)
+            archives_of[digest].add(archive)
+            size_of[digest] = fn.stat().st_size
+    shared = { d : a for d, a in archives_of.items() if len(a) > 1 }
+    return {
+        'archives' : len(rules),
+        'unique_images' : len(archives_of),
+        'images_in_multiple_archives' : len(shared),
+        'bytes_stored_more_than_once' : sum([size_of[d] * (len(a) - 1) for d, a in shared.items()]),
+    }
+
+def format_report(report):
+    lines = []
+    for r in report['arches']:
+        lines.append(f'== {r["arch"]}: {r["images"]} images, {r["raw_bytes"]} bytes')
+        lines.append(f'   unique: {r["unique_images"]} images, {r["unique_bytes"]} bytes, {len(r["duplicate_groups"])} duplicate groups')
+        ns = r['nearest_similarity']
+        lines.append(f'   nearest-neighbor similarity: mean {ns["mean"]}, {ns["above_threshold"]} unique images above threshold')
+        lines.append(f'   {"Strategy":<28} {"Size":>12} {"Ratio":>7} {"Decode all(ms)":>15} {"Decode one(ms)":>15}')
+        for name, s in r['strategies'].items():
+            lines.append(f'   {name:<28} {s["size"]:>12} {s["ratio"]:>7} {s["decode_all_ms"]:>15} {s["decode_one_ms"]:>15}')
+    if 'cluster' in report:
+        c = report['cluster']
+        lines.append(f'== Cluster: {c["archives"]} archives, {c["unique_images"]} unique images, '
+                     f'{c["images_in_multiple_archives"]} in multiple archives, '
+                     f'{c["bytes_stored_more_than_once"]} bytes stored more than once')
+    return '\n'.join(lines)
+
+def study(files, args, rules=None):
+    by_arch = defaultdict(list)
+    for b in scan_blobs(files):
+        by_arch[b.arch].append(b)
+    report = { 'arches' : [ study_arch(arch, by_arch[arch], args) for arch in sorted(by_arch.keys()) ] }
+    if rules is not None:
+        report['cluster'] = study_cluster(rules)
+    return report
+
+def main():
+    args = parse()
+    files = []
+    for d in args.dirs:
+        files += list(d.rglob(args.pattern))
+    rules = None
+    if args.cluster is not None:
+        rules = parse_cluster(args.cluster)
+        files += [ fn for _, l in rules for fn in l ]
+    report = study(files, args, rules)
+    print(format_report(report))
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.emit_dir is not None:
+        assert rules is not None, '--emit_dir requires --cluster'
+        pack_cluster(rules, args.emit_dir, args.ignore_json, dedup=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import bisect
+import lzma
+import struct
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from .aks2 import AKS2_MAGIC, AKS2Reader, load_hsaco, open_hsaco_ledger
+
+desc = """
+AOTriton Kernel Storage V3 (AKS3) utility
+"""
+
+def parse():
+    parser = ArgumentParser(description=desc)
+    parser.add_argument("-o", help="Output AKS3 file. Uses the .aks2 suffix, which is what the runtime opens")
+    parser.add_argument("-l", help="List the content of an AKS2/AKS3 file")
+    parser.add_argument("--ignore_json", help="Ignore JSON files", action='store_true')
+    parser.add_argument("--ledger", type=Path, default=None,
+                        help="Compile ledger that records the metadata of HSACO files, see v3python.aks2")
+    parser.add_argument("--no_ledger", action='store_true', help="Always read the JSON files")
+    parser.add_argument("--block_size", type=int, default=0,
+                        help="Group consecutive kernels into solid blocks of at least this many uncompressed bytes. 0 for one block per kernel")
+    parser.add_argument("hsaco_files", nargs='*', help="Input HSACO Files")
+    args = parser.parse_args()
+    return args
+
+# AKS3 Format
+# Integers are in native byte order, same as AKS2.
+# -- Uncompressed
+# 16B: Header
+#     4B: AKS3  (AOTriton Kernel Storage version 3)
+#     4B: Number of Kernels (N)
+#     4B: Number of Blocks (B)
+#     4B: Name table size (S)
+# B * 24B: Block table
+#     8B: offset (from the end of the name table)
+#     4B: compressed size
+#     4B: uncompressed size
+#     4B: codec, 0: stored, 1: xz
+#     4B: reserved
+# N * 40B: Kernel table, sorted by (name hash, name)
+#     8B: FNV-1a 64-bit hash of the file name
+#     4B: file name offset in the name table
+#     4B: file name length, excluding trailing '\0'
+#     4B: block index, 0xFFFFFFFF for empty images (failed compilation)
+#     4B: image offset in the uncompressed block
+#     4B: image size
+#     4B: shared memory size
+#     4B: number of threads in a GPU thread block
+#     4B: reserved
+# S bytes: Name table, '\0' terminated file names
+# -- Compressed
+# B * varlen: Blocks, each can be decompressed independently
+AKS3_MAGIC = b'AKS3'
+CODEC_STORED = 0
+CODEC_XZ = 1
+NO_BLOCK = 0xFFFFFFFF
+
+_HEADER = struct.Struct('=4sIII')
+_BLOCK = struct.Struct('=QIIII')
+_ENTRY = struct.Struct('=QIIIIIIII')
+
+FNV_OFFSET_BASIS = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+def name_hash(name : bytes):
+    h = FNV_OFFSET_BASIS
+    for c in name:
+        h = ((h ^ c) * FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+    return h
+
+@dataclass
+class AKS3_Block:
+    offset : int = 0
+    compressed_size : int = 0
+    raw_size : int = 0
+    codec : int = CODEC_XZ
+
+@dataclass
+class AKS3_KernelEntry:
+    name : bytes = b''
+    block : int = NO_BLOCK
+    offset : int = 0
+    image_size : int = 0
+    shared_memory_size : int = 0
+    block_threads : int = 0
+
+    @property
+    def name_hash(self):
+        return name_hash(self.name)
+
+'''
+Compress one block. Blocks that do not benefit from compression are stored.
+'''
+def compress_block(raw : bytes):
+    compressed = lzma.compress(raw)
+    if len(compressed) >= len(raw):
+        return CODEC_STORED, raw
+    return CODEC_XZ, compressed
+
+class AKS3(object):
+    def __init__(self, block_size=0):
+        self.block_size = block_size
+        self.entries = []
+        self.blocks = []
+        self.block_data = []
+        self._pending = []
+        self._pending_size = 0
+        self._data_size = 0
+
+    def add(self, name : str, blob : bytes, shared_memory_size=0, block_threads=0):
+        entry = AKS3_KernelEntry(name=name.encode('utf-8'),
+                                 image_size=len(blob),
+                                 shared_memory_size=shared_memory_size,
+                                 block_threads=block_threads)
+        self.entries.append(entry)
+        if not blob:
+            return
+        entry.block = len(self.blocks)
+        entry.offset = self._pending_size
+        self._pending.append(blob)
+        self._pending_size += len(blob)
+        if self._pending_size >= self.block_size:
+            self._close_block()
+
+    def _close_block(self):
+        if not self._pending:
+            return
+        raw = b''.join(self._pending)
+        codec, data = compress_block(raw)
+        self.blocks.append(AKS3_Block(offset=self._data_size,
+                                      compressed_size=len(data),
+                                      raw_size=len(raw),
+                                      codec=codec))
+        self.block_data.append(data)
+        self._data_size += len(data)
+        self._pending = []
+        self._pending_size = 0
+
+    def load(self, args):
+        ledger = open_hsaco_ledger(args, args.hsaco_files)
+        for hsaco in args.hsaco_files:
+            entry, blob = load_hsaco(Path(hsaco), 0, args.ignore_json, ledger)
+            self.add(entry.filename.decode('utf-8'), blob, entry.shared_memory_size, entry.block_threads)
+
+    def write(self, f):
+        self._close_block()
+        entries = sorted(self.entries, key=lambda e : (e.name_hash, e.name))
+        names = b''
+        name_offsets = []
+        for e in entries:
+            name_offsets.append(len(names))
+            names += e.name + b'\0'
+        f.write(_HEADER.pack(AKS3_MAGIC, len(entries), len(self.blocks), len(names)))
+        for b in self.blocks:
+            f.write(_BLOCK.pack(b.offset, b.compressed_size, b.raw_size, b.codec, 0))
+        for e, name_offset in zip(entries, name_offsets):
+            f.write(_ENTRY.pack(e.name_hash, name_offset, len(e.name), e.block, e.offset,
+                                e.image_size, e.shared_memory_size, e.block_threads, 0))
+        f.write(names)
+        for data in self.block_data:
+            f.write(data)
+
+'''
+Reads AKS3 files. Only the index is loaded when opening the file, and
+read() decompresses the block of the requested kernel.
+'''
+class AKS3Reader(object):
+    def __init__(self, path : Path):
+        self._path = Path(path)
+        with open(self._path, 'rb') as f:
+            magic, nkernels, nblocks, names_size = _HEADER.unpack(f.read(_HEADER.size))
+            assert magic == AKS3_MAGIC, f'{path} is not an AKS3 file'
+            self.blocks = [ AKS3_Block(*_BLOCK.unpack(f.read(_BLOCK.size))[:4]) for _ in range(nblocks) ]
+            raw_entries = [ _ENTRY.unpack(f.read(_ENTRY.size)) for _ in range(nkernels) ]
+            names = f.read(names_size)
+            self._data_offset = f.tell()
+        assert len(names) == names_size, f'{path}: truncated name table'
+        self._hashes = []
+        self.entries = []
+        for h, name_offset, name_length, block, offset, image_size, shared, threads, _ in raw_entries:
+            assert name_offset + name_length <= names_size, f'{path}: name beyond the name table'
+            entry = AKS3_KernelEntry(name=names[name_offset:name_offset+name_length],
+                                     block=block,
+                                     offset=offset,
+                                     image_size=image_size,
+                                     shared_memory_size=shared,
+                                     block_threads=threads)
+            self._hashes.append(h)
+            self.entries.append(entry)
+
+    @property
+    def kernels(self):
+        return [ e.name.decode('utf-8') for e in self.entries ]
+
+    def lookup(self, name : str):
+        bname = name.encode('utf-8')
+        h = name_hash(bname)
+        i = bisect.bisect_left(self._hashes, h)
+        while i < len(self._hashes) and self._hashes[i] == h:
+            if self.entries[i].name == bname:
+                return self.entries[i]
+            i += 1
+        return None
+
+    def read_block(self, index : int):
+        block = self.blocks[index]
+        with open(self._path, 'rb') as f:
+            f.seek(self._data_offset + block.offset)
+            data = f.read(block.compressed_size)
+        if block.codec == CODEC_STORED:
+            raw = data
+        else:
+            assert block.codec == CODEC_XZ, f'{self._path}: unknown codec {block.codec} of block {index}'
+            raw = lzma.decompress(data)
+        assert len(raw) == block.raw_size, f'{self._path}: block {index} size {len(raw)} != {block.raw_size}'
+        return raw
+
+    '''
+    Returns (image, shared_memory_size, block_threads), or None if not found
+    '''
+    def read(self, name : str):
+        entry = self.lookup(name)
+        if entry is None:
+            return None
+        if entry.block == NO_BLOCK:
+            return b'', entry.shared_memory_size, entry.block_threads
+        raw = self.read_block(entry.block)
+        return raw[entry.offset:entry.offset+entry.image_size], entry.shared_memory_size, entry.block_threads
+
+'''
+Opens AKS2 or AKS3 file according to the magic
+'''
+def open_archive(path : Path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == AKS3_MAGIC:
+        return AKS3Reader(path)
+    if magic == AKS2_MAGIC:
+        return AKS2Reader(path)
+    assert False, f'{path} is neither AKS2 nor AKS3 file'
+
+def do_create(args):
+    if not args.hsaco_files:
+        print("No input file, exit")
+        return
+    aks3 = AKS3(block_size=args.block_size)
+    aks3.load(args)
+    with open(Path(args.o).with_suffix('.aks2'), "wb") as f:
+        aks3.write(f)
+
+def do_list(args):
+    archive = open_archive(Path(args.l))
+    for name in archive.kernels:
+        image, shared_memory_size, block_threads = archive.read(name)
+        print(f'{name}\t{len(image)}\t{shared_memory_size}\t{block_threads}')
+
+def main():
+    args = parse()
+    if args.l:
+        do_list(args)
+    else:
+        do_create(args)
+
+if __name__ == "__main__":
+    main()
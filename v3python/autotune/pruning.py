@@ -0,0 +1,348 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Declarative pruning of autotune configs
+#
+# gen_autotune_configs of a KernelDescription enumerates candidate configs.
+# Configs known to time out, spill registers, or never win the tuning are
+# removed by the rules in the pruning rule file of the kernel, so that new
+# hardware or Triton versions only need an updated rule file. The rule file
+# can be extended by learn_rules() from the compile ledger, see
+# v3python/learn_pruning_rules.py.
+#
+# Rule file format (JSON):
+#   {
+#     "version": 1,
+#     "kernel": "attn_fwd",
+#     "rules": [
+#       {
+#         "reason": "Timeout",
+#         "production_line": ["RDNA"],        # Optional
+#         "arch": ["gfx1100", "gfx95*"],      # Optional, fnmatch patterns
+#         "when": { "BLOCK_M*BLOCK_N": {"ge": 1024}, "num_warps": {"lt": 4} },
+#         "support": 12                       # Optional, learned rules only
+#       }
+#     ]
+#   }
+#
+# A rule prunes a config if all conditions in "when" hold. Conditions are
+# over the variables of the config:
+#   * Functional arguments, with their triton_compile_signature, e.g.
+#     "Q": "*fp16:16", "BLOCK_DMODEL": 128
+#   * Config.kwargs, e.g. BLOCK_M, BLOCK_N, waves_per_eu
+#   * num_warps and num_stages
+# A key "A*B" stands for the product of variables A and B. A plain value is
+# the same as {"eq": value}. Conditions over missing variables do not hold.
+
+import fnmatch
+import itertools
+import json
+import operator
+from pathlib import Path
+import numpy as np
+from ..gpu_targets import AOTRITON_ARCH_PRODUCTION_LINE
+
+PRUNING_VERSION = 1
+
+OPERATORS = {
+    'eq' : operator.eq,
+    'ne' : operator.ne,
+    'lt' : operator.lt,
+    'le' : operator.le,
+    'gt' : operator.gt,
+    'ge' : operator.ge,
+    'in' : lambda a, b : a in b,
+    'not_in' : lambda a, b : a not in b,
+}
+
+COMPILER_VARIABLES = ['num_warps', 'num_stages', 'waves_per_eu']
+
+'''
+Value of a variable, or None if any variable of a product is missing
+'''
+def lookup_variable(variables : dict, key : str):
+    if '*' not in key:
+        return variables.get(key, None)
+    product = 1
+    for name in key.split('*'):
+        v = variables.get(name, None)
+        if v is None or isinstance(v, str):
+            return None
+        product *= v
+    return product
+
+def config_variables(functional_variables : dict, cfg : 'Config'):
+    variables = dict(functional_variables)
+    variables.update(cfg.kwargs)
+    variables['num_warps'] = cfg.num_warps
+    variables['num_stages'] = cfg.num_stages
+    return variables
+
+def functional_variables(f : 'Functional'):
+    return { aname : tc.triton_compile_signature for aname, tc in f.compact_choices.items() }
+
+class PruningRule(object):
+    def __init__(self, when : dict, reason='', arch=None, production_line=None, support=None):
+        self.when = when
+        self.reason = reason
+        self.arch = arch
+        self.production_line = production_line
+        self.support = support
+        self._conditions = []
+        for key, cond in when.items():
+            if not isinstance(cond, dict):
+                cond = { 'eq' : cond }
+            for op, value in cond.items():
+                assert op in OPERATORS, f'Unknown operator {op} of "{key}" in pruning rule {when}'
+                self._conditions.append((key, OPERATORS[op], value))
+
+    @staticmethod
+    def from_dict(d : dict):
+        return PruningRule(when=d['when'],
+                           reason=d.get('reason', ''),
+                           arch=d.get('arch', None),
+                           production_line=d.get('production_line', None),
+                           support=d.get('support', None))
+
+    def asdict(self):
+        d = { 'reason' : self.reason }
+        if self.production_line is not None:
+            d['production_line'] = self.production_line
+        if self.arch is not None:
+            d['arch'] = self.arch
+        d['when'] = self.when
+        if self.support is not None:
+            d['support'] = self.support
+        return d
+
+    def applies_to(self, arch):
+        if self.arch is not None and not any([fnmatch.fnmatchcase(arch, pattern) for pattern in self.arch]):
+            return False
+        if self.production_line is not None and AOTRITON_ARCH_PRODUCTION_LINE.get(arch, None) not in self.production_line:
+            return False
+        return True
+
+    def matches(self, variables : dict):
+        for key, op, value in self._conditions:
+            v = lookup_variable(variables, key)
+            if v is None:
+                return False
+            try:
+                if not op(v, value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+'''
+Pruning rules of one kernel, loaded from its rule file.
+'''
+class PruningRuleSet(object):
+    def __init__(self, kernel : str, rules=None):
+        self.kernel = kernel
+        self.rules = [] if rules is None else list(rules)
+
+    @staticmethod
+    def load(path : Path, kernel=None):
+        path = Path(path)
+        if not path.is_file():
+            return PruningRuleSet(kernel)
+        with open(path) as f:
+            d = json.load(f)
+        version = d.get('version', None)
+        assert version == PRUNING_VERSION, f'{path}: unsupported pruning rule version {version}, expecting {PRUNING_VERSION}'
+        return PruningRuleSet(d.get('kernel', kernel), [ PruningRule.from_dict(r) for r in d['rules'] ])
+
+    def asdict(self):
+        return {
+            'version' : PRUNING_VERSION,
+            'kernel' : self.kernel,
+            'rules' : [ r.asdict() for r in self.rules ],
+        }
+
+    '''
+    One rule field per line, which keeps the diffs of rule files readable
+    '''
+    def save(self, path : Path):
+        d = self.asdict()
+        rules = []
+        for r in d['rules']:
+            fields = [ f'      {json.dumps(k)}: {json.dumps(v)}' for k, v in r.items() ]
+            rules.append('    {\n' + ',\n'.join(fields) + '\n    }')
+        with open(path, 'w') as f:
+            f.write('{\n')
+            f.write(f'  "version": {d["version"]},\n')
+            f.write(f'  "kernel": {json.dumps(d["kernel"])},\n')
+            f.write('  "rules": [\n' + ',\n'.join(rules) + '\n  ]\n' if rules else '  "rules": []\n')
+            f.write('}\n')
+
+    def for_arch(self, arch):
+        return [ r for r in self.rules if r.applies_to(arch) ]
+
+    '''
+    Returns the first rule that prunes the variables, or None
+    '''
+    def match(self, variables : dict, arch):
+        for r in self.for_arch(arch):
+            if r.matches(variables):
+                return r
+        return None
+
+    '''
+    Configs of Functional f that are not pruned
+    '''
+    def filter(self, f : 'Functional', configs):
+        rules = self.for_arch(f.arch)
+        if not rules:
+            yield from configs
+            return
+        fvars = functional_variables(f)
+        for cfg in configs:
+            variables = config_variables(fvars, cfg)
+            if not any([r.matches(variables) for r in rules]):
+                yield cfg
+
+# Variables that learned rules may use
+LEARNED_VARIABLES = ['Q', 'BLOCK_DMODEL', 'BLOCK_M', 'BLOCK_N', 'BLOCK_M*BLOCK_N'] + COMPILER_VARIABLES
+
+REASON_TIMEOUT = 'Timeout'
+REASON_SPILL = 'Register spills'
+
+def parse_signature_value(s : str):
+    if s in ['True', 'False']:
+        return s == 'True'
+    try:
+        return int(s)
+    except ValueError:
+        return s
+
+'''
+Variables of a compile ledger record, from its Triton signature string and
+compiler options.
+arguments: ARGUMENTS of the kernel, in the order of the signature
+'''
+def record_variables(record : dict, arguments):
+    variables = {}
+    signature = record.get('signature', None)
+    if arguments and signature:
+        values = [ v.strip() for v in signature.split(',') ]
+        variables.update({ name : parse_signature_value(v) for name, v in zip(arguments, values) })
+    for k in COMPILER_VARIABLES:
+        if record.get(k, None) is not None:
+            variables[k] = record[k]
+    return variables
+
+'''
+Classify a compile ledger record.
+Returns REASON_TIMEOUT or REASON_SPILL for configs to prune, '' for viable
+configs, and None for records that say nothing about the config (e.g.,
+crashes and memory limits).
+Negative thresholds disable the corresponding spill check.
+'''
+def classify_record(record : dict, vgpr_spill_threshold=0, sgpr_spill_threshold=-1):
+    status = record.get('status', None)
+    if status == 'Timeout':
+        return REASON_TIMEOUT
+    if status != 'Complete':
+        return None
+    def spilled(key, threshold):
+        return threshold >= 0 and record.get(key, -1) > threshold
+    if spilled('vgpr_spill_count', vgpr_spill_threshold) or spilled('sgpr_spill_count', sgpr_spill_threshold):
+        return REASON_SPILL
+    return ''
+
+def _literals(variables, bad):
+    literals = []
+    for key in LEARNED_VARIABLES:
+        values = set([ lookup_variable(v, key) for v in variables ]) - {None}
+        bad_values = set([ lookup_variable(variables[i], key) for i in bad ]) - {None}
+        if not bad_values:
+            continue
+        numeric = all([ isinstance(v, int) and not isinstance(v, bool) for v in values ])
+        values = sorted(values) if numeric else sorted(values, key=repr)
+        for value in sorted(bad_values) if numeric else sorted(bad_values, key=repr):
+            literals.append((key, 'eq', value))
+            if numeric and value > values[0]:
+                literals.append((key, 'ge', value))
+            if numeric and value < values[-1]:
+                literals.append((key, 'le', value))
+    return literals
+
+def _mask(variables, key, op, value):
+    rule = PruningRule({ key : { op : value } })
+    return np.array([ rule.matches(v) for v in variables ], dtype=bool)
+
+'''
+Greedy covering of bad configs with conjunctions of conditions that never
+cover a viable config.
+Returns [(when, support)]
+'''
+def _cover(variables, bad, good, min_support, max_conditions):
+    literals = _literals(variables, bad)
+    masks = [ _mask(variables, *lit) for lit in literals ]
+    uncovered = np.zeros(len(variables), dtype=bool)
+    uncovered[bad] = True
+    good_mask = np.zeros(len(variables), dtype=bool)
+    good_mask[good] = True
+    found = []
+    while True:
+        best = None
+        for n in range(1, max_conditions + 1):
+            for combo in itertools.combinations(range(len(literals)), n):
+                keys = [ literals[i][0] for i in combo ]
+                if len(set(keys)) != len(keys):
+                    continue
+                mask = np.logical_and.reduce([ masks[i] for i in combo ])
+                if (mask & good_mask).any():
+                    continue
+                support = int((mask & uncovered).sum())
+                # Prefer the most support, then the fewest conditions
+                if support >= min_support and (best is None or support > best[0]):
+                    best = (support, combo, mask)
+        if best is None:
+            break
+        support, combo, mask = best
+        when = {}
+        for i in combo:
+            key, op, value = literals[i]
+            when[key] = value if op == 'eq' else { op : value }
+        found.append((when, support))
+        uncovered &= ~mask
+    return found
+
+'''
+Propose pruning rules from compile ledger records.
+
+records: latest record of each HSACO, see compiler.ledger.latest_records.
+         Spill counts are read from vgpr_spill_count and sgpr_spill_count.
+kernel_arguments: {kernel name: ARGUMENTS}
+existing: {kernel name: PruningRuleSet}. Configs already pruned are ignored.
+
+Rules are proposed per kernel and arch, and only cover configs that are
+never viable in the ledger. Returns {kernel name: [PruningRule]}.
+'''
+def learn_rules(records, kernel_arguments, existing=None, min_support=3, max_conditions=2,
+                vgpr_spill_threshold=0, sgpr_spill_threshold=-1):
+    existing = {} if existing is None else existing
+    groups = {}
+    for r in records:
+        label = classify_record(r, vgpr_spill_threshold, sgpr_spill_threshold)
+        if label is None or r.get('kernel', None) is None or r.get('arch', None) is None:
+            continue
+        variables = record_variables(r, kernel_arguments.get(r['kernel'], None))
+        groups.setdefault((r['kernel'], r['arch']), []).append((variables, label))
+    proposals = {}
+    for (kernel, arch), items in sorted(groups.items()):
+        ruleset = existing.get(kernel, None)
+        if ruleset is not None:
+            items = [ (v, label) for v, label in items if ruleset.match(v, arch) is None ]
+        variables = [ v for v, _ in items ]
+        good = [ i for i, (_, label) in enumerate(items) if label == '' ]
+        for reason in [REASON_TIMEOUT, REASON_SPILL]:
+            bad = [ i for i, (_, label) in enumerate(items) if label == reason ]
+            if len(bad) < min_support:
+                continue
+            for when, support in _cover(variables, bad, good, min_support, max_conditions):
+                rule = PruningRule(when, reason=reason, arch=[arch], support=support)
+                proposals.setdefault(kernel, []).append(rule)
+    return proposals
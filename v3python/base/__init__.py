@@ -13,5 +13,6 @@ from .parameter import (
     TemplateParameter,
     PerformanceTemplateParameter,
 )
+from .exclusion import Exclusion
 from .interface import Interface
 
@@ -16,6 +16,14 @@ t2 need to be derived from info stored in Parameter object.
 '''
 
 class Bind(object):
+    __slots__ = (
+        '_klass',
+        '_value',
+        '_conditional',
+        '_init_value',
+        '_nth_choice',
+    )
+
     def __init__(self,
                  klass : 'Parameter',
                  value : 'Any',
@@ -49,6 +57,10 @@ class Bind(object):
         return self._value.resolve(aname, tc_dict=None)
 
     ############## signature ##############
+    @property
+    def nth_choice(self):
+        return self._nth_choice
+
     @property
     def godel_number(self):
         return self._nth_choice * self.param_klass.godel_number
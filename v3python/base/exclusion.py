@@ -0,0 +1,93 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import itertools
+import numpy as np
+
+'''
+Exclusion: declarative rule to remove Functionals from Interface.gen_functionals
+
+Unlike CHOICE_FILTERS, which removes choices of a single argument, an
+Exclusion removes combinations of choices, e.g., causal with bias.
+
+Exclusion rules are evaluated over the choice indices of TemplateParameters,
+hence disabled combinations are skipped before any Bind or Functional
+objects are created, and the number of enabled Functionals can be computed
+without enumerating them.
+
+keys:      argument names. An element can also be a list of alternative
+           names (e.g. ['CAUSAL', 'CAUSAL_TYPE']), and the first name found in
+           the Interface is used.
+predicate: predicate(*values) -> bool, True to exclude. Values are the
+           triton_compile_signature of the choices, same as check_value() in
+           rules.
+arch:      None to apply on all arches. Otherwise arch(arch_name) -> bool
+           selects the arches that this rule applies to.
+
+Keys bound to choices that may be conditional cannot be evaluated before the
+Functional is settled, and they are rejected.
+'''
+class Exclusion(object):
+    def __init__(self, keys, predicate, arch=None):
+        self._keys = [ k if isinstance(k, (list, tuple)) else [k] for k in keys ]
+        self._predicate = predicate
+        self._arch = arch
+
+    def applies_to(self, arch):
+        return self._arch is None or self._arch(arch)
+
+    def _locate(self, func_params):
+        def locate_key(alternatives):
+            for aname in alternatives:
+                for i, tp in enumerate(func_params):
+                    if aname in tp.all_names:
+                        return i, aname
+            assert False, f'Exclusion key {alternatives} cannot be found in the functional parameters'
+        return [ locate_key(alternatives) for alternatives in self._keys ]
+
+    '''
+    Returns (axes, table)
+      axes: indices of func_params involved in this rule
+      table: boolean ndarray over the choices of func_params[axes], True means excluded
+    '''
+    def tabulate(self, func_params):
+        located = self._locate(func_params)
+        axes = sorted(set([ i for i, _ in located ]))
+        for i in axes:
+            assert not func_params[i].maybe_conditional, f'Exclusion over conditional choices {func_params[i].all_names} is not supported'
+        shape = [ func_params[i].nchoices for i in axes ]
+        table = np.zeros(shape, dtype=bool)
+        for nths in itertools.product(*[range(n) for n in shape]):
+            nth_of = dict(zip(axes, nths))
+            values = [ func_params[i].choices[nth_of[i]].triton_compile_signature for i, _ in located ]
+            table[nths] = bool(self._predicate(*values))
+        return axes, table
+
+    '''
+    Evaluate this rule over a constructed Functional
+    '''
+    def excludes(self, functional):
+        if not self.applies_to(functional.arch):
+            return False
+        bind_dict = functional.build_complete_bind_dict()
+        def value(alternatives):
+            for aname in alternatives:
+                if aname in bind_dict:
+                    return bind_dict[aname].value.triton_compile_signature
+            assert False, f'Exclusion key {alternatives} cannot be found in {functional=}'
+        return bool(self._predicate(*[ value(alternatives) for alternatives in self._keys ]))
+
+'''
+Boolean ndarray over the choices of all func_params, True means enabled.
+Element order matches itertools.product(*func_params).
+'''
+def build_enabled_mask(func_params, exclusions, arch):
+    mask = np.ones([ tp.nchoices for tp in func_params ], dtype=bool)
+    for rule in exclusions:
+        if not rule.applies_to(arch):
+            continue
+        axes, table = rule.tabulate(func_params)
+        # Broadcast the table of the rule to all func_params
+        shape = [ tp.nchoices if i in axes else 1 for i, tp in enumerate(func_params) ]
+        mask &= ~table.reshape(shape)
+    return mask
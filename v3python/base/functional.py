@@ -18,6 +18,8 @@ from ..utils import log
 # 1. Target GPU architecture is also part of a Functional
 # 2. Arch number is assigned per-meta_object since it is possible some
 #    kernel/operator is not supported on certain arch
+# 3. A Functional is immutable once its conditional values are settled in
+#    __init__, so derived values are computed on first use and cached.
 
 def build_tc_dict(args):
     return { arg.name : arg.value for arg in args }
@@ -29,6 +31,21 @@ def build_complete_dict(args):
     return { aname : arg for arg in args for aname in arg._klass.all_names }
 
 class Functional(object):
+    __slots__ = (
+        '_arch',
+        '_arch_number',
+        '_meta',
+        '_binds',
+        '_optimized_for',
+        '_database_gpus',
+        '_compact_dict',
+        # Caches
+        '_godel_number',
+        '_complete_bind_dict',
+        '_complete_tc_dict',
+        '_human_readable_signature',
+        '_signature_in_func_name',
+    )
 
     def __init__(self,
                  meta_object,  # KernelDescription | Operator
@@ -44,6 +61,11 @@ class Functional(object):
         self._database_gpus = [ AOTRITON_TUNING_DATABASE_REUSE.get(gpu, gpu) for gpu in optimized_for ]
         self.__settle_conditional_values()
         self._compact_dict = build_compact_dict(self._binds)
+        self._godel_number = None
+        self._complete_bind_dict = None
+        self._complete_tc_dict = None
+        self._human_readable_signature = None
+        self._signature_in_func_name = None
 
     def __settle_conditional_values(self):
         while True:
@@ -83,7 +105,9 @@ class Functional(object):
 
     @property
     def godel_number(self):
-        return sum([s.godel_number for s in self._binds])
+        if self._godel_number is None:
+            self._godel_number = sum([s.godel_number for s in self._binds])
+        return self._godel_number
 
     '''
     dict of repr -> typed choice
@@ -96,19 +120,28 @@ class Functional(object):
     dict of all parameter -> typed choice
     '''
     def build_complete_bind_dict(self, with_resolved_tc=False):
-        d = build_complete_dict(self._binds)
+        if self._complete_bind_dict is None:
+            self._complete_bind_dict = build_complete_dict(self._binds)
+        d = self._complete_bind_dict
         if not with_resolved_tc:
-            return d
+            return dict(d)
         return { aname : (bind, bind.get_typed_value(aname)) for aname, bind in d.items() }
 
+    '''
+    Returns a new dict, callers may modify it (e.g. KernelSignature)
+    '''
     def build_complete_tc_dict(self, with_resolved_tc=False):
-        d = build_complete_dict(self._binds)
-        return { aname : bind.get_typed_value(aname) for aname, bind in d.items() }
+        if self._complete_tc_dict is None:
+            d = self.build_complete_bind_dict()
+            self._complete_tc_dict = { aname : bind.get_typed_value(aname) for aname, bind in d.items() }
+        return dict(self._complete_tc_dict)
 
     @property
     def human_readable_signature(self):
-        lf = [s.human_readable_signature for s in self._binds]
-        return 'Human-readable Signature \n// ' + '\n// '.join([x for x in lf if x is not None])
+        if self._human_readable_signature is None:
+            lf = [s.human_readable_signature for s in self._binds]
+            self._human_readable_signature = 'Human-readable Signature \n// ' + '\n// '.join([x for x in lf if x is not None])
+        return self._human_readable_signature
 
     @property
     def compact_choices(self) -> dict:
@@ -124,8 +157,10 @@ class Functional(object):
     '''
     @property
     def signature_in_func_name(self):
-        lf = [bind.signature_in_func_name for bind in self._binds if bind.show_in_compact]
-        return '_'.join([x for x in lf])
+        if self._signature_in_func_name is None:
+            lf = [bind.signature_in_func_name for bind in self._binds if bind.show_in_compact]
+            self._signature_in_func_name = '_'.join([x for x in lf])
+        return self._signature_in_func_name
 
     '''
     file pack signature only cares about Functional, so it is FONLY__
@@ -3,6 +3,7 @@
 
 from abc import ABC, abstractmethod
 import itertools
+import numpy as np
 from .parameter import (
     TemplateParameter as TP,
 )
@@ -14,6 +15,7 @@ from .typed_choice import constexpr as TCC
 from .functional import (
     Functional,
 )
+from .exclusion import build_enabled_mask
 from ..utils import log
 
 '''
@@ -30,6 +32,7 @@ class Interface(ABC):
     FEAT_CHOICES = None         # Required For Operator
     PERF_CHOICES = None         # Required For KernelDescription/MetroKernel
     CHOICE_FILTERS = None       # Optional, Exclude unsupported combinations
+    FUNCTIONAL_EXCLUSIONS = []  # Optional, list of Exclusion to skip disabled Functionals
     TENSOR_RANKS = None         # Operator, Required if Interface has Tensor Inputs
     TENSOR_STRIDE_INPUTS = None # Operator, Required if Interface has Tensor Inputs
     PARTIALLY_TUNED_FUNCTIONALS = {}    # Optional but usually needed
@@ -142,15 +145,57 @@ class Interface(ABC):
         log(lambda : f'get_tensor_rank {self=} {self.TENSOR_RANKS=}')
         return self.TENSOR_RANKS.get(tensor_arg, self.TENSOR_RANKS['_default'])
 
+    '''
+    Parameters enumerated by gen_functionals
+    '''
+    def _enumerated_func_params(self):
+        return self._func_params
+
+    '''
+    Subset of target_arch supported by this Interface
+    '''
+    def _supported_target_arch(self, target_arch):
+        return target_arch
+
+    '''
+    Boolean ndarray over choices of _enumerated_func_params(), True if the
+    Functional is not excluded by FUNCTIONAL_EXCLUSIONS on the given arch.
+    '''
+    def enabled_functional_mask(self, arch):
+        return build_enabled_mask(self._enumerated_func_params(), self.FUNCTIONAL_EXCLUSIONS, arch)
+
+    '''
+    Number of Functionals gen_functionals yields for each arch, without
+    creating them
+    '''
+    def count_functionals(self, target_arch) -> dict:
+        return { arch : int(self.enabled_functional_mask(arch).sum())
+                 for arch in self._supported_target_arch(target_arch).keys() }
+
+    '''
+    Functionals excluded by FUNCTIONAL_EXCLUSIONS are skipped before creation.
+    Order is the same as itertools.product over _enumerated_func_params()
+    '''
     def gen_functionals(self, target_arch):
+        func_params = self._enumerated_func_params()
         def create_binds_from_nths(nths):
-            return [ tp.create_nth(nth) for tp, nth in zip(self._func_params, nths) ]
+            return [ tp.create_nth(nth) for tp, nth in zip(func_params, nths) ]
+        target_arch = self._supported_target_arch(target_arch)
         for arch_number, arch in enumerate(target_arch.keys()):
             gpus = target_arch[arch]
-            for nths in itertools.product(*self._func_params):
+            # np.argwhere lists indices in C order, i.e., itertools.product order
+            for nths in np.argwhere(self.enabled_functional_mask(arch)).tolist():
                 binds = create_binds_from_nths(nths)
                 yield Functional(self, arch, arch_number, binds, optimized_for=gpus)
 
+    '''
+    Functionals enumerated by gen_functionals are not excluded by
+    FUNCTIONAL_EXCLUSIONS. Subclasses may override this for rules that cannot
+    be expressed declaratively, which are checked by the code generator.
+    '''
+    def is_functional_disabled(self, functional):
+        return any([rule.excludes(functional) for rule in self.FUNCTIONAL_EXCLUSIONS])
+
     @abstractmethod
     def translate_dataframe(self, f : Functional, df : 'pandas.DataFrame'):
         pass
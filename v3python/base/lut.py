@@ -0,0 +1,55 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import numpy as np
+from ..utils import profiler
+
+'''
+Tuning LUT construction shared by KernelDescription and Operator
+
+The LUT of a Functional has shape [noptimized_for, *[nvalues of each key]],
+where each key axis is indexed by the position of the value in the sorted
+unique values of the key column.
+'''
+
+'''
+Returns (possible_values, indices)
+  possible_values: { key : sorted unique values of df[key], as list }
+  indices: list of int ndarrays, the bucket of each row for each key
+'''
+def bucket_sparse_keys(df : 'pandas.DataFrame', sparse_keys):
+    possible_values = {}
+    indices = []
+    with profiler.span('np.unique'):
+        for key in sparse_keys:
+            uniques, inverse = np.unique(df[key].to_numpy(), return_inverse=True)
+            possible_values[key] = uniques.tolist()
+            indices.append(inverse.reshape(-1))
+    return possible_values, indices
+
+'''
+Same as df[keys].to_numpy(), without constructing the sub-DataFrame when all
+columns share the same dtype.
+'''
+def stack_columns(df : 'pandas.DataFrame', keys):
+    cols = [ df[key].to_numpy() for key in keys ]
+    if all([c.dtype == cols[0].dtype for c in cols]):
+        return np.stack(cols, axis=1)
+    return df[keys].to_numpy()
+
+'''
+Scatter values into a LUT filled with -1.
+Rows of database_gpus[i] are written to lut[i], on top of the entries of
+database_gpus[0]. Rows later in df win over earlier ones with the same indices.
+'''
+def scatter_lut(f : 'Functional', df : 'pandas.DataFrame', possible_values, indices, values):
+    lut_shape = [f.noptimized_for] + [ len(v) for v in possible_values.values() ]
+    # lut starts with a large enough dtype
+    lut_tensor = np.full(lut_shape, -1, dtype=np.int32)
+    gpus = df['gpu'].to_numpy()
+    for i, gpu in enumerate(f.database_gpus):
+        if i > 0:
+            lut_tensor[i] = lut_tensor[0]
+        rows = gpus == gpu
+        lut_tensor[i][tuple([ind[rows] for ind in indices])] = values[rows]
+    return lut_tensor
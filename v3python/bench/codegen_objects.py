@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from ..rules import kernels as triton_kernels
+from ..database.sqlite import Factory as SqliteFactory
+from ..gpu_targets import AOTRITON_SUPPORTED_GPUS, cluster_gpus
+
+desc = """
+Micro-benchmark of Functional/Bind/KernelSignature objects.
+Creates all Functionals and KernelSignatures of the selected kernels (default:
+attn_fwd and the backward kernels), then reads the signatures used by the
+code generator. Reports objects per second and peak traced memory.
+"""
+
+DEFAULT_KERNELS = [
+    'attn_fwd',
+    'bwd_preprocess',
+    'bwd_preprocess_varlen',
+    'bwd_kernel_dk_dv',
+    'bwd_kernel_dq',
+    'bwd_kernel_fuse',
+    'bwd_postprocess',
+]
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--build_dir", type=Path, default='build/',
+                   help="Directory that contains tuning_database.sqlite3")
+    p.add_argument("--target_gpus", type=str, nargs='+', choices=AOTRITON_SUPPORTED_GPUS, required=True)
+    p.add_argument("--kernels", type=str, nargs='+', default=DEFAULT_KERNELS,
+                   help="NAME of kernels to benchmark")
+    p.add_argument("--reads", type=int, default=4,
+                   help="Times each signature is read, approximating the code generator")
+    return p.parse_args()
+
+def create_objects(kdescs, target_arch, fac):
+    functionals = []
+    ksigs = []
+    for kdesc in kdescs:
+        for f in kdesc.gen_functionals(target_arch):
+            functionals.append(f)
+            if kdesc.is_functional_disabled(f):
+                continue
+            df, _ = fac.create_view(f)
+            if df is None or df.empty:
+                _, sigs, _ = kdesc.translate_empty_dataframe(f)
+            else:
+                _, sigs, _ = kdesc.translate_dataframe(f, df)
+            ksigs += sigs
+    return functionals, ksigs
+
+def read_signatures(functionals, ksigs, reads):
+    n = 0
+    for _ in range(reads):
+        for f in functionals:
+            f.godel_number
+            f.tunecc_signature
+            f.filepack_signature
+            f.human_readable_signature
+            f.build_complete_tc_dict()
+            n += 5
+        for ksig in ksigs:
+            ksig.full_compact_signature
+            ksig.triton_signature_string
+            ksig.perf_signature
+            ksig.copt_signature
+            n += 4
+    return n
+
+def main():
+    args = parse()
+    target_arch = cluster_gpus(args.target_gpus)
+    kdescs = [ k for k in triton_kernels if k.NAME in args.kernels ]
+    # Database rows are loaded before the measurement to exclude the prefetched tables
+    fac = SqliteFactory(args.build_dir)
+    create_objects(kdescs, target_arch, fac)
+
+    tic = time.perf_counter()
+    functionals, ksigs = create_objects(kdescs, target_arch, fac)
+    create_time = time.perf_counter() - tic
+    tic = time.perf_counter()
+    nreads = read_signatures(functionals, ksigs, args.reads)
+    read_time = time.perf_counter() - tic
+    del functionals, ksigs
+
+    # tracemalloc slows down allocations, hence memory is measured separately
+    tracemalloc.start()
+    functionals, ksigs = create_objects(kdescs, target_arch, fac)
+    _, create_peak = tracemalloc.get_traced_memory()
+    read_signatures(functionals, ksigs, 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nobjs = len(functionals) + len(ksigs)
+    print(f'Kernels: {" ".join([k.NAME for k in kdescs])}')
+    print(f'{len(functionals)} Functionals, {len(ksigs)} KernelSignatures')
+    print(f'Create (incl. translate_dataframe): {create_time:.3f}s, {nobjs / create_time:.0f} objects/s')
+    print(f'Read signatures: {read_time:.3f}s, {nreads / read_time:.0f} reads/s')
+    print(f'Peak traced memory: {create_peak / 2**20:.1f} MiB after creation, {peak / 2**20:.1f} MiB after reads')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import time
+from pathlib import Path
+import pandas as pd
+from ..rules import (
+    kernels as triton_kernels,
+    operators as dispatcher_operators,
+)
+from ..database.sqlite import Factory as SqliteFactory
+from ..gpu_targets import AOTRITON_SUPPORTED_GPUS, cluster_gpus
+
+desc = """
+Benchmark sqlite.Factory.create_view with and without table prefetch.
+Results of both paths are compared for every Functional.
+"""
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--build_dir", type=Path, default='build/',
+                   help="Directory that contains tuning_database.sqlite3 and op_database.sqlite3")
+    p.add_argument("--target_gpus", type=str, nargs='+', choices=AOTRITON_SUPPORTED_GPUS, required=True)
+    p.add_argument("--no_check", action='store_true', help="Skip comparing the results of two paths")
+    return p.parse_args()
+
+def run(fac, functionals):
+    results = []
+    tic = time.perf_counter()
+    for f in functionals:
+        results.append(fac.create_view(f))
+    return time.perf_counter() - tic, results
+
+def main():
+    args = parse()
+    target_arch = cluster_gpus(args.target_gpus)
+    functionals = []
+    for iface in list(dispatcher_operators) + list(triton_kernels):
+        functionals += list(iface.gen_functionals(target_arch))
+    print(f'{len(functionals)} Functionals')
+    legacy_time, legacy = run(SqliteFactory(args.build_dir, prefetch=False), functionals)
+    print(f'SELECT per Functional: {legacy_time:.3f}s')
+    prefetch_time, prefetched = run(SqliteFactory(args.build_dir, prefetch=True), functionals)
+    print(f'Prefetched tables:     {prefetch_time:.3f}s ({legacy_time / prefetch_time:.1f}x)')
+    if args.no_check:
+        return
+    for f, (ldf, lsql), (pdf, psql) in zip(functionals, legacy, prefetched):
+        assert lsql == psql, f'SQL mismatch for {f.compact_signature_noarch}: {lsql} vs {psql}'
+        if ldf is None or pdf is None:
+            assert ldf is None and pdf is None
+            continue
+        pd.testing.assert_frame_equal(ldf, pdf)
+    print('Results are identical')
+
+if __name__ == '__main__':
+    main()
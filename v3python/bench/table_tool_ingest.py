@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import io
+import json
+import sqlite3
+import tempfile
+import time
+from contextlib import closing, redirect_stdout
+from pathlib import Path
+import numpy as np
+from v2python.table_tool import TuningDatabase, do_main
+
+desc = """
+Benchmark of v2python.table_tool ingestion with synthetic tuning logs of
+attn_fwd. Each action is run twice: once committing every row with the
+rollback journal (the behavior before --batch_size), and once with batched
+transactions in WAL mode. Reports input lines and upserts per second,
+and checks both databases have the same content.
+"""
+
+SEQLENS = [16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192]
+HEAD_DIMS = [16, 32, 48, 64, 80, 96, 128, 160, 192, 224, 256]
+BLOCKS = [(128, 64), (128, 32), (64, 64), (64, 32), (32, 32), (16, 16)]
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--lines", type=int, default=100000, help="Number of lines of the synthetic log")
+    p.add_argument("--configs", type=int, default=48, help="Lines per tuning task, i.e., configs tried for the same inputs")
+    p.add_argument("--actions", type=str, nargs='+', default=['pipejson', 'rawjson'], choices=['pipejson', 'rawjson'])
+    p.add_argument("--batch_size", type=int, default=1000, help="--batch_size of the batched run")
+    p.add_argument("--flush_interval", type=float, default=1.0, help="--flush_interval of the batched run")
+    p.add_argument("--work_dir", type=Path, default=None, help="Directory of the databases. Defaults to a temporary directory. Use a directory on the disk of the tuning database, fsync dominates the legacy run")
+    p.add_argument("--seed", type=int, default=0)
+    return p.parse_args()
+
+'''
+JSON lines as written by DbService of the tuner, grouped by task
+'''
+def synthetic_log(nlines, configs, seed):
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(nlines):
+        tid = i // configs
+        trng = np.random.default_rng([seed, tid])
+        hdim = int(trng.choice(HEAD_DIMS))
+        inputs = {
+            'Q_dtype' : str(trng.choice(['torch.float16', 'torch.bfloat16', 'torch.float32'])),
+            'N_HEADS' : 4,
+            'D_HEAD' : hdim,
+            'Max_seqlen_q' : int(trng.choice(SEQLENS)),
+            'Max_seqlen_k' : int(trng.choice(SEQLENS)),
+            'CAUSAL_TYPE' : int(trng.integers(0, 2)),
+            'BIAS_TYPE' : 0,
+            'ENABLE_DROPOUT' : bool(trng.integers(0, 2)),
+            'PADDED_HEAD' : False,
+            'BLOCK_DMODEL' : hdim,
+        }
+        block_m, block_n = BLOCKS[int(rng.integers(len(BLOCKS)))]
+        elapsed = float(rng.uniform(0.01, 2.0))
+        adiff = float(rng.uniform(1e-4, 1e-2))
+        j = {
+            'arch' : 'gfx942',
+            'kernel_name' : 'attn_fwd',
+            'inputs' : inputs,
+            'result' : 'tuned',
+            'tuned_kernel' : {
+                'BLOCK_M' : block_m,
+                'BLOCK_N' : block_n,
+                'PRE_LOAD_V' : bool(rng.integers(0, 2)),
+            },
+            'compiler_options' : {
+                'waves_per_eu' : int(rng.integers(0, 4)),
+                'num_warps' : int(rng.choice([2, 4, 8])),
+                'num_stages' : 1,
+            },
+            'ut_passed' : True,
+            'time' : [elapsed, elapsed * 1.1],
+            'adiffs' : [adiff],
+            'target_fudge_factors' : { 'out' : float(rng.uniform(1.0, 4.0)) },
+            '_debug_task_id' : tid,
+        }
+        lines.append(json.dumps(j, separators=(',', ':')) + '\n')
+    return ''.join(lines)
+
+def table_tool_args(db_file, action, batch_size, flush_interval, journal_mode):
+    return argparse.Namespace(file=str(db_file),
+                              opfile=None,
+                              kernel_family='FLASH',
+                              verbose=False,
+                              action=action,
+                              round_inputs=False,
+                              fudge_factor_tolerance=5.0,
+                              max_fudge_factor=100.0,
+                              batch_size=batch_size,
+                              flush_interval=flush_interval,
+                              journal_mode=journal_mode,
+                              aggregate_in_memory=False,
+                              aggregation_budget=100000,
+                              scratch_dir=None)
+
+def ingest(db_file, action, log, batch_size, flush_interval, journal_mode):
+    args = table_tool_args(db_file, action, batch_size, flush_interval, journal_mode)
+    db = TuningDatabase(args)
+    tic = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        do_main(args, db, io.StringIO(log))
+    return time.perf_counter() - tic, db.committed
+
+def dump(db_file):
+    with closing(sqlite3.connect(db_file)) as conn:
+        tables = [ r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name") ]
+        return { t : sorted(conn.execute(f'SELECT * FROM "{t}"').fetchall(), key=repr) for t in tables }
+
+def run(args, work_dir, log, nlines):
+    for action in args.actions:
+        results = {}
+        for name, batch_size, flush_interval, journal_mode in [('per-row commit', 1, 0.0, 'delete'),
+                                                               ('batched', args.batch_size, args.flush_interval, 'wal')]:
+            db_file = work_dir / f'{action}-{journal_mode}.sqlite3'
+            db_file.unlink(missing_ok=True)
+            elapsed, rows = ingest(db_file, action, log, batch_size, flush_interval, journal_mode)
+            results[name] = (elapsed, db_file)
+            print(f'{action:<9} {name:<15} {elapsed:8.3f}s {nlines / elapsed:10.0f} lines/s {rows:8d} upserts {rows / elapsed:10.0f} upserts/s')
+        (legacy_time, legacy_db), (batched_time, batched_db) = results.values()
+        assert dump(legacy_db) == dump(batched_db), f'{action}: databases differ'
+        assert not Path(f'{batched_db}-wal').exists(), f'{batched_db}: WAL file left behind'
+        print(f'{action:<9} speedup {legacy_time / batched_time:.1f}x, identical content')
+
+def main():
+    args = parse()
+    log = synthetic_log(args.lines, args.configs, args.seed)
+    print(f'{args.lines} lines, {-(-args.lines // args.configs)} tasks, {len(log) / 2**20:.1f} MiB')
+    if args.work_dir is not None:
+        args.work_dir.mkdir(parents=True, exist_ok=True)
+        run(args, args.work_dir, log, args.lines)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            run(args, Path(work_dir), log, args.lines)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+from ..rules import (
+    kernels as triton_kernels,
+    operators as dispatcher_operators,
+)
+from ..kernel.ksignature import KernelSignature, COMPILER_OPTIONS
+from ..database.sqlite import Factory as SqliteFactory
+from ..gpu_targets import AOTRITON_SUPPORTED_GPUS, cluster_gpus
+
+desc = """
+Benchmark translate_dataframe of KernelDescription and Operator against the
+per-row implementation it replaced (df[key].apply(bucket.index) and a pandas
+filter per database gpu). Runs over all Functionals with tuning database
+rows, and compares the LUT arrays and signature lists of both paths.
+"""
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--build_dir", type=Path, default='build/',
+                   help="Directory that contains tuning_database.sqlite3 and op_database.sqlite3")
+    p.add_argument("--target_gpus", type=str, nargs='+', choices=AOTRITON_SUPPORTED_GPUS, required=True)
+    p.add_argument("--no_check", action='store_true', help="Skip comparing the results of two paths")
+    return p.parse_args()
+
+def legacy_fill_lut(f, df, sparse_keys, values_key):
+    sparse_key_possible_values = { key : np.unique(df[key].to_numpy()).tolist() for key in sparse_keys }
+    lut_shape = [f.noptimized_for] + [ len(sparse_key_possible_values[key]) for key in sparse_keys ]
+    lut_tensor = np.full(lut_shape, -1, dtype=np.int32)
+    for i, ind_key in enumerate(sparse_keys):
+        bucket = sparse_key_possible_values[ind_key]
+        def discretization(v):
+            return bucket.index(v)
+        df[f'$$ind_{i}'] = df[ind_key].apply(discretization)
+    for i, gpu in enumerate(f.database_gpus):
+        if i > 0:
+            lut_tensor[i] = lut_tensor[0]
+        df_i = df[df['gpu'] == gpu]
+        inds = tuple([df_i[f'$$ind_{i}'] for i in range(len(sparse_keys))])
+        lut_tensor[i][inds] = df_i[values_key]
+    return lut_tensor
+
+def legacy_kernel_translate(kdesc, f, df):
+    sparse_keys = [ f'inputs${key}' for key, _ in kdesc.AUTOTUNE_KEYS_VALIDATED ]
+    perf_params = list(kdesc.gen_performance_params())
+    perf_keys = [ f'tuned_kernel${meta.repr_name}' for meta in perf_params ]
+    copt_keys = [ f'compiler_options${key}' for key in COMPILER_OPTIONS ]
+    np_sigs, revind = np.unique(df[perf_keys + copt_keys].to_numpy(), axis=0, return_inverse=True)
+    df['$$sig_num'] = revind
+    nperfs = len(perf_keys)
+    sigs = [ KernelSignature(f,
+                             [ meta.create_direct(value) for meta, value in zip(perf_params, nprow) ],
+                             nprow[nperfs:].tolist()) for nprow in np_sigs ]
+    lut_tensor = legacy_fill_lut(f, df, sparse_keys, '$$sig_num')
+    for dtype in [np.int8, np.int16, np.int32]:
+        if len(sigs) < np.iinfo(dtype).max:
+            break
+    return lut_tensor.astype(dtype), sigs
+
+def legacy_operator_translate(op, f, df):
+    sparse_keys = [ f'inputs${key}' for key in op.OPTUNE_KEYS.keys() ]
+    lut_tensor = legacy_fill_lut(f, df, sparse_keys, 'op$backend')
+    backend_inds = np.unique(lut_tensor).tolist()
+    return lut_tensor, [op.list_backends()[ind].enum_name for ind in backend_inds]
+
+def signature_list(sigs):
+    return [ s if isinstance(s, str) else s.full_compact_signature for s in sigs ]
+
+def collect(fac, target_arch):
+    items = []
+    for iface in list(dispatcher_operators) + list(triton_kernels):
+        legacy = legacy_operator_translate if iface.TUNE_NAME == 'optune' else legacy_kernel_translate
+        for f in iface.gen_functionals(target_arch):
+            if iface.is_functional_disabled(f):
+                continue
+            df, _ = fac.create_view(f)
+            if df is None or df.empty:
+                continue
+            items.append((iface, legacy, f, df))
+    return items
+
+def main():
+    args = parse()
+    target_arch = cluster_gpus(args.target_gpus)
+    items = collect(SqliteFactory(args.build_dir), target_arch)
+    nrows = sum([len(df) for _, _, _, df in items])
+    print(f'{len(items)} Functionals with tuning database rows, {nrows} rows')
+    # The legacy implementation adds columns to df, hence both paths work on copies
+    legacy_dfs = [ df.copy() for _, _, _, df in items ]
+    vectorized_dfs = [ df.copy() for _, _, _, df in items ]
+    tic = time.perf_counter()
+    legacy = [ translate(iface, f, df) for (iface, translate, f, _), df in zip(items, legacy_dfs) ]
+    legacy_time = time.perf_counter() - tic
+    print(f'Per-row apply:  {legacy_time:.3f}s')
+    tic = time.perf_counter()
+    vectorized = [ iface.translate_dataframe(f, df) for (iface, _, f, _), df in zip(items, vectorized_dfs) ]
+    vectorized_time = time.perf_counter() - tic
+    print(f'Vectorized:     {vectorized_time:.3f}s ({legacy_time / vectorized_time:.1f}x)')
+    if args.no_check:
+        return
+    for (iface, _, f, _), (llut, lsigs), (vlut, vsigs, _) in zip(items, legacy, vectorized):
+        where = f'{iface.NAME} {f.compact_signature_noarch}'
+        assert llut.dtype == vlut.dtype, f'LUT dtype mismatch for {where}: {llut.dtype} vs {vlut.dtype}'
+        assert np.array_equal(llut, vlut), f'LUT mismatch for {where}'
+        assert signature_list(lsigs) == signature_list(vsigs), f'Signature mismatch for {where}'
+    print('LUT arrays and signature lists are identical')
+
+if __name__ == '__main__':
+    main()
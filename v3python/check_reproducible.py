@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from .gpu_targets import AOTRITON_SUPPORTED_GPUS
+
+desc = """
+Self-check of byte-reproducible code generation.
+Runs v3python.generate under different PYTHONHASHSEED values and --jobs,
+with the same build_dir, and compares the generated trees. Exits with 1 if
+any generated file differs.
+"""
+
+SOURCE_PATH = Path(__file__).resolve().parent.parent
+RULES_DIR = SOURCE_PATH / 'v3python' / 'rules'
+DATABASE_ARCHIVES = ['tuning_database.sqlite3.tar.xz', 'op_database.sqlite3.tar.xz']
+# Not part of the generated code: databases and sidecar files of the generator
+IGNORED_SUFFIXES = ['.sqlite3']
+IGNORED_PREFIXES = ['.aotriton']
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--target_gpus", type=str, nargs='+', choices=AOTRITON_SUPPORTED_GPUS, required=True)
+    p.add_argument("--seeds", type=str, nargs='+', default=['0', '1'],
+                   help="PYTHONHASHSEED of each run. The first run is the reference.")
+    p.add_argument("--jobs", type=int, nargs='+', default=[1],
+                   help="--jobs of v3python.generate. Every seed is run with every value. The first value is the reference.")
+    p.add_argument("--work_dir", type=Path, default=None,
+                   help="Directory to keep the generated trees. A temporary directory is used (and removed) by default.")
+    p.add_argument("--db_dir", type=Path, default=None,
+                   help="Directory that contains the tuning databases. Defaults to the databases shipped in v3python/rules.")
+    p.add_argument("generate_args", nargs=argparse.REMAINDER,
+                   help="Extra arguments passed to v3python.generate, after '--'")
+    args = p.parse_args()
+    if args.generate_args and args.generate_args[0] == '--':
+        args.generate_args = args.generate_args[1:]
+    return args
+
+def is_ignored(name):
+    return any(name.endswith(s) for s in IGNORED_SUFFIXES) or any(name.startswith(p) for p in IGNORED_PREFIXES)
+
+def install_databases(build_dir : Path, db_dir : Path):
+    build_dir.mkdir(parents=True, exist_ok=True)
+    if db_dir is not None:
+        for fn in db_dir.glob('*.sqlite3'):
+            shutil.copy(fn, build_dir / fn.name)
+        return
+    for archive in DATABASE_ARCHIVES:
+        with tarfile.open(RULES_DIR / archive) as tar:
+            tar.extractall(build_dir, filter='data')
+
+def generate(build_dir : Path, seed, jobs, target_gpus, generate_args):
+    env = dict(os.environ)
+    env['PYTHONHASHSEED'] = str(seed)
+    cmd = [sys.executable, '-m', 'v3python.generate',
+           '--target_gpus', *target_gpus,
+           '--build_dir', str(build_dir),
+           '--no_manifest',
+           '--jobs', str(jobs),
+           *generate_args]
+    subprocess.run(cmd, env=env, cwd=SOURCE_PATH, check=True, stdout=subprocess.DEVNULL)
+
+'''
+Returns relative paths of files that only exist in one tree or differ
+'''
+def compare_trees(ref : Path, other : Path):
+    def list_files(root):
+        return set([ fn.relative_to(root) for fn in root.rglob('*') if fn.is_file() and not is_ignored(fn.name) ])
+    ref_files = list_files(ref)
+    other_files = list_files(other)
+    diffs = list(ref_files ^ other_files)
+    for fn in ref_files & other_files:
+        if not filecmp.cmp(ref / fn, other / fn, shallow=False):
+            diffs.append(fn)
+    return sorted(diffs)
+
+def run_name(seed, jobs):
+    return f'PYTHONHASHSEED={seed} --jobs {jobs}'
+
+'''
+Returns the list of (run name, differing files) against the first run,
+i.e., the first seed with the first jobs
+'''
+def check(work_dir : Path, target_gpus, seeds, db_dir=None, generate_args=[], jobs=[1]):
+    build_dir = work_dir / 'build'
+    runs = []
+    for seed in seeds:
+        for j in jobs:
+            if build_dir.exists():
+                shutil.rmtree(build_dir)
+            install_databases(build_dir, db_dir)
+            generate(build_dir, seed, j, target_gpus, generate_args)
+            run_dir = work_dir / f'run_{seed}_j{j}'
+            if run_dir.exists():
+                shutil.rmtree(run_dir)
+            # Generated files contain absolute paths, hence all runs use the same build_dir
+            build_dir.rename(run_dir)
+            runs.append((run_name(seed, j), run_dir))
+    ref_name, ref_dir = runs[0]
+    return [ (name, compare_trees(ref_dir, run_dir)) for name, run_dir in runs[1:] ]
+
+def main():
+    args = parse()
+    if args.work_dir is None:
+        with tempfile.TemporaryDirectory(prefix='aotriton_reproducible_') as tmp:
+            results = check(Path(tmp), args.target_gpus, args.seeds, args.db_dir, args.generate_args, args.jobs)
+    else:
+        results = check(args.work_dir, args.target_gpus, args.seeds, args.db_dir, args.generate_args, args.jobs)
+    ref_name = run_name(args.seeds[0], args.jobs[0])
+    failed = False
+    for name, diffs in results:
+        if not diffs:
+            print(f'{name}: identical to {ref_name}')
+            continue
+        failed = True
+        print(f'{name}: {len(diffs)} file(s) differ from {ref_name}')
+        for fn in diffs:
+            print(f'\t{fn.as_posix()}')
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -26,8 +26,8 @@ class AffineGenerator(InterfaceGenerator):
     SOURCE_TEMPLATE = get_template('affine.cc')
     PFX = 'affine'
 
-    def __init__(self, args, iface : Interface, parent_repo : RegistryRepository):
-        super().__init__(args, iface, parent_repo)
+    def __init__(self, args, iface : Interface, parent_repo : RegistryRepository, *, pool=None, manifest=None, database=None):
+        super().__init__(args, iface, parent_repo, pool=pool, manifest=manifest, database=database)
         akdesc = iface
         # Patch _target_arch since affine kernel may not support all arches.
         self._target_arch = { arch: gpus for arch, gpus in self._target_arch.items() if arch in akdesc.SUPPORTED_ARCH }
@@ -41,18 +41,30 @@ class AffineGenerator(InterfaceGenerator):
     '''
     def create_sub_generator(self, functional : Functional, df : 'pandas.DataFrame', sql : str):
         akdesc = functional.meta_object
-        if akdesc.is_functional_disabled(functional):
-            log(lambda : f'Functional {functional.godel_number=} disabled in affine kernel {akdesc.NAME}')
+        selected = self.select_affine_kernels(functional)
+        if selected is None:
             use_this_functional = False
             return None, use_this_functional
         use_this_functional = True
+        df, dkarg = selected
+        capgen = AffineCapabilityGenerator(self._args, akdesc, functional, df, dkarg, self._this_repo)
+        return capgen, use_this_functional
+
+    '''
+    Returns (df, dkarg) of the affine kernels of the Functional, or None if
+    the Functional is not used. Also used by --plan.
+    '''
+    @staticmethod
+    def select_affine_kernels(functional : Functional):
+        akdesc = functional.meta_object
+        if akdesc.is_functional_disabled(functional):
+            log(lambda : f'Functional {functional.godel_number=} disabled in affine kernel {akdesc.NAME}')
+            return None
         log(lambda : f'Translating Functional with godel number {functional.godel_number}')
         df, dkarg = akdesc.translate_empty_dataframe(functional)
         if df.empty:
-            use_this_functional = False
-            return None, use_this_functional
-        capgen = AffineCapabilityGenerator(self._args, akdesc, functional, df, dkarg, self._this_repo)
-        return capgen, use_this_functional
+            return None
+        return df, dkarg
 
     def write_shim_header(self, functionals, fout):
         akdesc = self._iface
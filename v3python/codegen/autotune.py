@@ -11,6 +11,7 @@ from ..utils import (
     LazyFile,
     dict2json,
     log,
+    profiler,
 )
 from .common import (
     codegen_struct_cfields,
@@ -19,9 +20,31 @@ from .common import (
     hsaco_dir,
 )
 from .basetune import BaseTuneCodeGenerator
+from ..compiler.ledger import open_ledger, DEFAULT_LEDGER
+from ..compiler.amdgpu_meta import resource_fields
 import json
 import numpy as np
 
+'''
+Skip kernels that spill or have low occupancy in the second pass of tuning
+builds, before the tuner benchmarks them on GPUs.
+Resource fields missing from the record are read from the HSACO.
+'''
+def hsaco_worth_tuning(args, hsaco, record):
+    max_spills = args.build_for_tuning_max_spills
+    min_occupancy = args.build_for_tuning_min_occupancy
+    if max_spills < 0 and min_occupancy <= 0:
+        return True
+    if 'occupancy' not in record:
+        record = resource_fields(hsaco.read_bytes())
+        if not record:
+            return True
+    if max_spills >= 0 and record['vgpr_spill_count'] + record['sgpr_spill_count'] > max_spills:
+        return False
+    if min_occupancy > 0 and record['occupancy'] is not None and record['occupancy'] < min_occupancy:
+        return False
+    return True
+
 class AutotuneCodeGenerator(BaseTuneCodeGenerator):
     AUTOTUNE_TEMPLATE = get_template('autotune_table_entry.cc')
 
@@ -36,30 +59,9 @@ class AutotuneCodeGenerator(BaseTuneCodeGenerator):
                  parent_repo):
         super().__init__(args, f, dataframe_for_tuning, parent_repo)
         self._sql = sql
-        # TODO: support other binning algorithm
         kdesc = self._f.meta_object
-        if args.build_for_tuning or self._df is None or self._df.empty:
-            log(lambda : f'translate_empty_dataframe for kernel {kdesc.NAME}')
-            self._lut_tensor, self._sigs, self._binning_dict = kdesc.translate_empty_dataframe(f)
-            # Replace sigs with configs from KernelDescription.gen_autotune_configs
-            if args.build_for_tuning and kdesc.is_tunable:
-                self._sigs = list(kdesc.gen_signatures_for_tuning(f))
-                if args.build_for_tuning_second_pass:
-                    image_path = hsaco_dir(args.build_dir, kdesc)
-                    def hsaco_compile_successful(ksig : KernelSignature):
-                        full = image_path / hsaco_filename(kdesc, ksig)
-                        if not full.exists():
-                            return False
-                        meta = full.with_suffix('.json')
-                        if not meta.exists():
-                            return False
-                        with open(meta) as f:
-                            j = json.load(f)
-                            return j['compile_status'] == 'Complete'
-                    self._sigs = [ ksig for ksig in self._sigs if hsaco_compile_successful(ksig) ]
-        else:
-            log(lambda : f'translate_dataframe for kernel {kdesc.NAME}')
-            self._lut_tensor, self._sigs, self._binning_dict = kdesc.translate_dataframe(f, self._df)
+        self._lut_tensor, self._sigs, self._binning_dict = self.select_signatures(args, f, self._df)
+        if not self.use_empty_dataframe(args, self._df):
             if not kdesc.sancheck_lut_tensor(f, self._lut_tensor):
                 ent = MissingLutEntry(f, self._lut_tensor)
                 if args._should_raise_for_lut(f):
@@ -69,12 +71,54 @@ class AutotuneCodeGenerator(BaseTuneCodeGenerator):
                         print(kdesc.NAME, "TUNE_FLASH --entry_from_json Item: ", j)
         assert all([isinstance(k, KernelSignature)] for k in self._sigs)
 
+    @staticmethod
+    def use_empty_dataframe(args, df):
+        return args.build_for_tuning or df is None or df.empty
+
+    '''
+    Returns (lut_tensor, sigs, binning_dict) of Functional f.
+    Also used by --plan to count the HSACO rules.
+    '''
+    @staticmethod
+    def select_signatures(args, f : Functional, df : 'pandas.DataFrame | None'):
+        # TODO: support other binning algorithm
+        kdesc = f.meta_object
+        if not AutotuneCodeGenerator.use_empty_dataframe(args, df):
+            log(lambda : f'translate_dataframe for kernel {kdesc.NAME}')
+            with profiler.span('translate_dataframe'):
+                return kdesc.translate_dataframe(f, df)
+        log(lambda : f'translate_empty_dataframe for kernel {kdesc.NAME}')
+        lut_tensor, sigs, binning_dict = kdesc.translate_empty_dataframe(f)
+        # Replace sigs with configs from KernelDescription.gen_autotune_configs
+        if args.build_for_tuning and kdesc.is_tunable:
+            sigs = list(kdesc.gen_signatures_for_tuning(f))
+            if args.build_for_tuning_second_pass:
+                image_path = hsaco_dir(args.build_dir, kdesc)
+                ledger = open_ledger(args.build_dir / DEFAULT_LEDGER)
+                def hsaco_compile_successful(ksig : KernelSignature):
+                    full = image_path / hsaco_filename(kdesc, ksig)
+                    if not full.exists():
+                        return False
+                    # Fall back to the .json for HSACO files not in the ledger
+                    record = None if ledger is None else ledger.lookup(full)
+                    if record is None:
+                        meta = full.with_suffix('.json')
+                        if not meta.exists():
+                            return False
+                        with open(meta) as fin:
+                            record = { 'status' : json.load(fin)['compile_status'] }
+                    if record['status'] != 'Complete':
+                        return False
+                    return hsaco_worth_tuning(args, full, record)
+                sigs = [ ksig for ksig in sigs if hsaco_compile_successful(ksig) ]
+        return lut_tensor, sigs, binning_dict
+
     def generate(self):
         # Un "self._" section
         args = self._args
 
         log(lambda : f'Writing to {self._cc_file}')
-        with LazyFile(self._cc_file) as fout:
+        with self._parent_repo.open_output(self._cc_file, bundle=self.is_bundled) as fout:
             self.write_autotune_src(fout)
         hsaco_registry = self._parent_repo.get_hsaco_registry('hsaco')
         hsaco_registry.register(self._f, self.all_signatures)
@@ -82,7 +126,8 @@ class AutotuneCodeGenerator(BaseTuneCodeGenerator):
     def write_autotune_src(self, fout):
         f = self._f
         kdesc = f.meta_object
-        lut_ctype, lut_cshape, lut_cdata = self.codegen_format_lut(self._lut_tensor)
+        with profiler.span('codegen_format_lut'):
+            lut_ctype, lut_cshape, lut_cdata = self.codegen_format_lut(self._lut_tensor)
         # gpu_kernel_image_dir = args.build_dir / f.FAMILY / f'gpu_kernel_image.{f.NAME}'
         package_path = str(f.full_filepack_path)
         meta_hsacos = self.codegen_compact_kernels(kdesc,
@@ -111,7 +156,10 @@ class AutotuneCodeGenerator(BaseTuneCodeGenerator):
             'human_readable_signature' : f.human_readable_signature,
             'sql'                   : self._sql,
         }
-        print(self.AUTOTUNE_TEMPLATE.format_map(d), file=fout)
+        d.update(self.codegen_bundle_namespace())
+        with profiler.span('format_map'):
+            src = self.AUTOTUNE_TEMPLATE.format_map(d)
+        print(src, file=fout)
 
     def codegen_kernel_psels(self, ksigs):
         lines = []
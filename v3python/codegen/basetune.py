@@ -23,16 +23,44 @@ class BaseTuneCodeGenerator(ABC):
         self._parent_repo = parent_repo
         self._cc_file = self.get_cc_file(f)
 
+    '''
+    With --tu_bundle_size N, Functionals of the same arch are bundled by
+    godel_number // N, so a bundle only changes when its own Functionals change.
+    '''
     def get_cc_file(self, f):
         iface = self._f.meta_object
         tune_dir = self._args.build_dir / iface.FAMILY / f'{iface.TUNE_NAME}.{iface.NAME}'
         tune_dir.mkdir(parents=True, exist_ok=True)
+        if self.is_bundled:
+            bundle_number = f.godel_number // self._args.tu_bundle_size
+            return tune_dir / f'BUNDLE__{bundle_number}___{f.arch}.cc'
         return tune_dir / (f.tunecc_signature + '.cc')
 
     @property
     def cc_file(self):
         return self._cc_file
 
+    @property
+    def is_bundled(self):
+        return self._args.tu_bundle_size > 1
+
+    '''
+    Entries of a bundle share one translation unit. Each entry wraps its
+    anonymous namespace in a named namespace, which is only visible to its
+    CURRENT_ENTRY_PUBLIC function.
+    Placeholders are empty if not bundled.
+    '''
+    def codegen_bundle_namespace(self):
+        if not self.is_bundled:
+            return { 'bundle_namespace_begin' : '', 'bundle_namespace_end' : '', 'bundle_namespace_using' : '' }
+        f = self._f
+        ns = f'Bundle_Entry__A{f.arch_number}__F{f.godel_number}'
+        return {
+            'bundle_namespace_begin'    : f'namespace {ns} {{\n',
+            'bundle_namespace_end'      : f'\n}} // namespace {ns}',
+            'bundle_namespace_using'    : f'\n    using namespace ::{ns};',
+        }
+
     @abstractmethod
     def generate(self):
         pass
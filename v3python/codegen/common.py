@@ -22,7 +22,8 @@ def codegen_struct_cfields(cfields, *, nalign):
     return ALIGN.join(rows)
 
 def codegen_includes(header_files):
-    includes = [f'#include "{fn}"' for fn in set(header_files)]
+    # dict.fromkeys removes duplicates in a deterministic order, unlike set()
+    includes = [f'#include "{fn}"' for fn in dict.fromkeys(header_files)]
     return '\n'.join(includes)
 
 class MissingLutEntry(Exception):
@@ -15,9 +15,11 @@ from .template import get_template
 from ..utils import (
     LazyFile,
     RegistryRepository,
+    profiler,
 )
 # from ..utils.is_tuning_enabled import is_tuning_on_for_kernel
 from ..database import Factories as DatabaseFactories
+from .parallel import generate_journaled, apply_result
 from ..gpu_targets import cluster_gpus
 
 class InterfaceGenerator(ABC):
@@ -25,8 +27,15 @@ class InterfaceGenerator(ABC):
     SOURCE_TEMPLATE = None  # get_template('shim.cc')
     PFX = None              # 'shim'/'op'
 
-    def __init__(self, args, iface : Interface, parent_repo : RegistryRepository):
+    '''
+    database: session shared by all generators, see RootGenerator.
+              Opened on demand if None.
+    '''
+    def __init__(self, args, iface : Interface, parent_repo : RegistryRepository, *, pool=None, manifest=None, database=None):
         self._args = args
+        self._pool = pool
+        self._manifest = manifest
+        self._database = database
         self._iface = iface
         # self._tuning = is_tuning_on_for_kernel(self._args, self._iface)
         self._target_gpus = args.target_gpus
@@ -43,11 +52,22 @@ class InterfaceGenerator(ABC):
     def this_repo(self):
         return self._this_repo
 
+    @property
+    def database(self):
+        if self._database is None:
+            self._database = DatabaseFactories.create_factory(self._args.build_dir,
+                                                              in_memory=self._args.db_in_memory)
+        return self._database
+
     @property
     def shim_files(self):
         return self._shim_files
 
     def generate(self):
+        with profiler.span(self._iface.NAME, cat='interface'):
+            self._generate()
+
+    def _generate(self):
         # Un "self._" section
         args = self._args
         iface = self._iface
@@ -56,19 +76,21 @@ class InterfaceGenerator(ABC):
         all_functionals = []
 
         # autotune phase
-        fac = DatabaseFactories.create_factory(args.build_dir)
-        # print(f'{iface.__class__=}')
-        for functional in iface.gen_functionals(self._target_arch):
-            # print(f'{functional=}')
-            df, sql = fac.create_view(functional)
-            # print(f'KernelShimGenerator.generate {df=}')
-            subg, use_this_functional = self.create_sub_generator(functional, df, sql)
-            if subg is not None:
-                subg.generate()
-                if subg.cc_file:
-                    self._shim_files.append(subg.cc_file)
-            if use_this_functional:
-                all_functionals.append(functional)
+        if self._pool is None and self._manifest is None:
+            fac = self.database
+            # print(f'{iface.__class__=}')
+            for functional in self.gen_functionals():
+                cc_file, use_this_functional = self.generate_functional(fac, functional)
+                self._add_cc_file(cc_file)
+                if use_this_functional:
+                    all_functionals.append(functional)
+        else:
+            for functional, result in self._generate_journaled():
+                self._add_cc_file(result.cc_file)
+                if result.use_this_functional:
+                    all_functionals.append(functional)
+        with profiler.span('write_bundles'):
+            self._this_repo.write_bundles()
 
         # Skip re-generation of shim files
         if args.build_for_tuning_second_pass:
@@ -81,16 +103,96 @@ class InterfaceGenerator(ABC):
         shim_path.mkdir(parents=True, exist_ok=True)
         shim_fn = self.PFX + '.' + iface.NAME + '.h'
         fullfn = shim_path / shim_fn
-        with LazyFile(fullfn) as fout:
+        with profiler.span('write_shim_header'), LazyFile(fullfn) as fout:
             self.write_shim_header(all_functionals, fout)
         # Note: should always generate the .cc file regardless
         # AOTRITON_TARGET_ARCH has affine kernel, otherwise member functions of
         # affine kernel context will be undefined
-        with LazyFile(fullfn.with_suffix('.cc')) as fout:
+        with profiler.span('write_shim_source'), LazyFile(fullfn.with_suffix('.cc')) as fout:
             self.write_shim_source(all_functionals, fout)
         self._shim_files.append(fullfn)
         self._shim_files.append(fullfn.with_suffix('.cc'))
 
+    def gen_functionals(self):
+        yield from self._iface.gen_functionals(self._target_arch)
+
+    # Functionals in the same bundle share the cc file
+    def _add_cc_file(self, cc_file):
+        if cc_file and cc_file not in self._shim_files:
+            self._shim_files.append(cc_file)
+
+    '''
+    Generate the autotune/optune code of a single Functional.
+    repo overrides self._this_repo, which allows parallel and incremental
+    generation to record the registrations (see parallel.py)
+    view: (df, sql) if fac.create_view(functional) was already called
+    '''
+    def generate_functional(self, fac, functional : Functional, repo=None, view=None):
+        this_repo = self._this_repo
+        if repo is not None:
+            self._this_repo = repo
+        try:
+            with profiler.span(functional.tunecc_signature, cat='functional', interface=self._iface.NAME):
+                # print(f'{functional=}')
+                df, sql = view if view is not None else fac.create_view(functional)
+                # print(f'KernelShimGenerator.generate {df=}')
+                with profiler.span('create_sub_generator'):
+                    subg, use_this_functional = self.create_sub_generator(functional, df, sql)
+                cc_file = None
+                if subg is not None:
+                    with profiler.span('codegen'):
+                        subg.generate()
+                    cc_file = subg.cc_file
+        finally:
+            self._this_repo = this_repo
+        return cc_file, use_this_functional
+
+    '''
+    Generate Functionals through RegistryJournal, used by --jobs and the manifest.
+    Functionals whose digests are found in the manifest are replayed directly,
+    the remaining ones are generated by the pool, or in this process.
+    Yields (functional, FunctionalResult) in the order of gen_functionals()
+    '''
+    def _generate_journaled(self):
+        functionals = list(self.gen_functionals())
+        fac = self.database
+        manifest = self._manifest
+        cached = {}
+        views = {}
+        digests = {}
+        pending = []
+        for findex, functional in enumerate(functionals):
+            if manifest is not None:
+                with profiler.span('manifest_lookup'):
+                    selection = fac.select(functional)
+                    digest = manifest.digest(functional, selection)
+                    result = manifest.load(functional, digest)
+                if result is not None and result.findex == findex:
+                    cached[findex] = result
+                    continue
+                digests[findex] = digest
+                # Workers call create_view by themselves
+                if self._pool is None:
+                    results, sql = selection
+                    views[findex] = (None if results is None else results.to_dataframe(), sql)
+            pending.append(findex)
+        if self._pool is not None:
+            fresh = self._pool.generate(self, pending)
+        else:
+            fresh = (generate_journaled(self, fac, functionals, findex, view=views.pop(findex, None))
+                     for findex in pending)
+        for findex, functional in enumerate(functionals):
+            if findex in cached:
+                result = cached[findex]
+            else:
+                result = next(fresh)
+                assert result.findex == findex
+                if manifest is not None:
+                    manifest.store(digests[findex], result)
+            with profiler.span('apply_result'):
+                apply_result(self._this_repo, functionals, result)
+            yield functional, result
+
     @abstractmethod
     def create_sub_generator(self, functional : Functional):
         pass
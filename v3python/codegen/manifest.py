@@ -0,0 +1,202 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Content-addressed manifest for incremental generation
+#
+# Each Functional is keyed by the digest of everything its autotune/optune
+# code depends on:
+#   * The generator itself (v3python/ except rules/, plus codegen templates)
+#   * Source of the rules module that defines the Interface, and the rules
+#     modules it imports
+#   * Pruning rule file of the Interface, if any
+#   * CLI arguments and AOTRITON_* environment variables
+#   * The selected tuning database rows and the SQL comment text
+# The object stored under the digest is the FunctionalResult of
+# parallel.generate_journaled, i.e., the registrations and the outputs with
+# placeholders. Replaying it is equivalent to re-running the code generation.
+#
+# Layout under build_dir:
+#   .aotriton_manifest/index.json         tunecc key -> digest of the last run
+#   .aotriton_manifest/objects/ab/abcd... pickled FunctionalResult
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+import sys
+import zlib
+from pathlib import Path
+from ..utils import log, profiler
+
+MANIFEST_VERSION = 2
+MANIFEST_DIR = '.aotriton_manifest'
+
+# Arguments that do not change the generated code
+_IGNORED_ARGS = ['jobs', 'verbose', 'no_manifest', 'profile', 'db_in_memory', 'plan', 'plan_ledger', 'reproducible', 'compile_order',
+                 'ninja', 'ninja_compile_jobs', 'ninja_timeout', 'ninja_triton_cache_dir', 'ninja_git_sha1', 'ninja_aks3', 'ninja_aks3_block_size']
+
+_V3PYTHON_DIR = Path(__file__).resolve().parent.parent
+_RULES_DIR = _V3PYTHON_DIR / 'rules'
+_TEMPLATE_DIR = Path(__file__).resolve().parent / 'template'
+
+def _blake2b():
+    return hashlib.blake2b(digest_size=20)
+
+def _hash_files(h, files):
+    for fn in sorted(files):
+        h.update(fn.relative_to(_V3PYTHON_DIR).as_posix().encode())
+        h.update(b'\0')
+        h.update(fn.read_bytes())
+        h.update(b'\0')
+
+'''
+Files under v3python/rules imported by the given module, including itself
+'''
+def _rules_closure(module_file : Path):
+    closure = set()
+    pending = [module_file.resolve()]
+    while pending:
+        fn = pending.pop()
+        if fn in closure or not fn.is_file():
+            continue
+        closure.add(fn)
+        tree = ast.parse(fn.read_text(), filename=str(fn))
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.ImportFrom):
+                continue
+            if node.level > 0:
+                base = fn.parent
+                for _ in range(node.level - 1):
+                    base = base.parent
+            elif node.module and node.module.startswith('v3python.'):
+                base = _V3PYTHON_DIR.parent
+            else:
+                continue
+            parts = node.module.split('.') if node.module else []
+            target = base.joinpath(*parts)
+            candidates = [target.with_suffix('.py'), target / '__init__.py']
+            # from . import foo
+            candidates += [target / f'{alias.name}.py' for alias in node.names]
+            for c in candidates:
+                c = c.resolve()
+                if c.is_relative_to(_RULES_DIR):
+                    pending.append(c)
+    return closure
+
+class Manifest(object):
+    def __init__(self, args):
+        self._root = args.build_dir / MANIFEST_DIR
+        self._verbose = args.verbose
+        self._objects = self._root / 'objects'
+        self._index = {}
+        self._rules_digests = {}
+        self._pruning_digests = {}
+        self._hits = 0
+        self._misses = 0
+        h = _blake2b()
+        h.update(f'MANIFEST_VERSION={MANIFEST_VERSION}\0'.encode())
+        generator_files = [ fn for fn in _V3PYTHON_DIR.rglob('*.py') if not fn.is_relative_to(_RULES_DIR) ]
+        generator_files += [ fn for fn in _TEMPLATE_DIR.rglob('*') if fn.is_file() ]
+        _hash_files(h, generator_files)
+        public_args = { k : v for k, v in vars(args).items() if not k.startswith('_') and k not in _IGNORED_ARGS }
+        h.update(repr(sorted(public_args.items())).encode())
+        envs = { k : v for k, v in os.environ.items() if k.startswith('AOTRITON_') }
+        h.update(repr(sorted(envs.items())).encode())
+        self._common_digest = h.digest()
+
+    def _rules_digest(self, iface):
+        module_file = Path(sys.modules[type(iface).__module__].__file__)
+        if module_file not in self._rules_digests:
+            h = _blake2b()
+            _hash_files(h, _rules_closure(module_file))
+            self._rules_digests[module_file] = h.digest()
+        return self._rules_digests[module_file]
+
+    def _pruning_digest(self, iface):
+        path = getattr(iface, 'pruning_rules_path', None)
+        if path is None:
+            return b''
+        if path not in self._pruning_digests:
+            h = _blake2b()
+            if path.is_file():
+                h.update(path.read_bytes())
+            self._pruning_digests[path] = h.digest()
+        return self._pruning_digests[path]
+
+    '''
+    selection: (QueryResults, sql) returned by database Factory.select
+    '''
+    def digest(self, functional, selection) -> str:
+        results, sql = selection
+        h = _blake2b()
+        h.update(self._common_digest)
+        h.update(self._rules_digest(functional.meta_object))
+        h.update(self._pruning_digest(functional.meta_object))
+        # Interfaces defined in the same rules module may share tunecc_signature
+        iface = functional.meta_object
+        h.update(f'{type(iface).__qualname__}\0{self.index_key(functional)}\0'.encode())
+        h.update(sql.encode())
+        h.update(b'\0')
+        if results is None:
+            h.update(b'None')
+        else:
+            h.update(repr(results.col_names).encode())
+            h.update(repr(results.rows).encode())
+        return h.hexdigest()
+
+    def _object_path(self, digest):
+        return self._objects / digest[:2] / digest
+
+    @staticmethod
+    def index_key(functional):
+        iface = functional.meta_object
+        return f'{iface.FAMILY}/{iface.NAME}/{functional.tunecc_signature}'
+
+    '''
+    Returns the stored FunctionalResult, or None
+    '''
+    def load(self, functional, digest):
+        self._index[self.index_key(functional)] = digest
+        fn = self._object_path(digest)
+        try:
+            result = pickle.loads(zlib.decompress(fn.read_bytes()))
+        except FileNotFoundError:
+            self._misses += 1
+            profiler.count('manifest_misses')
+            return None
+        except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError):
+            log(lambda : f'Corrupted manifest object {fn}')
+            self._misses += 1
+            profiler.count('manifest_misses')
+            return None
+        self._hits += 1
+        profiler.count('manifest_hits')
+        return result
+
+    def store(self, digest, result):
+        fn = self._object_path(digest)
+        fn.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fn.with_suffix('.tmp')
+        tmp.write_bytes(zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(tmp, fn)
+
+    '''
+    Write index.json and remove objects not referenced by this run
+    '''
+    def save(self):
+        self._root.mkdir(parents=True, exist_ok=True)
+        tmp = self._root / 'index.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({ 'version' : MANIFEST_VERSION, 'functionals' : self._index }, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._root / 'index.json')
+        live = set(self._index.values())
+        if self._objects.is_dir():
+            for fn in self._objects.glob('*/*'):
+                if fn.name not in live:
+                    fn.unlink()
+        summary = f'Incremental generation: {self._hits} Functionals reused, {self._misses} regenerated'
+        if self._verbose:
+            print(summary)
+        else:
+            log(summary)
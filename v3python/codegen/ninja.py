@@ -0,0 +1,197 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Self-contained ninja file of the GPU kernel build (kernels.ninja)
+#
+# Alternative to the one add_custom_command per line of Bare.compile and
+# Bare.cluster in v3src/CMakeLists.txt, which makes the CMake configure time
+# grow with the number of kernels. The graph is the same:
+#   Bare.compile:   <hsaco> | <json> : compile <triton source>
+#                   Compile jobs share the 'compile' pool. The Triton
+#                   modules imported by the source are read from the depfile
+#                   written by compile.py --depfile.
+#   Bare.cluster:   <aks2> : pack <hsaco>... | <json>...
+#   Affine.cluster: <aks2> : pack_affine <co>...
+#   <images>/<arch>/__signature__ : copy __signature__.json || <aks2 of arch>
+# Both compile and pack rules use restat, so unchanged outputs do not
+# trigger the work downstream.
+
+import os
+import shlex
+import sys
+from pathlib import Path
+
+NINJA_FILE = 'kernels.ninja'
+IMAGE_DIR = 'aotriton.images'
+SIGNATURE_FILE = '__signature__.json'
+COMPILE_POOL = 'compile'
+
+def escape(s):
+    return str(s).replace('$', '$$')
+
+def escape_path(p):
+    return str(p).replace('$', '$$').replace(' ', '$ ').replace(':', '$:')
+
+def quote(s):
+    return escape(shlex.quote(str(s)))
+
+'''
+Minimal writer of the ninja syntax. Lines are not wrapped.
+'''
+class NinjaWriter(object):
+    def __init__(self, fout):
+        self._fout = fout
+
+    def comment(self, text):
+        for line in text.splitlines():
+            print(f'# {line}', file=self._fout)
+
+    def newline(self):
+        print('', file=self._fout)
+
+    def variable(self, key, value, indent=0):
+        print(f'{"  " * indent}{key} = {value}', file=self._fout)
+
+    def pool(self, name, depth):
+        print(f'pool {name}', file=self._fout)
+        self.variable('depth', depth, indent=1)
+
+    def rule(self, name, command, description=None, **kwargs):
+        print(f'rule {name}', file=self._fout)
+        self.variable('command', command, indent=1)
+        if description is not None:
+            self.variable('description', description, indent=1)
+        for key, value in kwargs.items():
+            self.variable(key, value, indent=1)
+
+    '''
+    Paths are escaped, variables are not
+    '''
+    def build(self, outputs, rule, inputs=(), implicit=(), order_only=(), implicit_outputs=(), variables=None):
+        line = ' '.join([ escape_path(o) for o in outputs ])
+        if implicit_outputs:
+            line += ' | ' + ' '.join([ escape_path(o) for o in implicit_outputs ])
+        line += f': {rule}'
+        if inputs:
+            line += ' ' + ' '.join([ escape_path(i) for i in inputs ])
+        if implicit:
+            line += ' | ' + ' '.join([ escape_path(i) for i in implicit ])
+        if order_only:
+            line += ' || ' + ' '.join([ escape_path(i) for i in order_only ])
+        print(f'build {line}', file=self._fout)
+        for key, value in (variables or {}).items():
+            self.variable(key, value, indent=1)
+
+    def default(self, targets):
+        print('default ' + ' '.join([ escape_path(t) for t in targets ]), file=self._fout)
+
+'''
+Writes kernels.ninja from the lines of Bare.compile, Bare.cluster and
+Affine.cluster, in the same order.
+'''
+class BuildNinjaGenerator(object):
+    def __init__(self, args):
+        self._args = args
+
+    @property
+    def build_dir(self):
+        return self._args.build_dir.absolute()
+
+    @property
+    def image_dir(self):
+        return self.build_dir / IMAGE_DIR
+
+    def _environment(self):
+        args = self._args
+        env = {}
+        if 'VIRTUAL_ENV' in os.environ:
+            env['VIRTUAL_ENV'] = os.environ['VIRTUAL_ENV']
+        triton_cache_dir = args.ninja_triton_cache_dir
+        if triton_cache_dir is None:
+            triton_cache_dir = self.build_dir.parent / 'triton-cache'
+        env['TRITON_CACHE_DIR'] = Path(triton_cache_dir).absolute()
+        env['TRITON_F32_DEFAULT'] = 'ieee'
+        env['TRITON_STORE_BINARY_ONLY'] = '1'
+        return 'env ' + ' '.join([ f'{k}={quote(v)}' for k, v in env.items() ])
+
+    def write(self, fout, compile_lines, cluster_lines, affine_lines):
+        args = self._args
+        root_dir = args.root_dir.absolute()
+        aks_module = 'v3python.aks3' if args.ninja_aks3 else 'v3python.aks2'
+        aks_options = f'--block_size {args.ninja_aks3_block_size}' if args.ninja_aks3 else ''
+        n = NinjaWriter(fout)
+        n.comment(f'Generated by v3python.generate --ninja. Build with ninja -f {NINJA_FILE}')
+        n.variable('ninja_required_version', '1.10')
+        n.variable('builddir', escape_path(self.build_dir))
+        n.variable('python', quote(sys.executable))
+        n.variable('compiler', quote(root_dir / 'v3python' / 'compile.py'))
+        n.variable('root_dir', quote(root_dir))
+        n.variable('env', self._environment())
+        n.variable('timeout', args.ninja_timeout)
+        n.variable('aks_module', aks_module)
+        n.variable('aks_options', aks_options)
+        n.newline()
+        n.pool(COMPILE_POOL, args.ninja_compile_jobs)
+        n.newline()
+        n.rule('compile',
+               '$env $python $compiler $src --kernel_name $kernel_name -o $out -g 1,1,1'
+               ' --num_warps $num_warps --num_stages $num_stages --waves_per_eu $waves_per_eu'
+               ' --target $target --signature $signature --timeout $timeout --depfile $out.d',
+               description='Compiling $out',
+               depfile='$out.d',
+               deps='gcc',
+               pool=COMPILE_POOL,
+               restat=1)
+        n.rule('pack',
+               'cd $root_dir && $python -m $aks_module -o $out $aks_options $pack_options -- $in',
+               description='Packing $out',
+               restat=1)
+        n.rule('copy',
+               '$python -c "import shutil, sys; shutil.copyfile(sys.argv[1], sys.argv[2])" $in $out',
+               description='Copying $out')
+        n.rule('image_signature',
+               f'cd $root_dir && $python -m v3python.write_image_signature {quote(self.build_dir)} {quote(args.ninja_git_sha1)} $out',
+               description='Writing $out')
+        n.newline()
+        hsacos = []
+        for line in compile_lines:
+            hsaco, src, kernel_name, num_warps, num_stages, waves_per_eu, arch, signature = line.rstrip('\n').split(';')
+            hsacos.append(hsaco)
+            n.build([hsaco], 'compile', [src],
+                    implicit_outputs=[str(Path(hsaco).with_suffix('.json'))],
+                    variables={
+                        'src' : quote(src),
+                        'kernel_name' : quote(kernel_name),
+                        'num_warps' : num_warps,
+                        'num_stages' : num_stages,
+                        'waves_per_eu' : waves_per_eu,
+                        'target' : quote(arch),
+                        'signature' : quote(signature),
+                    })
+        n.build(['compile'], 'phony', hsacos)
+        n.newline()
+        signature_file = self.build_dir / SIGNATURE_FILE
+        n.build([str(signature_file)], 'image_signature')
+        archives = []
+        arch_archives = {}
+        def add_clusters(lines, options):
+            for line in lines:
+                parts = line.rstrip('\n').split(';')
+                arch_dir, family, kernel, fonly = parts[:4]
+                objects = parts[4:]
+                aks2 = self.image_dir / arch_dir / family / kernel / f'{fonly}.aks2'
+                implicit = [] if options else [ str(Path(o).with_suffix('.json')) for o in objects ]
+                n.build([str(aks2)], 'pack', objects, implicit=implicit,
+                        variables={ 'pack_options' : options } if options else None)
+                archives.append(str(aks2))
+                arch_archives.setdefault(arch_dir, []).append(str(aks2))
+        add_clusters(cluster_lines, '')
+        add_clusters(affine_lines, '--ignore_json')
+        signatures = []
+        for arch_dir, aks in arch_archives.items():
+            arch_signature = self.image_dir / arch_dir / '__signature__'
+            n.build([str(arch_signature)], 'copy', [str(signature_file)], order_only=aks)
+            signatures.append(str(arch_signature))
+        n.build(['images'], 'phony', archives + signatures)
+        n.newline()
+        n.default(['images'])
@@ -14,6 +14,7 @@ from ..utils import (
     LazyFile,
     dict2json,
     log,
+    profiler,
 )
 
 class OptuneCodeGenerator(BaseTuneCodeGenerator):
@@ -29,7 +30,8 @@ class OptuneCodeGenerator(BaseTuneCodeGenerator):
         if self._df is None or self._df.empty:
             self._lut_tensor, self._backend_names, self._binning_dict = iface.translate_empty_dataframe(f)
         else:
-            self._lut_tensor, self._backend_names, self._binning_dict = iface.translate_dataframe(f, self._df)
+            with profiler.span('translate_dataframe'):
+                self._lut_tensor, self._backend_names, self._binning_dict = iface.translate_dataframe(f, self._df)
 
     @property
     def is_trivial(self):
@@ -43,13 +45,14 @@ class OptuneCodeGenerator(BaseTuneCodeGenerator):
         repo.register((functional.arch_number, functional.godel_number), mono_backend)
 
     def generate(self):
-        with LazyFile(self._cc_file) as fout:
+        with self._parent_repo.open_output(self._cc_file, bundle=self.is_bundled) as fout:
             self.write_optune_src(fout)
 
     def write_optune_src(self, fout):
         f = self._f
         iface = f.meta_object
-        lut_ctype, lut_cshape, lut_cdata = self.codegen_format_lut(self._lut_tensor)
+        with profiler.span('codegen_format_lut'):
+            lut_ctype, lut_cshape, lut_cdata = self.codegen_format_lut(self._lut_tensor)
         # gpu_kernel_image_dir = args.build_dir / f.FAMILY / f'gpu_kernel_image.{f.NAME}'
         package_path = str(f.full_filepack_path)
         d = {
@@ -65,5 +68,8 @@ class OptuneCodeGenerator(BaseTuneCodeGenerator):
             'deduplicated_lut_function' : self.codegen_deduplicated_lut_function(lut_ctype, lut_cshape),
             'human_readable_signature' : f.human_readable_signature,
         }
-        print(self.OPTUNE_TEMPLATE.format_map(d), file=fout)
+        d.update(self.codegen_bundle_namespace())
+        with profiler.span('format_map'):
+            src = self.OPTUNE_TEMPLATE.format_map(d)
+        print(src, file=fout)
 
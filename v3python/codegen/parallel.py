@@ -0,0 +1,182 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Fan out per-Functional code generation to a process pool
+#
+# Workers run InterfaceGenerator.generate_functional against a RegistryJournal
+# instead of the interface's RegistryRepository. The main process replays the
+# journals in the order of Interface.gen_functionals, hence the registries and
+# the generated files are byte-identical to the serial generation.
+
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from ..base import Functional
+from ..kernel.ksignature import KernelSignature
+from ..database import Factories as DatabaseFactories
+from ..utils import (
+    RegistryJournal,
+    resolve_placeholders,
+    log,
+    profiler,
+)
+
+CHUNK_SIZE = 16
+
+@dataclass
+class FunctionalRef:
+    index : int
+
+@dataclass
+class KernelSignatureRecipe:
+    findex : int
+    perfs : tuple   # (nth_choice, value) for each performance parameter
+    copts : tuple
+
+@dataclass
+class FunctionalResult:
+    findex : int
+    cc_file : 'Path | None'
+    use_this_functional : bool
+    entries : list
+    outputs : list
+
+def _all_interfaces():
+    from ..rules import (
+        kernels as triton_kernels,
+        operators as dispatcher_operators,
+        affine_kernels,
+    )
+    return list(dispatcher_operators) + list(triton_kernels) + list(affine_kernels)
+
+def _locate_interface(iface):
+    for i, candidate in enumerate(_all_interfaces()):
+        if candidate is iface:
+            return i
+    assert False, f'Interface {iface.UNTYPED_FULL_NAME} is not listed in v3python.rules'
+
+class _Encoder(object):
+    def __init__(self, functional, findex):
+        self._f = functional
+        self._findex = findex
+
+    def __call__(self, obj):
+        if isinstance(obj, tuple):
+            return tuple([self(o) for o in obj])
+        if isinstance(obj, list):
+            return [self(o) for o in obj]
+        if isinstance(obj, Functional):
+            assert obj is self._f
+            return FunctionalRef(self._findex)
+        if isinstance(obj, KernelSignature):
+            return self.encode_ksig(obj)
+        return obj
+
+    def encode_ksig(self, ksig):
+        assert ksig.functional() is self._f
+        kdesc = self._f.meta_object
+        perfs = []
+        for tp, bind in zip(kdesc.gen_performance_params(), ksig._perfs, strict=True):
+            assert bind.param_klass is tp
+            if bind.nth_choice is not None:
+                perfs.append((bind.nth_choice, None))
+            else:
+                perfs.append((None, bind.value.json_value))
+        return KernelSignatureRecipe(self._findex, tuple(perfs), tuple(ksig._copts))
+
+class _Decoder(object):
+    def __init__(self, functionals):
+        self._functionals = functionals
+
+    def __call__(self, obj):
+        if isinstance(obj, tuple):
+            return tuple([self(o) for o in obj])
+        if isinstance(obj, list):
+            return [self(o) for o in obj]
+        if isinstance(obj, FunctionalRef):
+            return self._functionals[obj.index]
+        if isinstance(obj, KernelSignatureRecipe):
+            return self.decode_ksig(obj)
+        return obj
+
+    def decode_ksig(self, recipe):
+        f = self._functionals[recipe.findex]
+        kdesc = f.meta_object
+        def create_bind(tp, nth, value):
+            return tp.create_nth(nth) if nth is not None else tp.create_direct(value)
+        binds = [ create_bind(tp, nth, value) for tp, (nth, value) in zip(kdesc.gen_performance_params(), recipe.perfs) ]
+        return KernelSignature(f, binds, list(recipe.copts))
+
+'''
+Generate a Functional against a RegistryJournal.
+view: (df, sql) if fac.create_view(functional) was already called
+'''
+def generate_journaled(gen, fac, functionals, findex, view=None):
+    functional = functionals[findex]
+    journal = RegistryJournal(encode=_Encoder(functional, findex))
+    cc_file, use_this_functional = gen.generate_functional(fac, functional, repo=journal, view=view)
+    return FunctionalResult(findex, cc_file, use_this_functional, journal.entries, journal.outputs)
+
+'''
+Replay the registrations of a FunctionalResult into repo, and write the outputs
+'''
+def apply_result(repo, functionals, result):
+    values = repo.replay(result.entries, _Decoder(functionals))
+    for text, path, bundle in result.outputs:
+        log(lambda : f'Writing to {path}')
+        with repo.open_output(path, bundle=bundle) as fout:
+            fout.write(resolve_placeholders(text, values))
+
+'''
+Per-process cache: (generator class, interface index) -> (generator, functionals)
+'''
+_WORKER_CACHE = {}
+# Database session of the worker process, shared by all cached generators
+_WORKER_DATABASE = None
+
+'''
+Returns (list of FunctionalResult, profiler records or None)
+'''
+def _generate_chunk(gen_class, iface_index, args, findices):
+    if args.profile:
+        profiler.enable()
+    global _WORKER_DATABASE
+    if _WORKER_DATABASE is None:
+        _WORKER_DATABASE = DatabaseFactories.create_factory(args.build_dir, in_memory=args.db_in_memory)
+    fac = _WORKER_DATABASE
+    key = (gen_class, iface_index)
+    if key not in _WORKER_CACHE:
+        iface = _all_interfaces()[iface_index]
+        gen = gen_class(args, iface, parent_repo=None, database=fac)
+        functionals = list(gen.gen_functionals())
+        _WORKER_CACHE[key] = (gen, functionals)
+    gen, functionals = _WORKER_CACHE[key]
+    results = [ generate_journaled(gen, fac, functionals, findex) for findex in findices ]
+    return results, profiler.take() if args.profile else None
+
+class FunctionalPool(object):
+    def __init__(self, args):
+        self._args = args
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ProcessPoolExecutor(max_workers=self._args.jobs)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+        self._executor = None
+
+    '''
+    Yields FunctionalResult of functionals[findex] for findex in findices, in
+    the same order. The results should be applied with apply_result.
+    '''
+    def generate(self, gen, findices):
+        iface_index = _locate_interface(gen._iface)
+        chunks = [ findices[begin:begin + CHUNK_SIZE] for begin in range(0, len(findices), CHUNK_SIZE) ]
+        futures = [ self._executor.submit(_generate_chunk, type(gen), iface_index, self._args, chunk)
+                    for chunk in chunks ]
+        for fut in futures:
+            results, records = fut.result()
+            if records is not None:
+                profiler.merge(*records)
+            yield from results
@@ -0,0 +1,257 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Build-cost planner, used by v3python.generate --plan
+#
+# Runs the Functional enumeration and database lookups of a normal generation,
+# and counts what the build would produce, without writing any generated file:
+#   * Functionals (enabled ones only), and the number excluded by the
+#     FUNCTIONAL_EXCLUSIONS of each Interface
+#   * Translation units: autotune/optune .cc per Functional (or per bundle
+#     with --tu_bundle_size), shim .cc per Interface
+#   * HSACO rules (lines of Bare.compile)
+#   * AKS2 archives (lines of Bare.cluster)
+# grouped by kernel, arch and BLOCK_DMODEL.
+#
+# If a compile ledger is available, the compile time of each HSACO is
+# estimated from the recorded durations. The ledger is written by
+# v3python/compile.py, see compiler/ledger.py for its format. The fields used
+# here are:
+#   {"hsaco": "<file name>", "kernel": "<NAME>", "arch": "<arch>", "duration": <seconds>}
+
+import json
+from collections import defaultdict
+from pathlib import Path
+from ..rules import (
+    kernels as triton_kernels,
+    operators as dispatcher_operators,
+    affine_kernels,
+)
+from ..gpu_targets import cluster_gpus
+from ..utils import profiler
+from ..compiler.ledger import CompileLedger, DEFAULT_LEDGER
+from .common import hsaco_filename
+from .autotune import AutotuneCodeGenerator
+from .affine import AffineGenerator
+
+'''
+Compile durations of a ledger, indexed for estimation.
+Lookup order: same HSACO file, then mean of (kernel, arch), then mean of kernel.
+'''
+class CompileDurationModel(object):
+    def __init__(self, records):
+        self._by_hsaco = {}
+        by_arch = defaultdict(list)
+        by_kernel = defaultdict(list)
+        for r in records:
+            duration = r.get('duration')
+            if duration is None:
+                continue
+            self._by_hsaco[r['hsaco']] = duration
+            by_arch[(r['kernel'], r['arch'])].append(duration)
+            by_kernel[r['kernel']].append(duration)
+        mean = lambda l : sum(l) / len(l)
+        self._by_arch = { k : mean(v) for k, v in by_arch.items() }
+        self._by_kernel = { k : mean(v) for k, v in by_kernel.items() }
+        self._nrecords = len(self._by_hsaco)
+
+    @staticmethod
+    def load(path : Path):
+        return CompileDurationModel(CompileLedger(path).records())
+
+    @property
+    def nrecords(self):
+        return self._nrecords
+
+    '''
+    Returns estimated seconds, or None if the kernel never appears in the ledger
+    '''
+    def estimate(self, kernel, arch, hsaco):
+        if hsaco in self._by_hsaco:
+            return self._by_hsaco[hsaco]
+        if (kernel, arch) in self._by_arch:
+            return self._by_arch[(kernel, arch)]
+        return self._by_kernel.get(kernel, None)
+
+class PlanGroup(object):
+    COUNTERS = ['functionals', 'hsaco', 'hsaco_estimated']
+
+    def __init__(self):
+        self.counts = { k : 0 for k in self.COUNTERS }
+        self.tus = set()
+        self.archives = set()
+        self.estimated_seconds = 0.0
+
+    def asdict(self, key):
+        d = dict(key)
+        d.update(self.counts)
+        d['tus'] = len(self.tus)
+        d['aks2_archives'] = len(self.archives)
+        d['estimated_seconds'] = round(self.estimated_seconds, 3)
+        return d
+
+class BuildPlanner(object):
+    def __init__(self, args, database):
+        self._args = args
+        self._database = database
+        self._target_arch = cluster_gpus(args.target_gpus)
+        self._groups = defaultdict(PlanGroup)
+        self._tus = set()
+        self._archives = set()
+        self._shim_tus = 0
+        self._disabled = 0
+        ledger = args.plan_ledger
+        if ledger is None and (args.build_dir / DEFAULT_LEDGER).is_file():
+            ledger = args.build_dir / DEFAULT_LEDGER
+        self._ledger = ledger
+        self._model = CompileDurationModel.load(ledger) if ledger is not None else None
+
+    @staticmethod
+    def _hdim(functional):
+        tc = functional.build_complete_tc_dict().get('BLOCK_DMODEL')
+        return None if tc is None else tc.triton_compile_signature
+
+    def _group(self, kind, iface, functional):
+        key = (('kind', kind),
+               ('family', iface.FAMILY),
+               ('name', iface.NAME),
+               ('arch', functional.arch),
+               ('BLOCK_DMODEL', self._hdim(functional)))
+        return self._groups[key]
+
+    # Same as BaseTuneCodeGenerator.get_cc_file
+    def _add_tu(self, g, iface, functional):
+        bundle_size = self._args.tu_bundle_size
+        if bundle_size > 1:
+            tu = (iface.NAME, functional.arch, functional.godel_number // bundle_size)
+        else:
+            tu = (iface.NAME, functional.tunecc_signature)
+        g.tus.add(tu)
+        self._tus.add(tu)
+
+    '''
+    Excluded Functionals are never created by gen_functionals, hence they
+    are counted from the size of the full product of the functional params
+    '''
+    def _count_excluded(self, iface):
+        enabled = iface.count_functionals(self._target_arch)
+        self._disabled += sum([ iface.enabled_functional_mask(arch).size - n for arch, n in enabled.items() ])
+
+    def plan(self):
+        for op in dispatcher_operators:
+            with profiler.span(op.NAME, cat='interface'):
+                self._plan_operator(op)
+        for k in triton_kernels:
+            with profiler.span(k.NAME, cat='interface'):
+                self._plan_kernel(k)
+        for ak in affine_kernels:
+            with profiler.span(ak.NAME, cat='interface'):
+                self._plan_affine(ak)
+        return self.report()
+
+    def _plan_operator(self, op):
+        self._shim_tus += 1
+        self._count_excluded(op)
+        for f in op.gen_functionals(self._target_arch):
+            g = self._group('operator', op, f)
+            g.counts['functionals'] += 1
+            df, _ = self._database.create_view(f)
+            if df is None or df.empty:
+                _, backend_names, _ = op.translate_empty_dataframe(f)
+            else:
+                _, backend_names, _ = op.translate_dataframe(f, df)
+            # Trivial optune is inlined into the shim (see OptuneCodeGenerator)
+            if len(backend_names) > 1:
+                self._add_tu(g, op, f)
+
+    def _plan_kernel(self, kdesc):
+        args = self._args
+        self._shim_tus += 1
+        self._count_excluded(kdesc)
+        for f in kdesc.gen_functionals(self._target_arch):
+            # Same as KernelShimGenerator.create_sub_generator
+            if kdesc.is_functional_disabled(f):
+                self._disabled += 1
+                continue
+            g = self._group('kernel', kdesc, f)
+            g.counts['functionals'] += 1
+            self._add_tu(g, kdesc, f)
+            if args.noimage_mode:
+                continue
+            df, _ = self._database.create_view(f)
+            _, sigs, _ = AutotuneCodeGenerator.select_signatures(args, f, df)
+            g.counts['hsaco'] += len(sigs)
+            g.archives.add(f.full_filepack_path)
+            self._archives.add(f.full_filepack_path)
+            if self._model is None:
+                continue
+            for ksig in sigs:
+                seconds = self._model.estimate(kdesc.NAME, f.arch, hsaco_filename(kdesc, ksig))
+                if seconds is not None:
+                    g.counts['hsaco_estimated'] += 1
+                    g.estimated_seconds += seconds
+
+    # Affine kernels are pre-compiled and consolidated into the affine shim
+    def _plan_affine(self, akdesc):
+        self._shim_tus += 1
+        self._count_excluded(akdesc)
+        for f in akdesc.gen_functionals(self._target_arch):
+            if AffineGenerator.select_affine_kernels(f) is None:
+                self._disabled += 1
+                continue
+            g = self._group('affine', akdesc, f)
+            g.counts['functionals'] += 1
+
+    def report(self):
+        groups = [ g.asdict(key) for key, g in self._groups.items() ]
+        totals = { k : sum([g[k] for g in groups]) for k in PlanGroup.COUNTERS }
+        totals['functionals_disabled'] = self._disabled
+        totals['tus'] = len(self._tus) + self._shim_tus
+        totals['shim_tus'] = self._shim_tus
+        totals['aks2_archives'] = len(self._archives)
+        if self._model is not None:
+            totals['estimated_cpu_hours'] = round(sum([g['estimated_seconds'] for g in groups]) / 3600.0, 3)
+        else:
+            totals['estimated_cpu_hours'] = None
+        return {
+            'target_gpus' : self._args.target_gpus,
+            'target_arch' : self._target_arch,
+            'ledger' : None if self._ledger is None else str(self._ledger),
+            'ledger_records' : 0 if self._model is None else self._model.nrecords,
+            'totals' : totals,
+            'groups' : groups,
+        }
+
+def format_plan(plan):
+    lines = []
+    hdr = f'{"Kind":<9} {"Kernel":<32} {"Arch":<8} {"HDim":>5} {"Funcs":>7} {"TUs":>7} {"HSACO":>8} {"AKS2":>6} {"Est.(h)":>8}'
+    lines.append(hdr)
+    for g in plan['groups']:
+        hdim = '-' if g['BLOCK_DMODEL'] is None else g['BLOCK_DMODEL']
+        aks2 = g['aks2_archives'] or '-'
+        est = f'{g["estimated_seconds"] / 3600:.2f}' if g['hsaco_estimated'] else '-'
+        lines.append(f'{g["kind"]:<9} {g["family"] + "/" + g["name"]:<32} {g["arch"]:<8} {hdim:>5} '
+                     f'{g["functionals"]:>7} {g["tus"]:>7} {g["hsaco"]:>8} {aks2:>6} {est:>8}')
+    t = plan['totals']
+    lines.append('')
+    lines.append(f'Functionals:        {t["functionals"]} ({t["functionals_disabled"]} disabled)')
+    lines.append(f'Translation units:  {t["tus"]} ({t["shim_tus"]} shims)')
+    lines.append(f'HSACO rules:        {t["hsaco"]}')
+    lines.append(f'AKS2 archives:      {t["aks2_archives"]}')
+    if t['estimated_cpu_hours'] is None:
+        lines.append('Compile time:       unknown, no compile ledger')
+    else:
+        lines.append(f'Compile time:       {t["estimated_cpu_hours"]:.2f} CPU-hours estimated from '
+                     f'{t["hsaco_estimated"]}/{t["hsaco"]} HSACO ({plan["ledger_records"]} ledger records)')
+    return '\n'.join(lines)
+
+'''
+Write the plan as JSON to path, and the text report to path + '.txt'
+'''
+def write_plan(plan, path : Path):
+    with open(path, 'w') as f:
+        json.dump(plan, f, indent=2)
+    text = format_plan(plan)
+    with open(str(path) + '.txt', 'w') as f:
+        print(text, file=f)
+    print(text)
@@ -3,6 +3,8 @@
 
 # Root of the Generation process
 
+import io
+from contextlib import contextmanager
 from pathlib import Path
 from collections import defaultdict
 from ..rules import (
@@ -13,10 +15,18 @@ from ..rules import (
 from .kernel import KernelShimGenerator
 from .affine import AffineGenerator
 from .operator import OperatorGenerator
+from .parallel import FunctionalPool
+from .manifest import Manifest
+from .plan import BuildPlanner, write_plan
+from .schedule import CompileScheduler, CompileCostModel, kernel_arguments_of
+from .ninja import BuildNinjaGenerator, NINJA_FILE
+from ..compiler.ledger import DEFAULT_LEDGER
+from ..database import Factories as DatabaseFactories
 from ..utils import (
     LazyFile,
     RegistryRepository,
     log,
+    profiler,
 )
 from .common import (
     hsaco_dir,
@@ -27,18 +37,46 @@ from ..gpu_targets import AOTRITON_ARCH_TO_DIRECTORY
 class RootGenerator(object):
     def __init__(self, args):
         self._args = args
+        # Lines of the list files, kept for --ninja
+        self._lists = {}
 
     def generate(self):
+        args = self._args
+        manifest = None
+        # Second pass depends on the compiled HSACO files, which are not tracked
+        if not args.no_manifest and not args.build_for_tuning_second_pass:
+            manifest = Manifest(args)
+        # One read-only session for all generators
+        with DatabaseFactories.create_factory(args.build_dir, in_memory=args.db_in_memory) as database:
+            if args.jobs > 1:
+                with FunctionalPool(args) as pool:
+                    self._generate(pool, manifest, database)
+            else:
+                self._generate(None, manifest, database)
+        if manifest is not None:
+            manifest.save()
+
+    '''
+    --plan: enumerate and query the database like generate(), but only write
+    the report
+    '''
+    def plan(self):
+        args = self._args
+        with DatabaseFactories.create_factory(args.build_dir, in_memory=args.db_in_memory) as database:
+            plan = BuildPlanner(args, database).plan()
+        write_plan(plan, args.plan)
+
+    def _generate(self, pool, manifest, database):
         args = self._args
         hsaco_for_kernels = []
         asms_for_kernels = []
         shims = []
         for op in dispatcher_operators:
-            opg = OperatorGenerator(self._args, op, parent_repo=None)
+            opg = OperatorGenerator(self._args, op, parent_repo=None, pool=pool, manifest=manifest, database=database)
             opg.generate()
             shims += opg.shim_files
         for k in triton_kernels:
-            ksg = KernelShimGenerator(self._args, k, parent_repo=None)
+            ksg = KernelShimGenerator(self._args, k, parent_repo=None, pool=pool, manifest=manifest, database=database)
             ksg.generate()
             hsacos = ksg.this_repo.get_data('hsaco')
             hsaco_for_kernels.append((k, hsacos))
@@ -49,7 +87,7 @@ class RootGenerator(object):
         # print(f'{affine_kernels=}')
         for ak in affine_kernels:
             log(lambda : f'{ak.__class__=}')
-            aksg = AffineGenerator(self._args, ak, parent_repo=None)
+            aksg = AffineGenerator(self._args, ak, parent_repo=None, pool=pool, manifest=manifest, database=database)
             aksg.generate()
             asms = aksg.this_repo.get_data('asms', return_none=True)
             if asms is not None:
@@ -59,7 +97,7 @@ class RootGenerator(object):
         if args.build_for_tuning_second_pass:
             return
 
-        with LazyFile(args.build_dir / 'Bare.shim') as shimfile:
+        with self._open_list(args.build_dir / 'Bare.shim') as shimfile:
             for shim in shims:
                 print(shim.absolute().as_posix(), file=shimfile)
         if args.noimage_mode:
@@ -68,7 +106,7 @@ class RootGenerator(object):
         #       Implemented this in
         #       Functional.filepack_signature (used by Functional.full_filepack_path)
         cluster_dict = defaultdict(list)
-        with LazyFile(args.build_dir / 'Bare.compile') as rulefile:
+        with profiler.span('write_bare_compile'), self._open_list(args.build_dir / 'Bare.compile', self._compile_order()) as rulefile:
             for kdesc, hsacos in hsaco_for_kernels:
                 image_path = hsaco_dir(args.build_dir, kdesc)
                 image_path.mkdir(parents=True, exist_ok=True)
@@ -82,7 +120,7 @@ class RootGenerator(object):
                     ffp = functional.full_filepack_path
                     aol = [self._absobjfn(image_path, kdesc, ksig) for ksig in signatures]
                     cluster_dict[ffp] += aol
-        with LazyFile(args.build_dir / 'Bare.cluster') as clusterfile:
+        with profiler.span('write_bare_cluster'), self._open_list(args.build_dir / 'Bare.cluster') as clusterfile:
             for ffp, aol in cluster_dict.items():
                 self.write_cluster(ffp, aol, clusterfile)
         '''
@@ -97,9 +135,54 @@ class RootGenerator(object):
         for akdesc, asm_registry in asms_for_kernels:
             for package_path, asms in asm_registry.items():
                 affine_dict[Path(package_path)] += [ self._absasmfn(asm) for asm in asms ]
-        with LazyFile(args.build_dir / 'Affine.cluster') as clusterfile:
+        with self._open_list(args.build_dir / 'Affine.cluster') as clusterfile:
             for ffp, aol in affine_dict.items():
-                self.write_cluster(ffp, list(set(aol)), clusterfile)
+                # Remove duplicates but keep the order, set() depends on PYTHONHASHSEED
+                self.write_cluster(ffp, list(dict.fromkeys(aol)), clusterfile)
+        if args.ninja:
+            with profiler.span('write_ninja'), LazyFile(args.build_dir / NINJA_FILE) as fout:
+                BuildNinjaGenerator(args).write(fout,
+                                                self._lists['Bare.compile'],
+                                                self._lists['Bare.cluster'],
+                                                self._lists['Affine.cluster'])
+
+    '''
+    Open list files consumed by CMake (Bare.*, Affine.cluster).
+    With --reproducible, lines are sorted, so the file does not depend on the
+    order of generation.
+    order: optional function that reorders the list of lines, after sorting
+    With --ninja, the lines are also kept for kernels.ninja.
+    '''
+    @contextmanager
+    def _open_list(self, path, order=None):
+        if not self._args.reproducible and order is None and not self._args.ninja:
+            with LazyFile(path) as fout:
+                yield fout
+            return
+        buf = io.StringIO()
+        yield buf
+        lines = buf.getvalue().splitlines(keepends=True)
+        if self._args.reproducible:
+            lines = sorted(lines)
+        if order is not None:
+            with profiler.span('compile_order'):
+                lines = order(lines)
+        if self._args.ninja:
+            self._lists[path.name] = lines
+        with LazyFile(path) as fout:
+            fout.writelines(lines)
+
+    '''
+    --compile_order lpt: longest predicted compile first
+    '''
+    def _compile_order(self):
+        args = self._args
+        if args.compile_order != 'lpt':
+            return None
+        ledger = args.plan_ledger if args.plan_ledger is not None else args.build_dir / DEFAULT_LEDGER
+        scheduler = CompileScheduler(CompileCostModel.from_ledger(ledger),
+                                     kernel_arguments_of(triton_kernels))
+        return scheduler.order
 
     def _absobjfn(self, path, kdesc, ksig):
         full = path / hsaco_filename(kdesc, ksig)
@@ -0,0 +1,242 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Longest-processing-time-first (LPT) order of HSACO compile rules
+#
+# CMake creates the custom commands, and the build tool starts them, in the
+# order of Bare.compile. Starting the longest jobs first avoids builds that
+# end with a few multi-minute kernels running alone.
+#
+# The duration of each rule is predicted by, in order of preference:
+#   1. The measured duration of the same HSACO in the compile ledger
+#   2. A log-linear model fitted on the ledger, for kernels in the ledger
+#   3. A heuristic based on BLOCK_M/BLOCK_N, hdim, stages and features,
+#      scaled to the ledger durations when available
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+from ..compiler.ledger import CompileLedger, latest_records, IMAGE_DIR_PREFIX
+
+# Constexpr arguments of Triton kernels used as features
+FEATURE_ARGUMENTS = ['BLOCK_M', 'BLOCK_N', 'BLOCK_DMODEL', 'ENABLE_DROPOUT', 'CAUSAL_TYPE', 'BIAS_TYPE']
+
+# Relative compile cost of each kernel at BLOCK_M = BLOCK_N = hdim = 64, one
+# stage, without optional features
+HEURISTIC_KERNEL_COST = {
+    'attn_fwd' : 1.5,
+    'bwd_kernel_dk_dv' : 2.5,
+    'bwd_kernel_dq' : 2.0,
+    'bwd_kernel_fuse' : 4.0,
+}
+HEURISTIC_DEFAULT_COST = 0.5
+# Seconds of unit cost, before scaling to the ledger
+HEURISTIC_UNIT_SECONDS = 60.0
+
+# Fitting the model needs a few records more than its parameters
+MIN_TRAINING_RECORDS = 16
+RIDGE = 1e-3
+
+'''
+One line of Bare.compile
+    hsaco;source;triton_kernel_name;num_warps;num_stages;waves_per_eu;arch;triton_signature_string
+'''
+@dataclass
+class CompileRule:
+    line : str
+    hsaco : str
+    kernel : str
+    arch : str
+    num_warps : int
+    num_stages : int
+    waves_per_eu : int
+    arguments : dict = field(default_factory=dict)
+
+    @staticmethod
+    def parse(line, kernel_arguments):
+        parts = line.rstrip('\n').split(';')
+        hsaco = Path(parts[0])
+        dirname = hsaco.parent.name
+        kernel = dirname[len(IMAGE_DIR_PREFIX):] if dirname.startswith(IMAGE_DIR_PREFIX) else parts[2]
+        names = kernel_arguments.get(kernel, [])
+        values = [ v.strip() for v in parts[7].split(',') ] if len(parts) > 7 else []
+        arguments = { name : value for name, value in zip(names, values) if name in FEATURE_ARGUMENTS }
+        return CompileRule(line=line,
+                           hsaco=hsaco.name,
+                           kernel=kernel,
+                           arch=parts[6],
+                           num_warps=int(parts[3]),
+                           num_stages=int(parts[4]),
+                           waves_per_eu=int(parts[5]),
+                           arguments=arguments)
+
+    def integer(self, name, default):
+        try:
+            return int(self.arguments[name])
+        except (KeyError, ValueError):
+            return default
+
+    def flag(self, name):
+        v = self.arguments.get(name, '0')
+        return 0.0 if v in ['0', 'False', ''] else 1.0
+
+    @property
+    def features(self):
+        log2 = lambda v : math.log2(max(v, 1))
+        return [
+            log2(self.integer('BLOCK_M', 64)),
+            log2(self.integer('BLOCK_N', 64)),
+            log2(self.integer('BLOCK_DMODEL', 64)),
+            float(self.num_stages),
+            log2(self.num_warps),
+            float(self.waves_per_eu),
+            self.flag('ENABLE_DROPOUT'),
+            self.flag('CAUSAL_TYPE'),
+            self.flag('BIAS_TYPE'),
+        ]
+
+def heuristic_seconds(rule : CompileRule):
+    tile = rule.integer('BLOCK_M', 64) * rule.integer('BLOCK_N', 64) / (64 * 64)
+    hdim = rule.integer('BLOCK_DMODEL', 64) / 64
+    cost = HEURISTIC_KERNEL_COST.get(rule.kernel, HEURISTIC_DEFAULT_COST)
+    cost *= math.sqrt(tile) * math.sqrt(max(hdim, 0.25))
+    cost *= 1.0 + 0.75 * (rule.num_stages - 1)
+    cost *= 1.0 + 0.2 * rule.flag('ENABLE_DROPOUT') + 0.1 * rule.flag('CAUSAL_TYPE') + 0.1 * rule.flag('BIAS_TYPE')
+    return HEURISTIC_UNIT_SECONDS * cost
+
+'''
+Predicts compile durations of CompileRules from measured durations
+{hsaco file name: seconds}
+'''
+class CompileCostModel(object):
+    def __init__(self, durations : dict):
+        self._durations = durations
+        self._kernels = []
+        self._coef = None
+        self._scale = 1.0
+
+    @staticmethod
+    def from_ledger(path : Path):
+        durations = {}
+        ledger = CompileLedger(path)
+        if ledger.exists():
+            for r in latest_records(ledger.records()):
+                if r.get('duration') is not None:
+                    durations[r['hsaco']] = r['duration']
+        return CompileCostModel(durations)
+
+    def _design(self, rules):
+        X = np.zeros((len(rules), len(self._kernels) + len(rules[0].features)))
+        index = { k : i for i, k in enumerate(self._kernels) }
+        for row, rule in enumerate(rules):
+            X[row, index[rule.kernel]] = 1.0
+            X[row, len(self._kernels):] = rule.features
+        return X
+
+    '''
+    Fit the model on the rules with measured durations
+    '''
+    def fit(self, rules):
+        measured = [ r for r in rules if self._durations.get(r.hsaco, 0) > 0 ]
+        if not measured:
+            return self
+        ratios = sorted([ self._durations[r.hsaco] / heuristic_seconds(r) for r in measured ])
+        self._scale = ratios[len(ratios) // 2]
+        if len(measured) < MIN_TRAINING_RECORDS:
+            return self
+        self._kernels = sorted(set([ r.kernel for r in measured ]))
+        X = self._design(measured)
+        y = np.log([ self._durations[r.hsaco] for r in measured ])
+        # Ridge regression, since features can be constant within a build
+        A = X.T @ X + RIDGE * np.eye(X.shape[1])
+        self._coef = np.linalg.solve(A, X.T @ y)
+        return self
+
+    @property
+    def trained(self):
+        return self._coef is not None
+
+    '''
+    Returns [(seconds, source)] where source is 'ledger', 'model' or 'heuristic'
+    '''
+    def predict(self, rules):
+        predictions = [ None ] * len(rules)
+        modeled = []
+        for i, r in enumerate(rules):
+            if r.hsaco in self._durations:
+                predictions[i] = (self._durations[r.hsaco], 'ledger')
+            elif self.trained and r.kernel in self._kernels:
+                modeled.append(i)
+            else:
+                predictions[i] = (heuristic_seconds(r) * self._scale, 'heuristic')
+        if modeled:
+            seconds = np.exp(self._design([ rules[i] for i in modeled ]) @ self._coef)
+            for i, s in zip(modeled, seconds.tolist()):
+                predictions[i] = (s, 'model')
+        return predictions
+
+'''
+Returns the indices of durations in LPT order. Ties keep the original order.
+'''
+def lpt_order(durations):
+    return sorted(range(len(durations)), key=lambda i : -durations[i])
+
+'''
+Makespan of list scheduling on the given number of cores: each job, in
+order, starts on the first core that becomes idle.
+'''
+def simulate_makespan(durations, cores):
+    assert cores > 0
+    finish = [0.0] * min(cores, max(len(durations), 1))
+    heapq.heapify(finish)
+    for d in durations:
+        heapq.heappush(finish, heapq.heappop(finish) + d)
+    return max(finish)
+
+def makespan_lower_bound(durations, cores):
+    if not durations:
+        return 0.0
+    return max(sum(durations) / cores, max(durations))
+
+'''
+Schedules the lines of Bare.compile.
+kernel_arguments: { kernel NAME : ARGUMENTS of the Triton kernel }
+'''
+class CompileScheduler(object):
+    def __init__(self, model : CompileCostModel, kernel_arguments : dict):
+        self._model = model
+        self._kernel_arguments = kernel_arguments
+
+    def predict(self, lines):
+        rules = [ CompileRule.parse(line, self._kernel_arguments) for line in lines ]
+        if not rules:
+            return rules, []
+        return rules, self._model.fit(rules).predict(rules)
+
+    def order(self, lines):
+        _, predictions = self.predict(lines)
+        return [ lines[i] for i in lpt_order([ s for s, _ in predictions ]) ]
+
+    def report(self, lines, cores_list):
+        rules, predictions = self.predict(lines)
+        durations = [ s for s, _ in predictions ]
+        lpt = [ durations[i] for i in lpt_order(durations) ]
+        sources = {}
+        for _, source in predictions:
+            sources[source] = sources.get(source, 0) + 1
+        return {
+            'rules' : len(rules),
+            'predicted_cpu_hours' : round(sum(durations) / 3600, 3),
+            'sources' : sources,
+            'makespan' : [ {
+                'cores' : cores,
+                'lower_bound_hours' : round(makespan_lower_bound(durations, cores) / 3600, 3),
+                'original_order_hours' : round(simulate_makespan(durations, cores) / 3600, 3),
+                'lpt_order_hours' : round(simulate_makespan(lpt, cores) / 3600, 3),
+            } for cores in cores_list ],
+        }
+
+def kernel_arguments_of(kdescs):
+    return { k.NAME : list(k.ARGUMENTS) for k in kdescs }
@@ -14,7 +14,7 @@
 
 #define ARRAY_SIZE(array)  (sizeof(array) / sizeof(array[0]))
 
-namespace { // Anonymous namespace
+[[bundle_namespace_begin]]namespace { // Anonymous namespace
 
 using namespace std::literals::string_view_literals;
 
@@ -62,13 +62,13 @@ static [[lut_ctype]] lut[[lut_cshape]] =
 [[lut_data]]
 ;
 
-}; // End of anonymous namespace
+}; // End of anonymous namespace[[bundle_namespace_end]]
 
 namespace AOTRITON_NS::v3::[[kernel_family_name]]::autotune {
 
 // using AOTRITON_NS::v2::[[kernel_family_name]]::[[context_class_name]];
 
-void CURRENT_ENTRY_PUBLIC([[context_class_name]]& context, int mod_number) {
+void CURRENT_ENTRY_PUBLIC([[context_class_name]]& context, int mod_number) {[[bundle_namespace_using]]
 #if AOTRITON_BUILD_FOR_TUNING
     int preferred_index = context._has_preferred_kernel;
     context._total_number_of_kernels = kTotalNumKernels;
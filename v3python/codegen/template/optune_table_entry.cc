@@ -12,7 +12,7 @@
 
 #define ARRAY_SIZE(array)  (sizeof(array) / sizeof(array[0]))
 
-namespace { // Anonymous namespace
+[[bundle_namespace_begin]]namespace { // Anonymous namespace
 
 using namespace std::literals::string_view_literals;
 
@@ -20,11 +20,11 @@ static [[lut_ctype]] lut[[lut_cshape]] =
 [[lut_data]]
 ;
 
-}; // End of anonymous namespace
+}; // End of anonymous namespace[[bundle_namespace_end]]
 
 namespace AOTRITON_NS::v3::[[op_family_name]]::optune {
 
-void CURRENT_ENTRY_PUBLIC([[context_class_name]]& context, int mod_number) {
+void CURRENT_ENTRY_PUBLIC([[context_class_name]]& context, int mod_number) {[[bundle_namespace_using]]
     auto backend_index = [[deduplicated_lut_function]](*context.params, mod_number, lut);
     if (backend_index < 0) {
         return ;
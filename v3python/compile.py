@@ -1,31 +1,65 @@
-import binascii
-import hashlib
-import importlib.util
+import os
 import sys
+import tempfile
+import time
 from argparse import ArgumentParser
 from pathlib import Path
-from typing import List
 
-import shutil
-import subprocess
-from multiprocessing import Process, Queue
-import queue
-import json
-
-from triton.backends.compiler import GPUTarget
-
-KNOWN_TARGETS_64 = ['gfx90a', 'gfx942', 'gfx950']
-KNOWN_TARGETS_32 = ['gfx1100', 'gfx1101', 'gfx1102', 'gfx1201', 'gfx1200', 'gfx1151', 'gfx1150', 'gfx1250']
-
-KNOWN_TARGETS = {
-  arch : GPUTarget('hip', arch, 64) for arch in KNOWN_TARGETS_64
-}
-KNOWN_TARGETS.update({
-  arch : GPUTarget('hip', arch, 32) for arch in KNOWN_TARGETS_32
-})
+if __package__:
+    from .compiler import (
+        CompileJob,
+        CompileResult,
+        BACKENDS,
+        KNOWN_TARGETS_64,
+        KNOWN_TARGETS_32,
+        STATUS_COMPLETE,
+        STATUS_EXCEPTION,
+        STATUS_TIMEOUT,
+        STATUS_EXIT_WITH_ERROR,
+        STATUS_MEMORY_LIMIT,
+        create_backend,
+    )
+    from .compiler import client
+    from .compiler.cache import HsacoCache
+    from .compiler.depfile import source_dependencies, write_depfile
+    from .compiler.governor import MemoryGovernor, PeakRssModel
+    from .compiler.ledger import CompileLedger, default_ledger, make_record, open_ledger as open_indexed_ledger
+    from .compiler.pool import WorkerPool
+    from .compiler.worker import reset_peak_rss, read_peak_rss
+else:
+    # CMake executes this file as a script
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from v3python.compiler import (
+        CompileJob,
+        CompileResult,
+        BACKENDS,
+        KNOWN_TARGETS_64,
+        KNOWN_TARGETS_32,
+        STATUS_COMPLETE,
+        STATUS_EXCEPTION,
+        STATUS_TIMEOUT,
+        STATUS_EXIT_WITH_ERROR,
+        STATUS_MEMORY_LIMIT,
+        create_backend,
+    )
+    from v3python.compiler import client
+    from v3python.compiler.cache import HsacoCache
+    from v3python.compiler.depfile import source_dependencies, write_depfile
+    from v3python.compiler.governor import MemoryGovernor, PeakRssModel
+    from v3python.compiler.ledger import CompileLedger, default_ledger, make_record, open_ledger as open_indexed_ledger
+    from v3python.compiler.pool import WorkerPool
+    from v3python.compiler.worker import reset_peak_rss, read_peak_rss
+
+KNOWN_TARGETS = KNOWN_TARGETS_64 + KNOWN_TARGETS_32
 
 desc = """
 Triton ahead-of-time compiler:
+The job is sent to the compile server (v3python.compiler.server) if
+--server or AOTRITON_COMPILE_SERVER points to the socket of a running server,
+otherwise the kernel is compiled by this process.
+With --memory_budget, concurrent compile.py processes that share the same
+--governor_dir only start compiling when the predicted peak RSS of their
+kernels fits the budget. The prediction comes from the compile ledger.
 """
 
 def parse():
@@ -33,7 +67,7 @@ def parse():
     parser.add_argument("path",
                         help="Path to Python source containing desired kernel in its scope. File will be executed.")
     parser.add_argument("--target", type=str, default=None,
-                        choices=list(KNOWN_TARGETS.keys()),
+                        choices=KNOWN_TARGETS,
                         help="Ahead of Time (AOT) Compile Architecture. PyTorch is required for autodetection if --target is missing.")
     parser.add_argument("--kernel_name", "-n", type=str, default="", help="Name of the kernel to compile",
                         required=True)
@@ -47,143 +81,155 @@ def parse():
     parser.add_argument("--verbose", "-v", help="Enable vebose output", action='store_true')
     parser.add_argument("--nostrip", help="Keep debugging symbols", action='store_true')
     parser.add_argument("--timeout", type=float, default=0.0, help='Maximal time the compiler can run. Passing 0 for indefinite.')
+    parser.add_argument("--server", type=Path, default=os.getenv('AOTRITON_COMPILE_SERVER', None),
+                        help='Socket of the compile server. Defaults to environment variable AOTRITON_COMPILE_SERVER.')
+    parser.add_argument("--backend", type=str, default=os.getenv('AOTRITON_COMPILE_BACKEND', 'triton'),
+                        choices=list(BACKENDS.keys()),
+                        help='Compiler backend when compiling in this process. Defaults to environment variable AOTRITON_COMPILE_BACKEND or triton.')
+    parser.add_argument("--memory_limit", type=int, default=0,
+                        help='Address space limit of the compiling process in MiB, when --timeout is positive or --memory_budget is set. 0 for unlimited, or --memory_budget if set.')
+    parser.add_argument("--memory_budget", type=int, default=int(os.getenv('AOTRITON_COMPILE_MEMORY_BUDGET', 0)),
+                        help='Total memory in MiB of concurrent compilations. Defaults to environment variable AOTRITON_COMPILE_MEMORY_BUDGET. 0 to disable.')
+    parser.add_argument("--governor_dir", type=Path, default=os.getenv('AOTRITON_COMPILE_GOVERNOR_DIR', None),
+                        help='Directory of the state shared by concurrent compilations under --memory_budget. Defaults to environment variable AOTRITON_COMPILE_GOVERNOR_DIR, or the directory of the compile ledger.')
+    parser.add_argument("--cache_dir", type=Path, default=os.getenv('AOTRITON_HSACO_CACHE', None),
+                        help='HSACO cache directory, shared across build trees. Defaults to environment variable AOTRITON_HSACO_CACHE. Disabled if not set.')
+    parser.add_argument("--cache_size", type=int, default=int(os.getenv('AOTRITON_HSACO_CACHE_SIZE', 20480)),
+                        help='Maximal size of the HSACO cache in MiB. Defaults to environment variable AOTRITON_HSACO_CACHE_SIZE or 20480.')
+    parser.add_argument("--negative_ttl", type=float, default=24.0,
+                        help='Hours to keep failed compilations in the HSACO cache, during which they are not retried.')
+    parser.add_argument("--ledger", type=Path, default=os.getenv('AOTRITON_COMPILE_LEDGER', None),
+                        help='Compile ledger to append the result to. Defaults to environment variable AOTRITON_COMPILE_LEDGER, or compile_ledger.jsonl of the build directory that contains --out_path.')
+    parser.add_argument("--no_ledger", action='store_true', help='Do not record the result in the compile ledger.')
+    parser.add_argument("--depfile", type=Path, default=None,
+                        help='Write the Python sources the kernel depends on to this file, in Makefile syntax.')
     args = parser.parse_args()
     return args
 
-def do_compile(args):
-    import triton
-    out_path = args.out_path
-
-    # execute python sources and extract functions wrapped in JITFunction
-    arg_path = Path(args.path)
-    sys.path.insert(0, str(arg_path.parent))
-    '''
-    spec = importlib.util.spec_from_file_location(arg_path.stem, arg_path)
-    mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    kernel = getattr(mod, args.kernel_name)
-    '''
-    if True:
-        exec_string = f'import {arg_path.stem}'
-        # print(exec_string)
-        exec(exec_string, globals()) # importlib code path miss things
-        # print(globals())
-        # kernel = globals()[f"{arg_path.stem}.{args.kernel_name}"]
-        mod = globals()[arg_path.stem]
-        kernel = getattr(mod, args.kernel_name)
-
-    grid = args.grid.split(",")
-    assert len(grid) == 3
-
-    # validate and parse signature
-    signature = list(map(lambda s: s.strip(" "), args.signature.split(",")))
-
-    def hash_signature(signature: List[str]):
-        m = hashlib.sha256()
-        m.update(" ".join(signature).encode())
-        return m.hexdigest()[:8]
-
-    meta_sig = f"warps{args.num_warps}xstages{args.num_stages}"
-    sig_hash = hash_signature(signature + [meta_sig])
-
-    def constexpr(s):
-        try:
-            ret = int(s)
-            return ret
-        except ValueError:
-            pass
-        try:
-            ret = float(s)
-            return ret
-        except ValueError:
-            pass
-        if s == 'True':
-            return True
-        if s == 'False':
-            return False
+'''
+Returns the CompileResult from the server, or None if no server is reachable.
+'''
+def compile_remote(args, job):
+    if not args.server:
+        return None
+    try:
+        return client.submit(args.server, job)
+    except (FileNotFoundError, ConnectionRefusedError):
         return None
 
-    hints = {(i, ): constexpr(s.split(":")[1]) for i, s in enumerate(signature) if ":" in s}
-    hints = {k: v for k, v in hints.items() if v is not None}
-    constants = {kernel.arg_names[i]: constexpr(s) for i, s in enumerate(signature)}
-    constants = {k: v for k, v in constants.items() if v is not None}
-    for key, value in hints.items():
-        if value == 1:
-            constants[kernel.arg_names[key[0]]] = value
-    signature = {kernel.arg_names[i]: s.split(":")[0] for i, s in enumerate(signature)}
-    for key in constants:
-        signature[key] = 'constexpr'
-    const_sig = 'x'.join([str(v) for v in constants.values()])
-    doc_string = [f"{k}={v}" for k, v in constants.items()]
-    doc_string += [f"num_warps={args.num_warps}", f"num_stages={args.num_stages}"]
-
-    # compile ast into cubin
-    for h in hints.values():
-        assert h in [1, 8, 16], f"Only 1 and 16 are valid hints, got {h}"
-    attrs = {k: [("tt.divisibility", 16)] for k, v in hints.items() if v == 16}
-    attrs.update({k: [("tt.divisibility", 8)] for k, v in hints.items() if v == 8})
-    src = triton.compiler.ASTSource(fn=kernel, constexprs=constants, signature=signature, attrs=attrs)
-    target = KNOWN_TARGETS[args.target]
-    backend = triton.compiler.make_backend(target)
-    kwargs = {"num_warps": args.num_warps, "num_stages": args.num_stages, "waves_per_eu": args.waves_per_eu}
-    opts = backend.parse_options(kwargs)
-    ccinfo = triton.compile(src, target=target, options=opts.__dict__)
-
-    # import pdb; pdb.set_trace()
-    with open(out_path.with_suffix('.hsaco'), 'bw') as f:
-        f.write(ccinfo.kernel)
-    with open(out_path.with_suffix('.json'), 'w') as f:
-        di = ccinfo.metadata._asdict()
-        del di['target']  # Cannot be serialized to Json
-        di['compile_status'] = 'Complete'
-        json.dump(di, f, indent=2)
-    return out_path
+'''
+Address space limit of the compiling process in bytes, 0 for unlimited
+'''
+def memory_limit(args):
+    return (args.memory_limit or args.memory_budget) << 20
+
+def compile_local(args, job):
+    with WorkerPool(backend=args.backend, workers=1, memory_limit=memory_limit(args)) as pool:
+        return pool.run(job)
+
+def compile_direct(args, job):
+    reset_peak_rss()
+    tic = time.monotonic()
+    create_backend(args.backend).compile(job)
+    return CompileResult(status=STATUS_COMPLETE,
+                         duration=time.monotonic() - tic,
+                         peak_rss=read_peak_rss(),
+                         hsaco_size=job.hsaco_path.stat().st_size)
+
+def compile_job(args, job):
+    result = compile_remote(args, job)
+    if result is None:
+        # Memory limits can only be enforced on a child process
+        if args.timeout <= 0 and args.memory_budget <= 0:
+            return compile_direct(args, job)
+        result = compile_local(args, job)
+    return result
+
+def ledger_path(args):
+    path = args.ledger if args.ledger else default_ledger(args.out_path)
+    if path is None or not path.parent.is_dir():
+        return None
+    return path
 
-def ipc_compile(ipc_in, ipc_out):
-    args = ipc_in.get()
-    try:
-        out_path = do_compile(args)
-        ipc_out.put('Complete')
-    except Exception as e:
-        if args.verbose:
-            print(e)
-        ipc_out.put('Exception')
+def open_ledger(args):
+    if args.no_ledger:
+        return None
+    path = ledger_path(args)
+    return None if path is None else CompileLedger(path)
+
+'''
+Returns (governor, predicted peak RSS), or (None, 0) without --memory_budget
+'''
+def open_governor(args, job):
+    if args.memory_budget <= 0:
+        return None, 0
+    ledger = ledger_path(args)
+    directory = args.governor_dir
+    if directory is None:
+        if ledger is not None:
+            directory = ledger.parent
+        else:
+            directory = Path(tempfile.gettempdir()) / f'aotriton-governor-{os.getuid()}'
+    governor = MemoryGovernor(directory, args.memory_budget << 20)
+    model = PeakRssModel(None if ledger is None else open_indexed_ledger(ledger))
+    return governor, model.predict(job)
+
+'''
+Note: the compile server is assumed to use the same backend as --backend
+'''
+def open_cache(args):
+    if not args.cache_dir:
+        return None
+    return HsacoCache(args.cache_dir,
+                      fingerprint=BACKENDS[args.backend].fingerprint(),
+                      max_size=args.cache_size << 20,
+                      negative_ttl=args.negative_ttl * 3600.0)
 
 def main():
     # command-line arguments
     args = parse()
-    if args.timeout <= 0:
-        do_compile(args)
-        return
-    ipc_to_worker = Queue()
-    ipc_worker_out = Queue()
-    ipc_to_worker.cancel_join_thread()
-    ipc_worker_out.cancel_join_thread()
-    worker = Process(target=ipc_compile, args=(ipc_to_worker, ipc_worker_out))
-    worker.start()
-    ipc_to_worker.put(args)
-    worker.join(args.timeout * 60.0)
-    if worker.exitcode == 0:
-        status = ipc_worker_out.get()
-    elif worker.exitcode is None:
-        worker.kill()
-        status = 'Timeout'
-    else:
-        status = 'ExitWithError'
-    if status == 'Timeout':
+    job = CompileJob.from_args(args)
+    job.rlimit_as = memory_limit(args)
+    cache = open_cache(args)
+    ledger = open_ledger(args)
+    result = None if cache is None else cache.get(job)
+    cached = result is not None
+    if not cached:
+        governor, predicted = open_governor(args, job)
+        try:
+            if governor is None:
+                result = compile_job(args, job)
+            else:
+                with governor.reserve(predicted):
+                    result = compile_job(args, job)
+        except Exception:
+            if ledger is not None:
+                ledger.append(make_record(job, CompileResult(status=STATUS_EXCEPTION)))
+            raise
+        if cache is not None:
+            cache.put(job, result)
+    elif args.verbose:
+        print(f'Compiling {args.path=} {args.kernel_name} to {args.out_path=}: cached {result.status}')
+    if ledger is not None:
+        ledger.append(make_record(job, result, cached=cached))
+    if args.depfile is not None:
+        write_depfile(args.depfile, job.hsaco_path, source_dependencies(args.path))
+    status = result.status
+    if status == STATUS_TIMEOUT:
         print(f'Compiling {args.path=} {args.kernel_name} to {args.out_path=} timed out with {args.timeout} minutes',
               file=sys.stderr)
-    ipc_to_worker.close()
-    ipc_worker_out.close()
-    if args.verbose and status == 'ExitWithError':
-        print(f'Compiling {args.path=} {args.kernel_name} to {args.out_path=} result with status {status} exitcode {worker.exitcode}')
-    # Write an empty file to avoid errors
-    if status != 'Complete':
-        with open(args.out_path.with_suffix('.hsaco'), 'bw') as f:
-            pass
-        with open(args.out_path.with_suffix('.json'), 'w') as f:
-            d = {'compile_status': status}
-            json.dump(d, f, indent=2)
+    if status == STATUS_MEMORY_LIMIT:
+        print(f'Compiling {args.path=} {args.kernel_name} to {args.out_path=} exceeded the memory limit of {job.rlimit_as >> 20} MiB',
+              file=sys.stderr)
+    if args.verbose and result.message:
+        print(result.message)
+    if args.verbose and status == STATUS_EXIT_WITH_ERROR:
+        print(f'Compiling {args.path=} {args.kernel_name} to {args.out_path=} result with status {status} exitcode {result.exitcode}')
+    # Without timeout, compiling errors fail the build
+    # Resource failures are recorded like timeouts, and do not fail the build
+    if args.timeout <= 0 and status not in [STATUS_COMPLETE, STATUS_MEMORY_LIMIT]:
+        print(f'Compiling {args.path=} {args.kernel_name} to {args.out_path=} failed with status {status}', file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
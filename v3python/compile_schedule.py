@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import json
+import os
+from pathlib import Path
+from .rules import kernels as triton_kernels
+from .compiler.ledger import DEFAULT_LEDGER
+from .codegen.schedule import CompileScheduler, CompileCostModel, kernel_arguments_of
+from .utils import LazyFile
+
+desc = """
+Predict the compile duration of each rule in Bare.compile, and report the
+expected makespan on N cores for the current order and for the
+longest-processing-time-first (LPT) order. With --rewrite, reorder
+Bare.compile in LPT order, same as v3python.generate --compile_order lpt.
+"""
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--build_dir", type=Path, default=Path('build'), help="Build directory that contains Bare.compile")
+    p.add_argument("--ledger", type=Path, default=None, help=f"Compile ledger. Defaults to {DEFAULT_LEDGER} under --build_dir")
+    p.add_argument("--cores", type=int, nargs='+', default=[os.cpu_count()], help="Number of cores to simulate")
+    p.add_argument("--json", type=Path, default=None, help="Also write the report as JSON to this file")
+    p.add_argument("--rewrite", action='store_true', help="Rewrite Bare.compile in LPT order")
+    args = p.parse_args()
+    return args
+
+def format_report(report):
+    lines = []
+    sources = ', '.join([ f'{v} from {k}' for k, v in sorted(report['sources'].items()) ])
+    lines.append(f'{report["rules"]} rules, {report["predicted_cpu_hours"]:.2f} CPU-hours predicted ({sources})')
+    lines.append(f'{"Cores":>6} {"Bound(h)":>9} {"Current(h)":>11} {"LPT(h)":>9}')
+    for m in report['makespan']:
+        lines.append(f'{m["cores"]:>6} {m["lower_bound_hours"]:>9.2f} {m["original_order_hours"]:>11.2f} {m["lpt_order_hours"]:>9.2f}')
+    return '\n'.join(lines)
+
+def main():
+    args = parse()
+    ledger = args.ledger if args.ledger is not None else args.build_dir / DEFAULT_LEDGER
+    scheduler = CompileScheduler(CompileCostModel.from_ledger(ledger), kernel_arguments_of(triton_kernels))
+    rule_file = args.build_dir / 'Bare.compile'
+    with open(rule_file) as f:
+        lines = [ line for line in f if line.strip() ]
+    report = scheduler.report(lines, args.cores)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(format_report(report))
+    if args.rewrite:
+        with LazyFile(rule_file) as fout:
+            fout.writelines(scheduler.order(lines))
+
+if __name__ == '__main__':
+    main()
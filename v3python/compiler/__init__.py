@@ -0,0 +1,20 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+from .job import (
+    CompileJob,
+    CompileResult,
+    write_failure,
+    STATUS_COMPLETE,
+    STATUS_EXCEPTION,
+    STATUS_TIMEOUT,
+    STATUS_EXIT_WITH_ERROR,
+    STATUS_MEMORY_LIMIT,
+)
+from .backend import (
+    KNOWN_TARGETS_64,
+    KNOWN_TARGETS_32,
+    Backend,
+    BACKENDS,
+    create_backend,
+)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Static resource usage and occupancy of HSACO files
+#
+# AMDGPU code objects (v3 and later) carry the kernel metadata as a MessagePack
+# map in an ELF note named "AMDGPU". The register counts, LDS and scratch
+# sizes, spill counts and the wavefront size are read from it, and the
+# theoretical occupancy (waves per SIMD) is computed from HARDWARE_LIMITS.
+#
+# Only the standard library is used, since this module runs during the build,
+# where pyelftools and msgpack are not required.
+
+import argparse
+import json
+import math
+import struct
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+desc = """
+Print the register usage, spills and theoretical occupancy of HSACO files,
+read from the AMDGPU metadata note.
+"""
+
+EM_AMDGPU = 224
+SHT_NOTE = 7
+NT_AMDGPU_METADATA = 32
+NOTE_NAME = b'AMDGPU'
+
+_ELF_IDENT = struct.Struct('<4sBBBBBxxxxxxx')
+_ELF64_HEADER = struct.Struct('<HHIQQQIHHHHHH')
+_ELF64_SECTION = struct.Struct('<IIQQQQIIQQ')
+_NOTE_HEADER = struct.Struct('<III')
+
+'''
+Returns [(name, type, desc)] of all notes in SHT_NOTE sections.
+Raises ValueError if data is not a 64-bit little-endian AMDGPU ELF.
+'''
+def read_notes(data : bytes):
+    if len(data) < _ELF_IDENT.size + _ELF64_HEADER.size:
+        raise ValueError('Too short for an ELF file')
+    magic, elf_class, elf_data, _, _, _ = _ELF_IDENT.unpack_from(data, 0)
+    if magic != b'\x7fELF' or elf_class != 2 or elf_data != 1:
+        raise ValueError('Not a 64-bit little-endian ELF file')
+    header = _ELF64_HEADER.unpack_from(data, _ELF_IDENT.size)
+    e_machine, e_shoff, e_shentsize, e_shnum = header[1], header[5], header[10], header[11]
+    if e_machine != EM_AMDGPU:
+        raise ValueError(f'Not an AMDGPU ELF file, e_machine = {e_machine}')
+    notes = []
+    for i in range(e_shnum):
+        offset = e_shoff + i * e_shentsize
+        if offset + _ELF64_SECTION.size > len(data):
+            raise ValueError(f'Truncated section header {i}')
+        _, sh_type, _, _, sh_offset, sh_size, _, _, _, _ = _ELF64_SECTION.unpack_from(data, offset)
+        if sh_type != SHT_NOTE:
+            continue
+        if sh_offset + sh_size > len(data):
+            raise ValueError(f'Truncated note section {i}')
+        pos, end = sh_offset, sh_offset + sh_size
+        while pos + _NOTE_HEADER.size <= end:
+            namesz, descsz, note_type = _NOTE_HEADER.unpack_from(data, pos)
+            pos += _NOTE_HEADER.size
+            name = data[pos:pos+namesz].rstrip(b'\0')
+            pos += (namesz + 3) & ~3
+            notes.append((name, note_type, data[pos:pos+descsz]))
+            pos += (descsz + 3) & ~3
+    return notes
+
+'''
+Minimal MessagePack decoder, sufficient for AMDGPU metadata
+'''
+def unpackb(data : bytes):
+    value, pos = _unpack(data, 0)
+    return value
+
+def _unpack(data, pos):
+    def take(n):
+        if pos + 1 + n > len(data):
+            raise ValueError('Truncated MessagePack data')
+        return data[pos+1:pos+1+n]
+    def sized(fmt):
+        n = struct.calcsize(fmt)
+        return struct.unpack('>' + fmt, take(n))[0], pos + 1 + n
+    if pos >= len(data):
+        raise ValueError('Truncated MessagePack data')
+    b = data[pos]
+    if b <= 0x7f:
+        return b, pos + 1
+    if b >= 0xe0:
+        return b - 0x100, pos + 1
+    if 0x80 <= b <= 0x8f:
+        return _unpack_map(data, pos + 1, b & 0x0f)
+    if 0x90 <= b <= 0x9f:
+        return _unpack_array(data, pos + 1, b & 0x0f)
+    if 0xa0 <= b <= 0xbf:
+        return _unpack_raw(data, pos + 1, b & 0x1f, text=True)
+    if b == 0xc0:
+        return None, pos + 1
+    if b == 0xc2:
+        return False, pos + 1
+    if b == 0xc3:
+        return True, pos + 1
+    scalars = {
+        0xca : 'f', 0xcb : 'd',
+        0xcc : 'B', 0xcd : 'H', 0xce : 'I', 0xcf : 'Q',
+        0xd0 : 'b', 0xd1 : 'h', 0xd2 : 'i', 0xd3 : 'q',
+    }
+    if b in scalars:
+        return sized(scalars[b])
+    lengths = { 0xc4 : 'B', 0xc5 : 'H', 0xc6 : 'I', 0xd9 : 'B', 0xda : 'H', 0xdb : 'I' }
+    if b in lengths:
+        n, start = sized(lengths[b])
+        return _unpack_raw(data, start, n, text=b >= 0xd9)
+    containers = { 0xdc : ('H', _unpack_array), 0xdd : ('I', _unpack_array), 0xde : ('H', _unpack_map), 0xdf : ('I', _unpack_map) }
+    if b in containers:
+        fmt, fn = containers[b]
+        n, start = sized(fmt)
+        return fn(data, start, n)
+    raise ValueError(f'Unsupported MessagePack type 0x{b:02x}')
+
+def _unpack_raw(data, pos, n, text):
+    if pos + n > len(data):
+        raise ValueError('Truncated MessagePack data')
+    raw = data[pos:pos+n]
+    return (raw.decode('utf-8') if text else raw), pos + n
+
+def _unpack_array(data, pos, n):
+    ret = []
+    for _ in range(n):
+        v, pos = _unpack(data, pos)
+        ret.append(v)
+    return ret, pos
+
+def _unpack_map(data, pos, n):
+    ret = {}
+    for _ in range(n):
+        k, pos = _unpack(data, pos)
+        v, pos = _unpack(data, pos)
+        ret[k] = v
+    return ret, pos
+
+'''
+Resource usage of one kernel in the code object.
+workgroup_size is .max_flat_workgroup_size, which Triton sets to
+num_warps * wavefront_size.
+On gfx90a and later, ArchVGPRs and AccVGPRs share the register file, and
+vgpr_count is the total of both (AccVGPRs start at the kernel descriptor's
+accum_offset). agpr_count is only informative.
+'''
+@dataclass
+class KernelResources:
+    name : str
+    arch : str = None
+    vgpr_count : int = 0
+    agpr_count : int = 0
+    sgpr_count : int = 0
+    lds_size : int = 0
+    scratch_size : int = 0
+    vgpr_spill_count : int = 0
+    sgpr_spill_count : int = 0
+    wavefront_size : int = 64
+    workgroup_size : int = 0
+
+'''
+'amdgcn-amd-amdhsa--gfx942:sramecc+:xnack-' -> 'gfx942'
+'''
+def target_arch(target : str):
+    if not target:
+        return None
+    return target.split('--')[-1].split(':')[0]
+
+def parse_metadata(meta : dict):
+    arch = target_arch(meta.get('amdhsa.target', None))
+    ret = []
+    for k in meta.get('amdhsa.kernels', []):
+        ret.append(KernelResources(name=k.get('.name', ''),
+                                   arch=arch,
+                                   vgpr_count=k.get('.vgpr_count', 0),
+                                   agpr_count=k.get('.agpr_count', 0),
+                                   sgpr_count=k.get('.sgpr_count', 0),
+                                   lds_size=k.get('.group_segment_fixed_size', 0),
+                                   scratch_size=k.get('.private_segment_fixed_size', 0),
+                                   vgpr_spill_count=k.get('.vgpr_spill_count', 0),
+                                   sgpr_spill_count=k.get('.sgpr_spill_count', 0),
+                                   wavefront_size=k.get('.wavefront_size', 64),
+                                   workgroup_size=k.get('.max_flat_workgroup_size', 0)))
+    return ret
+
+'''
+Returns [KernelResources] of the code object, or raises ValueError
+'''
+def read_kernel_resources(data : bytes):
+    for name, note_type, note_desc in read_notes(data):
+        if name == NOTE_NAME and note_type == NT_AMDGPU_METADATA:
+            return parse_metadata(unpackb(note_desc))
+    raise ValueError('No AMDGPU metadata note')
+
+'''
+Per-SIMD resources that limit the number of resident waves.
+vgprs_per_simd: VGPRs available to each lane of a SIMD, in units of the
+                wave size the kernels are compiled for.
+sgprs_per_simd: 0 if SGPRs do not limit occupancy (RDNA)
+lds_per_cu: LDS that workgroups on one CU (or WGP, with simds_per_cu of
+            the WGP) can share
+'''
+@dataclass
+class HardwareLimits:
+    simds_per_cu : int
+    max_waves_per_simd : int
+    vgprs_per_simd : int
+    vgpr_granule : int
+    sgprs_per_simd : int
+    sgpr_granule : int
+    lds_per_cu : int
+
+_CDNA3 = HardwareLimits(simds_per_cu=4, max_waves_per_simd=8, vgprs_per_simd=512, vgpr_granule=8,
+                        sgprs_per_simd=800, sgpr_granule=16, lds_per_cu=64 << 10)
+_RDNA3_FULL_VGPRS = HardwareLimits(simds_per_cu=2, max_waves_per_simd=16, vgprs_per_simd=1536, vgpr_granule=24,
+                                   sgprs_per_simd=0, sgpr_granule=0, lds_per_cu=64 << 10)
+_RDNA3 = HardwareLimits(simds_per_cu=2, max_waves_per_simd=16, vgprs_per_simd=1024, vgpr_granule=16,
+                        sgprs_per_simd=0, sgpr_granule=0, lds_per_cu=64 << 10)
+
+# Keys are the same as AOTRITON_ARCH_PRODUCTION_LINE.
+# TODO: gfx1250 uses the RDNA3 limits until its limits are published
+HARDWARE_LIMITS = {
+    'gfx90a'     : _CDNA3,
+    'gfx942'     : _CDNA3,
+    'gfx950'     : HardwareLimits(**dict(asdict(_CDNA3), lds_per_cu=160 << 10)),
+    'gfx1100'    : _RDNA3_FULL_VGPRS,
+    'gfx1101'    : _RDNA3_FULL_VGPRS,
+    'gfx1102'    : _RDNA3,
+    'gfx1150'    : _RDNA3,
+    'gfx1151'    : _RDNA3_FULL_VGPRS,
+    'gfx1200'    : _RDNA3_FULL_VGPRS,
+    'gfx1201'    : _RDNA3_FULL_VGPRS,
+    'gfx1250'    : _RDNA3,
+}
+
+LIMITER_WAVES = 'waves'
+LIMITER_VGPR = 'vgpr'
+LIMITER_SGPR = 'sgpr'
+LIMITER_LDS = 'lds'
+
+def _align(v, granule):
+    return (max(v, 1) + granule - 1) // granule * granule
+
+'''
+Returns (waves per SIMD, limiter) of the kernel on arch.
+The limiter is the resource that bounds the occupancy, or 'waves' if the
+occupancy is the hardware maximum. Returns (None, None) for unknown arches.
+'''
+def occupancy(res : KernelResources, arch=None):
+    hw = HARDWARE_LIMITS.get(arch or res.arch, None)
+    if hw is None:
+        return None, None
+    limits = [(hw.max_waves_per_simd, LIMITER_WAVES)]
+    limits.append((hw.vgprs_per_simd // _align(res.vgpr_count, hw.vgpr_granule), LIMITER_VGPR))
+    if hw.sgprs_per_simd > 0:
+        limits.append((hw.sgprs_per_simd // _align(res.sgpr_count, hw.sgpr_granule), LIMITER_SGPR))
+    if res.lds_size > 0:
+        workgroups = hw.lds_per_cu // res.lds_size
+        waves_per_workgroup = max(1, math.ceil(res.workgroup_size / res.wavefront_size))
+        limits.append((math.ceil(workgroups * waves_per_workgroup / hw.simds_per_cu), LIMITER_LDS))
+    # The first limiter wins ties, hence 'waves' when nothing else binds
+    waves, limiter = min(limits, key=lambda l : l[0])
+    return waves, limiter
+
+'''
+Fields of compile ledger records that describe the resource usage of the
+HSACO file. If the code object has multiple kernels, the one with the
+lowest occupancy is reported. Returns {} if the file is not an AMDGPU code
+object with metadata.
+'''
+def resource_fields(data : bytes, arch=None):
+    try:
+        kernels = read_kernel_resources(data)
+    except ValueError:
+        return {}
+    if not kernels:
+        return {}
+    rated = [ (res, *occupancy(res, arch)) for res in kernels ]
+    res, waves, limiter = min(rated, key=lambda r : -1 if r[1] is None else r[1])
+    return {
+        'vgpr_count' : res.vgpr_count,
+        'agpr_count' : res.agpr_count,
+        'sgpr_count' : res.sgpr_count,
+        'lds_size' : res.lds_size,
+        'scratch_size' : res.scratch_size,
+        'vgpr_spill_count' : res.vgpr_spill_count,
+        'sgpr_spill_count' : res.sgpr_spill_count,
+        'wavefront_size' : res.wavefront_size,
+        'occupancy' : waves,
+        'occupancy_limiter' : limiter,
+    }
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--arch", type=str, default=None, choices=list(HARDWARE_LIMITS.keys()),
+                   help="Compute the occupancy on this arch instead of the target of the code object")
+    p.add_argument("--json", action='store_true', help="Print one JSON object per file")
+    p.add_argument("hsaco_files", nargs='+', type=Path, help="Input HSACO files")
+    args = p.parse_args()
+    return args
+
+def main():
+    args = parse()
+    if not args.json:
+        print('vgpr\tagpr\tsgpr\tlds\tscratch\tvspill\tsspill\twave\toccupancy\tfile')
+    for fn in args.hsaco_files:
+        fields = resource_fields(fn.read_bytes(), args.arch)
+        if args.json:
+            print(json.dumps(dict(hsaco=str(fn), **fields)))
+            continue
+        if not fields:
+            print(f'-\t-\t-\t-\t-\t-\t-\t-\t-\t{fn}')
+            continue
+        print('\t'.join([ str(fields[k]) for k in ['vgpr_count', 'agpr_count', 'sgpr_count', 'lds_size',
+                                                   'scratch_size', 'vgpr_spill_count', 'sgpr_spill_count',
+                                                   'wavefront_size'] ])
+              + f'\t{fields["occupancy"]} ({fields["occupancy_limiter"]})\t{fn}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+from .job import CompileJob, STATUS_COMPLETE
+
+KNOWN_TARGETS_64 = ['gfx90a', 'gfx942', 'gfx950']
+KNOWN_TARGETS_32 = ['gfx1100', 'gfx1101', 'gfx1102', 'gfx1201', 'gfx1200', 'gfx1151', 'gfx1150', 'gfx1250']
+
+_SOURCE_MODULES = {}  # resolved path -> module
+
+'''
+Imports a kernel source by its path. Sources in different directories may
+share the file name, hence each is imported under a name derived from its
+resolved path, and cached by that path.
+The directory of the source is added to sys.path for the helper modules it
+imports.
+'''
+def import_source(path):
+    path = Path(path).resolve()
+    mod = _SOURCE_MODULES.get(path)
+    if mod is not None:
+        return mod
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    digest = hashlib.sha256(str(path).encode()).hexdigest()[:16]
+    name = f'_aotriton_source_{digest}_{path.stem}'
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    # Triton looks up the globals of JITFunction through sys.modules
+    sys.modules[name] = mod
+    try:
+        spec.loader.exec_module(mod)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    _SOURCE_MODULES[path] = mod
+    return mod
+
+'''
+Compiler backend, executed by the workers of WorkerPool or in the process of
+v3python/compile.py.
+compile() writes the .hsaco and .json files of the job, and raises an
+exception on failure.
+'''
+class Backend(object):
+    NAME = None
+
+    def compile(self, job : CompileJob):
+        raise NotImplementedError()
+
+    '''
+    Identifies the compiler and the environment that affects its output.
+    Part of the key of HsacoCache. Must not import the compiler.
+    '''
+    @classmethod
+    def fingerprint(cls):
+        return cls.NAME
+
+'''
+Triton ahead-of-time compiler.
+Kernel source modules stay imported, hence a persistent worker only pays the
+import cost once per module.
+'''
+class TritonBackend(Backend):
+    NAME = 'triton'
+    DISTRIBUTIONS = ['triton', 'pytorch-triton-rocm']
+    ENVIRONMENT = ['TRITON_F32_DEFAULT', 'TRITON_STORE_BINARY_ONLY']
+
+    def __init__(self):
+        import triton
+        from triton.backends.compiler import GPUTarget
+        self._triton = triton
+        self._targets = { arch : GPUTarget('hip', arch, 64) for arch in KNOWN_TARGETS_64 }
+        self._targets.update({ arch : GPUTarget('hip', arch, 32) for arch in KNOWN_TARGETS_32 })
+
+    @classmethod
+    def fingerprint(cls):
+        version = None
+        for dist in cls.DISTRIBUTIONS:
+            try:
+                version = f'{dist}-{importlib.metadata.version(dist)}'
+                break
+            except importlib.metadata.PackageNotFoundError:
+                pass
+        if version is None:
+            import triton
+            version = f'triton-{triton.__version__}'
+        env = [ f'{key}={os.getenv(key, "")}' for key in cls.ENVIRONMENT ]
+        return ' '.join([cls.NAME, version] + env)
+
+    def _import_kernel(self, job):
+        # execute python sources and extract functions wrapped in JITFunction
+        return getattr(import_source(job.path), job.kernel_name)
+
+    def compile(self, job : CompileJob):
+        triton = self._triton
+        kernel = self._import_kernel(job)
+        out_path = Path(job.out_path)
+
+        grid = job.grid.split(",")
+        assert len(grid) == 3
+
+        # validate and parse signature
+        signature = list(map(lambda s: s.strip(" "), job.signature.split(",")))
+
+        def hash_signature(signature: List[str]):
+            m = hashlib.sha256()
+            m.update(" ".join(signature).encode())
+            return m.hexdigest()[:8]
+
+        meta_sig = f"warps{job.num_warps}xstages{job.num_stages}"
+        sig_hash = hash_signature(signature + [meta_sig])
+
+        def constexpr(s):
+            try:
+                ret = int(s)
+                return ret
+            except ValueError:
+                pass
+            try:
+                ret = float(s)
+                return ret
+            except ValueError:
+                pass
+            if s == 'True':
+                return True
+            if s == 'False':
+                return False
+            return None
+
+        hints = {(i, ): constexpr(s.split(":")[1]) for i, s in enumerate(signature) if ":" in s}
+        hints = {k: v for k, v in hints.items() if v is not None}
+        constants = {kernel.arg_names[i]: constexpr(s) for i, s in enumerate(signature)}
+        constants = {k: v for k, v in constants.items() if v is not None}
+        for key, value in hints.items():
+            if value == 1:
+                constants[kernel.arg_names[key[0]]] = value
+        signature = {kernel.arg_names[i]: s.split(":")[0] for i, s in enumerate(signature)}
+        for key in constants:
+            signature[key] = 'constexpr'
+
+        # compile ast into cubin
+        for h in hints.values():
+            assert h in [1, 8, 16], f"Only 1 and 16 are valid hints, got {h}"
+        attrs = {k: [("tt.divisibility", 16)] for k, v in hints.items() if v == 16}
+        attrs.update({k: [("tt.divisibility", 8)] for k, v in hints.items() if v == 8})
+        src = triton.compiler.ASTSource(fn=kernel, constexprs=constants, signature=signature, attrs=attrs)
+        target = self._targets[job.target]
+        backend = triton.compiler.make_backend(target)
+        kwargs = {"num_warps": job.num_warps, "num_stages": job.num_stages, "waves_per_eu": job.waves_per_eu}
+        opts = backend.parse_options(kwargs)
+        ccinfo = triton.compile(src, target=target, options=opts.__dict__)
+
+        with open(out_path.with_suffix('.hsaco'), 'bw') as f:
+            f.write(ccinfo.kernel)
+        with open(out_path.with_suffix('.json'), 'w') as f:
+            di = ccinfo.metadata._asdict()
+            del di['target']  # Cannot be serialized to Json
+            di['compile_status'] = STATUS_COMPLETE
+            json.dump(di, f, indent=2)
+
+'''
+Fake compiler for tests, without GPU toolchain.
+The behavior is selected by comma separated directives in kernel_name:
+    sleep=SECONDS   run for SECONDS
+    hog=MIB         allocate MIB MiB of memory
+    oom             allocate memory until MemoryError, then abort like a
+                    native allocator failure
+    raise           raise an exception
+    crash           terminate the process
+    hang            never return
+The image is derived from all fields of the job, except out_path and rlimit_as.
+'''
+class FakeBackend(Backend):
+    NAME = 'fake'
+
+    @staticmethod
+    def directives(job):
+        d = {}
+        for item in job.kernel_name.split(','):
+            k, _, v = item.partition('=')
+            d[k] = v
+        return d
+
+    @staticmethod
+    def image(job):
+        d = job.asdict()
+        del d['out_path']
+        del d['rlimit_as']
+        return b'FAKEHSACO' + hashlib.blake2b(json.dumps(d, sort_keys=True).encode(), digest_size=20).digest()
+
+    def compile(self, job : CompileJob):
+        d = self.directives(job)
+        if 'sleep' in d:
+            time.sleep(float(d['sleep']))
+        if 'hog' in d:
+            hog = bytearray(int(d['hog']) << 20)
+            # Touch every page
+            for i in range(0, len(hog), 4096):
+                hog[i] = 1
+        if 'oom' in d:
+            hogs = []
+            try:
+                while True:
+                    hogs.append(bytearray(16 << 20))
+            except MemoryError:
+                pass
+            # Give the pool time to observe the address space before dying
+            time.sleep(0.5)
+            os.abort()
+        if 'raise' in d:
+            raise RuntimeError(f'FakeBackend: {job.kernel_name}')
+        if 'crash' in d:
+            os._exit(3)
+        if 'hang' in d:
+            while True:
+                time.sleep(3600)
+        with open(job.hsaco_path, 'bw') as f:
+            f.write(self.image(job))
+        with open(job.json_path, 'w') as f:
+            json.dump({ 'shared' : 0,
+                        'num_warps' : job.num_warps,
+                        'warp_size' : 64,
+                        'name' : job.kernel_name,
+                        'compile_status' : STATUS_COMPLETE }, f, indent=2)
+
+BACKENDS = { b.NAME : b for b in [TritonBackend, FakeBackend] }
+
+def create_backend(name):
+    return BACKENDS[name]()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from .job import (
+    CompileJob,
+    CompileResult,
+    write_failure,
+    STATUS_COMPLETE,
+    STATUS_TIMEOUT,
+    STATUS_MEMORY_LIMIT,
+)
+
+desc = """
+Content-addressed HSACO cache shared across build trees.
+Prints the statistics of the cache, and optionally evicts or clears it.
+"""
+
+DEFAULT_MAX_SIZE = 20 << 30
+DEFAULT_NEGATIVE_TTL = 24 * 3600.0
+# Eviction stops once the cache is below this fraction of max_size
+LOW_WATERMARK = 0.9
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        timeout REAL NOT NULL,
+        created REAL NOT NULL,
+        last_used REAL NOT NULL)''',
+    'CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)',
+    'CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+]
+STAT_NAMES = ['hits', 'misses', 'negative_hits', 'stores', 'evictions']
+
+_source_digests = {}
+
+'''
+Digest of all python files under the directory of the kernel source, since
+kernels import their siblings.
+'''
+def source_digest(directory : Path):
+    directory = Path(directory).resolve()
+    if directory not in _source_digests:
+        m = hashlib.blake2b(digest_size=20)
+        for fn in sorted(directory.rglob('*.py')):
+            m.update(fn.relative_to(directory).as_posix().encode('utf-8') + b'\0')
+            m.update(fn.read_bytes())
+        _source_digests[directory] = m.hexdigest()
+    return _source_digests[directory]
+
+'''
+The cache key covers everything that determines the output of compile.py.
+out_path, grid, verbose and timeout do not change the compiled image.
+'''
+def cache_key(job : CompileJob, fingerprint : str):
+    path = Path(job.path)
+    d = {
+        'source' : source_digest(path.parent),
+        'module' : path.stem,
+        'kernel_name' : job.kernel_name,
+        'signature' : job.signature,
+        'num_warps' : job.num_warps,
+        'num_stages' : job.num_stages,
+        'waves_per_eu' : job.waves_per_eu,
+        'target' : job.target,
+        'nostrip' : job.nostrip,
+        'compiler' : fingerprint,
+    }
+    return hashlib.blake2b(json.dumps(d, sort_keys=True).encode('utf-8'), digest_size=20).hexdigest()
+
+'''
+On-disk HSACO cache, safe to share among concurrent compile.py processes.
+
+Layout:
+    cache_dir/index.sqlite3         entries and statistics
+    cache_dir/objects/XX/KEY.hsaco
+    cache_dir/objects/XX/KEY.json
+
+Successful compilations are evicted in LRU order once the total size exceeds
+max_size (bytes). Failures (Timeout, Exception, ...) are negative entries
+without objects, which expire after negative_ttl seconds. A Timeout entry is
+ignored by jobs with a longer timeout.
+'''
+class HsacoCache(object):
+    def __init__(self, cache_dir, fingerprint, max_size=DEFAULT_MAX_SIZE, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        (self.cache_dir / 'objects').mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_dir / 'index.sqlite3', timeout=600.0, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def key(self, job : CompileJob):
+        return cache_key(job, self.fingerprint)
+
+    def _object_path(self, key, suffix):
+        return self.cache_dir / 'objects' / key[:2] / f'{key}{suffix}'
+
+    def _count(self, name, n=1):
+        self._conn.execute('INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?',
+                           (name, n, n))
+
+    def _remove(self, key):
+        self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+        for suffix in ['.hsaco', '.json']:
+            self._object_path(key, suffix).unlink(missing_ok=True)
+
+    '''
+    Writes the outputs of job from the cache. Returns the cached CompileResult,
+    or None on cache miss.
+    '''
+    def get(self, job : CompileJob):
+        key = self.key(job)
+        now = time.time()
+        row = self._conn.execute('SELECT status, size, timeout, created FROM entries WHERE key = ?', (key,)).fetchone()
+        result = None
+        if row is not None:
+            status, size, timeout, created = row
+            if status == STATUS_COMPLETE:
+                result = self._restore(job, key)
+            elif now - created > self.negative_ttl:
+                self._remove(key)
+            elif status == STATUS_TIMEOUT and (job.timeout <= 0 or job.timeout > timeout):
+                pass
+            else:
+                write_failure(job, status)
+                result = CompileResult(status=status)
+        if result is None:
+            self._count('misses')
+            return None
+        self._conn.execute('UPDATE entries SET last_used = ? WHERE key = ?', (now, key))
+        self._count('hits' if result.status == STATUS_COMPLETE else 'negative_hits')
+        return result
+
+    def _restore(self, job, key):
+        try:
+            shutil.copyfile(self._object_path(key, '.hsaco'), job.hsaco_path)
+            shutil.copyfile(self._object_path(key, '.json'), job.json_path)
+        except FileNotFoundError:
+            self._remove(key)
+            return None
+        return CompileResult(status=STATUS_COMPLETE, hsaco_size=job.hsaco_path.stat().st_size)
+
+    '''
+    Records the outputs of a finished job. Resource failures depend on the
+    build host, and are not recorded.
+    '''
+    def put(self, job : CompileJob, result : CompileResult):
+        if result.status == STATUS_MEMORY_LIMIT:
+            return
+        key = self.key(job)
+        now = time.time()
+        size = 0
+        if result.status == STATUS_COMPLETE:
+            for suffix, src in [('.hsaco', job.hsaco_path), ('.json', job.json_path)]:
+                dst = self._object_path(key, suffix)
+                dst.parent.mkdir(exist_ok=True)
+                tmp = dst.with_name(f'{dst.name}.{os.getpid()}.tmp')
+                shutil.copyfile(src, tmp)
+                os.replace(tmp, dst)
+                size += dst.stat().st_size
+        self._conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                           (key, result.status, size, job.timeout, now, now))
+        self._count('stores')
+        if result.status == STATUS_COMPLETE and self.total_size() > self.max_size:
+            self.evict(int(self.max_size * LOW_WATERMARK))
+
+    def total_size(self):
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    '''
+    Removes least recently used entries until the cache is not larger than
+    target_size bytes, and expired negative entries. Returns the number of
+    removed entries.
+    '''
+    def evict(self, target_size):
+        expired = self._conn.execute('SELECT key FROM entries WHERE status != ? AND created < ?',
+                                     (STATUS_COMPLETE, time.time() - self.negative_ttl)).fetchall()
+        victims = [ key for key, in expired ]
+        total = self.total_size()
+        for key, size in self._conn.execute('SELECT key, size FROM entries WHERE status = ? ORDER BY last_used',
+                                            (STATUS_COMPLETE,)).fetchall():
+            if total <= target_size:
+                break
+            victims.append(key)
+            total -= size
+        for key in victims:
+            self._remove(key)
+        self._count('evictions', len(victims))
+        return len(victims)
+
+    def clear(self):
+        for key, in self._conn.execute('SELECT key FROM entries').fetchall():
+            self._remove(key)
+
+    def stats(self):
+        d = { name : 0 for name in STAT_NAMES }
+        d.update(self._conn.execute('SELECT name, value FROM stats').fetchall())
+        d['entries'], d['negative_entries'], d['size'] = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(status != ?), 0), COALESCE(SUM(size), 0) FROM entries',
+            (STATUS_COMPLETE,)).fetchone()
+        lookups = d['hits'] + d['negative_hits'] + d['misses']
+        d['hit_rate'] = (d['hits'] + d['negative_hits']) / lookups if lookups else 0.0
+        return d
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--cache_dir", type=Path, default=os.getenv('AOTRITON_HSACO_CACHE', None), required=os.getenv('AOTRITON_HSACO_CACHE') is None,
+                   help="Cache directory. Defaults to environment variable AOTRITON_HSACO_CACHE")
+    p.add_argument("--evict", type=int, default=None, help="Evict entries until the cache is not larger than this many MiB")
+    p.add_argument("--clear", action='store_true', help="Remove all entries")
+    args = p.parse_args()
+    return args
+
+def main():
+    args = parse()
+    # Maintenance does not depend on the compiler, hence no fingerprint
+    with HsacoCache(args.cache_dir, fingerprint=None) as cache:
+        if args.clear:
+            cache.clear()
+        elif args.evict is not None:
+            cache.evict(args.evict << 20)
+        for k, v in cache.stats().items():
+            print(f'{k}\t{v:.3f}' if isinstance(v, float) else f'{k}\t{v}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import json
+import socket
+from .job import CompileJob, CompileResult
+
+'''
+Send one request to the compile server, and returns the decoded response.
+Raises ConnectionRefusedError or FileNotFoundError if no server listens on
+socket_path.
+'''
+def request(socket_path, d):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(socket_path))
+        with s.makefile('rwb') as f:
+            f.write(json.dumps(d).encode('utf-8') + b'\n')
+            f.flush()
+            line = f.readline()
+    assert line, f'Compile server {socket_path} closed the connection without response'
+    response = json.loads(line)
+    assert 'error' not in response, f'Compile server {socket_path}: {response["error"]}'
+    return response
+
+def submit(socket_path, job : CompileJob):
+    response = request(socket_path, { 'op' : 'compile', 'job' : job.asdict() })
+    return CompileResult.from_dict(response['result'])
+
+def status(socket_path):
+    return request(socket_path, { 'op' : 'status' })['status']
+
+def shutdown(socket_path):
+    request(socket_path, { 'op' : 'shutdown' })
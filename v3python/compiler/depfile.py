@@ -0,0 +1,51 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+# Make-style dependency files of HSACO files, for the ninja build
+# (v3python.codegen.ninja).
+#
+# Triton sources import their helpers as top-level modules from the
+# directory of the source (the backend puts it on sys.path), hence the
+# dependencies are the modules of that directory reachable from the
+# source through import statements.
+
+import ast
+from pathlib import Path
+
+def _imported_names(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            yield node.module.split('.')[0]
+
+'''
+Python files of the directory of source that source imports, directly or
+indirectly, including source itself. Sorted, except source comes first.
+'''
+def source_dependencies(source):
+    source = Path(source).absolute()
+    directory = source.parent
+    found = { source }
+    pending = [ source ]
+    while pending:
+        path = pending.pop()
+        try:
+            tree = ast.parse(path.read_text(encoding='utf-8'), filename=str(path))
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for name in _imported_names(tree):
+            dep = directory / f'{name}.py'
+            if dep not in found and dep.is_file():
+                found.add(dep)
+                pending.append(dep)
+    return [ source ] + sorted(found - { source })
+
+def _escape(path):
+    return str(path).replace(' ', '\\ ').replace('#', '\\#').replace('$', '$$')
+
+def write_depfile(depfile, target, dependencies):
+    deps = ' '.join([ _escape(d) for d in dependencies ])
+    with open(depfile, 'w') as f:
+        print(f'{_escape(target)}: {deps}', file=f)
@@ -0,0 +1,139 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from .job import CompileJob
+from .ledger import kernel_and_arch
+
+# Peak RSS of jobs that have never been measured
+DEFAULT_PEAK_RSS = 4 << 30
+# Safety margin on measured peak RSS
+PEAK_RSS_MARGIN = 1.25
+
+'''
+Predicts the peak RSS of compile jobs from the measurements in the compile
+ledger, see CompileLedger.peak_rss.
+ledger: CompileLedger with an up-to-date index, or None
+'''
+class PeakRssModel(object):
+    def __init__(self, ledger, default=DEFAULT_PEAK_RSS, margin=PEAK_RSS_MARGIN):
+        self._ledger = ledger
+        self._default = default
+        self._margin = margin
+
+    def predict(self, job : CompileJob):
+        if self._ledger is None:
+            return self._default
+        peak = self._ledger.peak_rss(job.hsaco_path, *kernel_and_arch(job))
+        if peak is None:
+            return self._default
+        return int(peak * self._margin)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+_tokens = itertools.count()
+
+'''
+Memory budget shared by all processes that use the same directory.
+
+Each job reserves its predicted peak RSS before it starts, and releases it
+when done. Jobs are admitted in FIFO order while the sum of reservations
+fits the budget. Requests larger than the budget are admitted alone.
+Reservations and waiters of dead processes are dropped, so a killed build
+does not leak the budget.
+
+The state is a JSON file, updated under flock(2):
+    {"reservations": {token: bytes}, "waiting": [token, ...]}
+Tokens are "<pid>:<thread>:<serial>".
+'''
+class MemoryGovernor(object):
+    STATE_FILE = 'memory_governor.json'
+
+    def __init__(self, directory, budget, poll_interval=0.05, max_poll_interval=1.0):
+        assert budget > 0
+        self.directory = Path(directory)
+        self.budget = budget
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / self.STATE_FILE
+
+    @contextmanager
+    def _state(self):
+        import fcntl
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'r+') as f:
+                try:
+                    state = json.load(f)
+                except ValueError:
+                    state = {}
+                state.setdefault('reservations', {})
+                state.setdefault('waiting', [])
+                alive = lambda token : _pid_alive(int(token.split(':')[0]))
+                state['reservations'] = { t : n for t, n in state['reservations'].items() if alive(t) }
+                state['waiting'] = [ t for t in state['waiting'] if alive(t) ]
+                yield state
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+        finally:
+            os.close(fd)
+
+    def usage(self):
+        with self._state() as state:
+            return sum(state['reservations'].values()), dict(state['reservations'])
+
+    '''
+    Blocks until nbytes can be reserved. Returns the token of the reservation.
+    '''
+    def acquire(self, nbytes):
+        nbytes = min(int(nbytes), self.budget)
+        token = f'{os.getpid()}:{threading.get_ident()}:{next(_tokens)}'
+        interval = self.poll_interval
+        try:
+            while True:
+                with self._state() as state:
+                    used = sum(state['reservations'].values())
+                    waiting = state['waiting']
+                    first = not waiting or waiting[0] == token
+                    if first and used + nbytes <= self.budget:
+                        if waiting:
+                            waiting.pop(0)
+                        state['reservations'][token] = nbytes
+                        return token
+                    if token not in waiting:
+                        waiting.append(token)
+                time.sleep(interval)
+                interval = min(interval * 1.5, self.max_poll_interval)
+        except BaseException:
+            self.release(token)
+            raise
+
+    def release(self, token):
+        with self._state() as state:
+            state['reservations'].pop(token, None)
+            if token in state['waiting']:
+                state['waiting'].remove(token)
+
+    @contextmanager
+    def reserve(self, nbytes):
+        token = self.acquire(nbytes)
+        try:
+            yield token
+        finally:
+            self.release(token)
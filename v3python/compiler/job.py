@@ -0,0 +1,84 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import json
+from dataclasses import dataclass, asdict, fields
+from pathlib import Path
+
+# Values of compile_status in the .json file
+STATUS_COMPLETE = 'Complete'
+STATUS_EXCEPTION = 'Exception'
+STATUS_TIMEOUT = 'Timeout'
+STATUS_EXIT_WITH_ERROR = 'ExitWithError'
+STATUS_MEMORY_LIMIT = 'MemoryLimit'
+
+'''
+One line of Bare.compile, i.e., the arguments of v3python/compile.py
+timeout is in minutes, same as --timeout.
+rlimit_as is the address space limit of the compiling process in bytes, 0
+for the default of the worker pool.
+'''
+@dataclass
+class CompileJob:
+    path : str
+    kernel_name : str
+    out_path : str
+    signature : str
+    grid : str = '1,1,1'
+    target : str = None
+    num_warps : int = 1
+    num_stages : int = 3
+    waves_per_eu : int = 0
+    timeout : float = 0.0
+    verbose : bool = False
+    nostrip : bool = False
+    rlimit_as : int = 0
+
+    @staticmethod
+    def from_args(args):
+        d = { f.name : getattr(args, f.name) for f in fields(CompileJob) if hasattr(args, f.name) }
+        d['path'] = str(d['path'])
+        d['out_path'] = str(d['out_path'])
+        return CompileJob(**d)
+
+    @staticmethod
+    def from_dict(d):
+        return CompileJob(**d)
+
+    def asdict(self):
+        return asdict(self)
+
+    @property
+    def hsaco_path(self):
+        return Path(self.out_path).with_suffix('.hsaco')
+
+    @property
+    def json_path(self):
+        return Path(self.out_path).with_suffix('.json')
+
+@dataclass
+class CompileResult:
+    status : str
+    duration : float = 0.0      # seconds
+    peak_rss : int = 0          # bytes, 0 if unknown
+    hsaco_size : int = 0
+    exitcode : int = None
+    message : str = ''
+
+    @staticmethod
+    def from_dict(d):
+        return CompileResult(**d)
+
+    def asdict(self):
+        return asdict(self)
+
+'''
+Write an empty .hsaco and a .json with compile_status only, so that the
+build does not fail for kernels that cannot be compiled.
+'''
+def write_failure(job : CompileJob, status):
+    with open(job.hsaco_path, 'bw') as f:
+        pass
+    with open(job.json_path, 'w') as f:
+        d = {'compile_status': status}
+        json.dump(d, f, indent=2)
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from .job import (
+    CompileJob,
+    CompileResult,
+    STATUS_COMPLETE,
+    STATUS_TIMEOUT,
+)
+from .amdgpu_meta import resource_fields
+
+desc = """
+Summarize the compile ledger: failure rates, timeouts and the slowest
+configurations per kernel and arch.
+"""
+
+# Compile ledger
+# JSON Lines file, one record per compile.py invocation, appended by
+# concurrent compile.py processes. Later records of the same HSACO supersede
+# earlier ones. Appends and compact() hold an exclusive flock on the file.
+# compact() replaces the file, hence writers must re-open the ledger for each
+# append, as CompileLedger.append() does.
+#   hsaco           file name of the HSACO
+#   kernel          NAME of the KernelDescription
+#   arch            arch of the Functional
+#   duration        seconds, null for cache hits
+#   status          compile_status, see compiler.job
+#   peak_rss        bytes, null for cache hits
+#   hsaco_size      bytes
+#   shared          shared memory size, only for Complete
+#   block_threads   num_warps * warp_size, only for Complete
+#   vgpr_count, agpr_count, sgpr_count, lds_size, scratch_size,
+#   vgpr_spill_count, sgpr_spill_count, wavefront_size, occupancy,
+#   occupancy_limiter
+#                   from the AMDGPU metadata of the HSACO, only for Complete,
+#                   see compiler.amdgpu_meta
+#   cached          result from HsacoCache
+#   path            absolute path of the HSACO
+#   kernel_name, signature, target, num_warps, num_stages, waves_per_eu, timeout, time
+#
+# The index (compile_ledger.jsonl.index.sqlite3) maps the path of each HSACO
+# to the offset of its latest record, and is updated incrementally by readers.
+# It also keeps the measured peak RSS of each HSACO, and the maximum of each
+# kernel and arch.
+DEFAULT_LEDGER = 'compile_ledger.jsonl'
+INDEX_SUFFIX = '.index.sqlite3'
+INDEX_VERSION = 2
+IMAGE_DIR_PREFIX = 'gpu_kernel_image.'
+_ARCH_PATTERN = re.compile(r'--Arch_(\w+)$')
+
+'''
+Ledger of the build tree that hsaco belongs to, i.e.,
+<build_dir>/<family>/gpu_kernel_image.<NAME>/<hsaco> -> <build_dir>/compile_ledger.jsonl
+Returns None if hsaco is not in a build tree.
+'''
+def default_ledger(hsaco):
+    hsaco = Path(hsaco).absolute()
+    if not hsaco.parent.name.startswith(IMAGE_DIR_PREFIX):
+        return None
+    return hsaco.parent.parent.parent / DEFAULT_LEDGER
+
+'''
+Returns (kernel, arch) of the job, as used by the planner
+'''
+def kernel_and_arch(job : CompileJob):
+    hsaco = job.hsaco_path
+    dirname = hsaco.parent.name
+    m = _ARCH_PATTERN.search(hsaco.stem)
+    kernel = dirname[len(IMAGE_DIR_PREFIX):] if dirname.startswith(IMAGE_DIR_PREFIX) else job.kernel_name
+    return kernel, m.group(1) if m else job.target
+
+def make_record(job : CompileJob, result : CompileResult, cached=False):
+    hsaco = job.hsaco_path.absolute()
+    kernel, arch = kernel_and_arch(job)
+    record = {
+        'hsaco' : hsaco.name,
+        'kernel' : kernel,
+        'arch' : arch,
+        'duration' : None if cached else round(result.duration, 3),
+        'status' : result.status,
+        'peak_rss' : None if cached else result.peak_rss,
+        'hsaco_size' : result.hsaco_size,
+        'cached' : cached,
+        'path' : str(hsaco),
+        'kernel_name' : job.kernel_name,
+        'signature' : job.signature,
+        'target' : job.target,
+        'num_warps' : job.num_warps,
+        'num_stages' : job.num_stages,
+        'waves_per_eu' : job.waves_per_eu,
+        'timeout' : job.timeout,
+        'time' : round(time.time(), 3),
+    }
+    if result.status == STATUS_COMPLETE:
+        try:
+            with open(job.json_path) as f:
+                j = json.load(f)
+            record['shared'] = j['shared']
+            record['block_threads'] = j['num_warps'] * j['warp_size']
+        except (OSError, KeyError, ValueError):
+            pass
+        try:
+            record.update(resource_fields(hsaco.read_bytes()))
+        except OSError:
+            pass
+    return record
+
+class CompileLedger(object):
+    def __init__(self, path):
+        self.path = Path(path)
+        self._index = None
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return self.path.is_file()
+
+    '''
+    Opens the ledger and takes the exclusive lock. If compact() replaced the
+    file while waiting for the lock, the new file is opened instead.
+    fcntl is imported here, since the generator imports this module on
+    Windows (AOTRITON_NOIMAGE_MODE), where the ledger is never written.
+    '''
+    @contextmanager
+    def locked(self, flags=os.O_RDONLY):
+        import fcntl
+        while True:
+            fd = os.open(self.path, flags, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    st = os.stat(self.path)
+                except FileNotFoundError:
+                    continue
+                fst = os.fstat(fd)
+                if (st.st_dev, st.st_ino) != (fst.st_dev, fst.st_ino):
+                    continue
+                yield fd
+                return
+            finally:
+                os.close(fd)
+
+    def append(self, record):
+        line = json.dumps(record).encode('utf-8') + b'\n'
+        with self.locked(os.O_WRONLY | os.O_APPEND | os.O_CREAT) as fd:
+            os.write(fd, line)
+
+    '''
+    Yields (offset, end, record) of each line. record is None for malformed
+    lines. Stops at the incomplete line of an ongoing append.
+    '''
+    def _scan(self, start=0):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                end = offset + len(line)
+                yield offset, end, record if isinstance(record, dict) else None
+                offset = end
+
+    def records(self):
+        if not self.exists():
+            return
+        for _, _, record in self._scan():
+            if record is not None:
+                yield record
+
+    def _open_index(self):
+        if self._index is not None:
+            return self._index
+        conn = sqlite3.connect(str(self.path) + INDEX_SUFFIX, timeout=600.0, isolation_level=None, check_same_thread=False)
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        version = conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if version is None or version[0] != INDEX_VERSION:
+            conn.execute('DROP TABLE IF EXISTS records')
+            conn.execute('DROP TABLE IF EXISTS peaks')
+            conn.execute('DELETE FROM meta')
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (INDEX_VERSION,))
+        conn.execute('CREATE TABLE IF NOT EXISTS records (path TEXT PRIMARY KEY, offset INTEGER NOT NULL, peak_rss INTEGER)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS peaks (kernel TEXT NOT NULL, arch TEXT NOT NULL, peak_rss INTEGER NOT NULL,
+                        PRIMARY KEY (kernel, arch))''')
+        self._index = conn
+        return conn
+
+    '''
+    Index the records appended since the last update. The whole ledger is
+    re-indexed if it has been replaced or truncated.
+    '''
+    def update_index(self):
+        conn = self._open_index()
+        st = os.stat(self.path)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            meta = dict(conn.execute('SELECT name, value FROM meta').fetchall())
+            start = meta.get('size', 0)
+            if meta.get('inode') != st.st_ino or start > st.st_size:
+                conn.execute('DELETE FROM records')
+                conn.execute('DELETE FROM peaks')
+                start = 0
+            end = start
+            rows = []
+            peaks = []
+            for offset, end, record in self._scan(start):
+                if record is None or 'path' not in record:
+                    continue
+                peak_rss = record.get('peak_rss') or None
+                rows.append((record['path'], offset, peak_rss))
+                if peak_rss is not None and 'kernel' in record:
+                    peaks.append((record['kernel'], record.get('arch', ''), peak_rss))
+            # Cache hits do not measure the peak RSS, hence keep the previous one
+            conn.executemany('''INSERT INTO records VALUES (?, ?, ?) ON CONFLICT(path) DO UPDATE
+                                SET offset = excluded.offset, peak_rss = COALESCE(excluded.peak_rss, peak_rss)''', rows)
+            conn.executemany('''INSERT INTO peaks VALUES (?, ?, ?) ON CONFLICT(kernel, arch) DO UPDATE
+                                SET peak_rss = MAX(peak_rss, excluded.peak_rss)''', peaks)
+            conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [('size', end), ('inode', st.st_ino)])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    '''
+    Latest record of the HSACO file, or None if not recorded
+    '''
+    def lookup(self, hsaco):
+        with self._lock:
+            row = self._open_index().execute('SELECT offset FROM records WHERE path = ?',
+                                             (str(Path(hsaco).absolute()),)).fetchone()
+        if row is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(row[0])
+            return json.loads(f.readline())
+
+    '''
+    Peak RSS in bytes measured for the HSACO file, or the maximum of its kernel
+    (and arch, if measured). Returns None if nothing is measured.
+    '''
+    def peak_rss(self, hsaco, kernel, arch):
+        with self._lock:
+            conn = self._open_index()
+            row = conn.execute('SELECT peak_rss FROM records WHERE path = ?',
+                               (str(Path(hsaco).absolute()),)).fetchone()
+            if row is None or row[0] is None:
+                row = conn.execute('SELECT peak_rss FROM peaks WHERE kernel = ? AND arch = ?', (kernel, arch)).fetchone()
+            if row is None:
+                row = conn.execute('SELECT MAX(peak_rss) FROM peaks WHERE kernel = ?', (kernel,)).fetchone()
+        return row[0]
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+'''
+Opens the ledger with an up-to-date index, once per process.
+Returns None if the ledger does not exist.
+'''
+def open_ledger(path):
+    path = Path(path).absolute()
+    with _ledgers_lock:
+        if path not in _ledgers:
+            ledger = CompileLedger(path)
+            if ledger.exists():
+                ledger.update_index()
+            else:
+                ledger = None
+            _ledgers[path] = ledger
+        return _ledgers[path]
+
+'''
+Latest state of each HSACO. The status comes from the latest record, while
+the duration and peak RSS come from the latest record that compiled the
+HSACO, since cache hits do not measure them.
+'''
+def latest_records(records):
+    latest = {}
+    for r in records:
+        if 'hsaco' not in r:
+            continue
+        key = r.get('path', r['hsaco'])
+        prev = latest.get(key)
+        r = dict(r)
+        if r.get('duration') is None and prev is not None:
+            r['duration'] = prev.get('duration')
+            r['peak_rss'] = prev.get('peak_rss')
+        latest[key] = r
+    return list(latest.values())
+
+def summarize(records, top=5):
+    groups = defaultdict(list)
+    for r in latest_records(records):
+        groups[(r['kernel'], r['arch'])].append(r)
+    summary = []
+    for (kernel, arch), rs in sorted(groups.items()):
+        status = defaultdict(int)
+        for r in rs:
+            status[r.get('status', STATUS_COMPLETE)] += 1
+        timed = [ r for r in rs if r.get('duration') is not None ]
+        slowest = sorted(timed, key=lambda r : r['duration'], reverse=True)[:top]
+        summary.append({
+            'kernel' : kernel,
+            'arch' : arch,
+            'hsaco' : len(rs),
+            'status' : dict(sorted(status.items())),
+            'failure_rate' : round(1.0 - status[STATUS_COMPLETE] / len(rs), 4),
+            'timeouts' : status[STATUS_TIMEOUT],
+            'cpu_seconds' : round(sum([ r['duration'] for r in timed ]), 3),
+            'max_peak_rss' : max([ r.get('peak_rss') or 0 for r in rs ]),
+            'spilled' : len([ r for r in rs if (r.get('vgpr_spill_count') or 0) > 0 ]),
+            'slowest' : [ { k : r.get(k) for k in ['hsaco', 'duration', 'status', 'peak_rss'] } for r in slowest ],
+        })
+    return summary
+
+def format_summary(summary):
+    lines = []
+    hdr = f'{"Kernel":<32} {"Arch":<8} {"HSACO":>7} {"Failed":>7} {"Timeout":>7} {"Rate":>6} {"CPU(h)":>8} {"PeakRSS(MiB)":>12} {"Spilled":>7}'
+    lines.append(hdr)
+    for g in summary:
+        failed = g['hsaco'] - g['status'].get(STATUS_COMPLETE, 0)
+        lines.append(f'{g["kernel"]:<32} {g["arch"]:<8} {g["hsaco"]:>7} {failed:>7} {g["timeouts"]:>7} '
+                     f'{g["failure_rate"] * 100:>5.1f}% {g["cpu_seconds"] / 3600:>8.2f} {g["max_peak_rss"] >> 20:>12} {g["spilled"]:>7}')
+    for g in summary:
+        if not g['slowest']:
+            continue
+        lines.append('')
+        lines.append(f'Slowest of {g["kernel"]} {g["arch"]}:')
+        for r in g['slowest']:
+            lines.append(f'    {r["duration"]:>9.1f}s {r["status"]:<13} {r["hsaco"]}')
+    return '\n'.join(lines)
+
+'''
+Rewrite the ledger with the latest record of each HSACO only.
+Appends wait for the lock, and go to the new file once it is replaced.
+'''
+def compact(ledger : CompileLedger):
+    with ledger.locked():
+        records = latest_records(ledger.records())
+        tmp = ledger.path.with_name(f'{ledger.path.name}.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            for r in records:
+                print(json.dumps(r), file=f)
+        os.replace(tmp, ledger.path)
+    return len(records)
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--ledger", type=Path, default=None, help=f"Compile ledger. Defaults to {DEFAULT_LEDGER} under --build_dir")
+    p.add_argument("--build_dir", type=Path, default=Path('build'), help="Build directory of the generator")
+    p.add_argument("--top", type=int, default=5, help="Number of slowest configurations listed per kernel and arch")
+    p.add_argument("--json", type=Path, default=None, help="Also write the summary as JSON to this file")
+    p.add_argument("--compact", action='store_true', help="Keep only the latest record of each HSACO in the ledger")
+    args = p.parse_args()
+    return args
+
+def main():
+    args = parse()
+    ledger = CompileLedger(args.ledger if args.ledger is not None else args.build_dir / DEFAULT_LEDGER)
+    if not ledger.exists():
+        print(f'{ledger.path} does not exist', file=sys.stderr)
+        sys.exit(1)
+    if args.compact:
+        print(f'{compact(ledger)} records kept in {ledger.path}')
+        return
+    summary = summarize(ledger.records(), top=args.top)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    print(format_summary(summary))
+
+if __name__ == '__main__':
+    main()
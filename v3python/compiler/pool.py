@@ -0,0 +1,170 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from .job import (
+    CompileJob,
+    CompileResult,
+    write_failure,
+    STATUS_TIMEOUT,
+    STATUS_EXIT_WITH_ERROR,
+    STATUS_MEMORY_LIMIT,
+)
+from .worker import worker_main, read_vm
+
+# Interval of sampling the address space of a busy worker, in seconds
+SAMPLE_INTERVAL = 0.05
+# A worker killed by a signal is considered out of memory if its address
+# space reached this fraction of the limit
+MEMORY_LIMIT_THRESHOLD = 0.8
+# Signals of native allocation failures (std::bad_alloc -> abort, or
+# dereferencing failed mallocs), and of the kernel OOM killer
+MEMORY_FAILURE_SIGNALS = [signal.SIGABRT, signal.SIGSEGV, signal.SIGBUS, signal.SIGKILL]
+
+'''
+A persistent worker process, owned by one dispatcher thread of WorkerPool.
+'''
+class _Worker(object):
+    def __init__(self, ctx, backend, memory_limit):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=worker_main,
+                                   args=(child_conn, backend, memory_limit),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        # Largest address space observed during the current job
+        self.peak_vm = 0
+
+    '''
+    Returns the CompileResult. The worker must be replaced if the status is
+    Timeout or ExitWithError.
+    '''
+    def run(self, job : CompileJob):
+        deadline = time.monotonic() + job.timeout * 60.0 if job.timeout > 0 else None
+        self.peak_vm = 0
+        try:
+            self.conn.send(job.asdict())
+            while True:
+                wait = SAMPLE_INTERVAL
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return CompileResult(status=STATUS_TIMEOUT)
+                if self.conn.poll(wait):
+                    return CompileResult.from_dict(self.conn.recv())
+                self.peak_vm = max(self.peak_vm, read_vm(self.process.pid)[0])
+        except (EOFError, OSError):
+            return CompileResult(status=STATUS_EXIT_WITH_ERROR)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        return self.process.exitcode
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5.0)
+        if self.process.exitcode is None:
+            self.kill()
+        else:
+            self.conn.close()
+
+'''
+Pool of persistent compile workers.
+
+Each worker keeps the backend, and the kernel modules it has imported, alive
+across jobs. A worker that times out or dies is killed and replaced by a new
+one; the job is recorded as Timeout or ExitWithError, with the same empty
+.hsaco and .json outputs as v3python/compile.py. A worker that dies of a
+native allocation failure under its memory limit, or is killed by the OOM
+killer, is recorded as MemoryLimit.
+
+backend: name of the backend, see compiler.backend.BACKENDS
+memory_limit: RLIMIT_AS of each worker in bytes, 0 for unlimited.
+              CompileJob.rlimit_as overrides it for one job.
+'''
+class WorkerPool(object):
+    def __init__(self, backend='triton', workers=1, memory_limit=0, context='spawn'):
+        assert workers > 0
+        self._ctx = multiprocessing.get_context(context)
+        self._backend = backend
+        self._memory_limit = memory_limit
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.stats = { 'submitted' : 0, 'completed' : 0, 'respawned' : 0 }
+        self._threads = [ threading.Thread(target=self._dispatch, daemon=True) for _ in range(workers) ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, job : CompileJob):
+        future = Future()
+        with self._lock:
+            self.stats['submitted'] += 1
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job : CompileJob):
+        return self.submit(job).result()
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _out_of_memory(self, job, worker, exitcode):
+        if exitcode is None or -exitcode not in MEMORY_FAILURE_SIGNALS:
+            return False
+        # Timeouts are recorded before the kill, hence SIGKILL comes from the OOM killer
+        if -exitcode == signal.SIGKILL:
+            return True
+        limit = job.rlimit_as or self._memory_limit
+        return bool(limit) and worker.peak_vm >= limit * MEMORY_LIMIT_THRESHOLD
+
+    def _dispatch(self):
+        worker = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is None:
+                    worker = _Worker(self._ctx, self._backend, self._memory_limit)
+                tic = time.monotonic()
+                result = worker.run(job)
+                if result.status in [STATUS_TIMEOUT, STATUS_EXIT_WITH_ERROR]:
+                    result.exitcode = worker.kill()
+                    result.duration = time.monotonic() - tic
+                    if result.status == STATUS_EXIT_WITH_ERROR and self._out_of_memory(job, worker, result.exitcode):
+                        result.status = STATUS_MEMORY_LIMIT
+                    worker = None
+                    self._count('respawned')
+                    write_failure(job, result.status)
+                self._count('completed')
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+        if worker is not None:
+            worker.stop()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from pathlib import Path
+from .job import CompileJob
+from .backend import BACKENDS
+from .pool import WorkerPool
+
+desc = """
+Persistent compile server for v3python/compile.py.
+Keeps a pool of compile workers with triton and kernel modules imported.
+v3python/compile.py sends its job to the server when AOTRITON_COMPILE_SERVER
+(or --server) points to the socket of a running server, hence the build
+rules do not need to change:
+
+    python -m v3python.compiler.server --socket build/compile.sock --workers 16 &
+    AOTRITON_COMPILE_SERVER=build/compile.sock make -j16 aotriton_v2_compile
+"""
+
+def parse():
+    p = argparse.ArgumentParser(description=desc, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--socket", type=Path, required=True, help="Path of the UNIX domain socket to listen on")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of compile workers")
+    p.add_argument("--backend", type=str, default='triton', choices=list(BACKENDS.keys()), help="Compiler backend")
+    p.add_argument("--memory_limit", type=int, default=0, help="Address space limit of each worker in MiB. 0 for unlimited.")
+    p.add_argument("--idle_timeout", type=float, default=0.0, help="Exit after idling for this many seconds. 0 to run until shut down.")
+    args = p.parse_args()
+    return args
+
+'''
+JSON lines protocol, one request per line:
+    {"op": "compile", "job": {CompileJob fields}} -> {"result": {CompileResult fields}}
+    {"op": "status"}                              -> {"status": {...}}
+    {"op": "shutdown"}                            -> {}
+Errors are returned as {"error": message}.
+'''
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            with self.server.activity():
+                response = self.server.respond(json.loads(line))
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool : WorkerPool, idle_timeout=0.0):
+        self.socket_path = Path(socket_path)
+        if self.socket_path.is_socket():
+            self.socket_path.unlink()
+        super().__init__(str(self.socket_path), _Handler)
+        self.pool = pool
+        self.idle_timeout = idle_timeout
+        self._active = 0
+        self._last_active = time.monotonic()
+        self._lock = threading.Lock()
+
+    def activity(self):
+        server = self
+        class _Activity(object):
+            def __enter__(self):
+                with server._lock:
+                    server._active += 1
+            def __exit__(self, exc_type, exc_value, traceback):
+                with server._lock:
+                    server._active -= 1
+                    server._last_active = time.monotonic()
+        return _Activity()
+
+    def respond(self, d):
+        op = d.get('op')
+        try:
+            if op == 'compile':
+                result = self.pool.run(CompileJob.from_dict(d['job']))
+                return { 'result' : result.asdict() }
+            if op == 'status':
+                with self._lock:
+                    status = dict(self.pool.stats, active=self._active - 1)
+                return { 'status' : status }
+            if op == 'shutdown':
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {}
+            return { 'error' : f'Unknown op {op}' }
+        except Exception as e:
+            return { 'error' : f'{type(e).__name__}: {e}' }
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(min(1.0, self.idle_timeout))
+            with self._lock:
+                idle = self._active == 0 and time.monotonic() - self._last_active > self.idle_timeout
+            if idle:
+                self.shutdown()
+                return
+
+    def serve(self):
+        if self.idle_timeout > 0:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+def main():
+    args = parse()
+    with WorkerPool(backend=args.backend,
+                    workers=args.workers,
+                    memory_limit=args.memory_limit << 20) as pool:
+        server = CompileServer(args.socket, pool, idle_timeout=args.idle_timeout)
+        server.serve()
+
+if __name__ == '__main__':
+    main()
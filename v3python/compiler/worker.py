@@ -0,0 +1,121 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import resource
+import time
+import traceback
+from .job import (
+    CompileJob,
+    CompileResult,
+    write_failure,
+    STATUS_COMPLETE,
+    STATUS_EXCEPTION,
+    STATUS_MEMORY_LIMIT,
+)
+from .backend import create_backend
+
+'''
+Peak RSS tracking of the current process.
+Writing 5 to /proc/self/clear_refs resets VmHWM, so the peak RSS of each job
+can be measured in a persistent worker. Falls back to ru_maxrss (peak of the
+process lifetime) when /proc is not available.
+'''
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def read_peak_rss():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+'''
+Address space of a process in bytes, as (current, peak). (0, 0) if unknown.
+'''
+def read_vm(pid='self'):
+    current, peak = 0, 0
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmSize:'):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith('VmPeak:'):
+                    peak = int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return current, peak
+
+'''
+Limit the address space of the current process. limit is in bytes, 0 to
+restore the hard limit. Only the soft limit is changed, so a persistent
+worker can apply different limits to different jobs.
+'''
+def limit_memory(limit):
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if not limit:
+        limit = hard
+    elif hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+'''
+Run one job with the backend, and never raise.
+Failures are recorded in the .hsaco/.json outputs as well as the returned
+CompileResult.
+'''
+def execute(backend, job : CompileJob):
+    reset_peak_rss()
+    tic = time.monotonic()
+    message = ''
+    try:
+        backend.compile(job)
+        status = STATUS_COMPLETE
+    except MemoryError:
+        status = STATUS_MEMORY_LIMIT
+    except Exception as e:
+        status = STATUS_EXCEPTION
+        message = traceback.format_exc() if job.verbose else str(e)
+    duration = time.monotonic() - tic
+    if status != STATUS_COMPLETE:
+        write_failure(job, status)
+    try:
+        hsaco_size = job.hsaco_path.stat().st_size
+    except OSError:
+        hsaco_size = 0
+    return CompileResult(status=status,
+                         duration=duration,
+                         peak_rss=read_peak_rss(),
+                         hsaco_size=hsaco_size,
+                         message=message)
+
+'''
+Entry point of worker processes. Receives CompileJob dicts from conn and
+sends back CompileResult dicts, until None is received or the connection
+is closed.
+'''
+def worker_main(conn, backend_name, memory_limit):
+    limit_memory(memory_limit)
+    backend = create_backend(backend_name)
+    while True:
+        try:
+            d = conn.recv()
+        except EOFError:
+            break
+        if d is None:
+            break
+        job = CompileJob.from_dict(d)
+        if job.rlimit_as:
+            limit_memory(job.rlimit_as)
+        result = execute(backend, job)
+        if job.rlimit_as:
+            limit_memory(memory_limit)
+        conn.send(result.asdict())
+    conn.close()
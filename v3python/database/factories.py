@@ -15,8 +15,15 @@ class Factories(object):
         other: requires a config file, for example: pg.json
     '''
     @staticmethod
-    def create_factory(path):
+    def find_factory(path):
         for fac in FACTORIES:
             if (path / fac.SIGNATURE_FILE).exists():
-                return fac(path)
-        assert False, 'database.Factories.create_factory failed. Database file missing?'
+                return fac
+        assert False, 'database.Factories.find_factory failed. Database file missing?'
+
+    '''
+    Open a database session. Options are passed to the factory class.
+    '''
+    @staticmethod
+    def create_factory(path, **options):
+        return Factories.find_factory(path)(path, **options)
@@ -5,7 +5,8 @@ import sqlite3
 import pandas as pd
 from ..base import typed_choice as TC
 from ..op import Operator
-from ..utils import log
+from ..utils import log, profiler
+from ..utils.log import AOTRITON_DEBUG_GENERATOR
 from ..gpu_targets import AOTRITON_TUNING_DATABASE_REUSE
 
 '''
@@ -13,6 +14,7 @@ We don't really need a LazyTableView, if Lazy evaluation is needed, a
 LazyPandasDataFrame is more preferrable
 '''
 # from .view import LazyTableView as SqliteTableView
+from .view import QueryResults
 
 def create_select_stmt(table_name, wheres):
     stmt = f"SELECT * FROM {table_name} WHERE "
@@ -34,52 +36,224 @@ def format_sql(stmt, params):
     template = stmt.replace('?', '{!r}')
     return template.format(*params)
 
+class PrefetchedTable(object):
+    '''
+    All rows of a tuning table for a given list of database_gpus, loaded with
+    a single SELECT. Rows are indexed by the values of WHERE columns, so
+    select() is a hash lookup instead of a SQL round-trip.
+
+    Rows keep the order returned by SQLite, hence a slice has the same order
+    as the per-Functional SELECT, which scans the same UNIQUE index.
+    '''
+    def __init__(self, conn, table_name, gpus):
+        self._gpus = list(gpus)
+        stmt, params = create_select_stmt(table_name, { 'gpu' : gpus })
+        with profiler.span('db_prefetch', table=table_name):
+            cursor = conn.execute(stmt, params)
+            self._columns = [ desc[0] for desc in cursor.description ]
+            self._rows = cursor.fetchall()
+        profiler.count('db_rows_read', len(self._rows))
+        self._colindex = { name : i for i, name in enumerate(self._columns) }
+        self._indices = {}
+
+    '''
+    Returns None if the WHERE clause cannot be served by the index
+    (IN list or unknown column). The caller should fall back to SQL.
+    '''
+    def select(self, wheres):
+        keys = []
+        values = []
+        for k, v in wheres.items():
+            # Already applied by the prefetch SELECT
+            if k == 'gpu' and list(v) == self._gpus:
+                continue
+            keys.append(k)
+            if isinstance(v, list) or isinstance(v, tuple):
+                return None
+            values.append(v.sql_value if isinstance(v, TC.TypedChoice) else v)
+        index = self._get_index(tuple(keys))
+        if index is None:
+            return None
+        rows = [self._rows[i] for i in index.get(tuple(values), [])]
+        return QueryResults(self._columns, rows)
+
+    def _get_index(self, keys):
+        if keys in self._indices:
+            return self._indices[keys]
+        if any([k not in self._colindex for k in keys]):
+            index = None
+        else:
+            cols = [self._colindex[k] for k in keys]
+            index = {}
+            for i, row in enumerate(self._rows):
+                key = tuple([row[c] for c in cols])
+                # NULL never matches '=' in SQL
+                if None in key:
+                    continue
+                index.setdefault(key, []).append(i)
+        self._indices[keys] = index
+        return index
+
+'''
+URI that opens the database file as read-only and immutable.
+SQLite skips locking and change detection of immutable databases, which is
+safe because the databases are not modified during code generation.
+'''
+def readonly_uri(fn):
+    return fn.absolute().as_uri() + '?mode=ro&immutable=1'
+
 class Factory(object):
     SIGNATURE_FILE = 'tuning_database.sqlite3'
     SECONDARY_DATABASES = {
         'op': 'op_database.sqlite3',
     }
+    MMAP_SIZE = 1 << 30
+    # The generator only issues a few SELECT shapes, but the per-Functional
+    # path (prefetch=False) binds them to many tables
+    CACHED_STATEMENTS = 512
+
+    '''
+    Read-only database session, shared by all generators of a process.
 
-    def __init__(self, path):
-        log(lambda : f'sqlite3.connect({path / self.SIGNATURE_FILE})')
-        self._conn = sqlite3.connect(path / self.SIGNATURE_FILE)
-        self._conn.set_trace_callback(log) # Debug
+    prefetch:  load each table once per database_gpus and serve create_view
+               from memory. False runs one SELECT per Functional.
+    in_memory: copy the database files into memory when the session is
+               opened, instead of memory-mapping them.
+    '''
+    def __init__(self, path, prefetch=True, in_memory=False):
+        self._prefetch = prefetch
+        self._tables = {}
+        files = { 'main' : path / self.SIGNATURE_FILE }
         for schema, bn in self.SECONDARY_DATABASES.items():
             fn = path / bn
-            if fn.is_file():
-                log(lambda : f"ATTACH DATABASE '{fn.as_posix()}' AS {schema};")
-                self._conn.execute(f"ATTACH DATABASE '{fn.as_posix()}' AS {schema};")
+            assert fn.is_file(), f'{fn} is not a file, {path}'
+            files[schema] = fn
+        if in_memory:
+            self._conn = self._open_in_memory(files)
+        else:
+            self._conn = self._open_readonly(files)
+        self._conn.execute('PRAGMA query_only = ON;')
+        if AOTRITON_DEBUG_GENERATOR:
+            self._conn.set_trace_callback(log) # Debug
+
+    def _connect(self, database):
+        return sqlite3.connect(database, uri=True, cached_statements=self.CACHED_STATEMENTS)
+
+    def _open_readonly(self, files):
+        log(lambda : f'sqlite3.connect({readonly_uri(files["main"])})')
+        conn = self._connect(readonly_uri(files['main']))
+        for schema, fn in files.items():
+            if schema != 'main':
+                log(lambda : f"ATTACH DATABASE '{readonly_uri(fn)}' AS {schema};")
+                conn.execute(f'ATTACH DATABASE ? AS {schema};', (readonly_uri(fn),))
+            conn.execute(f'PRAGMA {schema}.mmap_size = {self.MMAP_SIZE};')
+        return conn
+
+    def _open_in_memory(self, files):
+        conn = self._connect(':memory:')
+        for schema, fn in files.items():
+            log(lambda : f'Load {fn} into memory as {schema}')
+            if schema != 'main':
+                conn.execute(f"ATTACH DATABASE ':memory:' AS {schema};")
+            with profiler.span('db_load', file=fn.name):
+                conn.deserialize(fn.read_bytes(), name=schema)
+        return conn
+
+    def close(self):
+        self._tables = {}
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _table_name(self, functional):
+        meta = functional.meta_object
+        pfx = 'op.' if isinstance(meta, Operator) else ''
+        return pfx + meta.FAMILY.upper() + '$' + meta.NAME
+
+    def _build_wheres(self, functional, choice_dict):
+        wheres = {
+            'gpu' : functional.database_gpus,
+        }
+        for key, value in choice_dict.items():
+            if isinstance(value, TC.TypedChoice) and value.is_tensor:
+                wheres[f'inputs${key}_dtype'] = value
             else:
-                assert False, f'{fn} is not a file, {path}'
+                wheres[f'inputs${key}'] = value
+        return wheres
 
     def create_view(self, functional):
+        with profiler.span('create_view'):
+            if not self._prefetch:
+                df, sql = self._create_view_per_functional(functional)
+                if df is not None:
+                    profiler.count('db_rows_read', len(df))
+                    profiler.count('db_rows_selected', len(df))
+                return df, sql
+            results, sql = self.select(functional)
+            if results is None:
+                return None, ''
+            return results.to_dataframe(), sql
+
+    '''
+    Same rows as create_view, but returns QueryResults instead of
+    pandas.DataFrame, which is much cheaper to hash or skip.
+    '''
+    def select(self, functional):
         log(lambda : f'{functional=}')
-        meta = functional.meta_object
-        pfx = 'op.' if isinstance(meta, Operator) else ''
-        table_name = pfx + meta.FAMILY.upper() + '$' + meta.NAME
+        table_name = self._table_name(functional)
         # TODO: Incremental changes:
         # 1. load database_gpus first
         # 2. then override entries with optimized_for gpus
-        def build_sql(choice_dict):
-            wheres = {
-                'gpu' : functional.database_gpus,
-            }
-            for key, value in choice_dict.items():
-                if isinstance(value, TC.TypedChoice) and value.is_tensor:
-                    wheres[f'inputs${key}_dtype'] = value
-                else:
-                    wheres[f'inputs${key}'] = value
-            return create_select_stmt(table_name, wheres)
-        stmt, params = build_sql(functional.compact_choices)
+        table = self._get_table(table_name, functional.database_gpus)
+        if table is None:
+            log(lambda : f'Table {table_name} may not exist.')
+            return None, ''
+        def query(wheres):
+            stmt, params = create_select_stmt(table_name, wheres)
+            results = table.select(wheres)
+            if results is None:
+                log(lambda : f'select stmt: {stmt} params {params}')
+                cursor = self._conn.execute(stmt, params)
+                results = QueryResults([ desc[0] for desc in cursor.description ], cursor.fetchall())
+                profiler.count('db_rows_read', len(results.rows))
+            profiler.count('db_rows_selected', len(results.rows))
+            return results, format_sql(stmt, params)
+        results, sql = query(self._build_wheres(functional, functional.compact_choices))
+        if results.rows:
+            return results, sql
+        # Downgrade
+        return query(self._build_wheres(functional, functional.fallback_choices))
+
+    def _create_view_per_functional(self, functional):
+        table_name = self._table_name(functional)
+        stmt, params = create_select_stmt(table_name, self._build_wheres(functional, functional.compact_choices))
         try:
             log(lambda : f'select stmt: {stmt} params {params}')
             df = pd.read_sql_query(stmt, self._conn, params=params)
             if not df.empty:
                 return df, format_sql(stmt, params)
             # Downgrade
-            stmt, params = build_sql(functional.fallback_choices)
+            stmt, params = create_select_stmt(table_name, self._build_wheres(functional, functional.fallback_choices))
             df = pd.read_sql_query(stmt, self._conn, params=params)
             return df, format_sql(stmt, params)
         except pd.errors.DatabaseError:
             log(lambda : f'Table {table_name} may not exist. select stmt: {stmt} params {params}')
             return None, ''
+
+    '''
+    Returns None if the table does not exist.
+    The result is cached, so missing tables are not queried again.
+    '''
+    def _get_table(self, table_name, gpus):
+        key = (table_name, tuple(gpus))
+        if key not in self._tables:
+            log(lambda : f'Prefetch {table_name} for {gpus}')
+            try:
+                self._tables[key] = PrefetchedTable(self._conn, table_name, gpus)
+            except sqlite3.DatabaseError:
+                self._tables[key] = None
+        return self._tables[key]
@@ -2,12 +2,19 @@
 # SPDX-License-Identifier: MIT
 
 from dataclasses import dataclass
+import pandas as pd
 
 @dataclass
 class QueryResults:
     col_names: list[str]
     rows: list
 
+    '''
+    Same DataFrame as pd.read_sql_query returns for these rows
+    '''
+    def to_dataframe(self):
+        return pd.DataFrame.from_records(self.rows, columns=self.col_names, coerce_float=True)
+
 class LazyTableView(object):
 
     '''
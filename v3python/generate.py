@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: MIT
 
 import os
+import functools
 from .rules import (
     kernels as triton_kernels,
     operators as dispatcher_operators,
@@ -12,6 +13,7 @@ from .codegen import (
 import argparse
 from pathlib import Path
 from .gpu_targets import AOTRITON_SUPPORTED_GPUS
+from .utils import profiler, OutputSink
 
 SKIPPED_LUT_CHECK = os.getenv('AOTRITON_SKIP_LUT_CHECK', default='').split(',')
 
@@ -38,8 +40,29 @@ def parse():
     p.add_argument("--build_for_tuning_second_pass", action='store_true', help="Only re-generate autotune files. Ignore HSACO kernels in the autotune files that failed to compile.")
     p.add_argument("--build_for_tuning_but_skip_kernel", type=str, default='', nargs='*',
                    help="Excluse certain GPU kernels for performance tuning when --build_for_tuning=True.")
+    p.add_argument("--build_for_tuning_max_spills", type=int, default=-1,
+                   help="With --build_for_tuning_second_pass, also ignore HSACO kernels that spill more registers (VGPR + SGPR) than this. Negative to keep all.")
+    p.add_argument("--build_for_tuning_min_occupancy", type=int, default=0,
+                   help="With --build_for_tuning_second_pass, also ignore HSACO kernels with fewer waves per SIMD than this, according to the AMDGPU metadata. 0 to keep all.")
     # Always True
     # p.add_argument("--generate_cluster_info", action='store_true', help="Generate Bare.functionals for clustering.")
+    p.add_argument("--tu_bundle_size", type=int, default=1, help="Unity build. Bundle the autotune/optune code of up to N Functionals of the same kernel and arch into one translation unit.")
+    p.add_argument("--reproducible", action='store_true', help="Sort the lines of Bare.shim, Bare.compile, Bare.cluster and Affine.cluster, so they do not depend on the order of generation.")
+    p.add_argument("--jobs", "-j", type=int, default=1, help="Number of worker processes to generate autotune/optune code of Functionals. Output is identical to serial generation.")
+    p.add_argument("--db_in_memory", action='store_true', help="Load the tuning databases into memory instead of memory-mapping the files. Does not change the generated code.")
+    p.add_argument("--no_manifest", action='store_true', help="Do not use the manifest under build_dir (.aotriton_manifest) to skip the code generation of unchanged Functionals.")
+    p.add_argument("--profile", type=Path, default=None, help="Write per-interface and per-functional timing to this file in Chrome trace JSON format, and a summary table to <file>.txt")
+    p.add_argument("--plan", type=Path, default=None, help="Dry run. Do not generate any file, but write the number of Functionals, translation units, HSACO rules and AKS2 archives to this file in JSON format, and a text report to <file>.txt")
+    p.add_argument("--plan_ledger", type=Path, default=None, help="Compile ledger (JSON Lines) used by --plan and --compile_order lpt to estimate the compile time. Defaults to compile_ledger.jsonl under build_dir if present.")
+    p.add_argument("--compile_order", type=str, default='generation', choices=['generation', 'lpt'],
+                   help="Order of the rules in Bare.compile, which is the order the build starts compiling. 'lpt' puts the longest predicted compile first.")
+    p.add_argument("--ninja", action='store_true', help="Also write kernels.ninja under build_dir, a ninja file that compiles the HSACO files in Bare.compile and packs the archives in Bare.cluster and Affine.cluster")
+    p.add_argument("--ninja_compile_jobs", type=int, default=os.cpu_count(), help="--ninja only. Depth of the ninja pool of compile jobs")
+    p.add_argument("--ninja_timeout", type=float, default=8.0, help="--ninja only. --timeout of compile.py in minutes. 0 for indefinite")
+    p.add_argument("--ninja_triton_cache_dir", type=Path, default=None, help="--ninja only. TRITON_CACHE_DIR of compile jobs. Defaults to triton-cache under the parent of build_dir")
+    p.add_argument("--ninja_git_sha1", type=str, default='unknown', help="--ninja only. Git SHA1 recorded in the image signature")
+    p.add_argument("--ninja_aks3", action='store_true', help="--ninja only. Pack with v3python.aks3 instead of v3python.aks2")
+    p.add_argument("--ninja_aks3_block_size", type=int, default=0, help="--ninja only. --block_size of v3python.aks3")
     p.add_argument("--verbose", action='store_true', help="Print debugging messages")
     p.add_argument("--lut_sanity_check", action='store_true', help="By default, an exception will ba raised when any the look up table (LUT) is broken. With this option the exception is not raised, and diagnose information is printed for developers to re-run the tuning script in order to fix the database.")
     # Handled by CMake
@@ -48,14 +71,27 @@ def parse():
     args._sanity_check_exceptions = []
     args.build_for_tuning_but_skip_kernel = args.build_for_tuning_but_skip_kernel
     args._object_file_registry = []
-    args._should_raise_for_lut = lambda f : should_raise_for_lut(args, f)
+    # functools.partial instead of lambda, so args can be pickled by --jobs
+    args._should_raise_for_lut = functools.partial(should_raise_for_lut, args)
     # print(args)
     return args
 
 def main():
     args = parse()
+    if args.profile:
+        profiler.enable()
     gen = RootGenerator(args)
-    gen.generate()
+    try:
+        if args.plan:
+            with profiler.span('plan'):
+                gen.plan()
+        else:
+            # Wait for all background writes before exit
+            with profiler.span('generate'), OutputSink(args.build_dir / OutputSink.INDEX_FILE):
+                gen.generate()
+    finally:
+        if args.profile:
+            profiler.write(args.profile)
     for e in args._sanity_check_exceptions:
         raise e
 
@@ -10,6 +10,7 @@ from pathlib import Path
 from ..base import (
     Interface,
     Functional,
+    Exclusion,
     ConditionalChoice,
     ConditionalConstexpr,
     ConditionalDeferredConstexpr,
@@ -17,9 +18,11 @@ from ..base import (
     TemplateParameter as TP,
     PerformanceTemplateParameter as PTP,
 )
+from ..base.lut import bucket_sparse_keys, stack_columns, scatter_lut
+from ..autotune.pruning import PruningRuleSet
 from .ksignature import KernelSignature, COMPILER_OPTIONS, DEFAULT_COPT
 from ..gpu_targets import AOTRITON_SUPPORTED_GPUS, cluster_gpus
-from ..utils import log
+from ..utils import log, profiler
 import pandas as pd
 
 SOURCE_PATH = Path(__file__).resolve()
@@ -54,6 +57,8 @@ class KernelDescription(Interface):
     ARGUMENTS = []
     NAME = None
     _ARGUMENT_CHOICES = None
+    MODULE_FILE = None
+    PRUNING_RULES = None    # Pruning rule file of gen_autotune_configs, relative to MODULE_FILE
 
     @property
     def enum_name(self):
@@ -77,12 +82,10 @@ class KernelDescription(Interface):
             log(lambda : f'{self._DATA_ARGUMENTS=}')
         return self._DATA_ARGUMENTS
 
-    def is_functional_disabled(self, functional):
-        return False
-
     def __init__(self, triton_kernel_name, triton_source_path):
         super().__init__()
         self._DATA_ARGUMENTS = None
+        self._pruning_rules = None
         self._triton_source_path = Path(triton_source_path)
         self._triton_kernel_name = triton_kernel_name
         # FIXME: Support tensor with different ranks
@@ -139,25 +142,21 @@ class KernelDescription(Interface):
         Extract keys from kdesc
         '''
         sparse_keys = [ f'inputs${key}' for key, _ in self.AUTOTUNE_KEYS_VALIDATED ]
-        nkeys = len(sparse_keys)
         # print(f'{sparse_keys=}')
-        def sorted_unique_key(key):
-            return np.unique(df[key].to_numpy()).tolist()
-        sparse_key_possible_values = { key : sorted_unique_key(key) for key in sparse_keys }
+        '''
+        Bucketing autotune indices
+        '''
+        sparse_key_possible_values, sparse_key_indices = bucket_sparse_keys(df, sparse_keys)
         binning_dict = { key : algo(sparse_key_possible_values[spk]) for spk, (key, algo) in zip(sparse_keys, self.AUTOTUNE_KEYS_VALIDATED) }
-        # sparse_shape is not used because lut is compact
-        lut_shape = [f.noptimized_for] + [ len(sparse_key_possible_values[key]) for key in sparse_keys ]
-        # lut starts with a large enough dtype
-        lut_tensor = np.full(lut_shape, -1, dtype=np.int32)
         perf_keys = [ f'tuned_kernel${meta.repr_name}' for meta in self._perf_params ]
         copt_keys = [ f'compiler_options${key}' for key in COMPILER_OPTIONS ]
         '''
         Deduplication and assign numbers
         '''
         log(lambda : f'{df[perf_keys + copt_keys]=}')
-        np_sigs, revind = np.unique(df[perf_keys + copt_keys].to_numpy(), axis=0, return_inverse=True)
-        df['$$sig_num'] = revind
-        sigs_dict = {}
+        with profiler.span('np.unique'):
+            np_sigs, revind = np.unique(stack_columns(df, perf_keys + copt_keys), axis=0, return_inverse=True)
+        profiler.count('signatures_deduplicated', len(df) - len(np_sigs))
         def perf_bind(nprow):
             return [ meta.create_direct(value) for meta, value in zip(self._perf_params, nprow) ]
         nperfs = len(perf_keys)
@@ -167,24 +166,11 @@ class KernelDescription(Interface):
                                    nprow[nperfs:].tolist())
         sigs = [ create_sig(nprow) for nprow in np_sigs ]
         '''
-        Bucketing autotune indices
-        '''
-        for i, ind_key in enumerate(sparse_keys):
-            bucket = sparse_key_possible_values[ind_key]
-            def discretization(v):
-                return bucket.index(v)
-            df[f'$$ind_{i}'] = df[ind_key].apply(discretization)
-        '''
         Create LUT
         Note: df's gpu column comes directly from DB. Hence database_gpus should be used.
         '''
-        for i, gpu in enumerate(f.database_gpus):
-            if i > 0:
-                lut_tensor[i] = lut_tensor[0]
-            df_i = df[df['gpu'] == gpu]
-            inds = tuple([df_i[f'$$ind_{i}'] for i in range(nkeys)])
-            sig_nums = df_i['$$sig_num']
-            lut_tensor[i][inds] = sig_nums
+        # sparse_shape is not used because lut is compact
+        lut_tensor = scatter_lut(f, df, sparse_key_possible_values, sparse_key_indices, revind.reshape(-1))
         '''
         Downcast LUT datatype
         Usually int8 is sufficient but let's be safe.
@@ -206,6 +192,19 @@ class KernelDescription(Interface):
         sigs = [ KernelSignature(f, defaults, DEFAULT_COPT) ]
         return lut_tensor, sigs, None
 
+    @property
+    def pruning_rules_path(self):
+        if self.PRUNING_RULES is None:
+            return None
+        return Path(self.MODULE_FILE).parent / self.PRUNING_RULES
+
+    @property
+    def pruning_rules(self):
+        if self._pruning_rules is None:
+            path = self.pruning_rules_path
+            self._pruning_rules = PruningRuleSet(self.NAME) if path is None else PruningRuleSet.load(path, self.NAME)
+        return self._pruning_rules
+
     def gen_signatures_for_tuning(self, f : Functional):
         def gen_perfs(cfg) -> 'list[Bind]':
             for meta in self._perf_params:
@@ -214,7 +213,7 @@ class KernelDescription(Interface):
         def gen_copts(cfg) -> list[int]:
             for copt, defopt in zip(COMPILER_OPTIONS, DEFAULT_COPT):
                 yield getattr(cfg, copt, defopt)
-        for cfg in self.gen_autotune_configs(f):
+        for cfg in self.pruning_rules.filter(f, self.gen_autotune_configs(f)):
             yield KernelSignature(f, list(gen_perfs(cfg)), list(gen_copts(cfg)))
 
     @property
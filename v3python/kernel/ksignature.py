@@ -20,7 +20,18 @@ assert COMPILER_OPTIONS[COPT_WAVES_INDEX] == 'waves_per_eu'
 assert COMPILER_OPTIONS[COPT_NWARPS_INDEX] == 'num_warps'
 assert COMPILER_OPTIONS[COPT_NSTAGES_INDEX] == 'num_stages'
 
+# Like Functional, KernelSignature is immutable after __init__ settles the
+# performance values, and derived signatures are cached.
 class KernelSignature(object):
+    __slots__ = (
+        '_functional',
+        '_perfs',
+        '_copts',
+        # Caches
+        '_perf_signature',
+        '_copt_signature',
+        '_triton_signature_string',
+    )
 
     def __init__(self, f : Functional, perf_values : 'list[Bind]', copt_values : list):
         self._functional = f
@@ -29,6 +40,9 @@ class KernelSignature(object):
             bind.settle_unresolved(tc_dict)
         self._perfs = perf_values
         self._copts = list(copt_values)
+        self._perf_signature = None
+        self._copt_signature = None
+        self._triton_signature_string = None
 
     def functional(self):
         return self._functional
@@ -43,21 +57,22 @@ class KernelSignature(object):
 
     @property
     def perf_signature(self):
-        kdesc = self._functional.meta_object
-        # TODO: Add prefix?
-        lp = [str(p.value) for p in self._perfs]
-        psel = '_'.join([x for x in lp if x is not None])
-        return psel
+        if self._perf_signature is None:
+            # TODO: Add prefix?
+            lp = [str(p.value) for p in self._perfs]
+            self._perf_signature = '_'.join([x for x in lp if x is not None])
+        return self._perf_signature
 
     @property
     def copt_dict(self):
-        kdesc = self._functional.meta_object
         return { oname : v for oname, v in zip(COMPILER_OPTIONS, self._copts) }
 
     @property
     def copt_signature(self):
-        lc = [f"{COMPACT_COMPILER_OPTIONS[oname]}{v}" for oname, v in self.copt_dict.items()]
-        return '_'.join(lc)
+        if self._copt_signature is None:
+            lc = [f"{COMPACT_COMPILER_OPTIONS[oname]}{v}" for oname, v in self.copt_dict.items()]
+            self._copt_signature = '_'.join(lc)
+        return self._copt_signature
 
     @property
     def both_signature(self):
@@ -90,6 +105,11 @@ class KernelSignature(object):
 
     @property
     def triton_signature_string(self):
+        if self._triton_signature_string is None:
+            self._triton_signature_string = self._build_triton_signature_string()
+        return self._triton_signature_string
+
+    def _build_triton_signature_string(self):
         complete_dict = self._functional.build_complete_tc_dict()
         for perf in self._perfs:
             for aname, tc in perf:
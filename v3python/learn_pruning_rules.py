@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import argparse
+import json
+from pathlib import Path
+from .rules import kernels as triton_kernels
+from .compiler.ledger import CompileLedger, DEFAULT_LEDGER, latest_records
+from .autotune.pruning import learn_rules
+from .codegen.schedule import kernel_arguments_of
+
+desc = """
+Propose pruning rules of autotune configs from the compile ledger of a
+--build_for_tuning build. Configs that time out, or spill more registers
+than the thresholds, are covered by rules that never prune a config that
+compiled without spills. With --write, the proposed rules are appended to the
+pruning rule files of the kernels (PRUNING_RULES of the KernelDescription).
+"""
+
+def parse():
+    p = argparse.ArgumentParser(description=desc)
+    p.add_argument("--build_dir", type=Path, default=Path('build'), help="Build directory of the tuning build")
+    p.add_argument("--ledger", type=Path, default=None, help=f"Compile ledger. Defaults to {DEFAULT_LEDGER} under --build_dir")
+    p.add_argument("--spills", type=Path, nargs='*', default=[],
+                   help="JSON lines files of measured spill counts, {\"hsaco\": ..., \"vgpr_spill_count\": ..., \"sgpr_spill_count\": ...}, e.g., from check_spill_registers of the tuning scripts")
+    p.add_argument("--vgpr_spill_threshold", type=int, default=0, help="Prune configs that spill more VGPRs than this. Negative to ignore VGPR spills")
+    p.add_argument("--sgpr_spill_threshold", type=int, default=-1, help="Prune configs that spill more SGPRs than this. Negative to ignore SGPR spills")
+    p.add_argument("--min_support", type=int, default=3, help="Minimal number of failed configs covered by a proposed rule")
+    p.add_argument("--max_conditions", type=int, default=2, help="Maximal number of conditions in a proposed rule")
+    p.add_argument("--write", action='store_true', help="Append the proposed rules to the pruning rule files")
+    args = p.parse_args()
+    return args
+
+'''
+Overlay measured spill counts onto the ledger records, matched by HSACO file name
+'''
+def merge_spills(records, spill_files):
+    by_name = { r['hsaco'] : r for r in records }
+    for fn in spill_files:
+        with open(fn) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                spill = json.loads(line)
+                r = by_name.get(Path(spill.get('hsaco', '')).name, None)
+                if r is None:
+                    continue
+                for key in ['vgpr_spill_count', 'sgpr_spill_count']:
+                    if key in spill:
+                        r[key] = spill[key]
+    return records
+
+def main():
+    args = parse()
+    ledger = CompileLedger(args.ledger if args.ledger is not None else args.build_dir / DEFAULT_LEDGER)
+    assert ledger.exists(), f'Compile ledger {ledger.path} does not exist'
+    records = merge_spills(latest_records(ledger.records()), args.spills)
+    kdescs = { k.NAME : k for k in triton_kernels if k.is_tunable }
+    existing = { name : k.pruning_rules for name, k in kdescs.items() }
+    proposals = learn_rules(records,
+                            kernel_arguments_of(triton_kernels),
+                            existing=existing,
+                            min_support=args.min_support,
+                            max_conditions=args.max_conditions,
+                            vgpr_spill_threshold=args.vgpr_spill_threshold,
+                            sgpr_spill_threshold=args.sgpr_spill_threshold)
+    if not proposals:
+        print('No rule proposed')
+        return
+    for kernel, rules in sorted(proposals.items()):
+        print(f'{kernel}: {len(rules)} rule(s)')
+        for rule in rules:
+            print(f'\t{json.dumps(rule.asdict())}')
+        if not args.write:
+            continue
+        kdesc = kdescs.get(kernel, None)
+        if kdesc is None or kdesc.pruning_rules_path is None:
+            print(f'\tSkipped: {kernel} has no pruning rule file')
+            continue
+        ruleset = existing[kernel]
+        ruleset.rules += rules
+        ruleset.save(kdesc.pruning_rules_path)
+        print(f'\tAppended to {kdesc.pruning_rules_path}')
+
+if __name__ == '__main__':
+    main()
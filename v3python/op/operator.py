@@ -5,6 +5,7 @@ from ..base import (
     Interface,
     Functional,
 )
+from ..base.lut import bucket_sparse_keys, scatter_lut
 import numpy as np
 
 class Operator(Interface):
@@ -44,30 +45,13 @@ class Operator(Interface):
     # TODO: Unify with KernelDescription.translate_dataframe?
     def translate_dataframe(self, f : Functional, df : 'pandas.DataFrame'):
         sparse_keys = [ f'inputs${key}' for key in self.OPTUNE_KEYS.keys() ]
-        nkeys = len(sparse_keys)
-        def sorted_unique_key(key):
-            return np.unique(df[key].to_numpy()).tolist()
-        sparse_key_possible_values = { key : sorted_unique_key(key) for key in sparse_keys }
-        binning_dict = { key : algo(sparse_key_possible_values[f'inputs${key}']) for key, algo in self.OPTUNE_KEYS.items() }
-        lut_shape = [f.noptimized_for] + [ len(sparse_key_possible_values[key]) for key in sparse_keys ]
-        lut_tensor = np.full(lut_shape, -1, dtype=np.int32)
-        backend_key = 'op$backend'
         '''
         Bucketing autotune indices
         '''
-        for i, ind_key in enumerate(sparse_keys):
-            bucket = sparse_key_possible_values[ind_key]
-            def discretization(v):
-                return bucket.index(v)
-            df[f'$$ind_{i}'] = df[ind_key].apply(discretization)
-        for i, gpu in enumerate(f.database_gpus):
-            if i > 0:
-                lut_tensor[i] = lut_tensor[0]
-            df_i = df[df['gpu'] == gpu]
-            inds = tuple([df_i[f'$$ind_{i}'] for i in range(nkeys)])
-            backends = df_i[backend_key]
-            import pandas as pd
-            lut_tensor[i][inds] = backends
+        sparse_key_possible_values, sparse_key_indices = bucket_sparse_keys(df, sparse_keys)
+        binning_dict = { key : algo(sparse_key_possible_values[f'inputs${key}']) for key, algo in self.OPTUNE_KEYS.items() }
+        backend_key = 'op$backend'
+        lut_tensor = scatter_lut(f, df, sparse_key_possible_values, sparse_key_indices, df[backend_key].to_numpy())
         '''
         LUT tensor for Optune stores string directly.
         '''
@@ -6,6 +6,7 @@ from ...gpu_targets import gpu2arch, AOTRITON_ARCH_WARPSIZE
 from ...op import Operator
 from ...kernel.kdesc import (
     KernelDescription,
+    Exclusion,
     get_possible_choices,
     select_pattern,
     ConditionalConstexpr,
@@ -46,23 +47,22 @@ def check_value(functional, repr_name):
 
 class FlashKernel(KernelDescription):
     FAMILY = 'flash'
+    MODULE_FILE = __file__
     LUT_FULL_SEQLEN_Q = [16,32,64,128,256,512,1024,2048,4096,8192]
     LUT_FULL_SEQLEN_K = [16,32,64,128,256,512,1024,2048,4096,8192]
     LUT_FULL_SEQLEN_NAVI = [16,32,64,128,256,512,1024]
 
-    def is_functional_disabled(self, functional):
+    @property
+    def FUNCTIONAL_EXCLUSIONS(self):
         if not hasattr(self, 'gen_autotune_configs'):  # only check acutal FA kernels
-            return False
-        is_causal = check_value(functional, ['CAUSAL', 'CAUSAL_TYPE'])
-        bias_type = check_value(functional, 'BIAS_TYPE')
-        # print(f'Functional {functional.godel_number=} {is_causal=} {bias_type=}')
-        if is_causal and bias_type != 0:
-            return True
-        if functional.arch.startswith('gfx11'):
-            hdim = check_value(functional, 'BLOCK_DMODEL')
-            if hdim > 256:
-                return True
-        return False
+            return []
+        return [
+            Exclusion([['CAUSAL', 'CAUSAL_TYPE'], 'BIAS_TYPE'],
+                      lambda is_causal, bias_type: is_causal and bias_type != 0),
+            Exclusion(['BLOCK_DMODEL'],
+                      lambda hdim: hdim > 256,
+                      arch=lambda arch: arch.startswith('gfx11')),
+        ]
 
     def sancheck_lut_tensor(self,
                             functional : 'Functional',
@@ -147,5 +147,4 @@ class FlashKernel(KernelDescription):
         return ret
 
 class FlashBwdKernel(FlashKernel):
-    def is_functional_disabled(self, functional):
-        return super().is_functional_disabled(functional)
+    pass
@@ -9,6 +9,7 @@ from ._common import (
     BinningExact,
     Config,
     check_value,
+    Exclusion,
     FlashAffine,
     ConditionalConstexpr as CC,
 )
@@ -118,12 +119,13 @@ class bwd_dq_dk_dv_v3(FlashAffine):
         CSVTranslator(column='ts_kv', iface_param='int32_t', value_translator=translate_csv_tskv),
     ]
 
+    FUNCTIONAL_EXCLUSIONS = [
+        Exclusion(['Q'], lambda dtype: '*fp32' in dtype),
+        Exclusion(['BLOCK_DMODEL'], lambda hdim: hdim > 192),
+    ]
+
     def is_functional_disabled(self, functional):
-        dtype = check_value(functional, ['Q'])
-        if '*fp32' in dtype:
-            return True
-        hdim = check_value(functional, ['BLOCK_DMODEL'])
-        if hdim > 192:
+        if super().is_functional_disabled(functional):
             return True
         # Unnecessary since CHOICE_FILTERS ensures BIAS_TYPE == 0
         # Kept in case furture ASM kernel supports BIAS_TYPE == 1
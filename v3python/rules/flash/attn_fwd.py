@@ -32,6 +32,7 @@ class attn_fwd(FlashKernel):
     NAME = 'attn_fwd'
     # Note: There is no other FWD metro kernel right now so the arguments are shared
     ARGUMENTS = OpAttnFwd.ARGUMENTS
+    PRUNING_RULES = 'attn_fwd.pruning.json'
 
     PERF_CHOICES = {
         frozenset(['PERSISTENT_TYPE']) : _IF_CAUSAL(TC.constexpr.int8_t(2)),
@@ -72,11 +73,11 @@ class attn_fwd(FlashKernel):
 
     DOWNGRADER = [(('RETURN_ENCODED_SOFTMAX', True), DOWNGRADE_RETURN_ENCODED_SOFTMAX)]
 
+    # Timeouts and configs without optimal kernels are pruned by PRUNING_RULES
     @staticmethod
     def gen_autotune_configs(f : 'Functional'):
         arch = f.arch
         dtype = check_value(f, ['Q'])
-        HEAD_DIM = check_value(f, ['BLOCK_DMODEL'])
         CAUSAL_TYPE = check_value(f, ['CAUSAL_TYPE'])
         ret = []
         CDNA = AOTRITON_ARCH_PRODUCTION_LINE[arch] == 'CDNA'
@@ -99,26 +100,10 @@ class attn_fwd(FlashKernel):
                                                                    NUM_WARPS,
                                                                    NUM_STAGES,
                                                                    PRE_LOAD_V):
-            if warps == 1 and M * N >= 64 * 128:
-                continue  # Timeout
-            if stages == 2 and M * N >= 64 * 32:
-                continue  # Timeout
-            if RDNA and HEAD_DIM == 256 and stages == 2:
-                continue  # Timeout
-            if HEAD_DIM >= 512 and M == 128 and N == 128 and warps == 2:
-                continue  # Timeout
             if dtype == '*fp32:16':
                 M //= 2
             if M < N:  # Faulty or duplicate
                 continue
-            if CDNA and M > 32 and N > 16 and stages == 2:
-                continue  # No optimal kernel according to 0.8b tuning db
-            if CDNA and M > 64 and N > 64 and warps == 1:
-                continue  # No optimal kernel according to 0.8b tuning db
-            if RDNA and M > 32 and N > 32 and stages == 2:
-                continue  # No optimal kernel according to 0.8b tuning db
-            if RDNA and M > 32 and N > 32 and warps == 1:
-                continue  # No optimal kernel according to 0.8b tuning db
             persistent_type = 2 if CAUSAL_TYPE != 0 else 0
             kw = { 'PERSISTENT_TYPE' : persistent_type,
                    'GRID_CU_MULTIP': 2,
@@ -55,6 +55,7 @@ class bwd_kernel_dk_dv(FlashBwdKernel):
     DEFAULT_NUM_WARPS=4
     DEFAULT_NUM_STAGES=1
     NAME = 'bwd_kernel_dk_dv'
+    PRUNING_RULES = 'bwd_kernel_dk_dv.pruning.json'
 
     AUTOTUNE_KEYS = {
         'max_seqlen_q' : BinningLessOrEqual,
@@ -70,13 +71,12 @@ class bwd_kernel_dk_dv(FlashBwdKernel):
     }
     DOWNGRADER = []
 
+    # Timeouts and configs without optimal kernels are pruned by PRUNING_RULES
     @staticmethod
     def gen_autotune_configs(f : 'Functional'):
         arch = f.arch
         dtype = check_value(f, ['Q'])
         HEAD_DIM = check_value(f, ['BLOCK_DMODEL'])
-        ret = []
-        CDNA = AOTRITON_ARCH_PRODUCTION_LINE[arch] == 'CDNA'
         RDNA = AOTRITON_ARCH_PRODUCTION_LINE[arch] == 'RDNA'
         # TODO: right sizes for fp32?
         BLOCK_SIZES = [16, 32, 64] if dtype != '*fp32:16' else [16, 32]
@@ -90,13 +90,5 @@ class bwd_kernel_dk_dv(FlashBwdKernel):
                                                             NUM_STAGES):
             if M < N:
                 continue  # deduplicate
-            if CDNA and M == 64 and N == 64 and warps == 4:
-                continue  # No optimal kernel according to 0.8b tuning db
-            if HEAD_DIM >= 512 and M == 64 and N == 64 and warps == 1:
-                continue  # Timeout
-            if RDNA and M * N >= 32 * 32 and warps < 4:
-                continue  # Timeout
-            if RDNA and M * N >= 32 * 16 and warps < 2:
-                continue  # Timeout
             kw = {'BLOCK_M': M, 'BLOCK_N': N, 'waves_per_eu': waves}
             yield Config(kw, num_stages=stages, num_warps=warps)
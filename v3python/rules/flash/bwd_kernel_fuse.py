@@ -14,7 +14,6 @@ from ._common import (
 )
 from .attn_fwd import attn_fwd
 from .op_attn_bwd import OpAttnBwd
-from v3python.gpu_targets import AOTRITON_ARCH_PRODUCTION_LINE
 match_fwd = lambda aname : get_possible_choices(attn_fwd, aname)
 
 class bwd_kernel_fuse(FlashBwdKernel):
@@ -65,6 +64,7 @@ class bwd_kernel_fuse(FlashBwdKernel):
     DEFAULT_NUM_WARPS=4
     DEFAULT_NUM_STAGES=1
     NAME = 'bwd_kernel_fuse'
+    PRUNING_RULES = 'bwd_kernel_fuse.pruning.json'
 
     AUTOTUNE_KEYS = {
         'max_seqlen_q' : BinningLessOrEqual,
@@ -75,14 +75,10 @@ class bwd_kernel_fuse(FlashBwdKernel):
     }
     DOWNGRADER = []
 
+    # Timeouts and configs without optimal kernels are pruned by PRUNING_RULES
     @staticmethod
     def gen_autotune_configs(f : 'Functional'):
-        arch = f.arch
         dtype = check_value(f, ['Q'])
-        HEAD_DIM = check_value(f, ['BLOCK_DMODEL'])
-        ret = []
-        CDNA = AOTRITON_ARCH_PRODUCTION_LINE[arch] == 'CDNA'
-        RDNA = AOTRITON_ARCH_PRODUCTION_LINE[arch] == 'RDNA'
         # TODO: right sizes for fp32?
         BLOCK_SIZES = [16, 32, 64] if dtype != '*fp32:16' else [16, 32]
         WAVES_PER_EU = [1, 2, 3, 4]
@@ -95,14 +91,6 @@ class bwd_kernel_fuse(FlashBwdKernel):
                                                             NUM_STAGES):
             if M < N:
                 continue  # deduplicate
-            if CDNA and M == 64 and N == 64 and warps == 4:
-                continue  # No optimal kernel according to 0.8b tuning db
-            if RDNA and M > 32 and warps == 1:
-                continue  # No optimal kernel according to 0.8b tuning db
-            if RDNA and M == 32  and N == 32 and warps != 4:
-                continue  # Timeout
-            if HEAD_DIM > 256 and M == 64 and N == 64 and warps == 1:
-                continue  # Timeout
             kw = {'BLOCK_M': M, 'BLOCK_N': N, 'waves_per_eu': waves}
             yield Config(kw, num_stages=stages, num_warps=warps)
 
@@ -2,12 +2,22 @@
 # SPDX-License-Identifier: MIT
 
 from .lazy_file import LazyFile
-from .registry import RegistryRepository
+from .output_sink import OutputSink
+from .registry import (
+    RegistryRepository,
+    RegistryJournal,
+    resolve_placeholders,
+)
 from .dict2json import dict2json
 from .log import log
+from .profile import profiler
 
 __all__ = [
     "LazyFile",
+    "OutputSink",
     "RegistryRepository",
+    "RegistryJournal",
+    "resolve_placeholders",
     "log",
+    "profiler",
 ]
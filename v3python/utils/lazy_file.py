@@ -4,14 +4,19 @@
 import shutil
 import io
 from pathlib import Path
+from .profile import profiler
+from .output_sink import OutputSink
 
 # LazyFile: a class to support lazy write to disk file
 #           The file is only updated when the content changes
 # Was named as NoWriteIfNoUpdateFile (very verbose)
+#
+# Within an active OutputSink, the content is handed over to the sink, which
+# compares against its digest index and writes in the background.
+# Otherwise the old content is read and compared synchronously.
 class LazyFile(object):
     def __init__(self, ofn : Path):
         self._ofn = ofn
-        self._old_content = ''
 
     @property
     def path(self):
@@ -19,9 +24,6 @@ class LazyFile(object):
 
     def __enter__(self):
         self._mf = io.StringIO()
-        if self._ofn.exists():
-            with open(self._ofn) as f:
-                self._old_content = f.read()
         return self._mf
 
     @property
@@ -29,10 +31,23 @@ class LazyFile(object):
         return self._mf
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            return
+        sink = OutputSink.active()
+        if sink is not None:
+            sink.write(self.path, self.memory_file.getvalue())
+            return
+        old_content = ''
+        if self._ofn.exists():
+            with profiler.span('LazyFile.read'), open(self._ofn) as f:
+                old_content = f.read()
         mf = self.memory_file
         mf.seek(0)
-        if mf.read() != self._old_content:
+        if mf.read() != old_content:
             mf.seek(0)
-            with open(self.path, 'w') as of:
+            with profiler.span('LazyFile.write'), open(self.path, 'w') as of:
                 shutil.copyfileobj(mf, of)
-
+                profiler.count('files_written')
+                profiler.count('bytes_written', of.tell())
+        else:
+            profiler.count('files_unchanged')
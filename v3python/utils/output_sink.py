@@ -0,0 +1,155 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .profile import profiler
+
+'''
+OutputSink: shared, asynchronous backend of LazyFile
+
+Files are only updated when the content changes, same as LazyFile. However
+the old content is not read back for comparison. Instead a sidecar index
+records the blake2b digest, size and mtime of every generated file. A file
+whose digest matches the index, and whose size/mtime still match the file
+system, is skipped without being opened.
+
+Files without index entry (e.g., the first run with the sidecar) fall back
+to read-and-compare, which is done in the background as well.
+
+Writes are atomic (temporary file in the same directory + os.replace), and
+executed by a thread pool. OutputSink.__exit__ waits for all writes and
+saves the index. Exceptions in background writes are raised there.
+
+Usage:
+    with OutputSink(build_dir / OutputSink.INDEX_FILE):
+        with LazyFile(fn) as fout:
+            ...
+'''
+class OutputSink(object):
+    INDEX_FILE = '.aotriton_outputs.json'
+    INDEX_VERSION = 1
+    _active = None
+
+    def __init__(self, index_file : Path, max_workers=4):
+        self._index_file = Path(index_file)
+        self._max_workers = max_workers
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    '''
+    The active sink is not inherited by forked processes (e.g., --jobs workers)
+    because its threads are not.
+    '''
+    @staticmethod
+    def active():
+        sink = OutputSink._active
+        if sink is None or sink._pid != os.getpid():
+            return None
+        return sink
+
+    def _load_index(self):
+        try:
+            with open(self._index_file) as f:
+                j = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if j.get('version') != self.INDEX_VERSION:
+            return {}
+        return j['files']
+
+    def _save_index(self):
+        self._index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_file.with_name(self._index_file.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({ 'version' : self.INDEX_VERSION, 'files' : self._index }, f, sort_keys=True)
+        os.replace(tmp, self._index_file)
+
+    def __enter__(self):
+        assert OutputSink._active is None, 'Nested OutputSink is not supported'
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                            thread_name_prefix='OutputSink')
+        self._pid = os.getpid()
+        OutputSink._active = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        OutputSink._active = None
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._save_index()
+
+    '''
+    Wait for all pending writes. Re-raises the first exception.
+    '''
+    def flush(self):
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending = {}
+        for fut in pending:
+            fut.result()
+
+    @staticmethod
+    def digest(text : str):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _is_up_to_date(self, key, digest):
+        entry = self._index.get(key)
+        if entry is None or entry[0] != digest:
+            return False
+        try:
+            st = os.stat(key)
+        except FileNotFoundError:
+            return False
+        return st.st_size == entry[1] and st.st_mtime_ns == entry[2]
+
+    def write(self, path : Path, text : str):
+        key = str(Path(path).absolute())
+        digest = self.digest(text)
+        with self._lock:
+            # Writes to the same file must be serialized
+            previous = self._pending.pop(key, None)
+        if previous is not None:
+            previous.result()
+        if self._is_up_to_date(key, digest):
+            profiler.count('files_unchanged')
+            return
+        fut = self._executor.submit(self._write_file, key, digest, text)
+        with self._lock:
+            self._pending[key] = fut
+
+    def _write_file(self, key, digest, text):
+        if key not in self._index and os.path.exists(key):
+            with profiler.span('LazyFile.read'), open(key) as f:
+                if f.read() == text:
+                    self._record(key, digest)
+                    profiler.count('files_unchanged')
+                    return
+        tmp = f'{key}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with profiler.span('LazyFile.write'):
+            try:
+                with open(tmp, 'w') as of:
+                    of.write(text)
+                    profiler.count('bytes_written', of.tell())
+                os.replace(tmp, key)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        profiler.count('files_written')
+        self._record(key, digest)
+
+    def _record(self, key, digest):
+        st = os.stat(key)
+        entry = [digest, st.st_size, st.st_mtime_ns]
+        with self._lock:
+            self._index[key] = entry
@@ -0,0 +1,155 @@
+# Copyright © 2025 Advanced Micro Devices, Inc.
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+'''
+Phase-level profiler of the generator, enabled by v3python.generate --profile
+
+Recommended usage:
+    with profiler.span('translate_dataframe'):
+        ...
+    profiler.count('db_rows_read', len(rows))
+
+Both are no-ops when the profiler is not enabled.
+Spans are exported as Chrome trace (chrome://tracing or https://ui.perfetto.dev)
+'''
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span(object):
+    def __init__(self, profiler, name, cat, args):
+        self._profiler = profiler
+        self._name = name
+        self._cat = cat
+        self._args = args
+
+    def __enter__(self):
+        self._begin = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        event = {
+            'name' : self._name,
+            'cat'  : self._cat,
+            'ph'   : 'X',
+            # perf_counter is CLOCK_MONOTONIC, hence comparable among --jobs workers
+            'ts'   : self._begin / 1000.0,
+            'dur'  : (end - self._begin) / 1000.0,
+            'pid'  : os.getpid(),
+            'tid'  : threading.get_ident(),
+        }
+        if self._args:
+            event['args'] = self._args
+        self._profiler._record(event)
+
+class Profiler(object):
+    # Categories listed individually in the summary.
+    # Other categories (e.g. 'functional') only have aggregated rows.
+    SUMMARY_DETAILED_CATS = ['phase', 'interface']
+    SUMMARY_TOP_N = 10
+
+    def __init__(self):
+        self._enabled = False
+        # Spans and counters are also recorded by OutputSink threads
+        self._lock = threading.Lock()
+        self._events = []
+        self._counters = defaultdict(int)
+        # --jobs workers may be forked while a thread holds the lock
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def enable(self):
+        self._enabled = True
+
+    def span(self, name, cat='phase', **args):
+        if not self._enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def _record(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def count(self, name, n=1):
+        if self._enabled:
+            with self._lock:
+                self._counters[name] += n
+
+    '''
+    Returns and clears the recorded events and counters.
+    Used by --jobs workers to send their records to the main process.
+    '''
+    def take(self):
+        with self._lock:
+            events, counters = self._events, dict(self._counters)
+            self._events = []
+            self._counters = defaultdict(int)
+        return events, counters
+
+    def merge(self, events, counters):
+        with self._lock:
+            self._events += events
+            for k, v in counters.items():
+                self._counters[k] += v
+
+    def summarize(self):
+        groups = defaultdict(list)
+        for e in self._events:
+            key = (e['cat'], e['name']) if e['cat'] in self.SUMMARY_DETAILED_CATS else (e['cat'], '*')
+            groups[key].append(e['dur'])
+        lines = []
+        lines.append(f'{"Category":<12} {"Name":<40} {"Count":>8} {"Total(s)":>10} {"Mean(ms)":>10} {"Max(ms)":>10}')
+        rows = sorted(groups.items(), key=lambda kv: sum(kv[1]), reverse=True)
+        for (cat, name), durs in rows:
+            total = sum(durs)
+            lines.append(f'{cat:<12} {name:<40} {len(durs):>8} {total/1e6:>10.3f} {total/len(durs)/1e3:>10.3f} {max(durs)/1e3:>10.3f}')
+        functionals = [ e for e in self._events if e['cat'] == 'functional' ]
+        if functionals:
+            lines.append('')
+            lines.append(f'Top {self.SUMMARY_TOP_N} slowest Functionals')
+            for e in sorted(functionals, key=lambda e: e['dur'], reverse=True)[:self.SUMMARY_TOP_N]:
+                lines.append(f'{e["dur"]/1e3:>10.3f} ms  {e["name"]}')
+        if self._counters:
+            lines.append('')
+            lines.append('Counters')
+            for k in sorted(self._counters.keys()):
+                lines.append(f'{k:<40} {self._counters[k]:>16}')
+        return '\n'.join(lines)
+
+    '''
+    Write Chrome trace JSON to path, and the summary table to path + '.txt'
+    '''
+    def write(self, path):
+        counters = dict(sorted(self._counters.items()))
+        trace = {
+            'traceEvents' : self._events,
+            'displayTimeUnit' : 'ms',
+            'otherData' : { 'counters' : counters },
+        }
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+        summary = self.summarize()
+        with open(str(path) + '.txt', 'w') as f:
+            print(summary, file=f)
+        print(summary)
+
+profiler = Profiler()
@@ -1,8 +1,11 @@
 # Copyright © 2025 Advanced Micro Devices, Inc.
 # SPDX-License-Identifier: MIT
 
+import io
+import re
 from dataclasses import dataclass
 from collections import defaultdict
+from .lazy_file import LazyFile
 
 class StringRegistry(object):
     def __init__(self):
@@ -106,6 +109,7 @@ Class to register re-used code or objects
 class RegistryRepository(object):
     def __init__(self):
         self._subreg_dict = {}
+        self._bundles = defaultdict(list)
 
     def _get_registry_with_factory(self, name, factory):
         if name not in self._subreg_dict:
@@ -136,3 +140,154 @@ class RegistryRepository(object):
         if name in self._subreg_dict:
             return self._subreg_dict[name].get_data()
         return None
+
+    '''
+    bundle: the file is a unity build bundle. The output is appended to the
+            bundle as an entry, and written by write_bundles()
+    '''
+    def open_output(self, path, bundle=False):
+        if bundle:
+            return DeferredFile(self._bundles[path])
+        return LazyFile(path)
+
+    '''
+    Write all bundles. Entries are concatenated in the order of open_output
+    Returns the list of bundle files
+    '''
+    def write_bundles(self):
+        bundles, self._bundles = self._bundles, defaultdict(list)
+        for path, entries in bundles.items():
+            with LazyFile(path) as fout:
+                for (text,) in entries:
+                    fout.write(text)
+        return list(bundles.keys())
+
+    _KIND_TO_GETTER = {
+        'string'                : 'get_string_registry',
+        'function'              : 'get_function_registry',
+        'signatured_function'   : 'get_signatured_function_registry',
+        'hsaco'                 : 'get_hsaco_registry',
+        'list'                  : 'get_list_registry',
+        'dict'                  : 'get_dict_registry',
+    }
+
+    '''
+    Apply registrations recorded by a RegistryJournal, in recording order.
+    Returns the list of actual values that replace the journal's placeholders.
+    '''
+    def replay(self, entries, decode=None):
+        values = []
+        for kind, name, args, kwargs in entries:
+            registry = getattr(self, self._KIND_TO_GETTER[kind])(name)
+            args = resolve_placeholders(args, values)
+            if decode is not None:
+                args = decode(args)
+            values.append(registry.register(*args, **kwargs))
+        return values
+
+'''
+Journaling of registrations, used by parallel code generation.
+
+Values returned by the registries above depend on the registration order (e.g.
+offsets in StringRegistry, indices in SignaturedFunctionRegistry), and these
+values are printed into the generated files. Worker processes hence cannot
+compute them. Instead, RegistryJournal returns placeholders and records every
+register() call. The main process then calls RegistryRepository.replay() with
+journals in the same order as the serial generation, which assigns identical
+values, and resolve_placeholders() substitutes them into the generated text.
+'''
+
+PLACEHOLDER_PATTERN = re.compile('\x00([0-9]+)\x00')
+
+def _make_placeholder(n):
+    return f'\x00{n}\x00'
+
+class JournaledRegistry(object):
+    def __init__(self, journal, kind, name):
+        self._journal = journal
+        self._kind = kind
+        self._name = name
+        self._local_fsigs = {}
+
+    def register(self, *args, **kwargs):
+        placeholder = self._journal.record(self._kind, self._name, args, kwargs)
+        # Only SignaturedFunctionRegistry.contains() needs local bookkeeping
+        if self._kind == 'signatured_function':
+            self._local_fsigs.setdefault(args[0], placeholder)
+        return placeholder
+
+    def contains(self, fsig):
+        if fsig in self._local_fsigs:
+            return True, self._local_fsigs[fsig]
+        return False, None
+
+class RegistryJournal(object):
+    def __init__(self, encode=None):
+        self._encode = encode if encode is not None else (lambda o : o)
+        self._entries = []
+        self._outputs = []
+        self._subreg_dict = {}
+
+    def _get_journaled(self, kind, name):
+        if name not in self._subreg_dict:
+            self._subreg_dict[name] = JournaledRegistry(self, kind, name)
+        return self._subreg_dict[name]
+
+    def get_string_registry(self, name):
+        return self._get_journaled('string', name)
+
+    def get_function_registry(self, name):
+        return self._get_journaled('function', name)
+
+    def get_signatured_function_registry(self, name):
+        return self._get_journaled('signatured_function', name)
+
+    def get_hsaco_registry(self, name):
+        return self._get_journaled('hsaco', name)
+
+    def get_list_registry(self, name):
+        return self._get_journaled('list', name)
+
+    def get_dict_registry(self, name):
+        return self._get_journaled('dict', name)
+
+    def record(self, kind, name, args, kwargs):
+        n = len(self._entries)
+        self._entries.append((kind, name, self._encode(args), kwargs))
+        return _make_placeholder(n)
+
+    def open_output(self, path, bundle=False):
+        return DeferredFile(self._outputs, path, bundle)
+
+    @property
+    def entries(self):
+        return self._entries
+
+    @property
+    def outputs(self):
+        return self._outputs
+
+'''
+Appends (text, *keys) to outputs when the with-block exits without exception
+'''
+class DeferredFile(object):
+    def __init__(self, outputs, *keys):
+        self._outputs = outputs
+        self._keys = keys
+
+    def __enter__(self):
+        self._mf = io.StringIO()
+        return self._mf
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self._outputs.append((self._mf.getvalue(), *self._keys))
+
+def resolve_placeholders(obj, values):
+    if isinstance(obj, str):
+        return PLACEHOLDER_PATTERN.sub(lambda m : str(values[int(m.group(1))]), obj)
+    if isinstance(obj, tuple):
+        return tuple([resolve_placeholders(o, values) for o in obj])
+    if isinstance(obj, list):
+        return [resolve_placeholders(o, values) for o in obj]
+    return obj
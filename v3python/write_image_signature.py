@@ -30,7 +30,8 @@ def main():
     args = parse()
     sig = {}
     sig['AOTRITON_GIT_SHA1'] = args.git_sha1
-    fac = DatabaseFactories.create_factory(args.build_dir)
+    # Only file names are needed, do not open the database
+    fac = DatabaseFactories.find_factory(args.build_dir)
     db = { 'primary' : hashfile(args.build_dir / fac.SIGNATURE_FILE) }
     def gen_secondary_db_hash():
         for k, v in fac.SECONDARY_DATABASES.items():
@@ -3,6 +3,7 @@
 
 #include <aotriton/_internal/packed_kernel.h>
 #include <aotriton/runtime.h>
+#include <algorithm>
 #include <mutex>
 #include <cstring>
 #include <cassert>
@@ -27,6 +28,7 @@
 namespace fs = std::filesystem;
 static const std::string_view KERNEL_STORAGE_V2_BASE = "aotriton.images";
 static const std::string AKS2_MAGIC = "AKS2";
+static const std::string AKS3_MAGIC = "AKS3";
 constexpr int AOTRITON_LZMA_BUFSIZ = 64 * 1024;
 
 namespace {
@@ -132,6 +134,87 @@ struct AKS2_Metadata {
   uint32_t image_size;
   uint32_t filename_length;
 };
+
+// AKS3 Format, see v3python/aks3.py for details
+// -- Uncompressed
+// Header
+// B * AKS3_Block
+// N * AKS3_Entry, sorted by (name_hash, name)
+// Name table
+// -- Compressed
+// B * varlen: Blocks, each can be decompressed independently
+struct AKS3_Header {
+  char magic[4];
+  uint32_t number_of_kernels;
+  uint32_t number_of_blocks;
+  uint32_t names_size;
+};
+
+struct AKS3_Block {
+  uint64_t offset;
+  uint32_t compressed_size;
+  uint32_t raw_size;
+  uint32_t codec;
+  uint32_t reserved;
+};
+
+struct AKS3_Entry {
+  uint64_t name_hash;
+  uint32_t name_offset;
+  uint32_t name_length;
+  uint32_t block;
+  uint32_t offset;
+  uint32_t image_size;
+  uint32_t shared_memory;
+  uint32_t number_of_threads;
+  uint32_t reserved;
+};
+
+static_assert(sizeof(AKS2_Header) == sizeof(AKS3_Header));
+static_assert(sizeof(AKS3_Block) == 24);
+static_assert(sizeof(AKS3_Entry) == 40);
+
+constexpr uint32_t AKS3_CODEC_STORED = 0;
+constexpr uint32_t AKS3_CODEC_XZ = 1;
+constexpr uint32_t AKS3_NO_BLOCK = 0xFFFFFFFF;
+
+namespace {
+
+// FNV-1a 64-bit, same as v3python.aks3.name_hash
+uint64_t
+aks3_name_hash(std::string_view name) {
+  uint64_t h = 0xcbf29ce484222325ULL;
+  for (unsigned char c : name) {
+    h ^= c;
+    h *= 0x100000001b3ULL;
+  }
+  return h;
+}
+
+}
+
+PackedKernel::PackedKernel(int fd) {
+  union {
+    AKS2_Header aks2;
+    AKS3_Header aks3;
+  } header;
+  auto header_read = fd_read(fd, &header, sizeof(header));
+  if (header_read != sizeof(header)) {
+    final_status_ = hipErrorInvalidSource;
+    return;
+  }
+  std::string_view magic(header.aks2.magic, 4);
+  if (magic == AKS2_MAGIC) {
+    format_ = 2;
+    final_status_ = open_aks2(fd, header.aks2);
+  } else if (magic == AKS3_MAGIC) {
+    format_ = 3;
+    final_status_ = open_aks3(fd, header.aks3);
+  } else {
+    final_status_ = hipErrorInvalidSource;
+  }
+}
+
 // AKS2 Format
 // -- Uncompressed
 // 4B: AKS2  (AOTriton Kernel Storage version 2)
@@ -147,13 +230,8 @@ struct AKS2_Metadata {
 //     4B file name length (M), including trailing '\0'
 //     MB file name
 // N * varlen: Kernel Images (TODO: alignment requirements?)
-PackedKernel::PackedKernel(int fd) {
-  AKS2_Header header;
-  auto header_read = fd_read(fd, &header, sizeof(AKS2_Header));
-  if (header_read == sizeof(AKS2_MAGIC) && std::string_view(header.magic, 4) != AKS2_MAGIC) {
-    final_status_ = hipErrorInvalidSource; // Broken at XZ level
-    return;
-  }
+hipError_t
+PackedKernel::open_aks2(int fd, const AKS2_Header& header) {
   decompressed_content_.resize(header.uncompressed_size);
   directory_.clear();
 
@@ -163,8 +241,7 @@ PackedKernel::PackedKernel(int fd) {
 #if AOTRITON_KERNEL_VERBOSE
     std::cerr << " lzma_stream_decoder error: " << ret << std::endl;
 #endif
-    final_status_ = hipErrorInvalidSource; // Broken at XZ level
-    return;
+    return hipErrorInvalidSource; // Broken at XZ level
   }
   uint8_t inbuf[AOTRITON_LZMA_BUFSIZ];
   strm.next_in = nullptr;
@@ -186,10 +263,11 @@ PackedKernel::PackedKernel(int fd) {
     if (ret != LZMA_OK && ret != LZMA_STREAM_END) {
       decompressed_content_.clear();
       directory_.clear();
-      final_status_ = hipErrorIllegalState; // Content not fully decompressed
-      return;
+      lzma_end(&strm);
+      return hipErrorIllegalState; // Content not fully decompressed
     }
   }
+  lzma_end(&strm);
 #if AOTRITON_KERNEL_VERBOSE
   std::cerr << "PackedKernel decompressed to " << (void*)decompressed_content_.data() << std::endl;
 #endif
@@ -212,13 +290,66 @@ PackedKernel::PackedKernel(int fd) {
     decompressed_content_.clear();
     directory_.clear();
     // Directory size not matching
-    final_status_ = hipErrorIllegalAddress;
-    return;
+    return hipErrorIllegalAddress;
   }
 #if AOTRITON_KERNEL_VERBOSE
   std::cerr << "PackedKernel.kernel_start_ sanity check passed" << std::endl;
 #endif
-  final_status_ = hipSuccess;
+  return hipSuccess;
+}
+
+// Only the index of AKS3 is parsed here. The compressed blocks are kept in
+// memory and decompressed by filter() on demand.
+hipError_t
+PackedKernel::open_aks3(int fd, const AKS3_Header& header) {
+  archive_content_.clear();
+  uint8_t inbuf[AOTRITON_LZMA_BUFSIZ];
+  while (true) {
+    auto rbytes = fd_read(fd, inbuf, AOTRITON_LZMA_BUFSIZ);
+    if (rbytes < 0) {
+      archive_content_.clear();
+      return hipErrorInvalidSource;
+    }
+    if (rbytes == 0)
+      break;
+    archive_content_.insert(archive_content_.end(), inbuf, inbuf + rbytes);
+  }
+  size_t index_size = size_t(header.number_of_blocks) * sizeof(AKS3_Block) +
+                      size_t(header.number_of_kernels) * sizeof(AKS3_Entry) +
+                      header.names_size;
+  if (archive_content_.size() < index_size) {
+    archive_content_.clear();
+    return hipErrorIllegalAddress; // Truncated index
+  }
+  const uint8_t* parse_ptr = archive_content_.data();
+  blocks_ = reinterpret_cast<const AKS3_Block*>(parse_ptr);
+  parse_ptr += header.number_of_blocks * sizeof(AKS3_Block);
+  entries_ = reinterpret_cast<const AKS3_Entry*>(parse_ptr);
+  parse_ptr += header.number_of_kernels * sizeof(AKS3_Entry);
+  names_ = reinterpret_cast<const char*>(parse_ptr);
+  parse_ptr += header.names_size;
+  block_start_ = parse_ptr;
+  size_t data_size = archive_content_.data() + archive_content_.size() - block_start_;
+  for (uint32_t i = 0; i < header.number_of_blocks; i++) {
+    if (blocks_[i].offset + blocks_[i].compressed_size > data_size) {
+      archive_content_.clear();
+      return hipErrorIllegalAddress; // Block beyond the end of file
+    }
+  }
+  for (uint32_t i = 0; i < header.number_of_kernels; i++) {
+    if (uint64_t(entries_[i].name_offset) + entries_[i].name_length > header.names_size) {
+      archive_content_.clear();
+      return hipErrorIllegalAddress; // Name beyond the name table
+    }
+  }
+  number_of_kernels_ = header.number_of_kernels;
+  number_of_blocks_ = header.number_of_blocks;
+  decompressed_blocks_.resize(number_of_blocks_);
+#if AOTRITON_KERNEL_VERBOSE
+  std::cerr << "PackedKernel AKS3 index: " << number_of_kernels_ << " kernels in "
+            << number_of_blocks_ << " blocks" << std::endl;
+#endif
+  return hipSuccess;
 }
 
 PackedKernel::~PackedKernel() {
@@ -229,6 +360,13 @@ PackedKernel::filter(std::string_view stem_name) const {
   if (status() != hipSuccess) {
     return { nullptr, 0, 0, dim3 { 0, 0, 0 } };
   }
+  if (format_ == 3)
+    return filter_aks3(stem_name);
+  return filter_aks2(stem_name);
+}
+
+TritonKernel::Essentials
+PackedKernel::filter_aks2(std::string_view stem_name) const {
   auto iter = directory_.find(stem_name);
   if (iter == directory_.end())
     return { nullptr, 0, 0, dim3 { 0, 1, 1 } };
@@ -245,4 +383,70 @@ PackedKernel::filter(std::string_view stem_name) const {
            dim3 { meta->number_of_threads, 1, 1 } };
 }
 
-}
\ No newline at end of file
+TritonKernel::Essentials
+PackedKernel::filter_aks3(std::string_view stem_name) const {
+  uint64_t h = aks3_name_hash(stem_name);
+  auto first = entries_;
+  auto last = entries_ + number_of_kernels_;
+  auto iter = std::lower_bound(first, last, h,
+                               [](const AKS3_Entry& e, uint64_t h) { return e.name_hash < h; });
+  for (; iter != last && iter->name_hash == h; iter++) {
+    if (std::string_view(names_ + iter->name_offset, iter->name_length) == stem_name)
+      break;
+  }
+  if (iter == last || iter->name_hash != h)
+    return { nullptr, 0, 0, dim3 { 0, 1, 1 } };
+  if (iter->image_size == 0 || iter->block == AKS3_NO_BLOCK) {
+    assert(iter->shared_memory == 0);
+    assert(iter->number_of_threads == 0);
+    return { nullptr, 0, 0, 0 };
+  }
+  if (iter->block >= number_of_blocks_ ||
+      iter->offset + iter->image_size > blocks_[iter->block].raw_size) {
+    return { nullptr, 0, 0, dim3 { 0, 1, 1 } };
+  }
+  const uint8_t* block = decompress_block(iter->block);
+  if (!block)
+    return { nullptr, 0, 0, dim3 { 0, 1, 1 } };
+  return { block + iter->offset,
+           iter->image_size,
+           static_cast<int>(iter->shared_memory),
+           dim3 { iter->number_of_threads, 1, 1 } };
+}
+
+// Returns the uncompressed block, or nullptr if the block is broken.
+// Decompressed blocks are kept until the PackedKernel is destroyed, because
+// TritonKernel::Essentials points to them.
+const uint8_t*
+PackedKernel::decompress_block(uint32_t index) const {
+  const auto& block = blocks_[index];
+  const uint8_t* in = block_start_ + block.offset;
+  if (block.codec == AKS3_CODEC_STORED)
+    return in;
+  if (block.codec != AKS3_CODEC_XZ)
+    return nullptr;
+  std::unique_lock lock(block_mutex_);
+  auto& out = decompressed_blocks_[index];
+  if (out)
+    return out->data();
+  auto buf = std::make_unique<std::vector<uint8_t>>(block.raw_size);
+  uint64_t memlimit = UINT64_MAX;
+  size_t in_pos = 0;
+  size_t out_pos = 0;
+  lzma_ret ret = lzma_stream_buffer_decode(&memlimit, 0, nullptr,
+                                           in, &in_pos, block.compressed_size,
+                                           buf->data(), &out_pos, buf->size());
+  if (ret != LZMA_OK || out_pos != block.raw_size) {
+#if AOTRITON_KERNEL_VERBOSE
+    std::cerr << "PackedKernel AKS3 block " << index << " decompression error: " << ret << std::endl;
+#endif
+    return nullptr;
+  }
+#if AOTRITON_KERNEL_VERBOSE
+  std::cerr << "PackedKernel AKS3 block " << index << " decompressed to " << (void*)buf->data() << std::endl;
+#endif
+  out = std::move(buf);
+  return out->data();
+}
+
+}